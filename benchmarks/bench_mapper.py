@@ -0,0 +1,161 @@
+"""
+CodebaseMapper Walker Benchmark
+
+Times the original recursive os.listdir/os.path.isdir walker against the
+scandir-based walker (serial and threaded) and the incremental rescan,
+checking that every variant renders exactly the same tree.
+
+Usage:
+    python benchmarks/bench_mapper.py                 # synthetic 100k-file tree
+    python benchmarks/bench_mapper.py --files 250000
+    python benchmarks/bench_mapper.py --root /path/to/monorepo
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.file_tools import CodebaseMapper
+
+
+def legacy_build_tree(mapper: CodebaseMapper, path: str, lines: list, prefix: str) -> None:
+    """The walker CodebaseMapper used before scandir (kept as the baseline)."""
+    try:
+        entries = sorted(os.listdir(path))
+    except PermissionError:
+        lines.append(f"{prefix}[Permission Denied]")
+        return
+
+    dirs = []
+    files = []
+    for entry in entries:
+        full_path = os.path.join(path, entry)
+        if entry in mapper.IGNORE_DIRS:
+            continue
+        _, ext = os.path.splitext(entry)
+        if ext in mapper.IGNORE_EXTENSIONS or entry in mapper.IGNORE_FILES:
+            continue
+        if os.path.isdir(full_path):
+            dirs.append(entry)
+        else:
+            files.append(entry)
+
+    for i, d in enumerate(dirs):
+        is_last_dir = (i == len(dirs) - 1) and (len(files) == 0)
+        connector = "└── " if is_last_dir else "├── "
+        lines.append(f"{prefix}{connector}📁 {d}/")
+        new_prefix = prefix + ("    " if is_last_dir else "│   ")
+        legacy_build_tree(mapper, os.path.join(path, d), lines, new_prefix)
+
+    for i, f in enumerate(files):
+        is_last = (i == len(files) - 1)
+        connector = "└── " if is_last else "├── "
+        lines.append(f"{prefix}{connector}📄 {f}")
+
+
+def make_tree(root: str, total_files: int, files_per_dir: int = 20, fanout: int = 8) -> int:
+    """
+    Create a synthetic source tree.
+
+    Returns:
+        Number of directories created
+    """
+    created = 0
+    dirs = 0
+    queue = [root]
+    while created < total_files:
+        parent = queue.pop(0)
+        for i in range(fanout):
+            path = os.path.join(parent, f"pkg{i}")
+            os.mkdir(path)
+            dirs += 1
+            queue.append(path)
+            for j in range(min(files_per_dir, total_files - created)):
+                ext = (".py", ".md", ".json", ".pyc")[j % 4]
+                open(os.path.join(path, f"module_{j}{ext}"), "w").close()
+                created += 1
+            if created >= total_files:
+                break
+    return dirs
+
+
+def best_of(repeat: int, fn):
+    """Fastest wall time of ``repeat`` runs and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--root", help="Existing tree to map instead of a synthetic one")
+    parser.add_argument("--files", type=int, default=100_000, help="Files in the synthetic tree")
+    parser.add_argument("--workers", type=int, default=CodebaseMapper().max_workers)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = None
+    root = args.root
+    if root is None:
+        tmp = tempfile.mkdtemp(prefix="bench_mapper_")
+        root = tmp
+        print(f"Creating {args.files:,} files under {root} ...")
+        dirs = make_tree(root, args.files)
+        print(f"  {dirs:,} directories")
+
+    try:
+        serial = CodebaseMapper(max_workers=1)
+        threaded = CodebaseMapper(max_workers=args.workers)
+
+        def run_legacy():
+            lines = []
+            legacy_build_tree(serial, root, lines, "")
+            return lines
+
+        def run_walker(mapper):
+            lines = []
+            mapper._build_tree(root, lines, "")
+            return lines
+
+        # Unchanged-tree check against a snapshot of the same tree; a freshly
+        # generated tree is inside the racy-mtime window, so stamp real mtimes
+        trusted = {}
+        serial._build_tree(root, [], "", new=trusted)
+        for rel, entry in trusted.items():
+            path = root if rel == "." else os.path.join(root, *rel.split("/"))
+            st = os.stat(path)
+            entry[:2] = [st.st_mtime_ns, st.st_ino]
+
+        results = [
+            ("legacy listdir+isdir (recursive)", *best_of(args.repeat, run_legacy)),
+            ("scandir, serial", *best_of(args.repeat, lambda: run_walker(serial))),
+            (f"scandir, {args.workers} threads", *best_of(args.repeat, lambda: run_walker(threaded))),
+            ("snapshot unchanged check", *best_of(
+                args.repeat, lambda: serial._snapshot_current(root, trusted)
+            )),
+        ]
+
+        baseline_time, baseline_lines = results[0][1], results[0][2]
+        print(f"\n{len(baseline_lines):,} map lines, best of {args.repeat}\n")
+        print(f"{'variant':<36} {'seconds':>9} {'speedup':>8}  identical")
+        for name, seconds, lines in results:
+            identical = "-" if not isinstance(lines, list) else str(lines == baseline_lines)
+            print(f"{name:<36} {seconds:>9.3f} {baseline_time / seconds:>7.1f}x  {identical}")
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Agent Pipeline Benchmark
+
+Replays a task corpus through run_agent_team against a deterministic fake
+of the Ollama API (fake_ollama.py) and, by default, a local stand-in for
+Docker (fake_docker.py), so throughput and per-stage latency of the
+orchestration, DockerSandboxTool and CodebaseMapper can be tracked
+without a GPU. Reports tasks per minute, p50/p95 per traced stage and
+peak RSS, and writes them as JSON; with --baseline it exits with status 1
+when throughput or a stage's p95 regressed beyond --tolerance.
+
+Usage:
+    python benchmarks/bench_pipeline.py                        # fake Ollama + fake Docker
+    python benchmarks/bench_pipeline.py --tasks 40 --workers 8
+    python benchmarks/bench_pipeline.py --async --candidates 2
+    python benchmarks/bench_pipeline.py --docker real          # real sandbox containers
+    python benchmarks/bench_pipeline.py --output new.json --baseline old.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from bench_mapper import make_tree
+from fake_docker import FakeDockerClient
+from fake_ollama import FakeOllama, task_marker
+from tracing import Tracer, format_summary, summarize
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus.json")
+
+# Marks a global swapped() found missing
+_UNSET = object()
+
+# Stages whose p95 is too small to compare reliably (seconds)
+MIN_COMPARABLE_SECONDS = 0.005
+
+# Defaults for importing main: no persistent caches or dependency images
+# (the benchmark swaps in its own LLM and sandbox anyway) and no telemetry
+BENCH_ENVIRONMENT = {
+    "LLM_CACHE": "off",
+    "SANDBOX_CACHE": "off",
+    "SANDBOX_DEPENDENCIES": "off",
+    "LLM_TIMINGS": "off",
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "OTEL_SDK_DISABLED": "true",
+}
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KiB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def load_corpus(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_tasks(corpus: Dict[str, Dict[str, Any]], count: int) -> List[str]:
+    """``count`` task descriptions cycling through the corpus, each uniquely marked."""
+    names = sorted(corpus)
+    return [
+        f"{corpus[name]['task']} {task_marker(index, name)}"
+        for index, name in ((i, names[i % len(names)]) for i in range(count))
+    ]
+
+
+@contextlib.contextmanager
+def swapped(module, **values):
+    """
+    Temporarily replace module globals (e.g. main's LLM and sandbox tool).
+
+    Lazy components not built yet stay unbuilt: they are removed again
+    afterwards instead of being built just to be restored.
+    """
+    saved = {name: vars(module).get(name, _UNSET) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is _UNSET:
+                delattr(module, name)
+            else:
+                setattr(module, name, value)
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """
+    Run the corpus and collect the report.
+
+    main's shared LLM, sandbox tool, workspaces and tracer are swapped for
+    ones pointing at the fakes and a scratch directory for the duration.
+    """
+    corpus = load_corpus(args.corpus)
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    project = os.path.join(workdir, "project")
+    os.makedirs(project)
+    make_tree(project, args.project_files)
+
+    fake_llm = FakeOllama(
+        corpus,
+        project_root=project,
+        latency=args.latency,
+        token_rate=args.token_rate,
+        prompt_rate=args.prompt_rate,
+        parallel=args.parallel,
+    )
+    fake_docker = None
+    cwd = os.getcwd()
+    try:
+        for name, value in BENCH_ENVIRONMENT.items():
+            os.environ.setdefault(name, value)
+        os.chdir(workdir)  # Anything main creates at import lands in the scratch directory
+        import main
+        from crewai import LLM
+        from llm_backend import ManagedLLM, make_slots
+        from ollama_runtime import OllamaInterceptor
+        from tools.container_pool import ContainerPool
+        from tools.docker_tool import DockerSandboxTool
+        from tools.file_tools import CodebaseMapper
+        from tools.workspace import WorkspaceManager
+
+        if args.docker == "fake":
+            fake_docker = FakeDockerClient(args.create_latency, args.exec_latency)
+        pool = ContainerPool(
+            image=main.sandbox_pool.image,
+            min_size=1,
+            max_size=args.containers,
+            limits=main.sandbox_limits,
+            client=fake_docker,
+        )
+        workspaces = WorkspaceManager(root=os.path.join(workdir, "workspace"))
+        llm = ManagedLLM(
+            LLM(model=f"ollama/{main.OLLAMA_MODEL}", base_url=fake_llm.url,
+                interceptor=OllamaInterceptor()),
+            slots=make_slots(args.parallel),
+        )
+        tracer = Tracer(keep=1_000_000)
+        tasks = make_tasks(corpus, args.tasks)
+        log = sys.stdout if args.verbose else io.StringIO()
+
+        with swapped(main, ollama_llm=llm, sandbox_pool=pool, workspace_manager=workspaces,
+                     docker_tool=DockerSandboxTool(pool=pool, workspaces=workspaces),
+                     codebase_mapper=CodebaseMapper(max_lines=400), tracer=tracer):
+            try:
+                pool.start()
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(log):
+                    if args.use_async:
+                        asyncio.run(main.run_batch_async(
+                            tasks, max_concurrency=args.workers,
+                            max_retries=args.max_retries, candidates=args.candidates
+                        ))
+                    else:
+                        main.run_batch(tasks, max_workers=args.workers,
+                                       max_retries=args.max_retries,
+                                       candidates=args.candidates)
+                wall = time.perf_counter() - started
+                pool_stats = pool.stats()
+            finally:
+                pool.close()
+    finally:
+        os.chdir(cwd)
+        fake_llm.close()
+        if fake_docker is not None:
+            fake_docker.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    spans = tracer.spans()
+    runs = [s for s in spans if s.name == "run"]
+    succeeded = sum(1 for s in runs if s.attributes.get("outcome") == "success")
+    return {
+        "benchmark": "pipeline",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "tasks": len(runs),
+        "succeeded": succeeded,
+        "failed": len(runs) - succeeded,
+        "wall_seconds": round(wall, 3),
+        "tasks_per_minute": round(len(runs) / wall * 60, 2) if wall else 0.0,
+        "stages": summarize(spans),
+        "llm_calls": fake_llm.calls,
+        "pool": pool_stats,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Regressions of ``report`` against ``baseline``.
+
+    Returns:
+        One line per regression: throughput below ``1 - tolerance`` of the
+        baseline, or a stage's p95 above ``1 + tolerance`` of it
+    """
+    regressions = []
+    before, after = baseline.get("tasks_per_minute", 0), report["tasks_per_minute"]
+    if before and after < before * (1 - tolerance):
+        regressions.append(f"tasks_per_minute {before} -> {after}")
+    for name, stats in report["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if old is None or old["p95"] < MIN_COMPARABLE_SECONDS:
+            continue
+        if stats["p95"] > old["p95"] * (1 + tolerance):
+            regressions.append(f"{name} p95 {old['p95']}s -> {stats['p95']}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Corpus JSON file")
+    parser.add_argument("--tasks", type=int, default=None,
+                        help="Tasks to run, cycling through the corpus (default: one each)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent tasks")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run on one event loop (run_batch_async)")
+    parser.add_argument("--candidates", type=int, default=1, help="Best-of-N candidates")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--docker", choices=("fake", "real"), default="fake",
+                        help="Sandbox backend: local stand-in or the Docker daemon")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Fake model seconds per call before the first token")
+    parser.add_argument("--token-rate", type=float, default=400.0,
+                        help="Fake model completion tokens per second")
+    parser.add_argument("--prompt-rate", type=float, default=4000.0,
+                        help="Fake model prompt tokens per second")
+    parser.add_argument("--parallel", type=int, default=2,
+                        help="Calls the fake model serves at once (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--containers", type=int, default=4,
+                        help="Sandbox pool size (concurrent executions)")
+    parser.add_argument("--create-latency", type=float, default=0.3,
+                        help="Fake Docker container startup seconds")
+    parser.add_argument("--exec-latency", type=float, default=0.02,
+                        help="Fake Docker seconds added per exec")
+    parser.add_argument("--project-files", type=int, default=2000,
+                        help="Files in the synthetic project the Architect maps")
+    parser.add_argument("--output", default="bench_pipeline.json", help="Report file")
+    parser.add_argument("--baseline", help="Earlier report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown before a regression is reported")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' output")
+    args = parser.parse_args()
+    if args.tasks is None:
+        args.tasks = len(load_corpus(args.corpus))
+
+    report = run_benchmark(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{report['tasks']} tasks ({report['succeeded']} passed) in "
+          f"{report['wall_seconds']:.1f}s: {report['tasks_per_minute']:.1f} tasks/min, "
+          f"{report['llm_calls']} LLM calls, peak RSS {report['peak_rss_kb']} KiB")
+    print(format_summary(report["stages"]))
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
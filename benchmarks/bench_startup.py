@@ -0,0 +1,115 @@
+"""
+Startup Time Benchmark
+
+Times cold imports in fresh interpreters: importing main and the tools
+package, a light tools submodule, `main.py --help`, and building the
+default agents (where crewai is imported now). With --ref the same
+scenarios also run against another git revision exported to a temporary
+directory, so the cost before and after a change is shown side by side.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --ref HEAD~1 --repeat 7
+"""
+
+import argparse
+import io
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scenario name -> arguments after the interpreter ({root} is the tree measured)
+SCENARIOS = {
+    "python (baseline)": ["-c", "pass"],
+    "import tools.results": ["-c", "import sys; sys.path.insert(0, {root!r}); import tools.results"],
+    "import tools": ["-c", "import sys; sys.path.insert(0, {root!r}); import tools"],
+    "import main": ["-c", "import sys; sys.path.insert(0, {root!r}); import main"],
+    "main.py --help": ["{root}/main.py", "--help"],
+    "import main + agents": [
+        "-c", "import sys; sys.path.insert(0, {root!r}); import main; main.build_agents()"
+    ],
+}
+
+# Keep the measured imports from writing caches or logging
+ENVIRONMENT = {"LLM_CACHE": "off", "SANDBOX_CACHE": "off", "CREWAI_DISABLE_TELEMETRY": "true",
+               "OTEL_SDK_DISABLED": "true"}
+
+
+def export_revision(ref: str, destination: str) -> None:
+    """Write the tree of git revision ``ref`` to ``destination``."""
+    archive = subprocess.run(["git", "-C", ROOT, "archive", "--format=tar", ref],
+                             check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(destination)
+
+
+def time_scenario(args: List[str], root: str, workdir: str, repeat: int) -> Optional[float]:
+    """Median wall time of ``repeat`` fresh runs (None if the command fails)."""
+    command = [sys.executable] + [arg.format(root=root) for arg in args]
+    env = dict(os.environ, **ENVIRONMENT)
+    # One unmeasured run compiles the bytecode
+    if subprocess.run(command, cwd=workdir, env=env, capture_output=True).returncode != 0:
+        return None
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=workdir, env=env, capture_output=True)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def measure(root: str, repeat: int) -> Dict[str, Optional[float]]:
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        return {name: time_scenario(args, root, workdir, repeat)
+                for name, args in SCENARIOS.items()}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _cell(seconds: Optional[float]) -> str:
+    return "failed" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ref", help="Git revision to compare against (e.g. HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario (median)")
+    args = parser.parse_args()
+
+    print(f"Measuring working tree ({args.repeat} runs per scenario) ...")
+    current = measure(ROOT, args.repeat)
+    before = None
+    if args.ref:
+        snapshot = tempfile.mkdtemp(prefix="bench_startup_ref_")
+        try:
+            export_revision(args.ref, snapshot)
+            print(f"Measuring {args.ref} ...")
+            before = measure(snapshot, args.repeat)
+        finally:
+            shutil.rmtree(snapshot, ignore_errors=True)
+
+    width = max(len(name) for name in SCENARIOS)
+    header = f"{'scenario':<{width}}  {'current':>10}"
+    if before is not None:
+        header += f"  {args.ref:>10}  {'speedup':>8}"
+    print(f"\n{header}")
+    for name in SCENARIOS:
+        row = f"{name:<{width}}  {_cell(current[name]):>10}"
+        if before is not None:
+            speedup = (f"{before[name] / current[name]:.1f}x"
+                       if before[name] and current[name] else "-")
+            row += f"  {_cell(before[name]):>10}  {speedup:>8}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
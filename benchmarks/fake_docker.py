@@ -0,0 +1,162 @@
+"""
+Local Stand-In for the Docker Client
+
+Implements the part of docker-py the sandbox uses (containers.run,
+exec_run, put_archive/get_archive, the low-level exec API, kill/remove)
+with a temporary directory per "container" and host subprocesses, so the
+pool, workspace and streaming code paths run unchanged without a daemon.
+Container startup and exec overhead are simulated with fixed delays.
+
+This is NOT a sandbox: scripts run on the host. Only use it with a
+trusted corpus.
+"""
+
+import io
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+from tools.limits import TIMEOUT_EXIT_CODE
+
+
+# Path of the sandbox workspace inside a real container
+WORKSPACE_DIR = "/workspace"
+
+
+class FakeContainer:
+    """A "container": a private directory standing in for /workspace."""
+
+    def __init__(self, client: "FakeDockerClient", container_id: str):
+        self.client = client
+        self.id = container_id
+        self.status = "running"
+        self.root = tempfile.mkdtemp(prefix=f"fake-container-{container_id}-")
+        self.process: Optional[subprocess.Popen] = None
+
+    def reload(self) -> None:
+        pass
+
+    def exec_run(self, cmd, **kwargs):
+        """Only the pool's reset command is run this way: empty the workspace."""
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        return SimpleNamespace(exit_code=0, output=b"")
+
+    def put_archive(self, path: str, data: bytes) -> bool:
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            tar.extractall(self.root)
+        return True
+
+    def get_archive(self, path: str):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            tar.add(self.root, arcname=os.path.basename(WORKSPACE_DIR))
+        return iter([buffer.getvalue()]), {}
+
+    def kill(self) -> None:
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def remove(self, force: bool = False) -> None:
+        self.kill()
+        self.status = "removed"
+        with self.client._lock:
+            self.client.running.pop(self.id, None)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class _Containers:
+    def __init__(self, client: "FakeDockerClient"):
+        self._client = client
+
+    def run(self, image, command=None, **kwargs) -> FakeContainer:
+        time.sleep(self._client.create_latency)
+        container = FakeContainer(self._client, f"c{next(self._client._ids)}")
+        with self._client._lock:
+            self._client.created += 1
+            self._client.running[container.id] = container
+        return container
+
+
+class _Api:
+    """The low-level exec calls ``ExecStream`` makes."""
+
+    def __init__(self, client: "FakeDockerClient"):
+        self._client = client
+        self._execs: Dict[str, dict] = {}
+
+    def exec_create(self, container_id, cmd, stdout=True, stderr=True, workdir=None):
+        exec_id = f"e{next(self._client._ids)}"
+        self._execs[exec_id] = {"container": container_id, "cmd": list(cmd), "exit_code": None}
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id, stream=True, demux=True):
+        return self._stream(self._execs[exec_id])
+
+    def exec_inspect(self, exec_id):
+        exit_code = self._execs[exec_id]["exit_code"]
+        return {"Running": exit_code is None, "ExitCode": exit_code}
+
+    def _stream(self, execution: dict):
+        time.sleep(self._client.exec_latency)
+        container = self._client.running[execution["container"]]
+        cmd = execution["cmd"]
+        timeout = float(cmd[3]) if cmd[:1] == ["timeout"] else None
+        script = os.path.join(container.root, os.path.basename(cmd[-1]))
+
+        process = subprocess.Popen(
+            [sys.executable, script], cwd=container.root,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        container.process = process
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+            execution["exit_code"] = process.returncode
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+            execution["exit_code"] = TIMEOUT_EXIT_CODE
+        finally:
+            container.process = None
+        if stdout:
+            yield stdout, None
+        if stderr:
+            yield None, stderr
+
+
+class FakeDockerClient:
+    """Drop-in for ``docker.from_env()`` as far as the sandbox is concerned."""
+
+    def __init__(self, create_latency: float = 0.3, exec_latency: float = 0.02):
+        """
+        Args:
+            create_latency: Seconds ``containers.run`` takes (container startup).
+            exec_latency: Seconds added to every exec (docker exec round trip).
+        """
+        self.create_latency = create_latency
+        self.exec_latency = exec_latency
+        self.created = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # Containers not yet removed, by id
+        self.running: Dict[str, FakeContainer] = {}
+        self.containers = _Containers(self)
+        self.api = _Api(self)
+
+    def close(self) -> None:
+        """Remove every container still around."""
+        for container in list(self.running.values()):
+            container.remove(force=True)
@@ -0,0 +1,260 @@
+"""
+Deterministic Fake of the Ollama HTTP API
+
+Serves /api/chat (what the agents' interceptor calls), /v1/chat/completions,
+/api/generate (warm-up) and /api/embed on a local port, replaying a task
+corpus instead of generating:
+- The Architect maps the project with the Codebase Mapper, then answers
+  with a plan carrying the run's marker
+- The Engineer answers with the corpus code for its next attempt
+- The Executor calls the Docker Sandbox Executor with that code, then
+  reports the tool's output
+Replies are delayed by ``latency`` plus prompt tokens at ``prompt_rate``
+and completion tokens at ``token_rate``, and carry Ollama's timing fields,
+so throughput and per-stage latency behave like a real model of that speed.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from ollama_runtime import to_native_request, to_openai_response
+
+
+# Marker the benchmark appends to every task: [bench:<run>:<corpus name>]
+MARKER = re.compile(r"\[bench:(\d+):([\w-]+)\]")
+
+# Comment heading every script, naming its run and attempt
+CODE_MARKER = re.compile(r"# \[bench:(\d+):([\w-]+)\] attempt (\d+)")
+
+# Roughly how many characters make one token
+CHARS_PER_TOKEN = 4
+
+# Dimensions of the fake embeddings
+EMBEDDING_DIMENSIONS = 64
+
+
+def task_marker(run: int, name: str) -> str:
+    """Marker identifying one run of corpus entry ``name``."""
+    return f"[bench:{run}:{name}]"
+
+
+def _tokens(text: str) -> int:
+    return max(len(text) // CHARS_PER_TOKEN, 1)
+
+
+def _embedding(text: str) -> List[float]:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(EMBEDDING_DIMENSIONS)]
+
+
+class FakeOllama:
+    """Scripted Ollama server on an ephemeral local port."""
+
+    def __init__(
+        self,
+        corpus: Dict[str, Dict[str, Any]],
+        project_root: Optional[str] = None,
+        latency: float = 0.05,
+        token_rate: float = 400.0,
+        prompt_rate: float = 4000.0,
+        parallel: Optional[int] = None,
+    ):
+        """
+        Args:
+            corpus: Corpus entries by name, each with an ``attempts`` list of
+                scripts (attempt N is answered with the Nth, the last one
+                repeating).
+            project_root: Directory the Architect maps (None skips mapping).
+            latency: Fixed seconds per call (load + first token).
+            token_rate: Completion tokens generated per second.
+            prompt_rate: Prompt tokens evaluated per second.
+            parallel: Calls served at once (like OLLAMA_NUM_PARALLEL);
+                further calls queue. None serves all at once.
+        """
+        self.corpus = corpus
+        self.project_root = project_root
+        self.latency = latency
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self._slots = threading.BoundedSemaphore(parallel) if parallel else None
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self.calls = 0
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+                try:
+                    status, reply = 200, fake.handle(self.path, body)
+                except Exception as e:
+                    status, reply = 500, {"error": str(e)}
+                data = json.dumps(reply).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -------------------------------------------------------------------------
+    # Endpoints
+    # -------------------------------------------------------------------------
+
+    def handle(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Reply to one request; raises for unknown endpoints."""
+        if path.endswith("/api/chat"):
+            return self._generate(body.get("model", ""), body.get("messages", []),
+                                  body.get("tools") or [])
+        if path.endswith("/v1/chat/completions"):
+            native = to_native_request(body, keep_alive=None)
+            return to_openai_response(self._generate(
+                native["model"], native["messages"], native.get("tools") or []
+            ))
+        if path.endswith("/api/generate"):
+            return self._timed(body.get("model", ""), {"response": ""}, body.get("prompt", ""), "")
+        if path.endswith("/api/embed"):
+            inputs = body.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            return {"model": body.get("model", ""),
+                    "embeddings": [_embedding(text) for text in inputs]}
+        raise ValueError(f"Unsupported endpoint {path}")
+
+    def _generate(self, model: str, messages: List[Dict[str, Any]],
+                  tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        conversation = "\n".join(str(m.get("content") or "") for m in messages)
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"),
+                      conversation)
+        used_tool = any(m.get("role") == "tool" for m in messages)
+
+        if "Software Architect" in system:
+            message = self._architect(conversation, tools, used_tool)
+        elif "Software Engineer" in system:
+            message = self._engineer(conversation)
+        elif "Code Executor" in system:
+            message = self._executor(conversation, messages, tools, used_tool)
+        else:
+            message = {"role": "assistant", "content": "OK"}
+
+        completion = message.get("content", "") + json.dumps(message.get("tool_calls", []))
+        return self._timed(model, {"message": message, "done_reason": "stop"},
+                           conversation, completion)
+
+    # -------------------------------------------------------------------------
+    # Agents
+    # -------------------------------------------------------------------------
+
+    def _architect(self, conversation: str, tools, used_tool: bool) -> Dict[str, Any]:
+        mapper = _tool_named(tools, "mapper")
+        if mapper and self.project_root and not used_tool:
+            return _tool_call(mapper, {"root_path": self.project_root})
+        match = MARKER.search(conversation)
+        marker = match.group(0) if match else ""
+        return {"role": "assistant", "content": (
+            f"PLAN {marker}\n1. Analyze the task.\n2. Write the script.\n"
+            "3. Print the result."
+        )}
+
+    def _engineer(self, conversation: str) -> Dict[str, Any]:
+        match = MARKER.search(conversation)
+        if not match or match.group(2) not in self.corpus:
+            return {"role": "assistant", "content": "print('no task')"}
+        run, name = match.groups()
+        key = f"{run}:{name}"
+        with self._lock:
+            attempt = self._attempts.get(key, 0) + 1
+            self._attempts[key] = attempt
+        return {"role": "assistant", "content": self.script(int(run), name, attempt)}
+
+    def _executor(self, conversation: str, messages, tools, used_tool: bool) -> Dict[str, Any]:
+        if used_tool:
+            result = next(m.get("content") or "" for m in reversed(messages)
+                          if m.get("role") == "tool")
+            return {"role": "assistant", "content": f"Execution report:\n{result}"}
+        sandbox = _tool_named(tools, "sandbox")
+        match = CODE_MARKER.search(conversation)
+        if not sandbox or not match:
+            return {"role": "assistant", "content": "No code to execute."}
+        run, name, attempt = match.groups()
+        return _tool_call(sandbox, {"code": self.script(int(run), name, int(attempt))})
+
+    def script(self, run: int, name: str, attempt: int) -> str:
+        """Code answered for ``attempt`` (1-based) of a corpus entry."""
+        attempts = self.corpus[name]["attempts"]
+        code = attempts[min(attempt, len(attempts)) - 1]
+        return f"# {task_marker(run, name)} attempt {attempt}\n{code}"
+
+    # -------------------------------------------------------------------------
+    # Timing
+    # -------------------------------------------------------------------------
+
+    def _timed(self, model: str, reply: Dict[str, Any], prompt: str,
+               completion: str) -> Dict[str, Any]:
+        """Wait as long as a model of the configured speed would, and report it."""
+        prompt_tokens = _tokens(prompt)
+        eval_tokens = _tokens(completion) if completion else 0
+        prompt_eval = prompt_tokens / self.prompt_rate
+        generation = eval_tokens / self.token_rate
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            time.sleep(self.latency + prompt_eval + generation)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+        with self._lock:
+            self.calls += 1
+
+        total = self.latency + prompt_eval + generation
+        reply.update({
+            "model": model,
+            "done": True,
+            "load_duration": int(self.latency * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_eval * 1e9),
+            "eval_count": eval_tokens,
+            "eval_duration": int(generation * 1e9),
+            "total_duration": int(total * 1e9),
+        })
+        reply.setdefault("done_reason", "stop")
+        return reply
+
+
+def _tool_named(tools: List[Dict[str, Any]], word: str) -> Optional[str]:
+    """Name of the first offered tool whose name contains ``word``."""
+    for tool in tools:
+        name = tool.get("function", {}).get("name", "")
+        if word in name.lower():
+            return name
+    return None
+
+
+def _tool_call(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return {"role": "assistant", "content": "",
+            "tool_calls": [{"function": {"name": name, "arguments": arguments}}]}
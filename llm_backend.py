@@ -0,0 +1,261 @@
+"""
+LLM Backend Wrapper for the Agent Team
+
+Wraps the provider LLM (Ollama via CrewAI) in a single object shared by
+all agents, so cross-cutting behaviour lives in one place:
+- Concurrency throttling: at most N in-flight generations (Ollama's
+  parallel slots), no matter how many crews are running
+- Response caching: identical requests are answered from a persistent
+  ResponseCache without touching the model
+- Sampling variants: copies at other temperatures/seeds share both
+- Stable prompt prefix: system messages always lead, so the static agent
+  prompt is byte-identical across calls and Ollama can reuse its KV cache
+- Tracing: every call is an "llm" span noting the agent, cache hits and
+  the time spent waiting for a slot
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Optional
+
+# Windows compatibility - must be imported before crewai
+import win_patch
+
+from crewai.llms.base_llm import BaseLLM, call_stop_override
+from llm_cache import ResponseCache, make_key
+from tracing import annotate, span
+
+
+# Backoff bounds (seconds) while an async call waits for a free slot
+SLOT_POLL_MIN = 0.005
+SLOT_POLL_MAX = 0.1
+
+
+class ManagedLLM(BaseLLM):
+    """
+    CrewAI-compatible LLM that delegates to a provider LLM.
+
+    CrewAI routes ``LLM(model="ollama/...")`` to a provider-specific class,
+    so behaviour is added by wrapping that instance instead of subclassing.
+    """
+
+    # Provider LLM that actually performs the generation
+    inner: BaseLLM
+
+    # Shared semaphore bounding concurrent calls (None = unlimited)
+    slots: Optional[Any] = None
+
+    # Persistent response cache (None disables caching)
+    cache: Optional[ResponseCache] = None
+
+    # Also cache sampled (temperature > 0, unseeded) generations
+    cache_sampled: bool = False
+
+    def __init__(self, inner: BaseLLM, **kwargs):
+        """
+        Args:
+            inner: Provider LLM, e.g. ``LLM(model="ollama/qwen2.5-coder:14b")``.
+            **kwargs: Extra fields such as ``slots``.
+        """
+        kwargs.setdefault("model", inner.model)
+        kwargs.setdefault("temperature", inner.temperature)
+        kwargs.setdefault("base_url", inner.base_url)
+        kwargs.setdefault("provider", inner.provider)
+        super().__init__(inner=inner, **kwargs)
+
+    def call(
+        self,
+        messages,
+        tools=None,
+        callbacks=None,
+        available_functions=None,
+        from_task=None,
+        from_agent=None,
+        response_model=None,
+    ):
+        """Run one generation on the provider LLM, waiting for a free slot."""
+        with span("llm", model=self.inner.model, agent=_role(from_agent)):
+            messages = stable_order(messages)
+            key = self._cache_key(messages, tools, available_functions, response_model)
+            if key is not None:
+                cached = self.cache.get(key)
+                annotate(cached=cached is not None)
+                if cached is not None:
+                    return cached
+
+            waiting = time.perf_counter()
+            with self._slot(), self._stop_words():
+                annotate(slot_wait=round(time.perf_counter() - waiting, 4))
+                response = self.inner.call(
+                    messages,
+                    tools=tools,
+                    callbacks=callbacks,
+                    available_functions=available_functions,
+                    from_task=from_task,
+                    from_agent=from_agent,
+                    response_model=response_model,
+                )
+
+            if key is not None and isinstance(response, str):
+                self.cache.put(key, response)
+            return response
+
+    async def acall(
+        self,
+        messages,
+        tools=None,
+        callbacks=None,
+        available_functions=None,
+        from_task=None,
+        from_agent=None,
+        response_model=None,
+    ):
+        """Async variant of ``call``; waiting for a slot does not block the event loop."""
+        with span("llm", model=self.inner.model, agent=_role(from_agent)):
+            messages = stable_order(messages)
+            key = self._cache_key(messages, tools, available_functions, response_model)
+            if key is not None:
+                cached = await asyncio.to_thread(self.cache.get, key)
+                annotate(cached=cached is not None)
+                if cached is not None:
+                    return cached
+
+            waiting = time.perf_counter()
+            if self.slots is not None:
+                await self._acquire_slot()
+            annotate(slot_wait=round(time.perf_counter() - waiting, 4))
+            try:
+                with self._stop_words():
+                    response = await self.inner.acall(
+                        messages,
+                        tools=tools,
+                        callbacks=callbacks,
+                        available_functions=available_functions,
+                        from_task=from_task,
+                        from_agent=from_agent,
+                        response_model=response_model,
+                    )
+            finally:
+                if self.slots is not None:
+                    self.slots.release()
+
+            if key is not None and isinstance(response, str):
+                await asyncio.to_thread(self.cache.put, key, response)
+            return response
+
+    def variant(self, **params) -> "ManagedLLM":
+        """
+        Copy of this LLM with different sampling parameters.
+
+        The copy shares the slots and cache, so e.g. best-of-N candidates at
+        other temperatures or seeds still count against the same limits.
+
+        Args:
+            **params: Provider LLM fields to override, e.g. ``temperature``, ``seed``.
+
+        Returns:
+            A new ManagedLLM wrapping a modified copy of the provider LLM
+        """
+        return ManagedLLM(
+            self.inner.model_copy(update=params),
+            slots=self.slots,
+            cache=self.cache,
+            cache_sampled=self.cache_sampled,
+        )
+
+    # -------------------------------------------------------------------------
+    # Capability queries are answered by the provider LLM
+    # -------------------------------------------------------------------------
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def supports_multimodal(self) -> bool:
+        return self.inner.supports_multimodal()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        return self.inner.get_token_usage_summary()
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _cache_key(self, messages, tools, available_functions, response_model) -> Optional[str]:
+        """
+        Cache key for a request, or None when the response must not be cached.
+
+        Calls that execute tools natively or return structured objects are
+        never cached, and neither is sampling that is not reproducible
+        unless ``cache_sampled`` is set. Only an explicit temperature of 0
+        or a fixed seed counts as reproducible; an unset temperature uses
+        the server's default, which samples.
+        """
+        if self.cache is None or available_functions or response_model is not None:
+            return None
+
+        inner = self.inner
+        deterministic = inner.temperature == 0 or inner.seed is not None
+        if not (deterministic or self.cache_sampled):
+            return None
+
+        params = {
+            "temperature": inner.temperature,
+            "top_p": inner.top_p,
+            "max_tokens": inner.max_tokens,
+            "seed": inner.seed,
+            "frequency_penalty": inner.frequency_penalty,
+            "presence_penalty": inner.presence_penalty,
+            "stop": sorted(self.stop_sequences) or None,
+        }
+        return make_key(inner.model, params, messages, tools)
+
+    def _slot(self):
+        return self.slots if self.slots is not None else nullcontext()
+
+    async def _acquire_slot(self) -> None:
+        # Poll instead of blocking a thread per waiting call, so dozens of
+        # queued coroutines cost no threads and cancellation cannot leak a slot
+        delay = SLOT_POLL_MIN
+        while not self.slots.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, SLOT_POLL_MAX)
+
+    def _stop_words(self):
+        # Agents set stop words on the LLM they hold (this wrapper); forward
+        # them to the provider for the duration of the call
+        stop = self.stop_sequences
+        return call_stop_override(self.inner, stop) if stop else nullcontext()
+
+
+def _role(agent) -> str:
+    """Role of the agent making a call ("" when unknown), for span attributes."""
+    return getattr(agent, "role", "") or ""
+
+
+def stable_order(messages):
+    """
+    Move system messages ahead of the conversation, keeping relative order.
+
+    The system prompt is the static part shared by every call of an agent;
+    keeping it first (and unchanged) lets the server reuse the KV cache
+    of that prefix instead of re-evaluating it.
+    """
+    if isinstance(messages, str):
+        return messages
+    system = [m for m in messages if m.get("role") == "system"]
+    if not system or messages[:len(system)] == system:
+        return messages
+    return system + [m for m in messages if m.get("role") != "system"]
+
+
+def make_slots(count: int) -> threading.BoundedSemaphore:
+    """Semaphore for ``ManagedLLM.slots`` allowing ``count`` concurrent calls."""
+    return threading.BoundedSemaphore(max(count, 1))
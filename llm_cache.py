@@ -0,0 +1,213 @@
+"""
+Content-Addressed LLM Response Cache
+
+Persists LLM completions on disk so identical requests (CI replays,
+retries, repeated planning prompts) skip the generation entirely:
+- Keyed by a hash of model, sampling parameters, normalized messages and tool schema
+- SQLite storage, shared safely between threads and processes
+- LRU eviction bounded by entry count and total bytes, plus a TTL
+- Hit/miss counters for monitoring
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+
+# Default location of the cache database
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm", "responses.sqlite")
+
+
+def normalize_messages(messages: Union[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Canonical form of a prompt for hashing.
+
+    Plain strings become a single user message, and trailing whitespace on
+    every line plus leading/trailing blank lines are dropped, so prompts
+    that differ only in indentation noise share a cache entry.
+    """
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+
+    normalized = []
+    for message in messages:
+        message = dict(message)
+        content = message.get("content")
+        if isinstance(content, str):
+            lines = [line.rstrip() for line in content.splitlines()]
+            message["content"] = "\n".join(lines).strip("\n")
+        normalized.append(message)
+    return normalized
+
+
+def _schema_default(obj: Any) -> Any:
+    """JSON fallback for tool objects: describe them by stable attributes only."""
+    if hasattr(obj, "name") and hasattr(obj, "description"):
+        return {"name": obj.name, "description": obj.description}
+    return type(obj).__name__
+
+
+def make_key(
+    model: str,
+    params: Dict[str, Any],
+    messages: Union[str, List[Dict[str, Any]]],
+    tools: Optional[List[Any]] = None,
+) -> str:
+    """
+    Content address of an LLM request.
+
+    Args:
+        model: Model identifier.
+        params: Sampling parameters that influence the output.
+        messages: Prompt as a string or chat messages.
+        tools: Tool schemas offered to the model.
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = {
+        "model": model,
+        "params": {k: v for k, v in sorted(params.items()) if v is not None},
+        "messages": normalize_messages(messages),
+        "tools": tools or [],
+    }
+    blob = json.dumps(payload, sort_keys=True, default=_schema_default, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Size-bounded, persistent key -> response store.
+
+    Entries older than ``ttl`` are treated as misses and removed. When the
+    cache exceeds ``max_entries`` or ``max_bytes`` the least recently used
+    entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = 10_000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = 7 * 24 * 3600,
+    ):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a process-local cache).
+            max_entries: Maximum number of cached responses.
+            max_bytes: Maximum total size of cached responses.
+            ttl: Seconds an entry stays valid (None = forever).
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)"
+        )
+        self._db.commit()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for ``key``, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._db.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response and evict least recently used entries if over budget."""
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        """Entry count, stored bytes and hit/miss counters."""
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _evict(self) -> None:
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        doomed = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
@@ -8,107 +8,579 @@ Architecture:
     Architect (Planner) -> Engineer (Coder) -> Executor (Tester)
     
 Feedback Loop:
-    If Executor returns stderr, Engineer retries (max 3 attempts).
+    If the sandbox run fails, Engineer retries (max 3 attempts) with the
+    trimmed traceback. Success is read from the structured ExecutionResult
+    the sandbox records, not from the agents' text.
+    The Architect's plan is kept; only Engineer -> Executor is re-run.
+
+Concurrency:
+    run_batch() runs many tasks at once through a TaskScheduler. LLM calls
+    are bounded by Ollama's parallel slots and sandbox executions by the
+    container pool size, so generation and execution overlap.
+    run_batch_async() does the same on one asyncio event loop
+    (run_agent_team_async / Crew.akickoff), without a thread per task.
+
+Best-of-N:
+    With candidates > 1, every attempt runs that many Engineer -> Executor
+    pairs side by side, the extra Engineers sampling at another temperature
+    and seed. The first candidate whose sandbox run passes wins and the
+    others are cancelled, which kills their containers.
+
+Tracing:
+    Every run is a trace of spans: run -> plan / attempt -> agent task ->
+    llm call (tokens, prompt-eval/eval time) / tool -> sandbox stage
+    (acquire, create, inject, exec, release). Per-stage latencies are
+    printed at exit and AGENT_TRACE exports the spans (JSONL or OTLP/JSON).
+
+Service:
+    --serve keeps one process running with a local job API (service.py):
+    tasks are submitted, polled and streamed over HTTP and share the warm
+    LLM, containers and caches. Requests need the bearer token printed at
+    startup (AGENT_SERVICE_TOKEN sets a fixed one).
+
+Startup:
+    The LLM, tools and default agents are built on first use (component(),
+    or attribute access such as main.ollama_llm), so crewai and docker are
+    only imported once a run needs them. benchmarks/bench_startup.py
+    measures the cold import cost.
 """
 
 # Windows compatibility - must be imported first
 import win_patch
 
-from crewai import Agent, Task, Crew, Process, LLM
-from tools.docker_tool import DockerSandboxTool
-from tools.file_tools import CodebaseMapper
+import argparse
+import asyncio
+import os
+import signal
+import threading
+import uuid
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from scheduler import TaskScheduler
+from tools.approvals import (
+    ApprovalPolicy, ApprovalQueue, FileApprovalSource, HttpApprovalSource, SocketApprovalSource
+)
+from tools.container_pool import ContainerPool
+from tools.limits import ExecutionLimits
+from tools.result_cache import ExecutionCache
+from tools.results import ERROR, OOM, TIMEOUT, ExecutionResult, collect_results
+from tools.workspace import WorkspaceManager
+from tracing import JsonlWriter, Tracer, annotate, format_summary, span, write_otlp
+
+# crewai (and everything built on it) is imported where it is first needed
+if TYPE_CHECKING:
+    from crewai import Agent, Crew, Task
+    from crewai.llms.base_llm import BaseLLM
+    from ollama_runtime import CallTiming
+
+# =============================================================================
+# Lazy Components
+# =============================================================================
+
+# The LLM, tools and default agents are built on first use rather than at
+# import, so importing main (tests, --help) does not pay for crewai. Each
+# is then cached as a module global: main.ollama_llm and component() return
+# the same object, and tests or benchmarks can replace it with setattr.
+_builders: Dict[str, Tuple[Tuple[str, ...], Callable[[], Any]]] = {}
+_build_lock = threading.RLock()
+
+
+def lazy(*names: str):
+    """
+    Register the decorated function as the builder of module globals ``names``.
+    
+    A builder of several names returns one value per name, in order.
+    """
+    def register(builder: Callable[[], Any]) -> Callable[[], Any]:
+        for name in names:
+            _builders[name] = (names, builder)
+        return builder
+    return register
+
+
+def component(name: str) -> Any:
+    """
+    Shared component ``name`` (e.g. "ollama_llm"), built on first use.
+    
+    Raises:
+        AttributeError: If no builder is registered under ``name``.
+    """
+    if name in globals():
+        return globals()[name]
+    if name not in _builders:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _build_lock:
+        if name not in globals():
+            names, builder = _builders[name]
+            values = builder()
+            for key, value in zip(names, values if len(names) > 1 else (values,)):
+                globals().setdefault(key, value)
+    return globals()[name]
+
+
+def __getattr__(name: str) -> Any:
+    return component(name)
+
+
+# crewai's classes; importing crewai takes seconds
+@lazy("Agent", "Task", "Crew", "Process", "LLM")
+def _import_crewai():
+    from crewai import LLM, Agent, Crew, Process, Task
+    return Agent, Task, Crew, Process, LLM
+
 
 # =============================================================================
 # LLM Configuration - Ollama Backend
 # =============================================================================
 
+# Concurrent generations Ollama can serve (match OLLAMA_NUM_PARALLEL on the server)
+LLM_CONCURRENCY = int(os.environ.get("OLLAMA_NUM_PARALLEL", "2"))
+
+# Concurrent sandbox executions (bounded by host cores)
+DOCKER_CONCURRENCY = int(os.environ.get("SANDBOX_MAX_CONTAINERS", os.cpu_count() or 4))
+
+
+# Persistent response cache for identical prompts (set LLM_CACHE=off to bypass)
+@lazy("llm_cache")
+def _build_llm_cache():
+    if os.environ.get("LLM_CACHE", "on").lower() == "off":
+        return None
+    from llm_cache import ResponseCache
+    return ResponseCache()
+
+
+# Ollama server and the model every agent shares
+OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_MODEL = "qwen2.5-coder:14b"
+
+# How long Ollama keeps the model loaded after each call, so idle gaps
+# between tasks do not cost a multi-second reload (unset uses
+# ollama_runtime.DEFAULT_KEEP_ALIVE)
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE") or None
+
+# Sampling temperature of the agents; 0 makes answers reproducible, so
+# repeated prompts are served from the response cache (an unset temperature
+# would leave Ollama's sampling default in place and bypass the cache)
+OLLAMA_TEMPERATURE = float(os.environ.get("OLLAMA_TEMPERATURE", "0"))
+
+# Context window requested on every call (unset keeps the server default);
+# it must not vary between calls, or Ollama reloads the model
+OLLAMA_NUM_CTX = int(os.environ["OLLAMA_NUM_CTX"]) if os.environ.get("OLLAMA_NUM_CTX") else None
+
+
+def log_llm_timing(timing: "CallTiming") -> None:
+    """Print the load / prompt-eval / eval split of one generation."""
+    print(f"[llm] {timing}")
+
+
+# Server-side timings of every generation (set LLM_TIMINGS=off to stop logging them)
+@lazy("llm_stats")
+def _build_llm_stats():
+    from ollama_runtime import CallStats
+    return CallStats(
+        on_call=None if os.environ.get("LLM_TIMINGS", "on").lower() == "off" else log_llm_timing
+    )
+
+
 # Configure Ollama as the LLM backend
 # Ensure Ollama is running: `ollama serve`
 # Ensure model is pulled: `ollama pull qwen2.5-coder:14b`
-ollama_llm = LLM(
-    model="ollama/qwen2.5-coder:14b",
-    base_url="http://localhost:11434"
-)
+# All agents share one ManagedLLM so the concurrency limit and cache are global
+# The interceptor routes calls to Ollama's native API for keep_alive and timings
+@lazy("ollama_llm")
+def _build_ollama_llm():
+    from llm_backend import ManagedLLM, make_slots
+    from ollama_runtime import DEFAULT_KEEP_ALIVE, OllamaInterceptor
+    
+    LLM = component("LLM")
+    return ManagedLLM(
+        LLM(
+            model=f"ollama/{OLLAMA_MODEL}",
+            base_url=OLLAMA_BASE_URL,
+            temperature=OLLAMA_TEMPERATURE,
+            interceptor=OllamaInterceptor(
+                keep_alive=OLLAMA_KEEP_ALIVE or DEFAULT_KEEP_ALIVE,
+                num_ctx=OLLAMA_NUM_CTX,
+                stats=component("llm_stats")
+            )
+        ),
+        slots=make_slots(LLM_CONCURRENCY),
+        cache=component("llm_cache")
+    )
+
+# Sampling temperature of the extra best-of-N candidates; each also gets its
+# own seed so they differ. The first candidate uses the shared LLM as is
+# (OLLAMA_TEMPERATURE, 0 by default), so its responses stay cacheable
+CANDIDATE_TEMPERATURE = float(os.environ.get("AGENT_CANDIDATE_TEMPERATURE", "0.8"))
+
+
+def candidate_llm(index: int) -> "BaseLLM":
+    """LLM for the Engineer of best-of-N candidate ``index`` (0-based)."""
+    llm = component("ollama_llm")
+    if index == 0:
+        return llm
+    return llm.variant(temperature=CANDIDATE_TEMPERATURE, seed=index)
 
 # =============================================================================
-# Tool Initialization
+# Tracing
 # =============================================================================
 
-# Docker sandbox tool for secure code execution
-docker_tool = DockerSandboxTool()
+# Spans of every run are kept in memory for the exit summary (set
+# AGENT_TRACING=off to disable). AGENT_TRACE=<path> also writes them to a
+# file: JSON lines as each span ends, or one OTLP/JSON file at exit with
+# AGENT_TRACE_FORMAT=otlp
+TRACE_PATH = os.environ.get("AGENT_TRACE") or None
+TRACE_FORMAT = os.environ.get("AGENT_TRACE_FORMAT", "jsonl").lower()
 
-# Codebase mapper for project structure visibility
-codebase_mapper = CodebaseMapper()
+tracer = None
+if os.environ.get("AGENT_TRACING", "on").lower() != "off":
+    tracer = Tracer(
+        on_end=JsonlWriter(TRACE_PATH) if TRACE_PATH and TRACE_FORMAT == "jsonl" else None
+    )
+
+
+def _trace_run(user_task: str, run_id: str, candidates: int):
+    """Root span of one run (a no-op context when tracing is off)."""
+    if tracer is None:
+        return nullcontext()
+    return tracer.span("run", run_id=run_id, task=user_task.strip()[:200],
+                       candidates=candidates)
+
+
+def export_trace() -> None:
+    """Print per-stage latencies and write the OTLP file if one was requested."""
+    if tracer is None:
+        return
+    print(f"\nStage latencies:\n{format_summary(tracer.summary())}")
+    if TRACE_PATH and TRACE_FORMAT == "otlp":
+        write_otlp(tracer.spans(), TRACE_PATH)
+    if TRACE_PATH:
+        print(f"Trace written to {TRACE_PATH}")
 
 # =============================================================================
-# Agent Definitions
+# Tool Initialization
 # =============================================================================
 
-# Architect Agent - Plans the solution approach
-architect = Agent(
-    role="Software Architect",
-    goal="Create clear, step-by-step implementation plans for coding tasks",
-    backstory="""You are an experienced software architect who excels at 
-    breaking down complex problems into simple, actionable steps. You provide 
-    clear pseudocode and implementation guidance that developers can follow.
-    
-    IMPORTANT: When planning file operations, remember that files saved by the 
-    Executor will persist in the ./workspace directory on the host machine.
-    Use the Codebase Mapper tool to understand the project structure first.""",
-    llm=ollama_llm,
-    tools=[codebase_mapper],
-    verbose=True
-)
+# Per-execution limits (timeout, memory, CPU, PIDs, output size)
+# Override per deployment with SANDBOX_* environment variables
+sandbox_limits = ExecutionLimits.from_env()
 
-# Engineer Agent - Writes the actual code
-engineer = Agent(
-    role="Software Engineer",
-    goal="Write clean, working Python code based on the architect's plan",
-    backstory="""You are a skilled Python developer who writes concise, 
-    functional code. You follow best practices and ensure your code handles 
-    edge cases. When given feedback about errors, you fix them efficiently.""",
-    llm=ollama_llm,
-    verbose=True
+# Warm pool of sandbox containers shared by all executions
+# Containers above min_size are reaped after idle_timeout seconds
+# max_size caps concurrent executions; extra runs wait for a free container
+sandbox_pool = ContainerPool(
+    min_size=1,
+    max_size=DOCKER_CONCURRENCY,
+    idle_timeout=300,
+    acquire_timeout=600,
+    limits=sandbox_limits
 )
 
-# Executor Agent - Tests code in Docker sandbox
-executor = Agent(
-    role="Code Executor",
-    goal="Execute Python code in a secure Docker sandbox and report results",
-    backstory="""You are a QA engineer who tests code by running it in an 
-    isolated Docker environment. You provide clear feedback about whether 
-    the code works correctly or if there are errors that need fixing.
-    
-    NOTE: Any files you create will be saved to ./workspace on the host machine.
-    Dangerous operations (rm, network requests) will require human approval.""",
-    llm=ollama_llm,
-    tools=[docker_tool],
-    verbose=True
+def stream_to_console(stream: str, text: str) -> None:
+    """Echo sandbox output live while the Executor's code is still running."""
+    prefix = "[sandbox:err] " if stream == "stderr" else "[sandbox] "
+    for line in text.splitlines():
+        print(f"{prefix}{line}")
+
+
+# Per-run staging directories under ./workspace/.runs
+# Artifacts reach ./workspace only when an attempt succeeds
+workspace_manager = WorkspaceManager()
+
+# Identical deterministic scripts replay their previous result instead of
+# leasing a container (set SANDBOX_CACHE=off to always execute)
+sandbox_cache = (
+    None if os.environ.get("SANDBOX_CACHE", "on").lower() == "off" else ExecutionCache()
 )
 
+# Scripts importing third-party packages run in a derived image with them
+# installed, built once per dependency set (set SANDBOX_DEPENDENCIES=off to
+# run everything on the base image). SANDBOX_WHEELHOUSE points at a directory
+# of wheels and SANDBOX_PIP_INDEX_URL at a local mirror; SANDBOX_OFFLINE=on
+# installs from the wheelhouse alone
+@lazy("sandbox_images")
+def _build_sandbox_images():
+    if os.environ.get("SANDBOX_DEPENDENCIES", "on").lower() == "off":
+        return None
+    from tools.sandbox_images import SandboxImages
+    return SandboxImages(
+        base_image=sandbox_pool.image,
+        max_images=int(os.environ.get("SANDBOX_MAX_IMAGES", "10")),
+        wheelhouse=os.environ.get("SANDBOX_WHEELHOUSE") or None,
+        index_url=os.environ.get("SANDBOX_PIP_INDEX_URL") or None,
+        offline=os.environ.get("SANDBOX_OFFLINE", "off").lower() == "on"
+    )
+
+
+# Where flagged scripts wait for a decision (SANDBOX_APPROVALS):
+#   console - interactive y/N prompt (default)
+#   http    - pending requests on http://127.0.0.1:8765/approvals (send the
+#             bearer token printed at startup; SANDBOX_APPROVAL_TOKEN fixes it)
+#   socket  - line protocol on 127.0.0.1:8766 (list / approve <id> / deny <id>)
+#   file    - <id>.json under workspace/.approvals; create <id>.approve or <id>.deny
+# With a queue, only the flagged task waits; the rest of the batch keeps running.
+# SANDBOX_AUTO_APPROVE / SANDBOX_AUTO_DENY take comma-separated "category:target"
+# globs, e.g. SANDBOX_AUTO_DENY="file-delete:*"
+APPROVAL_MODE = os.environ.get("SANDBOX_APPROVALS", "console").lower()
+APPROVAL_TOKEN = os.environ.get("SANDBOX_APPROVAL_TOKEN") or None
+
+
+def _patterns(name: str) -> List[str]:
+    return [p.strip() for p in os.environ.get(name, "").split(",") if p.strip()]
+
+
+approval_queue = None
+if APPROVAL_MODE != "console":
+    approval_queue = ApprovalQueue(
+        ApprovalPolicy(
+            approve=_patterns("SANDBOX_AUTO_APPROVE"),
+            deny=_patterns("SANDBOX_AUTO_DENY")
+        ),
+        timeout=float(os.environ.get("SANDBOX_APPROVAL_TIMEOUT", "300"))
+    )
+
+
+def start_approval_source():
+    """Start the configured approval source; returns it (None for console)."""
+    if approval_queue is None:
+        return None
+    if APPROVAL_MODE == "http":
+        source = HttpApprovalSource(approval_queue, token=APPROVAL_TOKEN)
+        print(f"Approvals: http://127.0.0.1:{source.port}/approvals "
+              f"(Authorization: Bearer {source.token})")
+    elif APPROVAL_MODE == "socket":
+        source = SocketApprovalSource(approval_queue)
+        print(f"Approvals: nc 127.0.0.1 {source.port}")
+    elif APPROVAL_MODE == "file":
+        directory = os.path.join(workspace_manager.root, ".approvals")
+        source = FileApprovalSource(approval_queue, directory)
+        print(f"Approvals: {directory}")
+    else:
+        raise ValueError(f"Unknown SANDBOX_APPROVALS mode: {APPROVAL_MODE}")
+    return source.start()
+
+
+# Stop a script at its first traceback instead of waiting for it to exit
+# (SANDBOX_ABORT_ON_TRACEBACK=on). Off by default: scripts that log a handled
+# exception and carry on would be killed and reported as failures
+ABORT_ON_TRACEBACK = os.environ.get("SANDBOX_ABORT_ON_TRACEBACK", "off").lower() == "on"
+
+
+# Docker sandbox tool for secure code execution
+# Output streams live to the console
+@lazy("docker_tool")
+def _build_docker_tool():
+    from tools.docker_tool import DockerSandboxTool
+    return DockerSandboxTool(
+        pool=sandbox_pool,
+        workspaces=workspace_manager,
+        on_output=stream_to_console,
+        abort_on_traceback=ABORT_ON_TRACEBACK,
+        result_cache=sandbox_cache,
+        approvals=approval_queue,
+        images=component("sandbox_images")
+    )
+
+
+# Codebase mapper for project structure visibility
+# Maps are capped at max_lines so large repos fit the 14B model's context;
+# the Architect expands summarized directories via the subtree argument
+@lazy("codebase_mapper")
+def _build_codebase_mapper():
+    from tools.file_tools import CodebaseMapper
+    return CodebaseMapper(max_lines=400)
+
+
+# Definitions/imports lookups so plans can cite exact locations without
+# pulling whole files into the prompt
+@lazy("symbol_index")
+def _build_symbol_index():
+    from tools.file_tools import SymbolIndex
+    return SymbolIndex()
+
+
+# Semantic snippet search over the project (including ./workspace) so agents
+# pull only relevant code into their prompts
+# Ensure the embedding model is pulled: `ollama pull nomic-embed-text`
+@lazy("semantic_search")
+def _build_semantic_search():
+    from tools.retrieval import OllamaEmbedder, SemanticSearch
+    return SemanticSearch(
+        embedder=OllamaEmbedder(
+            model=os.environ.get("OLLAMA_EMBED_MODEL", "nomic-embed-text"),
+            base_url=OLLAMA_BASE_URL
+        )
+    )
+
 # =============================================================================
-# Task Definitions with Feedback Loop
+# Agent Definitions
 # =============================================================================
 
-def run_agent_team(user_task: str, max_retries: int = 3) -> str:
+# Agent whose every task runs in a "task" span of the active trace (the
+# class is created on first use because it subclasses crewai's Agent)
+@lazy("TracedAgent")
+def _build_traced_agent():
+    Agent = component("Agent")
+    
+    class TracedAgent(Agent):
+        """Agent whose every task runs in a "task" span of the active trace."""
+        
+        def execute_task(self, task, context=None, tools=None):
+            with span("task", agent=self.role):
+                return super().execute_task(task, context, tools)
+        
+        async def aexecute_task(self, task, context=None, tools=None):
+            with span("task", agent=self.role):
+                return await super().aexecute_task(task, context, tools)
+    
+    return TracedAgent
+
+
+def build_agents(engineer_llm: Optional["BaseLLM"] = None):
     """
-    Run the agent team on a given task with automatic retry on failure.
+    Create a fresh Architect, Engineer and Executor.
+    
+    Agents keep per-task execution state, so each run gets its own set;
+    the LLM and tools they use are shared.
     
     Args:
-        user_task: The task description for the agents to complete.
-        max_retries: Maximum number of retry attempts if code fails.
-        
+        engineer_llm: LLM for the Engineer, e.g. a sampling variant for a
+            best-of-N candidate. Defaults to the shared LLM.
+    
     Returns:
-        The final output from the agent team.
+        Tuple of (architect, engineer, executor) agents.
     """
+    TracedAgent = component("TracedAgent")
+    llm = component("ollama_llm")
+    semantic_search = component("semantic_search")
+    
+    # Architect Agent - Plans the solution approach
+    architect = TracedAgent(
+        role="Software Architect",
+        goal="Create clear, step-by-step implementation plans for coding tasks",
+        backstory="""You are an experienced software architect who excels at 
+        breaking down complex problems into simple, actionable steps. You provide 
+        clear pseudocode and implementation guidance that developers can follow.
+    
+        IMPORTANT: When planning file operations, remember that files saved by the 
+        Executor will persist in the ./workspace directory on the host machine.
+        Use the Codebase Mapper tool to understand the project structure first.
+        If the map summarizes a directory you need, call it again with subtree set
+        to that directory. Use the Symbol Index tool to find where a class or
+        function is defined, or who imports a module, instead of reading files,
+        and Semantic Code Search to pull in just the snippets relevant to the task.""",
+        llm=llm,
+        tools=[component("codebase_mapper"), component("symbol_index"), semantic_search],
+        verbose=True
+    )
+    
+    # Engineer Agent - Writes the actual code
+    engineer = TracedAgent(
+        role="Software Engineer",
+        goal="Write clean, working Python code based on the architect's plan",
+        backstory="""You are a skilled Python developer who writes concise, 
+        functional code. You follow best practices and ensure your code handles 
+        edge cases. When given feedback about errors, you fix them efficiently.
+        Use Semantic Code Search to look up existing code you need to build on.
+        Third-party packages your code imports are installed in the sandbox
+        automatically; never pip install them from the code itself.""",
+        llm=engineer_llm or llm,
+        tools=[semantic_search],
+        verbose=True
+    )
+    
+    # Executor Agent - Tests code in Docker sandbox
+    executor = TracedAgent(
+        role="Code Executor",
+        goal="Execute Python code in a secure Docker sandbox and report results",
+        backstory="""You are a QA engineer who tests code by running it in an 
+        isolated Docker environment. You provide clear feedback about whether 
+        the code works correctly or if there are errors that need fixing.
+    
+        NOTE: Any files you create will be saved to ./workspace on the host machine.
+        Dangerous operations (rm, network requests) will require human approval.""",
+        llm=llm,
+        tools=[component("docker_tool")],
+        verbose=True
+    )
+    
+    return architect, engineer, executor
+
+
+# Default agents for interactive use and warm-up; run_agent_team builds its own set
+lazy("architect", "engineer", "executor")(build_agents)
+
+
+def _system_prompt(agent: "Agent") -> str:
+    """The static system prompt CrewAI starts every call of ``agent`` with."""
+    prompt, _, _ = agent._build_execution_prompt(agent.tools or [])
+    return prompt.get("system") or prompt.get("prompt", "")
+
+
+def warm_up_llm() -> List["CallTiming"]:
+    """
+    Load the shared model and prefill each agent's system prompt.
+    
+    Every run builds fresh agents with the same prompts, so the prefixes
+    cached here are the ones later calls start with.
+    
+    Returns:
+        Timing of the model load followed by one per prefilled prompt.
+    """
+    from ollama_runtime import DEFAULT_KEEP_ALIVE, warm_up
+    
+    agents = [component(name) for name in ("architect", "engineer", "executor")]
+    timings = warm_up(
+        OLLAMA_MODEL,
+        OLLAMA_BASE_URL,
+        keep_alive=OLLAMA_KEEP_ALIVE or DEFAULT_KEEP_ALIVE,
+        system_prompts=[_system_prompt(agent) for agent in agents],
+        num_ctx=OLLAMA_NUM_CTX
+    )
+    print(f"Model ready in {timings[0].total:.1f}s "
+          f"(prefilled {len(timings) - 1} agent prompts)")
+    return timings
+
+# =============================================================================
+# Task Definitions with Feedback Loop
+# =============================================================================
+
+# Feedback when the Executor finished without running any code
+NO_EXECUTION_FEEDBACK = (
+    "EXECUTION ERROR: The code was never run in the sandbox. "
+    "Provide complete, directly executable Python code."
+)
+
+
+def _planning_task(
+    architect: "Agent",
+    user_task: str,
+    failures: Optional[List[str]] = None
+) -> "Task":
+    """Task 1: Architect creates the plan (or revises it after failed fixes)."""
+    Task = component("Task")
     
-    # Task 1: Architect creates the plan
-    planning_task = Task(
+    revision = ""
+    if failures:
+        attempts = "\n\n".join(
+            f"Attempt {i}:\n{failure}" for i, failure in enumerate(failures, 1)
+        )
+        revision = f"""
+        The previous plan was implemented {len(failures)} time(s) and every
+        attempt FAILED. The errors were:
+        
+        {attempts}
+        
+        Rethink the approach instead of patching it.
+        """
+    
+    return Task(
         description=f"""
         Analyze the following task and create a step-by-step implementation plan:
         
         TASK: {user_task}
-        
+        {revision}
         Provide:
         1. A brief analysis of the problem
         2. Step-by-step pseudocode
@@ -117,25 +589,48 @@ def run_agent_team(user_task: str, max_retries: int = 3) -> str:
         expected_output="A clear implementation plan with pseudocode",
         agent=architect
     )
+
+
+def _coding_task(engineer: "Agent", plan: str, error: Optional[str] = None) -> "Task":
+    """Task 2: Engineer writes the code from the plan, fixing the last error if any."""
+    Task = component("Task")
     
-    # Task 2: Engineer writes the code (depends on planning)
-    coding_task = Task(
-        description="""
+    if error is None:
+        instructions = """
         Based on the architect's plan, write complete Python code that:
         1. Implements the solution correctly
         2. Includes proper error handling
         3. Outputs results clearly with print statements
+        """
+    else:
+        instructions = f"""
+        The previous code attempt FAILED with this error:
+        {error}
         
+        Please fix the code and try again. Remember:
+        1. Analyze what went wrong
+        2. Fix the specific issue
+        3. Provide complete, executable Python code
+        """
+    
+    return Task(
+        description=f"""
+        ARCHITECT'S PLAN:
+        {plan}
+        {instructions}
         IMPORTANT: Provide ONLY the raw Python code. No markdown, no explanations.
         The code must be directly executable.
         """,
         expected_output="Complete, executable Python code",
-        agent=engineer,
-        context=[planning_task]
+        agent=engineer
     )
+
+
+def _execution_task(executor: "Agent", coding_task: "Task") -> "Task":
+    """Task 3: Executor runs the code (depends on coding)."""
+    Task = component("Task")
     
-    # Task 3: Executor runs the code (depends on coding)
-    execution_task = Task(
+    return Task(
         description="""
         Execute the engineer's code in the Docker sandbox and report results.
         
@@ -150,44 +645,440 @@ def run_agent_team(user_task: str, max_retries: int = 3) -> str:
         agent=executor,
         context=[coding_task]
     )
+
+
+def _planning_crew(
+    architect: "Agent",
+    user_task: str,
+    failures: Optional[List[str]] = None
+) -> "Crew":
+    """Crew running the Architect alone."""
+    Crew, Process = component("Crew"), component("Process")
+    
+    return Crew(
+        agents=[architect],
+        tasks=[_planning_task(architect, user_task, failures)],
+        process=Process.sequential,
+        verbose=True
+    )
+
+
+def _make_plan(
+    architect: "Agent",
+    user_task: str,
+    failures: Optional[List[str]] = None
+) -> str:
+    """Run the Architect alone and return its plan."""
+    with span("plan", replan=bool(failures)):
+        return str(_planning_crew(architect, user_task, failures).kickoff())
+
+
+async def _make_plan_async(
+    architect: "Agent",
+    user_task: str,
+    failures: Optional[List[str]] = None
+) -> str:
+    """Async ``_make_plan``."""
+    with span("plan", replan=bool(failures)):
+        return str(await _planning_crew(architect, user_task, failures).akickoff())
+
+
+def _attempt_crew(
+    engineer: "Agent", executor: "Agent", plan: str, error: Optional[str]
+) -> "Crew":
+    """Crew for one Engineer -> Executor attempt."""
+    Crew, Process = component("Crew"), component("Process")
     
-    # Run the crew with the defined workflow
-    crew = Crew(
-        agents=[architect, engineer, executor],
-        tasks=[planning_task, coding_task, execution_task],
+    coding_task = _coding_task(engineer, plan, error)
+    return Crew(
+        agents=[engineer, executor],
+        tasks=[coding_task, _execution_task(executor, coding_task)],
         process=Process.sequential,
         verbose=True
     )
+
+
+def _judge(executions: List[ExecutionResult]) -> Optional[str]:
+    """
+    Decide an attempt from the sandbox runs it recorded.
     
-    # Execute and handle retries for failures
-    for attempt in range(max_retries):
-        print(f"\n{'='*60}")
-        print(f"ATTEMPT {attempt + 1}/{max_retries}")
-        print(f"{'='*60}\n")
+    Returns:
+        None if the last run succeeded, otherwise the feedback for the
+        Engineer (only the trimmed traceback, not the whole output)
+    """
+    execution = executions[-1] if executions else None
+    if execution is not None and execution.ok:
+        return None
+    return execution.feedback() if execution is not None else NO_EXECUTION_FEEDBACK
+
+
+# Which failed candidate's feedback to keep when none passes: a traceback
+# is the most useful to fix, a run that never happened the least
+FAILURE_RANK = {ERROR: 3, TIMEOUT: 2, OOM: 2}
+
+
+def _failure_rank(executions: List[ExecutionResult]) -> int:
+    if not executions:
+        return 0
+    return FAILURE_RANK.get(executions[-1].status, 1)
+
+
+async def _run_candidates(
+    teams: List[Tuple["Agent", "Agent"]],
+    plan: str,
+    error: Optional[str],
+    run_id: str,
+    attempt: int
+) -> Tuple[str, Optional[str]]:
+    """
+    Run one attempt as several Engineer -> Executor candidates at once.
+    
+    The first candidate whose sandbox run passes wins; the rest are
+    cancelled, which kills their containers.
+    
+    Args:
+        teams: (engineer, executor) pair of each candidate.
+        plan: The Architect's plan.
+        error: Feedback from the previous attempt, if any.
+        run_id: Identifier shared by all attempts of the run.
+        attempt: Attempt number (1-based).
         
-        result = crew.kickoff()
+    Returns:
+        Tuple of (crew output, feedback) where feedback is None for a pass.
+        When every candidate fails, the most useful failure is returned.
+    """
+    async def run(index: int, engineer: "Agent", executor: "Agent"):
+        crew = _attempt_crew(engineer, executor, plan, error)
+        candidate = index + 1 if len(teams) > 1 else None
+        candidate_span = span("candidate", candidate=candidate) if candidate else nullcontext()
+        with candidate_span, workspace_manager.use(run_id, attempt, candidate), \
+                collect_results() as executions:
+            result = await crew.akickoff()
+            annotate(passed=_judge(executions) is None)
+        return str(result), executions
+    
+    pending = {
+        asyncio.create_task(run(index, engineer, executor)): index
+        for index, (engineer, executor) in enumerate(teams)
+    }
+    failures = []
+    crash = None
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = pending.pop(task)
+                try:
+                    result_str, executions = task.result()
+                except Exception as e:
+                    # One crashed candidate must not sink the others
+                    crash = crash or e
+                    continue
+                feedback = _judge(executions)
+                if feedback is None:
+                    if len(teams) > 1:
+                        print(f"\n🏁 Candidate {index + 1} passed; "
+                              f"cancelling {len(pending)} other(s)")
+                    return result_str, None
+                failures.append((_failure_rank(executions), result_str, feedback))
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    if not failures:
+        raise crash
+    _, result_str, feedback = max(failures, key=lambda failure: failure[0])
+    return result_str, feedback
+
+
+def _print_attempt(attempt: int, max_retries: int) -> None:
+    print(f"\n{'='*60}")
+    print(f"ATTEMPT {attempt + 1}/{max_retries}")
+    print(f"{'='*60}\n")
+
+
+def run_agent_team(
+    user_task: str,
+    max_retries: int = 3,
+    replan_after: Optional[int] = None,
+    candidates: int = 1
+) -> str:
+    """
+    Run the agent team on a given task with automatic retry on failure.
+    
+    The Architect plans once; retries only re-run the Engineer -> Executor
+    pair with the error fed back, so the plan is not regenerated each time.
+    
+    Args:
+        user_task: The task description for the agents to complete.
+        max_retries: Maximum number of retry attempts if code fails.
+        replan_after: Ask the Architect for a new plan after this many
+            consecutive failed fixes (None keeps the first plan throughout).
+        candidates: Engineer -> Executor candidates per attempt (best-of-N).
         
-        # Check if execution was successful
-        result_str = str(result)
-        if "EXECUTION ERROR:" not in result_str and "SYSTEM ERROR:" not in result_str:
-            print("\n✅ SUCCESS: Code executed without errors!")
-            return result_str
-        else:
-            print(f"\n⚠️ Attempt {attempt + 1} failed. Retrying...")
-            if attempt < max_retries - 1:
-                # Modify the coding task to indicate retry
-                coding_task.description = f"""
-                The previous code attempt FAILED with this error:
-                {result_str}
+    Returns:
+        The final output from the agent team.
+    """
+    if candidates > 1:
+        # Cancelling the losing candidates needs the async path
+        return asyncio.run(run_agent_team_async(
+            user_task, max_retries=max_retries, replan_after=replan_after,
+            candidates=candidates
+        ))
+    
+    # Fresh agents so concurrent runs do not share execution state
+    architect, engineer, executor = build_agents()
+    
+    # Every attempt gets its own workspace so concurrent runs never collide
+    run_id = uuid.uuid4().hex[:12]
+    
+    with _trace_run(user_task, run_id, candidates):
+        # Stage 1: plan once and keep it across retries
+        plan = _make_plan(architect, user_task)
+        failures: List[str] = []
+        error = None
+        
+        # Execute and handle retries for failures
+        for attempt in range(max_retries):
+            _print_attempt(attempt, max_retries)
+            
+            if replan_after and len(failures) >= replan_after:
+                print(f"\n🔁 {len(failures)} fixes failed. Asking the Architect to re-plan...")
+                plan = _make_plan(architect, user_task, failures)
+                failures = []
+                error = None
+            
+            # Stage 2: only the Engineer -> Executor pair is re-run
+            with span("attempt", attempt=attempt + 1):
+                crew = _attempt_crew(engineer, executor, plan, error)
+                with workspace_manager.use(run_id, attempt + 1), \
+                        collect_results() as executions:
+                    result = crew.kickoff()
                 
-                Please fix the code and try again. Remember:
-                1. Analyze what went wrong
-                2. Fix the specific issue
-                3. Provide complete, executable Python code
-                """
+                # Decide from the last sandbox run, not from the agents' wording
+                result_str = str(result)
+                error = _judge(executions)
+                annotate(passed=error is None)
+            if error is None:
+                annotate(outcome="success", attempts=attempt + 1)
+                print("\n✅ SUCCESS: Code executed without errors!")
+                return result_str
+            print(f"\n⚠️ Attempt {attempt + 1} failed. Retrying...")
+            failures.append(error)
+        
+        annotate(outcome="failed", attempts=max_retries)
+        print("\n❌ FAILED: Max retries exceeded.")
+        return result_str
+
+
+async def run_agent_team_async(
+    user_task: str,
+    max_retries: int = 3,
+    replan_after: Optional[int] = None,
+    candidates: int = 1
+) -> str:
+    """
+    Async ``run_agent_team`` built on ``Crew.akickoff``.
     
-    print("\n❌ FAILED: Max retries exceeded.")
-    return result_str
+    LLM calls are awaited natively and sandbox runs execute in worker
+    threads, so one event loop can keep many tasks in flight. Cancelling
+    the coroutine kills the container of any run in progress.
+    
+    Args:
+        user_task: The task description for the agents to complete.
+        max_retries: Maximum number of retry attempts if code fails.
+        replan_after: Ask the Architect for a new plan after this many
+            consecutive failed fixes (None keeps the first plan throughout).
+        candidates: Engineer -> Executor candidates raced per attempt; the
+            first to pass wins (best-of-N).
+        
+    Returns:
+        The final output from the agent team.
+    """
+    architect, engineer, executor = build_agents()
+    teams = [(engineer, executor)] + [
+        build_agents(engineer_llm=candidate_llm(index))[1:]
+        for index in range(1, candidates)
+    ]
+    
+    run_id = uuid.uuid4().hex[:12]
+    
+    with _trace_run(user_task, run_id, candidates):
+        plan = await _make_plan_async(architect, user_task)
+        failures: List[str] = []
+        error = None
+        
+        for attempt in range(max_retries):
+            _print_attempt(attempt, max_retries)
+            
+            if replan_after and len(failures) >= replan_after:
+                print(f"\n🔁 {len(failures)} fixes failed. Asking the Architect to re-plan...")
+                plan = await _make_plan_async(architect, user_task, failures)
+                failures = []
+                error = None
+            
+            with span("attempt", attempt=attempt + 1):
+                result_str, error = await _run_candidates(
+                    teams, plan, error, run_id, attempt + 1
+                )
+                annotate(passed=error is None)
+            if error is None:
+                annotate(outcome="success", attempts=attempt + 1)
+                print("\n✅ SUCCESS: Code executed without errors!")
+                return result_str
+            print(f"\n⚠️ Attempt {attempt + 1} failed. Retrying...")
+            failures.append(error)
+        
+        annotate(outcome="failed", attempts=max_retries)
+        print("\n❌ FAILED: Max retries exceeded.")
+        return result_str
+
+
+def run_batch(
+    tasks: List[str],
+    max_workers: Optional[int] = None,
+    max_retries: int = 3,
+    candidates: int = 1
+) -> List[str]:
+    """
+    Run several tasks concurrently and return their results in order.
+    
+    More tasks are kept in flight than either the LLM or the Docker limit
+    allows, so one task's generation overlaps another's execution.
+    
+    Args:
+        tasks: Task descriptions to run.
+        max_workers: Concurrent tasks. Defaults to LLM + Docker concurrency.
+        max_retries: Maximum attempts per task.
+        candidates: Best-of-N candidates per attempt.
+        
+    Returns:
+        Final output of each task, in the same order as ``tasks``.
+        Tasks that raised return a "SYSTEM ERROR:" string instead.
+    """
+    if max_workers is None:
+        max_workers = LLM_CONCURRENCY + DOCKER_CONCURRENCY
+    
+    with TaskScheduler(run_agent_team, max_workers=max_workers) as scheduler:
+        futures = scheduler.map(tasks, max_retries=max_retries, candidates=candidates)
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(f"SYSTEM ERROR: Task crashed. Reason: {str(e)}")
+    
+    print(f"\nBatch finished: {scheduler.stats()}")
+    return results
+
+
+async def run_batch_async(
+    tasks: List[str],
+    max_concurrency: Optional[int] = None,
+    max_retries: int = 3,
+    candidates: int = 1
+) -> List[str]:
+    """
+    Run several tasks on the current event loop and return their results in order.
+    
+    Waiting tasks cost no threads: LLM calls queue on the shared slots and
+    sandbox runs on the container pool.
+    
+    Args:
+        tasks: Task descriptions to run.
+        max_concurrency: Tasks in flight at once. Defaults to all of them.
+        max_retries: Maximum attempts per task.
+        candidates: Best-of-N candidates per attempt.
+        
+    Returns:
+        Final output of each task, in the same order as ``tasks``.
+        Tasks that raised return a "SYSTEM ERROR:" string instead.
+    """
+    limit = asyncio.Semaphore(max_concurrency or max(len(tasks), 1))
+    
+    async def run_one(task: str) -> str:
+        async with limit:
+            try:
+                return await run_agent_team_async(
+                    task, max_retries=max_retries, candidates=candidates
+                )
+            except Exception as e:
+                return f"SYSTEM ERROR: Task crashed. Reason: {str(e)}"
+    
+    return list(await asyncio.gather(*(run_one(task) for task in tasks)))
+
+
+# =============================================================================
+# Service Mode
+# =============================================================================
+
+# Port of the local job API (python main.py --serve)
+SERVICE_PORT = int(os.environ.get("AGENT_SERVICE_PORT", "8780"))
+
+# Bearer token of the job API (default: a new random one per process)
+SERVICE_TOKEN = os.environ.get("AGENT_SERVICE_TOKEN") or None
+
+
+def serve(port: int = SERVICE_PORT, max_workers: Optional[int] = None) -> None:
+    """
+    Run as a long-lived service taking jobs over HTTP until interrupted.
+    
+    The LLM client, warm containers and caches are built once and shared
+    by every job, so startup is paid once per process instead of per task.
+    Use SANDBOX_APPROVALS=http (or socket/file) when nobody watches the
+    console.
+    
+    Args:
+        port: Port of the job API on 127.0.0.1 (see service.py).
+        max_workers: Jobs running at once. Defaults to LLM + Docker concurrency.
+    """
+    from service import JobServer, JobService
+    
+    approval_source = start_approval_source()
+    try:
+        sandbox_pool.start()
+    except Exception as e:
+        print(f"⚠️ Could not pre-warm sandbox containers: {e}")
+    try:
+        warm_up_llm()
+    except Exception as e:
+        print(f"⚠️ Could not pre-warm the model: {e}")
+    
+    # Sandbox output goes to the job that produced it instead of the console
+    tool = component("docker_tool")
+    jobs = JobService(
+        run_agent_team,
+        max_workers=max_workers or LLM_CONCURRENCY + DOCKER_CONCURRENCY,
+        tracer=tracer
+    )
+    tool.on_output = jobs.on_output
+    server = JobServer(jobs, port=port, token=SERVICE_TOKEN, health=lambda: {
+        "sandbox": sandbox_pool.stats(),
+        "llm": component("llm_stats").summary()
+    }).start()
+    print(f"Agent team service listening on {server.url}/jobs (Ctrl+C to stop)")
+    print(f"Send 'Authorization: Bearer {server.token}' with every request")
+    
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    try:
+        while not stopping.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\nStopping: running jobs finish, queued jobs are cancelled")
+        server.stop()
+        jobs.close(cancel_pending=True)
+        tool.close()
+        sandbox_pool.close()
+        if approval_source is not None:
+            approval_source.stop()
+    
+    print(f"\nJobs: {jobs.stats()['jobs']}")
+    export_trace()
 
 
 # =============================================================================
@@ -195,22 +1086,87 @@ def run_agent_team(user_task: str, max_retries: int = 3) -> str:
 # =============================================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local agent team.")
+    parser.add_argument(
+        "tasks", nargs="*",
+        help="Task descriptions to run (default: the Fibonacci test task)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Concurrent tasks when several are given (or jobs with --serve)"
+    )
+    parser.add_argument(
+        "--async", dest="use_async", action="store_true",
+        help="Run tasks on one asyncio event loop instead of worker threads"
+    )
+    parser.add_argument(
+        "--candidates", type=int, default=1,
+        help="Code candidates generated and run in parallel per attempt; first to pass wins"
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="Run as a service accepting jobs over a local HTTP API (see service.py)"
+    )
+    parser.add_argument(
+        "--port", type=int, default=SERVICE_PORT,
+        help="Port of the job API with --serve"
+    )
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(port=args.port, max_workers=args.workers)
+        raise SystemExit(0)
+    
     # Test task from the workflow specification
     test_task = """
     Write a Python script that calculates the first 10 Fibonacci numbers 
     and prints them. The output should be a comma-separated list.
     """
+    tasks = args.tasks or [test_task]
     
     print("="*60)
     print("LOCAL AGENT TEAM - CrewAI + Ollama + Docker")
     print("="*60)
-    print(f"\nTest Task: {test_task.strip()}")
+    for task in tasks:
+        print(f"\nTask: {task.strip()}")
     print("="*60)
     
-    # Run the agent team
-    final_result = run_agent_team(test_task)
+    approval_source = start_approval_source()
     
-    print("\n" + "="*60)
-    print("FINAL RESULT")
-    print("="*60)
-    print(final_result)
+    # Pre-warm the sandbox so the first execution is a pool hit
+    try:
+        sandbox_pool.start()
+    except Exception as e:
+        print(f"⚠️ Could not pre-warm sandbox containers: {e}")
+    
+    # Load the model before the first task needs it
+    try:
+        warm_up_llm()
+    except Exception as e:
+        print(f"⚠️ Could not pre-warm the model: {e}")
+    
+    # Run the agent team (concurrently when several tasks are given)
+    try:
+        if args.use_async:
+            final_results = asyncio.run(run_batch_async(
+                tasks, max_concurrency=args.workers, candidates=args.candidates
+            ))
+        elif len(tasks) == 1:
+            final_results = [run_agent_team(tasks[0], candidates=args.candidates)]
+        else:
+            final_results = run_batch(tasks, max_workers=args.workers,
+                                      candidates=args.candidates)
+    finally:
+        component("docker_tool").close()
+        sandbox_pool.close()
+        if approval_source is not None:
+            approval_source.stop()
+    
+    for final_result in final_results:
+        print("\n" + "="*60)
+        print("FINAL RESULT")
+        print("="*60)
+        print(final_result)
+    
+    print(f"\nLLM timings: {component('llm_stats').summary()}")
+    export_trace()
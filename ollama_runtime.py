@@ -0,0 +1,399 @@
+"""
+Ollama Model Residency, Warm-Up and Call Timings
+
+CrewAI reaches Ollama through its OpenAI-compatible /v1 endpoint, which
+accepts no ``keep_alive`` (every call resets residency to the server
+default, so idle gaps unload the model) and reports no timings.
+OllamaInterceptor, passed as the provider LLM's ``interceptor``, sends each
+chat completion to the native /api/chat instead:
+- ``keep_alive`` (and optionally ``num_ctx``) is set on every call
+- Load, prompt-eval and eval durations of every call are recorded in CallStats
+  and on the active "llm" trace span, with the prompt/completion token counts
+- Responses are translated back, so CrewAI's tool handling is unchanged
+warm_up() loads the model at startup and prefills the agents' static
+system prompts, so the first calls find them in Ollama's KV cache.
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+# Windows compatibility - must be imported before crewai
+import win_patch
+
+from crewai.llms.hooks.base import BaseInterceptor
+from tracing import annotate
+
+
+# How long the model stays loaded after a call (Ollama duration string)
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Path suffixes of the OpenAI-compatible and native chat endpoints
+OPENAI_CHAT_PATH = "/v1/chat/completions"
+NATIVE_CHAT_PATH = "/api/chat"
+
+# Sampling parameters that map onto Ollama options
+_OPTION_NAMES = {
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "seed": "seed",
+    "stop": "stop",
+    "frequency_penalty": "frequency_penalty",
+    "presence_penalty": "presence_penalty",
+    "max_tokens": "num_predict",
+    "max_completion_tokens": "num_predict",
+}
+
+# Whether the request in flight in this thread / task was sent to /api/chat;
+# transports see the response without its request, so the outbound hook
+# leaves this note for the inbound one
+_routed: ContextVar[bool] = ContextVar("ollama_routed", default=False)
+
+
+@dataclass
+class CallTiming:
+    """Server-side timings of one Ollama call (seconds)."""
+
+    model: str = ""
+    load: float = 0.0
+    prompt_eval: float = 0.0
+    eval: float = 0.0
+    total: float = 0.0
+    # Tokens evaluated for the prompt; a reused prefix is not counted
+    prompt_tokens: int = 0
+    eval_tokens: int = 0
+
+    @classmethod
+    def from_ollama(cls, payload: Dict[str, Any]) -> "CallTiming":
+        """Read the ``*_duration`` (nanoseconds) and ``*_count`` fields of a response."""
+        return cls(
+            model=payload.get("model", ""),
+            load=payload.get("load_duration", 0) / 1e9,
+            prompt_eval=payload.get("prompt_eval_duration", 0) / 1e9,
+            eval=payload.get("eval_duration", 0) / 1e9,
+            total=payload.get("total_duration", 0) / 1e9,
+            prompt_tokens=payload.get("prompt_eval_count", 0),
+            eval_tokens=payload.get("eval_count", 0),
+        )
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.eval_tokens / self.eval if self.eval else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"load {self.load:.2f}s, "
+            f"prompt {self.prompt_tokens} tok/{self.prompt_eval:.2f}s, "
+            f"eval {self.eval_tokens} tok/{self.eval:.2f}s "
+            f"({self.tokens_per_second:.1f} tok/s)"
+        )
+
+
+class CallStats:
+    """Thread-safe record of recent call timings."""
+
+    def __init__(self, keep: int = 1000, on_call: Optional[Callable[[CallTiming], None]] = None):
+        """
+        Args:
+            keep: Most recent timings retained.
+            on_call: Called with every recorded timing, e.g. to log it.
+        """
+        self.keep = keep
+        self.on_call = on_call
+        self._lock = threading.Lock()
+        self._calls: List[CallTiming] = []
+        self._count = 0
+
+    def record(self, timing: CallTiming) -> None:
+        with self._lock:
+            self._calls.append(timing)
+            del self._calls[:-self.keep]
+            self._count += 1
+        if self.on_call is not None:
+            self.on_call(timing)
+
+    def calls(self) -> List[CallTiming]:
+        with self._lock:
+            return list(self._calls)
+
+    def summary(self) -> Dict[str, float]:
+        """Call count plus total seconds and tokens of the retained calls."""
+        with self._lock:
+            calls = list(self._calls)
+            summary = {"calls": self._count}
+        for name in ("load", "prompt_eval", "eval", "total", "prompt_tokens", "eval_tokens"):
+            summary[name] = sum(getattr(call, name) for call in calls)
+        summary["cold_loads"] = sum(1 for call in calls if call.load > 1.0)
+        return summary
+
+
+# =============================================================================
+# OpenAI <-> native request translation
+# =============================================================================
+
+def _text(content: Any) -> str:
+    """Flatten OpenAI content parts to text."""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def to_native_request(
+    body: Dict[str, Any],
+    keep_alive: Optional[str] = DEFAULT_KEEP_ALIVE,
+    num_ctx: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Translate an OpenAI chat completion request into an /api/chat request.
+
+    Args:
+        body: Parsed JSON body sent to /v1/chat/completions.
+        keep_alive: How long the model stays loaded afterwards.
+        num_ctx: Context window to request (None keeps the server default).
+
+    Returns:
+        JSON body for /api/chat
+    """
+    tool_names: Dict[str, str] = {}
+    messages = []
+    for message in body.get("messages", []):
+        native = {"role": message["role"], "content": _text(message.get("content"))}
+        if message.get("tool_calls"):
+            native["tool_calls"] = []
+            for call in message["tool_calls"]:
+                function = call["function"]
+                arguments = function.get("arguments") or "{}"
+                if isinstance(arguments, str):
+                    arguments = json.loads(arguments)
+                native["tool_calls"].append(
+                    {"function": {"name": function["name"], "arguments": arguments}}
+                )
+                tool_names[call.get("id", "")] = function["name"]
+        if message["role"] == "tool" and message.get("tool_call_id") in tool_names:
+            native["tool_name"] = tool_names[message["tool_call_id"]]
+        messages.append(native)
+
+    request: Dict[str, Any] = {"model": body["model"], "messages": messages, "stream": False}
+    if keep_alive is not None:
+        request["keep_alive"] = keep_alive
+    if body.get("tools"):
+        request["tools"] = body["tools"]
+
+    options = {
+        native: body[name] for name, native in _OPTION_NAMES.items()
+        if body.get(name) is not None
+    }
+    if isinstance(options.get("stop"), str):
+        options["stop"] = [options["stop"]]
+    if num_ctx is not None:
+        options["num_ctx"] = num_ctx
+    if options:
+        request["options"] = options
+
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_object":
+        request["format"] = "json"
+    elif response_format.get("type") == "json_schema":
+        request["format"] = response_format.get("json_schema", {}).get("schema", "json")
+    return request
+
+
+def to_openai_response(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate an /api/chat response into an OpenAI chat completion."""
+    message = payload.get("message", {})
+    reply: Dict[str, Any] = {"role": "assistant", "content": message.get("content", "")}
+    if message.get("tool_calls"):
+        reply["tool_calls"] = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {
+                    "name": call["function"]["name"],
+                    "arguments": json.dumps(call["function"].get("arguments", {})),
+                },
+            }
+            for call in message["tool_calls"]
+        ]
+        finish_reason = "tool_calls"
+    else:
+        finish_reason = "length" if payload.get("done_reason") == "length" else "stop"
+
+    prompt_tokens = payload.get("prompt_eval_count", 0)
+    completion_tokens = payload.get("eval_count", 0)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", ""),
+        "choices": [{"index": 0, "message": reply, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class OllamaInterceptor(BaseInterceptor[httpx.Request, httpx.Response]):
+    """
+    Routes non-streaming chat completions to Ollama's native API.
+
+    Pass as ``LLM(model="ollama/...", interceptor=OllamaInterceptor())``.
+    Streaming requests and other endpoints pass through unchanged.
+    """
+
+    def __init__(
+        self,
+        keep_alive: Optional[str] = DEFAULT_KEEP_ALIVE,
+        num_ctx: Optional[int] = None,
+        stats: Optional[CallStats] = None,
+    ):
+        """
+        Args:
+            keep_alive: How long the model stays loaded after each call.
+            num_ctx: Context window to request (None keeps the server default).
+            stats: Receives the timings of every call.
+        """
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.stats = stats
+
+    def on_outbound(self, message: httpx.Request) -> httpx.Request:
+        _routed.set(False)
+        if not message.url.path.endswith(OPENAI_CHAT_PATH):
+            return message
+        body = json.loads(message.read() or b"{}")
+        if body.get("stream"):
+            return message
+        _routed.set(True)
+        path = message.url.path[:-len(OPENAI_CHAT_PATH)] + NATIVE_CHAT_PATH
+        headers = {k: v for k, v in message.headers.items() if k.lower() != "content-length"}
+        return httpx.Request(
+            "POST", message.url.copy_with(path=path), headers=headers,
+            json=to_native_request(body, self.keep_alive, self.num_ctx),
+            extensions=message.extensions,
+        )
+
+    def on_inbound(self, message: httpx.Response) -> httpx.Response:
+        if not _routed.get():
+            return message
+        message.read()
+        return self._translate(message)
+
+    async def aon_outbound(self, message: httpx.Request) -> httpx.Request:
+        if message.url.path.endswith(OPENAI_CHAT_PATH):
+            await message.aread()
+        return self.on_outbound(message)
+
+    async def aon_inbound(self, message: httpx.Response) -> httpx.Response:
+        if not _routed.get():
+            return message
+        await message.aread()
+        return self._translate(message)
+
+    def _translate(self, response: httpx.Response) -> httpx.Response:
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {"error": response.text}
+        if response.status_code != 200 or "error" in payload:
+            error = {"message": str(payload.get("error", payload)), "type": "ollama_error"}
+            status = response.status_code if response.status_code != 200 else 500
+            return httpx.Response(status, json={"error": error})
+
+        timing = CallTiming.from_ollama(payload)
+        if self.stats is not None:
+            self.stats.record(timing)
+        annotate(
+            prompt_tokens=timing.prompt_tokens, completion_tokens=timing.eval_tokens,
+            load=timing.load, prompt_eval=timing.prompt_eval, eval=timing.eval,
+        )
+        return httpx.Response(200, json=to_openai_response(payload))
+
+
+# =============================================================================
+# Warm-up
+# =============================================================================
+
+def native_base_url(base_url: str) -> str:
+    """Ollama server URL without the OpenAI-compatible /v1 suffix."""
+    base_url = base_url.rstrip("/")
+    return base_url[:-3] if base_url.endswith("/v1") else base_url
+
+
+def _post(url: str, body: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise RuntimeError(f"Ollama request to {url} failed: {e}") from e
+    if "error" in payload:
+        raise RuntimeError(f"Ollama returned an error: {payload['error']}")
+    return payload
+
+
+def warm_up(
+    model: str,
+    base_url: str = "http://localhost:11434",
+    keep_alive: Optional[str] = DEFAULT_KEEP_ALIVE,
+    system_prompts: Iterable[str] = (),
+    num_ctx: Optional[int] = None,
+    timeout: float = 300.0,
+) -> List[CallTiming]:
+    """
+    Load a model and prefill static system prompts into Ollama's KV cache.
+
+    Args:
+        model: Model name without the provider prefix, e.g. "qwen2.5-coder:14b".
+        base_url: Ollama server URL (a trailing /v1 is ignored).
+        keep_alive: How long the model stays loaded.
+        system_prompts: Prompts every later call starts with (one per agent).
+        num_ctx: Context window, which must match the later calls for reuse.
+        timeout: Seconds to wait for each request, including the model load.
+
+    Returns:
+        Timing of the load followed by one per prefilled prompt
+
+    Raises:
+        RuntimeError: If Ollama cannot be reached or reports an error.
+    """
+    base = native_base_url(base_url)
+    options: Dict[str, Any] = {"num_predict": 1}
+    if num_ctx is not None:
+        options["num_ctx"] = num_ctx
+
+    # A generate request without a prompt only loads the model
+    started = time.monotonic()
+    load: Dict[str, Any] = {"model": model}
+    if keep_alive is not None:
+        load["keep_alive"] = keep_alive
+    payload = _post(f"{base}/api/generate", load, timeout)
+    timings = [CallTiming(model=payload.get("model", model),
+                          load=time.monotonic() - started,
+                          total=time.monotonic() - started)]
+
+    for prompt in dict.fromkeys(system_prompts):
+        body = {
+            "model": model,
+            "messages": [{"role": "system", "content": prompt}],
+            "stream": False,
+            "options": options,
+        }
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        timings.append(CallTiming.from_ollama(_post(f"{base}{NATIVE_CHAT_PATH}", body, timeout)))
+    return timings
+
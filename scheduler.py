@@ -0,0 +1,201 @@
+"""
+Concurrent Task Scheduler for the Agent Team
+
+Runs many agent-team tasks at once so the GPU (LLM generations) and the
+CPU (Docker sandbox executions) are kept busy at the same time:
+- Priority queue: higher priority tasks start first, FIFO within a priority
+- Backpressure: a bounded queue blocks (or rejects) new submissions
+- Per-task futures for collecting results as they complete
+
+The separate LLM and Docker concurrency limits are enforced where the
+resources are used: ``ManagedLLM.slots`` bounds in-flight generations and
+the sandbox ``ContainerPool.max_size`` bounds concurrent executions.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+@dataclass(order=True)
+class _Job:
+    """Queue entry; ordering uses only (sort_key, seq)."""
+
+    sort_key: int
+    seq: int
+    task: str = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    future: Future = field(compare=False)
+
+
+# Sentinel telling a worker thread to exit
+_STOP = object()
+
+
+class TaskScheduler:
+    """
+    Thread pool that runs a task function over a prioritised, bounded queue.
+
+    Example:
+        scheduler = TaskScheduler(run_agent_team, max_workers=6)
+        futures = [scheduler.submit(t) for t in tasks]
+        results = [f.result() for f in futures]
+        scheduler.shutdown()
+    """
+
+    def __init__(
+        self,
+        run_fn: Callable[..., Any],
+        max_workers: int = 4,
+        max_queue: int = 100,
+    ):
+        """
+        Args:
+            run_fn: Called as ``run_fn(task, **kwargs)`` for each submitted task.
+            max_workers: Number of tasks in flight at once. Should exceed the
+                LLM and Docker limits so one resource works while the other waits.
+            max_queue: Maximum queued (not yet started) tasks before
+                ``submit`` blocks or raises ``queue.Full``.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.run_fn = run_fn
+        self.max_workers = max_workers
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue(maxsize=max_queue)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._started_at = time.monotonic()
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"agent-worker-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        task: str,
+        priority: int = 0,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Queue a task for execution.
+
+        Args:
+            task: The task description passed to ``run_fn``.
+            priority: Higher values start sooner.
+            block: When the queue is full, wait for room (True) or raise (False).
+            timeout: Maximum seconds to wait for room when blocking.
+            **kwargs: Extra keyword arguments for ``run_fn``.
+
+        Returns:
+            A Future resolving to ``run_fn``'s return value
+
+        Raises:
+            queue.Full: If the queue stays full (backpressure).
+            RuntimeError: If the scheduler has been shut down.
+        """
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Scheduler has been shut down")
+            self.submitted += 1
+
+        future: Future = Future()
+        job = _Job(-priority, next(self._seq), task, kwargs, future)
+        try:
+            self._queue.put(job, block=block, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self.submitted -= 1
+            raise
+        return future
+
+    def map(self, tasks: Iterable[str], priority: int = 0, **kwargs) -> List[Future]:
+        """Submit several tasks with the same priority, blocking on backpressure."""
+        return [self.submit(task, priority=priority, **kwargs) for task in tasks]
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        Stop accepting tasks and stop the workers once the queue drains.
+
+        Args:
+            wait: Block until running tasks have finished.
+            cancel_pending: Cancel tasks that have not started yet.
+        """
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+
+        if cancel_pending:
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                job.future.cancel()
+
+        # Sentinels sort after every real job so queued work finishes first
+        for _ in self._workers:
+            self._queue.put(_Job(float("inf"), next(self._seq), "", {}, _STOP))
+
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def stats(self) -> dict:
+        """Throughput and queue counters."""
+        elapsed_hours = (time.monotonic() - self._started_at) / 3600
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "running": self.running,
+                "queued": self._queue.qsize(),
+                "tasks_per_hour": self.completed / elapsed_hours if elapsed_hours else 0.0,
+            }
+
+    def __enter__(self) -> "TaskScheduler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown(wait=True)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job.future is _STOP:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue  # Cancelled while queued
+
+            with self._lock:
+                self.running += 1
+            try:
+                result = self.run_fn(job.task, **job.kwargs)
+            except BaseException as e:
+                with self._lock:
+                    self.running -= 1
+                    self.failed += 1
+                job.future.set_exception(e)
+            else:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                job.future.set_result(result)
@@ -0,0 +1,466 @@
+"""
+Agent Team Service
+
+Daemon mode (``python main.py --serve``): one long-lived process keeps the
+LLM client, warm sandbox containers and the response/execution caches hot
+while jobs arrive over a local HTTP API:
+
+    POST /jobs                   {"task": "...", "priority": 0, "max_retries": 3, "candidates": 1}
+                                 (run options limited to OPTION_RANGES)
+    GET  /jobs                   retained jobs, without their results
+    GET  /jobs/<id>              status, outcome and result of one job
+    GET  /jobs/<id>/events       events after ?after=<seq>, waiting up to ?wait=<seconds>
+    GET  /jobs/<id>/events?follow=1   stream events as JSON lines until the job ends
+    POST /jobs/<id>/cancel       cancel a job that has not started
+    GET  /health                 job, queue and resource counters
+
+Every request must carry ``Authorization: Bearer <token>`` with the token
+printed at startup, address a loopback host, send no Origin header and,
+for POST, a JSON Content-Type (see tools/local_http.py).
+
+Jobs run on a persistent TaskScheduler worker pool. Each job records
+events as it goes: status changes, the output of its sandbox runs and the
+spans of its run (plan, attempts, agent tasks, sandbox calls).
+"""
+
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from scheduler import TaskScheduler
+from tools.local_http import new_token, rejection
+from tracing import Span, Tracer
+
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"            # run_fn returned; see Job.outcome for the verdict
+FAILED = "failed"        # run_fn raised
+CANCELLED = "cancelled"
+
+FINISHED = frozenset({DONE, FAILED, CANCELLED})
+
+# Spans recorded as job events when they finish
+EVENT_SPANS = frozenset({"run", "plan", "attempt", "task", "tool.sandbox"})
+
+# Events kept per job (older output is dropped first)
+MAX_EVENTS = 2000
+
+# Longest a single events request may wait for news (seconds)
+MAX_WAIT = 60.0
+
+# Accepted range of each run option in POST /jobs; every attempt and
+# candidate costs an Engineer generation and a container run
+OPTION_RANGES = {
+    "max_retries": (1, 10),
+    "candidates": (1, 8),
+    "replan_after": (1, 10),
+}
+
+# Job whose run the current thread or task is serving
+_current_job: ContextVar[Optional["Job"]] = ContextVar("current_job", default=None)
+
+
+@dataclass
+class Job:
+    """One submitted task and everything recorded about it."""
+
+    id: str
+    task: str
+    options: Dict[str, Any]
+    priority: int = 0
+    status: str = QUEUED
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    outcome: Optional[str] = None  # "success" / "failed" from the run span, when traced
+    result: Optional[str] = None
+    error: Optional[str] = None
+    events: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=MAX_EVENTS),
+                                          repr=False)
+    last_seq: int = 0
+    future: Optional[Future] = field(default=None, repr=False)
+
+    def to_dict(self, result: bool = True) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "task": self.task,
+            "options": self.options,
+            "priority": self.priority,
+            "status": self.status,
+            "outcome": self.outcome,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "events": self.last_seq,
+        }
+        if result:
+            data["result"] = self.result
+            data["error"] = self.error
+        return data
+
+
+class JobService:
+    """
+    Persistent worker pool running agent-team jobs and recording their progress.
+
+    Example:
+        service = JobService(run_agent_team, max_workers=6, tracer=tracer)
+        job = service.submit("Print the first 10 primes", max_retries=2)
+        events = service.events(job.id, after=0, timeout=30)
+        service.close()
+    """
+
+    def __init__(
+        self,
+        run_fn: Callable[..., Any],
+        max_workers: int = 4,
+        max_queue: int = 100,
+        keep: int = 1000,
+        tracer: Optional[Tracer] = None,
+    ):
+        """
+        Args:
+            run_fn: Called as ``run_fn(task, **options)`` for each job, e.g.
+                ``main.run_agent_team``.
+            max_workers: Jobs running at once.
+            max_queue: Jobs waiting to start before ``submit`` raises ``queue.Full``.
+            keep: Jobs retained for polling; the oldest finished ones are
+                forgotten beyond that.
+            tracer: Tracer whose spans are recorded as events of the job
+                they belong to (its ``on_end`` is chained, not replaced).
+        """
+        self.run_fn = run_fn
+        self.keep = keep
+        self.tracer = tracer
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._scheduler = TaskScheduler(self._run, max_workers=max_workers, max_queue=max_queue)
+        self._chained_on_end = None
+        if tracer is not None:
+            self._chained_on_end = tracer.on_end
+            tracer.on_end = self._on_span
+
+    # -------------------------------------------------------------------------
+    # Jobs
+    # -------------------------------------------------------------------------
+
+    def submit(self, task: str, priority: int = 0, **options) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            task: Task description for ``run_fn``.
+            priority: Higher values start sooner.
+            **options: Extra keyword arguments for ``run_fn``.
+
+        Returns:
+            The queued Job
+
+        Raises:
+            queue.Full: If ``max_queue`` jobs are already waiting.
+            RuntimeError: If the service has been closed.
+        """
+        job = Job(uuid.uuid4().hex[:12], task, options, priority)
+        with self._cond:
+            job.future = self._scheduler.submit(job.id, priority=priority, block=False)
+            self._jobs[job.id] = job
+            self._event(job, "status", status=QUEUED)
+            self._evict()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        """Retained jobs, oldest first."""
+        with self._cond:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started; returns whether it was cancelled."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED or not job.future.cancel():
+                return False
+            job.status = CANCELLED
+            job.finished = time.time()
+            self._event(job, "status", status=CANCELLED)
+            return True
+
+    def events(self, job_id: str, after: int = 0, timeout: float = 0.0) -> Optional[List[dict]]:
+        """
+        Events of a job newer than sequence number ``after``.
+
+        Waits up to ``timeout`` seconds for one to arrive unless the job has
+        already finished.
+
+        Returns:
+            The events (possibly empty), or None for an unknown job
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                new = [event for event in job.events if event["seq"] > after]
+                remaining = deadline - time.monotonic()
+                if new or job.status in FINISHED or remaining <= 0:
+                    return new
+                self._cond.wait(remaining)
+
+    def stats(self) -> Dict[str, Any]:
+        """Jobs by status plus the worker pool's queue counters."""
+        with self._cond:
+            counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {"jobs": counts, "workers": self._scheduler.max_workers,
+                "scheduler": self._scheduler.stats()}
+
+    def close(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stop accepting jobs and stop the workers once running jobs end."""
+        if cancel_pending:
+            for job in self.jobs():
+                self.cancel(job.id)
+        self._scheduler.shutdown(wait=wait)
+        if self.tracer is not None and self.tracer.on_end == self._on_span:
+            self.tracer.on_end = self._chained_on_end
+
+    # -------------------------------------------------------------------------
+    # Event sources
+    # -------------------------------------------------------------------------
+
+    def on_output(self, stream: str, text: str) -> None:
+        """Sandbox output callback (``DockerSandboxTool.on_output``) recording job output."""
+        job = _current_job.get()
+        if job is None:
+            return
+        with self._cond:
+            self._event(job, "output", stream=stream, text=text)
+
+    def _on_span(self, span: Span) -> None:
+        if self._chained_on_end is not None:
+            self._chained_on_end(span)
+        job = _current_job.get()
+        if job is None or span.name not in EVENT_SPANS:
+            return
+        with self._cond:
+            if span.name == "run":
+                job.outcome = span.attributes.get("outcome")
+            self._event(job, "span", name=span.name, status=span.status,
+                        duration=round(span.duration, 6), attributes=span.attributes)
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _run(self, job_id: str) -> None:
+        with self._cond:
+            job = self._jobs[job_id]
+            job.status = RUNNING
+            job.started = time.time()
+            self._event(job, "status", status=RUNNING)
+
+        token = _current_job.set(job)
+        try:
+            result = self.run_fn(job.task, **job.options)
+        except Exception as e:
+            status, result, error = FAILED, None, f"{type(e).__name__}: {e}"
+        else:
+            status, result, error = DONE, str(result), None
+        finally:
+            _current_job.reset(token)
+
+        with self._cond:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished = time.time()
+            self._event(job, "status", status=status, outcome=job.outcome)
+
+    def _event(self, job: Job, kind: str, **data: Any) -> None:
+        """Append an event to ``job`` and wake waiters; caller holds ``_cond``."""
+        job.last_seq += 1
+        job.events.append({"seq": job.last_seq, "time": time.time(), "type": kind, **data})
+        self._cond.notify_all()
+
+    def _evict(self) -> None:
+        """Forget the oldest finished jobs beyond ``keep``; caller holds ``_cond``."""
+        excess = len(self._jobs) - self.keep
+        for job_id in [j.id for j in self._jobs.values() if j.status in FINISHED][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+
+def _bounded_option(body: Dict[str, Any], name: str) -> int:
+    """A run option from a job request, checked against OPTION_RANGES."""
+    value = body[name]
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer")
+    low, high = OPTION_RANGES[name]
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+
+class _JobHandler(BaseHTTPRequestHandler):
+    """The job API (see the module docstring)."""
+
+    def do_GET(self):
+        if self._refused():
+            return
+        service: JobService = self.server.jobs
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        query = parse_qs(url.query)
+        if parts == ["health"]:
+            self._reply(200, {"status": "ok", **service.stats(), **self.server.health()})
+        elif parts == ["jobs"]:
+            self._reply(200, [job.to_dict(result=False) for job in service.jobs()])
+        elif len(parts) == 2 and parts[0] == "jobs" and service.get(parts[1]):
+            self._reply(200, service.get(parts[1]).to_dict())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            try:
+                after = int(query.get("after", ["0"])[0])
+                wait = min(float(query.get("wait", ["0"])[0]), MAX_WAIT)
+            except ValueError:
+                self._reply(400, {"error": "after and wait must be numbers"})
+                return
+            if query.get("follow", ["0"])[0] not in ("0", "false", ""):
+                self._follow(service, parts[1], after)
+                return
+            events = service.events(parts[1], after, timeout=wait)
+            if events is None:
+                self._reply(404, {"error": "not found"})
+            else:
+                self._reply(200, events)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self._refused():
+            return
+        service: JobService = self.server.jobs
+        parts = urlsplit(self.path).path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            if service.cancel(parts[1]):
+                self._reply(200, service.get(parts[1]).to_dict())
+            else:
+                self._reply(409, {"error": "unknown job or already started"})
+            return
+        if parts != ["jobs"]:
+            self._reply(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            task = body["task"]
+            if not isinstance(task, str) or not task.strip():
+                raise ValueError("task must be a non-empty string")
+            priority = int(body.get("priority", 0))
+            options = {name: _bounded_option(body, name) for name in OPTION_RANGES
+                       if body.get(name) is not None}
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": f"invalid job: {e}"})
+            return
+        try:
+            job = service.submit(task, priority=priority, **options)
+        except queue.Full:
+            self._reply(503, {"error": "job queue is full"})
+            return
+        except RuntimeError as e:
+            self._reply(503, {"error": str(e)})
+            return
+        self._reply(202, job.to_dict())
+
+    def _follow(self, service: JobService, job_id: str, after: int) -> None:
+        """Stream events as JSON lines until the job has finished."""
+        if service.get(job_id) is None:
+            self._reply(404, {"error": "not found"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            while True:
+                events = service.events(job_id, after, timeout=MAX_WAIT)
+                if events is None:
+                    return
+                for event in events:
+                    self.wfile.write(json.dumps(event, default=str).encode("utf-8") + b"\n")
+                    after = event["seq"]
+                self.wfile.flush()
+                job = service.get(job_id)
+                if not events and (job is None or job.status in FINISHED):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away
+
+    def _refused(self) -> bool:
+        """Reply with an error to requests that may come from a browser page."""
+        refused = rejection(self, self.server.token)
+        if refused is not None:
+            self._reply(refused[0], {"error": refused[1]})
+        return refused is not None
+
+    def _reply(self, status: int, payload) -> None:
+        data = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class JobServer:
+    """The job API on a local HTTP endpoint."""
+
+    def __init__(
+        self,
+        jobs: JobService,
+        host: str = "127.0.0.1",
+        port: int = 8780,
+        health: Optional[Callable[[], Dict[str, Any]]] = None,
+        token: Optional[str] = None,
+    ):
+        """
+        Args:
+            jobs: Service the endpoint submits to and reads from.
+            host: Interface to bind; keep it local.
+            port: Port to listen on (0 picks a free one).
+            health: Extra counters merged into /health, e.g. sandbox pool stats.
+            token: Bearer token clients must send (default: a random one,
+                readable as ``self.token``).
+        """
+        self.server = ThreadingHTTPServer((host, port), _JobHandler)
+        self.server.daemon_threads = True
+        self.server.jobs = jobs
+        self.server.health = health or dict
+        self.server.token = self.token = token or new_token()
+        self.port = self.server.server_address[1]
+        self.url = f"http://{host}:{self.port}"
+
+    def start(self) -> "JobServer":
+        threading.Thread(target=self.server.serve_forever, name="jobs-http",
+                         daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,239 @@
+"""
+Unit Tests for the Approval Queue
+
+Tests:
+1. Policy rules: auto-approve, auto-deny, fall through to a human
+2. Parking, deciding and expiring requests without blocking other work
+3. File, socket and HTTP approval sources
+4. Sandbox tool integration
+"""
+
+import unittest
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.approvals import (
+    APPROVED, DENIED, EXPIRED, PENDING, ApprovalPolicy, ApprovalQueue,
+    FileApprovalSource, HttpApprovalSource, SocketApprovalSource
+)
+from tools.docker_tool import DockerSandboxTool
+from tools.safety import Finding
+
+DELETE = Finding("file-delete", "os.remove", 2, "os.remove('x')")
+NETWORK = Finding("network", "requests.get", 3, "requests.get(url)")
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class TestPolicy(unittest.TestCase):
+    """Test automatic decisions."""
+
+    def test_deny_wins(self):
+        """A single denied finding should reject the request."""
+        policy = ApprovalPolicy(approve=["*"], deny=["file-delete:*"])
+        self.assertFalse(policy.decide([NETWORK, DELETE]))
+
+    def test_approve_needs_every_finding(self):
+        """Auto-approval applies only when all findings are covered."""
+        policy = ApprovalPolicy(approve=["network:requests.*"])
+        self.assertTrue(policy.decide([NETWORK]))
+        self.assertIsNone(policy.decide([NETWORK, DELETE]))
+
+    def test_policy_decides_without_waiting(self):
+        """Policy matches should be settled at submission."""
+        queue = ApprovalQueue(ApprovalPolicy(deny=["network:*"]))
+
+        request = queue.submit("code", [NETWORK])
+
+        self.assertEqual(request.status, DENIED)
+        self.assertFalse(queue.wait(request))
+        self.assertEqual(queue.stats()["auto_denied"], 1)
+
+
+class TestApprovalQueue(unittest.TestCase):
+    """Test parking and deciding requests."""
+
+    def test_waiter_released_by_decision(self):
+        """A waiting execution should resume once a human decides."""
+        queue = ApprovalQueue()
+        results = []
+        waiter = threading.Thread(
+            target=lambda: results.append(queue.request_approval("code", [DELETE], "run1"))
+        )
+        waiter.start()
+        wait_for(lambda: queue.pending())
+
+        request = queue.pending()[0]
+        self.assertEqual(request.label, "run1")
+        self.assertTrue(queue.decide(request.id, True, by="tester"))
+        waiter.join(5)
+
+        self.assertEqual(results, [True])
+        self.assertEqual(request.decided_by, "tester")
+        self.assertFalse(queue.decide(request.id, False))
+
+    def test_other_work_not_blocked(self):
+        """One parked request should not hold up another submission."""
+        queue = ApprovalQueue(ApprovalPolicy(approve=["network:*"]))
+        threading.Thread(target=queue.request_approval, args=("a", [DELETE]),
+                         daemon=True).start()
+        wait_for(lambda: queue.pending())
+
+        started = time.monotonic()
+        self.assertTrue(queue.request_approval("b", [NETWORK]))
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_timeout_expires_request(self):
+        """Unanswered requests should expire with the configured default."""
+        queue = ApprovalQueue(timeout=0.05)
+
+        request = queue.submit("code", [DELETE])
+
+        self.assertFalse(queue.wait(request))
+        self.assertEqual(request.status, EXPIRED)
+        self.assertTrue(ApprovalQueue(timeout=0.01, approve_on_timeout=True)
+                        .request_approval("code", [DELETE]))
+
+    def test_decided_requests_pruned(self):
+        """Only keep_decided settled requests should be retained."""
+        queue = ApprovalQueue(ApprovalPolicy(approve=["*"]), keep_decided=2)
+        ids = [queue.submit("code", [NETWORK]).id for _ in range(4)]
+
+        self.assertIsNone(queue.get(ids[0]))
+        self.assertIsNotNone(queue.get(ids[-1]))
+
+
+class TestFileSource(unittest.TestCase):
+    """Test approvals through a watched directory."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.queue = ApprovalQueue()
+        self.source = FileApprovalSource(self.queue, self.dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_pending_written_and_decision_read(self):
+        """A .deny file should reject the request and clean up."""
+        request = self.queue.submit("code", [DELETE])
+        pending = os.path.join(self.dir, f"{request.id}.json")
+        with open(pending) as f:
+            self.assertEqual(json.load(f)["findings"], [str(DELETE)])
+
+        with open(os.path.join(self.dir, f"{request.id}.deny"), "w") as f:
+            f.write("deletes user data")
+        self.source.poll()
+
+        self.assertEqual(request.status, DENIED)
+        self.assertEqual(request.reason, "deletes user data")
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+class TestNetworkSources(unittest.TestCase):
+    """Test the socket and HTTP sources on ephemeral local ports."""
+
+    def setUp(self):
+        self.queue = ApprovalQueue()
+        self.request = self.queue.submit("code", [DELETE], "run1/attempt-1")
+
+    def test_socket_protocol(self):
+        """list and approve commands should work over a local socket."""
+        source = SocketApprovalSource(self.queue, port=0).start()
+        try:
+            with socket.create_connection(("127.0.0.1", source.port), timeout=5) as conn:
+                reader = conn.makefile("rb")
+                conn.sendall(b"list\n")
+                self.assertIn(self.request.id, reader.readline().decode())
+                conn.sendall(f"approve {self.request.id} looks fine\n".encode())
+                self.assertEqual(reader.readline().decode().strip(), "OK")
+        finally:
+            source.stop()
+
+        self.assertEqual(self.request.status, APPROVED)
+        self.assertEqual(self.request.reason, "looks fine")
+
+    def test_http_endpoint(self):
+        """Pending requests should be listed and decided over HTTP."""
+        source = HttpApprovalSource(self.queue, port=0).start()
+        base = f"http://127.0.0.1:{source.port}/approvals"
+        try:
+            auth = {"Authorization": f"Bearer {source.token}"}
+            with urllib.request.urlopen(urllib.request.Request(base, headers=auth),
+                                        timeout=5) as response:
+                listed = json.loads(response.read())
+            post = urllib.request.Request(f"{base}/{self.request.id}/deny",
+                                          data=b'{"by": "alice"}', method="POST",
+                                          headers={**auth, "Content-Type": "application/json"})
+            with urllib.request.urlopen(post, timeout=5) as response:
+                decided = json.loads(response.read())
+        finally:
+            source.stop()
+
+        self.assertEqual([r["id"] for r in listed], [self.request.id])
+        self.assertEqual(decided["status"], DENIED)
+        self.assertEqual(self.request.decided_by, "alice")
+
+    def test_http_endpoint_refuses_browser_requests(self):
+        """A cross-site form post or a request without the token must not decide."""
+        source = HttpApprovalSource(self.queue, port=0, token="secret").start()
+        url = f"http://127.0.0.1:{source.port}/approvals/{self.request.id}/approve"
+        attempts = [
+            {"Content-Type": "text/plain", "Authorization": "Bearer secret"},
+            {"Content-Type": "application/json"},
+            {"Content-Type": "application/json", "Authorization": "Bearer secret",
+             "Origin": "http://evil.example"},
+        ]
+        codes = []
+        try:
+            for headers in attempts:
+                request = urllib.request.Request(url, data=b"{}", method="POST", headers=headers)
+                try:
+                    urllib.request.urlopen(request, timeout=5)
+                except urllib.error.HTTPError as e:
+                    codes.append(e.code)
+        finally:
+            source.stop()
+
+        self.assertEqual(codes, [415, 401, 403])
+        self.assertEqual(self.request.status, PENDING)
+
+
+class TestSandboxIntegration(unittest.TestCase):
+    """Test that the sandbox uses the queue instead of input()."""
+
+    @patch('builtins.input')
+    def test_queue_used_instead_of_console(self, mock_input):
+        """A configured queue should decide without prompting."""
+        queue = ApprovalQueue(ApprovalPolicy(deny=["shell:*"]))
+        tool = DockerSandboxTool(approvals=queue)
+
+        result = tool.execute("import os\nos.system('ls')")
+
+        self.assertIn("EXECUTION DENIED", result)
+        mock_input.assert_not_called()
+        self.assertEqual(queue.stats()["auto_denied"], 1)
+        self.assertEqual(queue.pending(), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,195 @@
+"""
+Unit Tests for the Asyncio Tool Support
+
+Tests:
+1. Async crews await a tool's _arun with context variables intact (or run
+   it in a thread when CrewAI's internals are missing)
+2. Cancellation tokens
+3. Async sandbox execution and cancellation killing the container (mocked Docker)
+4. Async codebase mapping
+"""
+
+import unittest
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.async_tools import CancelToken, NativeAsyncTool
+from tools.container_pool import ContainerPool
+from tools.docker_tool import DockerSandboxTool, build_archive
+from tools.file_tools import CodebaseMapper
+from tools.limits import ExecutionLimits
+from tools.results import CANCELLED, collect_results
+from tools.workspace import WorkspaceManager
+
+request_id: ContextVar[str] = ContextVar("request_id", default="")
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class EchoTool(NativeAsyncTool):
+    name: str = "Echo"
+    description: str = "Echoes the request id"
+
+    def _run(self, text: str) -> str:
+        return f"sync {text} {request_id.get()}"
+
+    async def _arun(self, text: str) -> str:
+        await asyncio.sleep(0)
+        return f"async {text} {request_id.get()}"
+
+
+class TestNativeAsyncTool(unittest.TestCase):
+    """Test the structured tool CrewAI builds from a NativeAsyncTool."""
+
+    def test_async_invocation_uses_arun_in_context(self):
+        """ainvoke should await _arun and see the caller's context variables."""
+        structured = EchoTool().to_structured_tool()
+
+        async def scenario():
+            request_id.set("req-1")
+            return await structured.ainvoke({"text": "hi"})
+
+        self.assertEqual(asyncio.run(scenario()), "async hi req-1")
+        self.assertEqual(structured.current_usage_count, 1)
+
+    def test_fallback_without_crewai_internals(self):
+        """Without the private hooks, ainvoke should run the tool in a thread, in context."""
+        structured = EchoTool().to_structured_tool()
+
+        async def scenario():
+            request_id.set("req-2")
+            return await structured.ainvoke('{"text": "hi"}')
+
+        with patch("tools.async_tools._HAS_NATIVE_HOOKS", False):
+            self.assertEqual(asyncio.run(scenario()), "sync hi req-2")
+
+    def test_sync_invocation_unchanged(self):
+        """Sync crews should still call _run."""
+        structured = EchoTool().to_structured_tool()
+
+        self.assertEqual(structured.invoke({"text": "hi"}), "sync hi ")
+        self.assertEqual(structured.args, EchoTool().to_structured_tool().args)
+
+
+class TestCancelToken(unittest.TestCase):
+    """Test cancellation tokens."""
+
+    def test_callbacks_run_once(self):
+        token = CancelToken()
+        calls = []
+        token.on_cancel(lambda: calls.append("a"))
+
+        token.cancel()
+        token.cancel()
+        token.on_cancel(lambda: calls.append("late"))
+
+        self.assertTrue(token.cancelled)
+        self.assertEqual(calls, ["a", "late"])
+
+
+class TestAsyncSandbox(unittest.TestCase):
+    """Test async execution against a mocked pool."""
+
+    def setUp(self):
+        self.pool = MagicMock(spec=ContainerPool)
+        self.pool.limits = ExecutionLimits()
+        self.pool.image = "python:3.11-slim"
+        self.container = self.pool.acquire.return_value
+        self.api = self.container.client.api
+        self.api.exec_create.return_value = {"Id": "exec-1"}
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 0}
+        self.workspace_root = tempfile.mkdtemp()
+        self.tool = DockerSandboxTool(pool=self.pool,
+                                      workspaces=WorkspaceManager(root=self.workspace_root))
+
+    def tearDown(self):
+        shutil.rmtree(self.workspace_root)
+
+    def test_arun_returns_legacy_text_and_records(self):
+        """_arun should run off the loop and record into the caller's collector."""
+        self.api.exec_start.return_value = iter([(b"ok\n", None)])
+        self.container.get_archive.return_value = (
+            iter([build_archive({"workspace/script.py": "..."})]), {}
+        )
+
+        with collect_results() as results:
+            output = asyncio.run(self.tool._arun("print('ok')"))
+
+        self.assertTrue(output.startswith("SUCCESS OUTPUT:\nok"))
+        self.assertEqual([r.status for r in results], ["success"])
+
+    def test_cancellation_kills_container(self):
+        """Cancelling the awaiting task should kill and discard the container."""
+        started = threading.Event()
+        killed = threading.Event()
+
+        def chunks():
+            yield b"working\n", None
+            started.set()
+            killed.wait(5)
+            raise ConnectionError("stream closed")
+
+        self.api.exec_start.return_value = chunks()
+        self.container.kill.side_effect = killed.set
+
+        async def scenario():
+            task = asyncio.create_task(self.tool.execute_result_async("print('x')"))
+            await asyncio.to_thread(started.wait, 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with collect_results() as results:
+            asyncio.run(scenario())
+            wait_for(lambda: self.pool.release.called)
+
+        self.container.kill.assert_called_once()
+        self.pool.release.assert_called_once_with(self.container, healthy=False)
+        self.assertEqual([r.status for r in results], [CANCELLED])
+
+
+class TestAsyncMapper(unittest.TestCase):
+    """Test the async codebase mapper."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, "src"))
+        open(os.path.join(self.root, "src", "app.py"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_arun_matches_run(self):
+        """The async map should be identical to the sync one."""
+        mapper = CodebaseMapper()
+        mapper._run(self.root)  # Writes context/map.md, which later maps include
+
+        async def scenario():
+            return await asyncio.gather(mapper._arun(self.root), mapper._arun(self.root))
+
+        first, second = asyncio.run(scenario())
+
+        self.assertIn("app.py", first)
+        self.assertEqual(first, second)
+        self.assertEqual(first, mapper._run(self.root))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,120 @@
+"""
+Unit Tests for the Benchmark Fakes
+
+Tests:
+1. Fake Ollama scripts each agent from the corpus
+2. Fake Docker runs scripts through the real sandbox tool and pool
+3. Regression check against a baseline report
+"""
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "benchmarks"))
+
+import win_patch  # Windows compatibility
+from bench_pipeline import compare
+from fake_docker import FakeDockerClient
+from fake_ollama import FakeOllama, task_marker
+from tools.container_pool import ContainerPool
+from tools.docker_tool import DockerSandboxTool
+from tools.limits import ExecutionLimits
+from tools.workspace import WorkspaceManager
+
+CORPUS = {"fix-me": {"task": "Fix it", "attempts": ["print(x)", "print('fixed')"]}}
+
+SANDBOX_TOOL = [{"type": "function", "function": {"name": "docker_sandbox_executor"}}]
+
+
+class TestFakeOllama(unittest.TestCase):
+    """Test the scripted agent replies."""
+
+    def setUp(self):
+        self.fake = FakeOllama(CORPUS, latency=0.0)
+        self.addCleanup(self.fake.close)
+        self.marker = task_marker(7, "fix-me")
+
+    def chat(self, role, content, tools=(), tool_result=None):
+        messages = [{"role": "system", "content": f"You are {role}."},
+                    {"role": "user", "content": content}]
+        if tool_result is not None:
+            messages.append({"role": "tool", "content": tool_result})
+        return self.fake.handle("/api/chat", {"model": "m", "messages": messages,
+                                              "tools": list(tools)})
+
+    def test_engineer_gets_next_attempt(self):
+        first = self.chat("Software Engineer", f"PLAN {self.marker}")
+        second = self.chat("Software Engineer", f"PLAN {self.marker}")
+
+        self.assertTrue(first["message"]["content"].endswith("print(x)"))
+        self.assertTrue(second["message"]["content"].endswith("print('fixed')"))
+        self.assertGreater(first["eval_count"], 0)
+
+    def test_executor_calls_sandbox_then_reports(self):
+        code = self.fake.script(7, "fix-me", 2)
+
+        call = self.chat("Code Executor", code, tools=SANDBOX_TOOL)
+        report = self.chat("Code Executor", code, tools=SANDBOX_TOOL, tool_result="SUCCESS")
+
+        function = call["message"]["tool_calls"][0]["function"]
+        self.assertEqual(function["name"], "docker_sandbox_executor")
+        self.assertEqual(function["arguments"], {"code": code})
+        self.assertIn("SUCCESS", report["message"]["content"])
+
+
+class TestFakeDocker(unittest.TestCase):
+    """Test the sandbox tool against the Docker stand-in."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.client = FakeDockerClient(create_latency=0.0, exec_latency=0.0)
+        self.pool = ContainerPool(max_size=2, reap_interval=None,
+                                  limits=ExecutionLimits(timeout=10), client=self.client)
+        self.tool = DockerSandboxTool(pool=self.pool,
+                                      workspaces=WorkspaceManager(root=self.root))
+
+    def tearDown(self):
+        self.pool.close()
+        self.client.close()
+        shutil.rmtree(self.root)
+
+    def test_runs_and_collects_artifacts(self):
+        result = self.tool.execute_result("open('out.txt', 'w').write('hi')\nprint('done')")
+
+        self.assertTrue(result.ok, result)
+        self.assertEqual(result.stdout.strip(), "done")
+        self.assertEqual(result.artifacts, ["out.txt"])
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+    def test_error_reported(self):
+        result = self.tool.execute_result("raise ValueError('bad')")
+
+        self.assertEqual(result.status, "error")
+        self.assertIn("ValueError: bad", result.traceback())
+
+
+class TestCompare(unittest.TestCase):
+    """Test the regression check."""
+
+    def test_slower_stages_and_throughput_flagged(self):
+        baseline = {"tasks_per_minute": 60.0, "stages": {
+            "llm": {"p95": 1.0}, "sandbox.exec": {"p95": 0.5}, "sandbox.safety": {"p95": 0.0001},
+        }}
+        report = {"tasks_per_minute": 45.0, "stages": {
+            "llm": {"p95": 1.1}, "sandbox.exec": {"p95": 0.9}, "sandbox.safety": {"p95": 0.01},
+        }}
+
+        regressions = compare(report, baseline, tolerance=0.2)
+
+        self.assertEqual(regressions, ["tasks_per_minute 60.0 -> 45.0",
+                                       "sandbox.exec p95 0.5s -> 0.9s"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
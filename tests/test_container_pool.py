@@ -0,0 +1,178 @@
+"""
+Unit Tests for ContainerPool
+
+Tests:
+1. Warm-up and reuse of pooled containers (hits vs misses)
+2. Health check and reset between uses
+3. Max size enforcement and idle reaping
+4. One shared docker client per process
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools import docker_client
+from tools.container_pool import ContainerPool, PoolExhaustedError
+from tools.sandbox_images import SandboxImages
+
+
+def make_client():
+    """Build a mock docker client whose containers are healthy and resettable."""
+    client = MagicMock()
+
+    def run_container(*args, **kwargs):
+        container = MagicMock()
+        container.status = "running"
+        container.exec_run.return_value = MagicMock(exit_code=0, output=b"")
+        return container
+
+    client.containers.run.side_effect = run_container
+    return client
+
+
+class TestContainerPool(unittest.TestCase):
+    """Test acquire/release behaviour of the pool."""
+
+    def setUp(self):
+        self.client = make_client()
+
+    def make_pool(self, **kwargs):
+        kwargs.setdefault("reap_interval", None)
+        return ContainerPool(client=self.client, **kwargs)
+
+    def test_start_prewarms_min_size(self):
+        """start() should create min_size containers up front."""
+        pool = self.make_pool(min_size=2, max_size=4)
+        pool.start()
+
+        self.assertEqual(self.client.containers.run.call_count, 2)
+        self.assertEqual(pool.stats()["idle"], 2)
+
+    def test_containers_not_bind_mounted(self):
+        """Pooled containers should keep /workspace private to the container."""
+        pool = self.make_pool(min_size=0)
+        pool.acquire()
+
+        kwargs = self.client.containers.run.call_args[1]
+        self.assertNotIn("volumes", kwargs)
+        self.assertEqual(kwargs["working_dir"], "/workspace")
+
+    def test_released_container_is_reused(self):
+        """A released container should be handed out again without a new run."""
+        pool = self.make_pool(min_size=0, max_size=2)
+
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+
+        self.assertIs(first, second)
+        self.assertEqual(self.client.containers.run.call_count, 1)
+        self.assertEqual(pool.stats()["hits"], 1)
+        self.assertEqual(pool.stats()["misses"], 1)
+
+    def test_release_runs_reset(self):
+        """Releasing a container should run the reset command inside it."""
+        pool = self.make_pool(min_size=0)
+
+        container = pool.acquire()
+        pool.release(container)
+
+        container.exec_run.assert_called_once()
+
+    def test_failed_reset_discards_container(self):
+        """A container whose reset fails should not go back to the pool."""
+        pool = self.make_pool(min_size=0)
+
+        container = pool.acquire()
+        container.exec_run.return_value = MagicMock(exit_code=1, output=b"")
+        pool.release(container)
+
+        self.assertEqual(pool.stats()["idle"], 0)
+        container.remove.assert_called_once_with(force=True)
+
+    def test_unhealthy_container_replaced(self):
+        """An idle container that stopped running should be replaced on acquire."""
+        pool = self.make_pool(min_size=0)
+
+        stale = pool.acquire()
+        pool.release(stale)
+        stale.status = "exited"
+
+        fresh = pool.acquire()
+
+        self.assertIsNot(stale, fresh)
+        stale.remove.assert_called_once_with(force=True)
+
+    def test_exhausted_pool_times_out(self):
+        """acquire() should fail once max_size containers are all in use."""
+        pool = self.make_pool(min_size=0, max_size=1)
+        pool.acquire()
+
+        with self.assertRaises(PoolExhaustedError):
+            pool.acquire(timeout=0.05)
+
+    def test_idle_containers_reaped(self):
+        """Idle containers above min_size should be reaped after idle_timeout."""
+        pool = self.make_pool(min_size=1, max_size=3, idle_timeout=0)
+
+        a = pool.acquire()
+        b = pool.acquire()
+        pool.release(a)
+        pool.release(b)
+
+        self.assertEqual(pool.stats()["idle"], 1)
+        self.assertEqual(pool.stats()["reaped"], 1)
+
+    def test_sibling_pools_reap(self):
+        """Pools derived for another image or limits should run their own reaper."""
+        pool = self.make_pool(min_size=0, reap_interval=60)
+        sibling = pool.with_image("local-dev-team-sandbox:abc")
+        self.addCleanup(sibling.close)
+
+        self.assertTrue(sibling._reaper.is_alive())
+        self.client.containers.run.assert_not_called()
+
+    def test_close_removes_idle(self):
+        """close() should remove every idle container."""
+        pool = self.make_pool(min_size=2)
+        pool.start()
+        pool.close()
+
+        self.assertEqual(pool.stats()["idle"], 0)
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+
+
+class TestSharedClient(unittest.TestCase):
+    """Test the process-wide docker client."""
+
+    def setUp(self):
+        docker_client.reset_client()
+        self.addCleanup(docker_client.reset_client)
+
+    def test_pool_and_images_share_client(self):
+        """Components without an explicit client should connect once between them."""
+        with patch("docker.from_env", return_value=make_client()) as from_env:
+            pool = ContainerPool(reap_interval=None)
+            images = SandboxImages(pool.image)
+
+            self.assertIs(pool.client, images.client)
+            self.assertIs(pool.client, docker_client.get_client())
+        from_env.assert_called_once_with()
+
+    def test_reset_closes_client(self):
+        with patch("docker.from_env", return_value=make_client()):
+            client = docker_client.get_client()
+        docker_client.reset_client()
+
+        client.close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
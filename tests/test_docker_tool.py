@@ -4,19 +4,38 @@ Unit Tests for DockerSandboxTool
 Tests:
 1. Dangerous command detection
 2. Human approval gate (mocked)
-3. File persistence via volume mount
+3. File persistence via per-run workspaces (inputs in, artifacts out)
+4. Tar payload construction for put_archive
+5. Structured execution results
+6. Derived images for third-party imports
 """
 
 import unittest
 from unittest.mock import patch, MagicMock
+import io
 import os
+import shutil
 import sys
+import tarfile
+import tempfile
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import win_patch  # Windows compatibility
-from tools.docker_tool import DockerSandboxTool, DANGEROUS_KEYWORDS
+from tools.container_pool import ContainerPool
+from tools.docker_tool import DockerSandboxTool, DANGEROUS_KEYWORDS, build_archive
+from tools.limits import ExecutionLimits
+from tools.result_cache import ExecutionCache
+from tools.results import SUCCESS, collect_results
+from tools.sandbox_images import ImageBuildError, SandboxImages
+from tools.workspace import WorkspaceManager, activate
+
+
+def workspace_archive(files):
+    """Tar stream shaped like container.get_archive('/workspace')."""
+    prefixed = {f"workspace/{name}": content for name, content in files.items()}
+    return iter([build_archive(prefixed)]), {}
 
 
 class TestDangerousCommandDetection(unittest.TestCase):
@@ -81,6 +100,422 @@ class TestHumanApprovalGate(unittest.TestCase):
         self.assertFalse(result)
 
 
+class TestBuildArchive(unittest.TestCase):
+    """Test the in-memory tar payload used to inject code."""
+    
+    def read_archive(self, data):
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            return {
+                m.name: tar.extractfile(m).read() if m.isfile() else None
+                for m in tar.getmembers()
+            }
+    
+    def test_multiple_files_packed(self):
+        """All files, including nested ones, should be in the archive."""
+        data = build_archive({"script.py": "print(1)", "pkg/helper.py": b"X = 1"})
+        members = self.read_archive(data)
+        
+        self.assertEqual(members["script.py"], b"print(1)")
+        self.assertEqual(members["pkg/helper.py"], b"X = 1")
+        self.assertIn("pkg", members)
+    
+    def test_large_script_supported(self):
+        """Scripts beyond argv limits should pack without issue."""
+        code = "x = 1\n" * 500_000
+        members = self.read_archive(build_archive({"script.py": code}))
+        
+        self.assertEqual(len(members["script.py"]), len(code))
+    
+    def test_escaping_path_rejected(self):
+        """Paths outside the workspace should be rejected."""
+        with self.assertRaises(ValueError):
+            build_archive({"../evil.py": ""})
+        with self.assertRaises(ValueError):
+            build_archive({"/etc/passwd": ""})
+
+
+class TestPooledExecution(unittest.TestCase):
+    """Test that executions lease containers from the pool (mocked Docker)."""
+    
+    def setUp(self):
+        self.pool = MagicMock(spec=ContainerPool)
+        self.pool.limits = ExecutionLimits()
+        self.pool.image = "python:3.11-slim"
+        self.container = self.pool.acquire.return_value
+        self.api = self.container.client.api
+        self.api.exec_create.return_value = {"Id": "exec-1"}
+        self.api.exec_start.return_value = iter([(b"ok\n", None)])
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 0}
+        self.container.get_archive.return_value = workspace_archive({"script.py": "..."})
+        self.workspace_root = tempfile.mkdtemp()
+        self.workspaces = WorkspaceManager(root=self.workspace_root)
+        self.tool = DockerSandboxTool(pool=self.pool, workspaces=self.workspaces)
+    
+    def tearDown(self):
+        shutil.rmtree(self.workspace_root)
+    
+    def test_container_returned_to_pool(self):
+        """A successful run should release the container as healthy."""
+        result = self.tool._run("print('ok')")
+        
+        self.assertIn("SUCCESS OUTPUT", result)
+        self.pool.release.assert_called_once_with(self.container, healthy=True)
+    
+    def test_code_sent_in_single_archive(self):
+        """Code should be injected with one put_archive and a single exec."""
+        self.tool._run("print('ok')", files={"data.txt": "42"})
+        
+        self.container.put_archive.assert_called_once()
+        path, data = self.container.put_archive.call_args[0]
+        self.assertEqual(path, "/workspace")
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            self.assertEqual(sorted(tar.getnames()), ["data.txt", "script.py"])
+        self.assertEqual(self.api.exec_create.call_count, 1)
+    
+    def test_output_streamed_to_callback(self):
+        """Chunks should reach on_output separately per stream as they arrive."""
+        self.api.exec_start.return_value = iter([
+            (b"line 1\n", None), (None, b"warning\n"), (b"line 2\n", None)
+        ])
+        received = []
+        self.tool.on_output = lambda stream, text: received.append((stream, text))
+        
+        result = self.tool._run("print('ok')")
+        
+        self.assertEqual(received, [
+            ("stdout", "line 1\n"), ("stderr", "warning\n"), ("stdout", "line 2\n")
+        ])
+        self.assertIn("line 1\nline 2\nwarning", result)
+    
+    def test_nonzero_exit_is_error(self):
+        """A non-zero exit code should be reported as an execution error."""
+        self.api.exec_start.return_value = iter([(None, b"boom\n")])
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 1}
+        
+        result = self.tool._run("raise SystemExit(1)")
+        
+        self.assertTrue(result.startswith("EXECUTION ERROR"))
+    
+    def test_abort_on_first_traceback(self):
+        """Reading should stop once the first traceback is complete."""
+        chunks = [
+            (None, b"Traceback (most recent call last):\n  File \"x\", line 1\n"),
+            (None, b"ValueError: bad\n"),
+            (b"never read\n", None),
+        ]
+        self.api.exec_start.return_value = iter(chunks)
+        self.api.exec_inspect.return_value = {"Running": True, "ExitCode": None}
+        self.tool.abort_on_traceback = True
+        
+        result = self.tool._run("...")
+        
+        self.assertIn("EXECUTION ERROR", result)
+        self.assertIn("ValueError: bad", result)
+        self.assertNotIn("never read", result)
+    
+    def test_handled_traceback_runs_to_exit(self):
+        """By default a logged, handled exception should not end a successful run."""
+        chunks = [
+            (None, b"Traceback (most recent call last):\n  File \"x\", line 1\n"),
+            (None, b"ValueError: retrying\n"),
+            (b"recovered\n", None),
+        ]
+        self.api.exec_start.return_value = iter(chunks)
+        
+        result = self.tool.execute_result("...")
+        
+        self.assertEqual(result.status, SUCCESS)
+        self.assertFalse(result.aborted)
+        self.assertIn("recovered", result.stdout)
+    
+    def test_output_capped(self):
+        """Output beyond max_output_bytes should keep only head and tail."""
+        self.api.exec_start.return_value = iter([(b"A" * 1000 + b"END", None)])
+        self.tool.limits = ExecutionLimits(max_output_bytes=100)
+        
+        result = self.tool._run("...")
+        
+        self.assertIn("bytes truncated", result)
+        self.assertTrue(result.rstrip().endswith("END"))
+    
+    def test_command_wrapped_with_timeout(self):
+        """The script should run under coreutils timeout with the configured limit."""
+        self.tool.limits = ExecutionLimits(timeout=5)
+        
+        self.tool._run("print('ok')")
+        
+        cmd = self.api.exec_create.call_args[0][1]
+        self.assertEqual(cmd[:4], ["timeout", "-k", "1", "5"])
+        self.assertEqual(cmd[-1], "/workspace/script.py")
+    
+    def test_timeout_reported(self):
+        """Exit code 124 from timeout should give a TIMEOUT result."""
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 124}
+        
+        result = self.tool._run("while True: pass")
+        
+        self.assertTrue(result.startswith("TIMEOUT:"))
+    
+    def test_oom_reported(self):
+        """A SIGKILL before the deadline should give an OOM result."""
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 137}
+        
+        result = self.tool._run("x = 'a' * 10**12")
+        
+        self.assertTrue(result.startswith("OOM:"))
+    
+    def test_artifacts_promoted_on_success(self):
+        """Files created by a successful run should be promoted to the workspace."""
+        self.container.get_archive.return_value = workspace_archive(
+            {"script.py": "...", "out/result.txt": "42"}
+        )
+        
+        with activate(self.workspaces.create("run-1")):
+            result = self.tool._run("...")
+        
+        self.assertIn("out/result.txt", result)
+        with open(os.path.join(self.workspace_root, "out", "result.txt")) as f:
+            self.assertEqual(f.read(), "42")
+        staged = os.path.join(self.workspace_root, ".runs", "run-1", "attempt-1", "out", "result.txt")
+        self.assertTrue(os.path.exists(staged))
+        self.assertFalse(os.path.exists(os.path.join(self.workspace_root, "script.py")))
+    
+    def test_workspace_inputs_injected(self):
+        """Files already in ./workspace should be readable; only changed ones come back."""
+        with open(os.path.join(self.workspace_root, "data.csv"), "w") as f:
+            f.write("a,b")
+        with open(os.path.join(self.workspace_root, "notes.txt"), "w") as f:
+            f.write("old")
+        self.container.get_archive.return_value = workspace_archive(
+            {"script.py": "...", "data.csv": "a,b", "notes.txt": "new", "out.txt": "1"}
+        )
+        
+        result = self.tool.execute_result("print(open('data.csv').read())")
+        
+        _, data = self.container.put_archive.call_args[0]
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            self.assertEqual(sorted(tar.getnames()), ["data.csv", "notes.txt", "script.py"])
+        self.assertEqual(result.artifacts, ["notes.txt", "out.txt"])
+    
+    def test_artifacts_not_promoted_on_failure(self):
+        """A failed run should leave the host workspace untouched."""
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 1}
+        
+        self.tool._run("...")
+        
+        self.container.get_archive.assert_not_called()
+        self.assertFalse(os.path.exists(os.path.join(self.workspace_root, ".runs")))
+    
+    def test_per_call_limits_use_matching_pool(self):
+        """Different container limits per call should lease from a sibling pool."""
+        sibling = self.pool.with_limits.return_value
+        sibling.acquire.return_value = self.container
+        
+        self.tool.execute("print('ok')", limits=ExecutionLimits(mem_limit="2g"))
+        
+        self.pool.with_limits.assert_called_once()
+        sibling.acquire.assert_called_once()
+        self.pool.acquire.assert_not_called()
+    
+    def test_third_party_imports_use_derived_image(self):
+        """A script importing numpy should lease from the pool of its derived image."""
+        self.tool.images = MagicMock(spec=SandboxImages)
+        self.tool.images.image_for.return_value = "local-dev-team-sandbox:abc"
+        sibling = self.pool.with_image.return_value
+        sibling.acquire.return_value = self.container
+        
+        self.tool.execute("import numpy\nprint(numpy.zeros(1))")
+        self.tool.execute("print('no imports')")
+        
+        self.tool.images.image_for.assert_called_once_with(["numpy"])
+        self.pool.with_image.assert_called_once_with("local-dev-team-sandbox:abc")
+        sibling.acquire.assert_called_once()
+        self.pool.acquire.assert_called_once()
+    
+    def test_evicted_image_pool_closed(self):
+        """Evicting a derived image should drop its pool's idle containers first."""
+        client = MagicMock()
+        client.containers.run.return_value.status = "running"
+        client.containers.run.return_value.exec_run.return_value = MagicMock(exit_code=0)
+        self.pool.with_image.side_effect = lambda image: ContainerPool(
+            image=image, min_size=0, reap_interval=None, client=client)
+        self.tool.images = SandboxImages(self.pool.image, max_images=0, client=client)
+        tag = self.tool._image_for("import numpy", None)
+        derived = self.tool._get_pool(image=tag)
+        derived.release(derived.acquire())
+        client.images.list.return_value = [MagicMock(id="id-numpy", tags=[tag])]
+        removed = []
+        client.images.remove.side_effect = removed.append
+        client.containers.run.return_value.remove.side_effect = (
+            lambda force: self.assertEqual(removed, []))
+        
+        self.assertEqual(self.tool.images.evict(), 1)
+        
+        client.containers.run.return_value.remove.assert_called_once_with(force=True)
+        self.assertEqual(removed, ["id-numpy"])
+        self.assertEqual(derived.stats()["idle"], 0)
+        self.assertIsNot(self.tool._get_pool(image=tag), derived)
+    
+    def test_failed_image_build_falls_back_to_base(self):
+        """An uninstallable import should still run (and fail) on the base image."""
+        self.tool.images = MagicMock(spec=SandboxImages)
+        self.tool.images.image_for.side_effect = ImageBuildError("no such package")
+        
+        with patch('builtins.print'):
+            result = self.tool._run("import notapackage")
+        
+        self.assertIn("SUCCESS OUTPUT", result)
+        self.pool.acquire.assert_called_once()
+    
+    def test_broken_container_discarded(self):
+        """A Docker failure mid-run should release the container as unhealthy."""
+        self.api.exec_create.side_effect = RuntimeError("daemon went away")
+        
+        result = self.tool._run("print('ok')")
+        
+        self.assertIn("SYSTEM ERROR", result)
+        self.pool.release.assert_called_once_with(self.container, healthy=False)
+
+    
+    def test_identical_code_served_from_cache(self):
+        """A repeated deterministic run should not lease a container again."""
+        self.tool.result_cache = ExecutionCache()
+        
+        first = self.tool._run("print('ok')")
+        second = self.tool._run("print('ok')")
+        
+        self.assertEqual(first, second)
+        self.pool.acquire.assert_called_once()
+        self.assertEqual(self.tool.result_cache.stats()["hits"], 1)
+    
+    def test_cached_artifacts_replayed(self):
+        """A cache hit should promote the artifacts of the original run."""
+        self.tool.result_cache = ExecutionCache()
+        self.container.get_archive.return_value = workspace_archive(
+            {"script.py": "...", "out.txt": "42"}
+        )
+        self.tool._run("open('out.txt', 'w').write('42')")
+        os.remove(os.path.join(self.workspace_root, "out.txt"))
+        
+        self.tool._run("open('out.txt', 'w').write('42')")
+        
+        self.pool.acquire.assert_called_once()
+        with open(os.path.join(self.workspace_root, "out.txt")) as f:
+            self.assertEqual(f.read(), "42")
+    
+    def test_artifacts_cached_without_active_run(self):
+        """Artifacts of a one-off workspace should be cached even if it is collected."""
+        self.tool.result_cache = ExecutionCache()
+        self.workspaces.keep = 0
+        self.container.get_archive.return_value = workspace_archive(
+            {"script.py": "...", "out.txt": "42"}
+        )
+        release = self.workspaces.release
+        
+        def release_and_collect(workspace):
+            release(workspace)
+            self.workspaces.gc()
+        
+        with patch.object(self.workspaces, "release", side_effect=release_and_collect):
+            self.tool._run("open('out.txt', 'w').write('42')")
+        os.remove(os.path.join(self.workspace_root, "out.txt"))
+        self.tool._run("open('out.txt', 'w').write('42')")
+        
+        self.pool.acquire.assert_called_once()
+        with open(os.path.join(self.workspace_root, "out.txt")) as f:
+            self.assertEqual(f.read(), "42")
+    
+    def test_abort_setting_not_shared_in_cache(self):
+        """A run aborted at its first traceback must not be replayed without the flag."""
+        self.tool.result_cache = ExecutionCache()
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 1}
+        self.tool.abort_on_traceback = True
+        self.tool._run("raise ValueError('x')")
+        
+        self.tool.abort_on_traceback = False
+        self.tool._run("raise ValueError('x')")
+        
+        self.assertEqual(self.pool.acquire.call_count, 2)
+    
+    def test_nondeterministic_code_not_cached(self):
+        """Scripts using the clock, randomness or network should always run."""
+        self.tool.result_cache = ExecutionCache()
+        
+        for _ in range(2):
+            self.api.exec_start.return_value = iter([(b"ok\n", None)])
+            self.tool._run("import random; print(random.random())")
+        
+        self.assertEqual(self.pool.acquire.call_count, 2)
+        self.assertEqual(self.tool.result_cache.stats()["entries"], 0)
+    
+    def test_cache_opt_out_per_call(self):
+        """execute(cache=False) should bypass a cached result."""
+        self.tool.result_cache = ExecutionCache()
+        self.tool.execute("print('ok')")
+        self.api.exec_start.return_value = iter([(b"ok\n", None)])
+        
+        self.tool.execute("print('ok')", cache=False)
+        
+        self.assertEqual(self.pool.acquire.call_count, 2)
+    
+    def test_timeouts_not_cached(self):
+        """Environmental failures such as timeouts should not be memoized."""
+        self.tool.result_cache = ExecutionCache()
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 124}
+        
+        self.tool._run("print('ok')")
+        
+        self.assertEqual(self.tool.result_cache.stats()["entries"], 0)
+
+    
+    def test_structured_result(self):
+        """execute_result should separate streams and report usage."""
+        usage = b'\x1e__sandbox_usage__ {"cpu_user": 0.5, "cpu_system": 0.1, "max_rss_kb": 9000}\n'
+        self.api.exec_start.return_value = iter([(b"out\n", None), (None, b"warn\n" + usage)])
+        received = []
+        self.tool.on_output = lambda stream, text: received.append(text)
+        
+        result = self.tool.execute_result("print('out')")
+        
+        self.assertTrue(result.ok)
+        self.assertEqual((result.exit_code, result.stdout, result.stderr), (0, "out\n", "warn\n"))
+        self.assertEqual(result.usage["max_rss_kb"], 9000)
+        self.assertNotIn("sandbox_usage", "".join(received))
+        self.assertEqual(str(result), "SUCCESS OUTPUT:\nout\nwarn\n")
+    
+    def test_result_recorded_out_of_band(self):
+        """Results should reach an active collector, including denials."""
+        self.api.exec_inspect.return_value = {"Running": False, "ExitCode": 1}
+        
+        with collect_results() as results:
+            self.tool._run("raise SystemExit(1)")
+            with patch.object(DockerSandboxTool, '_request_approval', return_value=False):
+                self.tool._run("import os\nos.remove('x')")
+        
+        self.assertEqual([r.status for r in results], ["error", "denied"])
+        self.assertEqual(results[0].exit_code, 1)
+    
+    def test_truncation_flagged(self):
+        """Capped streams should be flagged on the result."""
+        self.api.exec_start.return_value = iter([(b"A" * 1000, None)])
+        self.tool.limits = ExecutionLimits(max_output_bytes=100)
+        
+        result = self.tool.execute_result("...")
+        
+        self.assertTrue(result.stdout_truncated)
+        self.assertFalse(result.stderr_truncated)
+    
+    def test_cached_result_marked(self):
+        """A replayed result should keep its fields and be marked cached."""
+        self.tool.result_cache = ExecutionCache()
+        first = self.tool.execute_result("print('ok')")
+        
+        second = self.tool.execute_result("print('ok')")
+        
+        self.assertTrue(second.cached)
+        self.assertEqual((second.status, second.stdout), (first.status, first.stdout))
+
+
 class TestDockerExecution(unittest.TestCase):
     """
     Integration tests for Docker execution.
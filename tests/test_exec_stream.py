@@ -0,0 +1,116 @@
+"""
+Unit Tests for the Streaming Exec Helpers
+
+Tests:
+1. Head/tail output truncation
+2. Traceback detection across chunk boundaries
+3. Incremental UTF-8 decoding
+4. Resource-usage runner
+"""
+
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.exec_stream import (
+    USAGE_RUNNER, ChunkDecoder, OutputCapture, TracebackDetector, split_usage
+)
+
+
+class TestOutputCapture(unittest.TestCase):
+    """Test the bounded output buffer."""
+
+    def test_small_output_kept_whole(self):
+        """Output under the limit should be returned unchanged."""
+        capture = OutputCapture(100)
+        capture.write(b"hello ")
+        capture.write(b"world")
+
+        self.assertFalse(capture.truncated)
+        self.assertEqual(capture.getvalue(), "hello world")
+
+    def test_head_and_tail_kept(self):
+        """Output over the limit should keep the first and last halves."""
+        capture = OutputCapture(10)
+        for i in range(100):
+            capture.write(f"{i:03d}\n".encode())
+
+        value = capture.getvalue()
+        self.assertTrue(capture.truncated)
+        self.assertTrue(value.startswith("000\n0"))
+        self.assertTrue(value.endswith("\n099\n"))
+        self.assertIn("390 bytes truncated", value)
+
+
+class TestTracebackDetector(unittest.TestCase):
+    """Test detection of the first complete traceback."""
+
+    def test_incomplete_traceback_not_reported(self):
+        """The marker alone should not count until the exception line arrives."""
+        detector = TracebackDetector()
+
+        self.assertFalse(detector.feed(b"Traceback (most recent call last):\n"))
+        self.assertFalse(detector.feed(b'  File "s.py", line 1, in <module>\n'))
+        self.assertTrue(detector.feed(b"ZeroDivisionError: division by zero\n"))
+
+    def test_marker_split_across_chunks(self):
+        """The marker should be found even when split between chunks."""
+        detector = TracebackDetector()
+
+        self.assertFalse(detector.feed(b"noise Traceback (most rec"))
+        self.assertFalse(detector.feed(b"ent call last):\n  File \"x\"\n"))
+        self.assertTrue(detector.feed(b"KeyError: 'a'\n"))
+
+    def test_plain_stderr_ignored(self):
+        """Warnings without a traceback should not trigger detection."""
+        detector = TracebackDetector()
+
+        self.assertFalse(detector.feed(b"DeprecationWarning: old api\n"))
+
+
+class TestChunkDecoder(unittest.TestCase):
+    """Test incremental decoding of split multi-byte characters."""
+
+    def test_split_character_decoded(self):
+        """A UTF-8 character split across chunks should decode once complete."""
+        decoder = ChunkDecoder()
+        data = "é".encode("utf-8")
+
+        self.assertEqual(decoder.decode("stdout", data[:1]), "")
+        self.assertEqual(decoder.decode("stdout", data[1:]), "é")
+
+
+
+@unittest.skipUnless(hasattr(os, "fork") and shutil.which("python"), "needs fork and python on PATH")
+class TestUsageRunner(unittest.TestCase):
+    """Test the rusage-reporting runner against the local interpreter."""
+
+    def test_runner_reports_usage_and_exit_code(self):
+        """The script's output and exit code should pass through unchanged."""
+        with tempfile.TemporaryDirectory() as tmp:
+            script = os.path.join(tmp, "script.py")
+            with open(script, "w") as f:
+                f.write("import sys\nprint('hi')\nsys.exit(3)\n")
+
+            proc = subprocess.run([sys.executable, "-S", "-c", USAGE_RUNNER, script],
+                                  capture_output=True, timeout=30)
+
+        stderr, usage = split_usage(proc.stderr)
+        self.assertEqual((proc.returncode, proc.stdout, stderr), (3, b"hi\n", b""))
+        self.assertGreater(usage["max_rss_kb"], 0)
+        self.assertIn("cpu_user", usage)
+
+    def test_chunk_without_report_unchanged(self):
+        """Ordinary stderr should pass through split_usage untouched."""
+        self.assertEqual(split_usage(b"warning\n"), (b"warning\n", None))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
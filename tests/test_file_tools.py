@@ -5,19 +5,26 @@ Tests:
 1. Directory tree generation
 2. Ignored directories/files filtering
 3. Context file creation
+4. Incremental rescans from the persisted snapshot
+5. Walker output format, parallel listing and deep trees
+6. Budgeted maps: collapsing, depth fitting, .gitignore and subtrees
+7. Symbol index queries and incremental updates
 """
 
 import unittest
+from unittest.mock import patch
 import os
 import sys
 import tempfile
 import shutil
+import time
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import win_patch  # Windows compatibility
-from tools.file_tools import CodebaseMapper
+from tools import file_tools
+from tools.file_tools import CodebaseMapper, SymbolIndex, SNAPSHOT_NAME, SYMBOLS_NAME
 
 
 class TestCodebaseMapper(unittest.TestCase):
@@ -102,5 +109,336 @@ class TestCodebaseMapper(unittest.TestCase):
         self.assertIn("Codebase Map", content)
 
 
+class TestIncrementalMapping(unittest.TestCase):
+    """Test snapshot reuse between scans."""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.mapper = CodebaseMapper()
+        os.makedirs(os.path.join(self.test_dir, "src"))
+        with open(os.path.join(self.test_dir, "src", "utils.py"), 'w') as f:
+            f.write("# utils")
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def age_tree(self):
+        """Move every mtime out of the racy window so listings can be trusted."""
+        past = time.time() - 3600
+        for dirpath, _, filenames in os.walk(self.test_dir):
+            for name in filenames:
+                os.utime(os.path.join(dirpath, name), (past, past))
+            os.utime(dirpath, (past, past))
+    
+    def warm_up(self):
+        """Scan until the snapshot covers the context directory and is trusted."""
+        self.mapper._run(self.test_dir)
+        self.age_tree()
+        return self.mapper._run(self.test_dir)
+    
+    def test_unchanged_tree_not_relisted(self):
+        """A scan of an unchanged tree should not list any directory."""
+        expected = self.warm_up()
+        
+        with patch("tools.file_tools.os.scandir") as scandir:
+            result = self.mapper._run(self.test_dir)
+        
+        scandir.assert_not_called()
+        self.assertEqual(result, expected)
+    
+    def test_only_changed_directory_relisted(self):
+        """A new file should be picked up by relisting just its directory."""
+        self.warm_up()
+        with open(os.path.join(self.test_dir, "src", "new.py"), 'w') as f:
+            f.write("")
+        
+        with patch("tools.file_tools.os.scandir", wraps=os.scandir) as scandir:
+            result = self.mapper._run(self.test_dir)
+        
+        self.assertIn("new.py", result)
+        listed = [os.path.basename(call.args[0]) for call in scandir.call_args_list]
+        self.assertEqual(listed, ["src"])
+    
+    def test_map_file_not_rewritten_when_unchanged(self):
+        """map.md should keep its mtime when the content is the same."""
+        self.warm_up()
+        map_file = os.path.join(self.test_dir, "context", "map.md")
+        before = os.stat(map_file).st_mtime_ns
+        
+        self.mapper._run(self.test_dir)
+        
+        self.assertEqual(os.stat(map_file).st_mtime_ns, before)
+    
+    def test_snapshot_not_listed(self):
+        """The snapshot file should not appear in the map."""
+        result = self.warm_up()
+        
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, "context", SNAPSHOT_NAME)))
+        self.assertNotIn(SNAPSHOT_NAME, result)
+        self.assertIn("map.md", result)
+    
+    def test_corrupt_snapshot_ignored(self):
+        """An unreadable snapshot should fall back to a full scan."""
+        self.mapper._run(self.test_dir)
+        with open(os.path.join(self.test_dir, "context", SNAPSHOT_NAME), 'w') as f:
+            f.write("{not json")
+        
+        result = self.mapper._run(self.test_dir)
+        
+        self.assertIn("utils.py", result)
+
+
+class TestTreeWalker(unittest.TestCase):
+    """Test the scandir-based walker."""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for path in ["b/inner/deep.txt", "b/z.py", "a/one.py", "top.md", "b/skip.log"]:
+            full = os.path.join(self.test_dir, *path.split("/"))
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            with open(full, 'w') as f:
+                f.write("")
+        os.makedirs(os.path.join(self.test_dir, "empty"))
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def tree(self, mapper):
+        lines = []
+        mapper._build_tree(self.test_dir, lines, prefix="")
+        return lines
+    
+    def test_tree_format(self):
+        """Directories come first, sorted, with the original connectors."""
+        self.assertEqual(self.tree(CodebaseMapper()), [
+            "├── 📁 a/",
+            "│   └── 📄 one.py",
+            "├── 📁 b/",
+            "│   ├── 📁 inner/",
+            "│   │   └── 📄 deep.txt",
+            "│   └── 📄 z.py",
+            "├── 📁 empty/",
+            "└── 📄 top.md",
+        ])
+    
+    def test_parallel_matches_serial(self):
+        """Fanning out across threads should not change the output."""
+        self.assertEqual(
+            self.tree(CodebaseMapper(max_workers=1)),
+            self.tree(CodebaseMapper(max_workers=8)),
+        )
+    
+    def test_deep_tree_beyond_recursion_limit(self):
+        """Nesting deeper than the recursion limit should still be mapped."""
+        depth = 300
+        path = os.path.join(self.test_dir, *["d"] * depth)
+        os.makedirs(path)
+        
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(200)
+        try:
+            lines = self.tree(CodebaseMapper(max_workers=1))
+        finally:
+            sys.setrecursionlimit(limit)
+        
+        self.assertEqual(sum("📁 d/" in line for line in lines), depth)
+
+
+class TestBudgetedMap(unittest.TestCase):
+    """Test that maps are fitted to the line budget."""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for i in range(3):
+            for j in range(5):
+                self.touch(f"pkg{i}/sub/mod{j}.py")
+        for j in range(30):
+            self.touch(f"data/item{j}.json" if j % 3 else f"data/item{j}.csv")
+        self.touch("README.md")
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def touch(self, path):
+        full = os.path.join(self.test_dir, *path.split("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'w') as f:
+            f.write("")
+    
+    def test_small_tree_fully_expanded(self):
+        """A tree within budget should be mapped completely without a note."""
+        result = CodebaseMapper()._run(self.test_dir)
+        
+        self.assertIn("mod4.py", result)
+        self.assertNotIn("**Note:**", result)
+    
+    def test_crowded_directory_collapsed(self):
+        """Directories over the threshold should list counts by extension."""
+        result = CodebaseMapper(collapse_threshold=10)._run(self.test_dir)
+        
+        self.assertIn("30 files (.json: 20, .csv: 10)", result)
+        self.assertNotIn("item1.json", result)
+    
+    def test_depth_reduced_to_fit_budget(self):
+        """Levels that do not fit max_lines should be summarized."""
+        result = CodebaseMapper(max_lines=6, collapse_threshold=10)._run(self.test_dir)
+        
+        self.assertIn("📁 pkg0/ (1 dir)", result)
+        self.assertNotIn("mod0.py", result)
+        self.assertIn("**Note:** Showing 1 directory level(s)", result)
+        self.assertIn("subtree=", result)
+    
+    def test_max_depth(self):
+        """max_depth should cap expansion even when the budget allows more."""
+        result = CodebaseMapper(max_depth=2)._run(self.test_dir)
+        
+        self.assertIn("📁 sub/ (5 files)", result)
+        self.assertNotIn("mod0.py", result)
+    
+    def test_gitignore_honored(self):
+        """Paths matched by .gitignore should be left out."""
+        with open(os.path.join(self.test_dir, ".gitignore"), 'w') as f:
+            f.write("data/\n*.md\n")
+        
+        result = CodebaseMapper()._run(self.test_dir)
+        
+        self.assertNotIn("data/", result)
+        self.assertNotIn("README.md", result)
+        self.assertIn("pkg0/", result)
+    
+    def test_subtree_expansion(self):
+        """subtree should map only that directory, without touching map.md."""
+        mapper = CodebaseMapper()
+        mapper._run(self.test_dir)
+        map_file = os.path.join(self.test_dir, "context", "map.md")
+        with open(map_file, encoding="utf-8") as f:
+            full_map = f.read()
+        
+        result = mapper._run(self.test_dir, subtree="pkg1")
+        
+        self.assertIn("**Subtree:** `pkg1`", result)
+        self.assertIn("mod3.py", result)
+        self.assertNotIn("pkg0", result)
+        with open(map_file, encoding="utf-8") as f:
+            self.assertEqual(f.read(), full_map)
+    
+    def test_subtree_outside_root_rejected(self):
+        """subtree must stay inside the project root."""
+        result = CodebaseMapper()._run(self.test_dir, subtree="../elsewhere")
+        
+        self.assertTrue(result.startswith("ERROR"))
+
+
+class TestSymbolIndex(unittest.TestCase):
+    """Test definition/import lookups."""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.write("pkg/__init__.py", "from .core import Engine\n")
+        self.write("pkg/core.py", (
+            "import os\n"
+            "LIMIT = 3\n"
+            "class Engine(Base):\n"
+            "    def start(self, speed: int = 1) -> bool:\n"
+            "        def helper(): pass\n"
+            "        return True\n"
+            "async def run(engine):\n"
+            "    pass\n"
+        ))
+        self.write("app.py", "from pkg.core import Engine, run\nimport pkg\n")
+        self.index = SymbolIndex(refresh_interval=0)
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def write(self, path, content):
+        full = os.path.join(self.test_dir, *path.split("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'w') as f:
+            f.write(content)
+    
+    def query(self, query, mode="definition"):
+        return self.index._run(query, mode=mode, root_path=self.test_dir)
+    
+    def test_definition_with_signature(self):
+        """Definitions should be located with file, line and signature."""
+        result = self.query("start")
+        
+        self.assertIn("pkg/core.py:4  method Engine.start  def start(self, speed: int=1) -> bool", result)
+        self.assertIn("pkg/core.py:3", self.query("Engine"))
+        self.assertIn("async def run(engine)", self.query("run"))
+        self.assertIn("variable LIMIT", self.query("LIMIT"))
+    
+    def test_nested_functions_not_indexed(self):
+        """Only module- and class-level definitions should be indexed."""
+        self.assertIn("no matches", self.query("helper"))
+    
+    def test_importers(self):
+        """Modules and names should resolve to importing files, including relative imports."""
+        by_module = self.query("pkg.core", mode="importers")
+        by_name = self.query("Engine", mode="importers")
+        
+        self.assertIn("app.py:1", by_module)
+        self.assertIn("pkg/__init__.py:1  from pkg.core import Engine", by_module)
+        self.assertIn("app.py:1", by_name)
+        self.assertIn("app.py:2  import pkg", self.query("pkg", mode="importers"))
+    
+    def test_outline(self):
+        """outline should list a module's definitions by path or dotted name."""
+        by_path = self.query("pkg/core.py", mode="outline")
+        by_module = self.query("pkg.core", mode="outline")
+        
+        self.assertEqual(by_path, by_module)
+        self.assertIn("    def start(", by_path)
+    
+    def test_outline_of_dotted_path(self):
+        """A leading ./ should be dropped, but not the dot of a hidden directory."""
+        self.write(".hidden/x.py", "def secret(): pass\n")
+        self.write("hidden/x.py", "def public(): pass\n")
+        
+        self.assertIn("def secret(", self.query(".hidden/x.py", mode="outline"))
+        self.assertIn("def secret(", self.query("./.hidden/x.py", mode="outline"))
+    
+    def test_returned_index_not_modified_by_refresh(self):
+        """A query iterating an index should not see later refreshes change it."""
+        files = self.index.refresh(self.test_dir)
+        snapshot = dict(files)
+        self.write("pkg/extra.py", "def added(): pass\n")
+        os.remove(os.path.join(self.test_dir, "app.py"))
+        
+        updated = self.index.refresh(self.test_dir)
+        
+        self.assertEqual(files, snapshot)
+        self.assertIn("pkg/extra.py", updated)
+        self.assertNotIn("app.py", updated)
+    
+    def test_index_persisted_and_updated_per_file(self):
+        """Only changed files should be re-parsed, and the index saved to disk."""
+        self.query("Engine")
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, "context", SYMBOLS_NAME)))
+        self.write("pkg/extra.py", "def added(): pass\n")
+        
+        fresh = SymbolIndex(refresh_interval=0)
+        with patch.object(file_tools, "_parse_source", wraps=file_tools._parse_source) as parse:
+            result = fresh._run("added", root_path=self.test_dir)
+        
+        self.assertIn("pkg/extra.py:1", result)
+        self.assertEqual(parse.call_count, 1)
+    
+    def test_removed_file_dropped(self):
+        """Deleted files should disappear from the index."""
+        self.query("Engine")
+        os.remove(os.path.join(self.test_dir, "app.py"))
+        
+        self.assertNotIn("app.py", self.query("Engine", mode="importers"))
+    
+    def test_syntax_error_tolerated(self):
+        """Unparseable files should not break queries on the rest."""
+        self.write("broken.py", "def oops(:\n")
+        
+        self.assertIn("pkg/core.py", self.query("Engine"))
+        self.assertIn("could not be parsed", self.query("broken.py", mode="outline"))
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,67 @@
+"""
+Unit Tests for .gitignore Matching
+
+Tests:
+1. Name patterns at any depth and anchored patterns
+2. Directory-only patterns and negation
+3. Wildcards including **
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.gitignore import GitIgnore
+
+
+class TestGitIgnore(unittest.TestCase):
+    """Test rule parsing and matching."""
+
+    def test_name_matches_at_any_depth(self):
+        """A pattern without a slash should match the name in any directory."""
+        rules = GitIgnore(["*.log", "build"])
+        self.assertTrue(rules.match("app.log", is_dir=False))
+        self.assertTrue(rules.match("src/deep/app.log", is_dir=False))
+        self.assertTrue(rules.match("pkg/build", is_dir=True))
+        self.assertFalse(rules.match("app.py", is_dir=False))
+
+    def test_anchored_pattern(self):
+        """A pattern containing a slash should only match from the root."""
+        rules = GitIgnore(["/dist", "docs/_build"])
+        self.assertTrue(rules.match("dist", is_dir=True))
+        self.assertFalse(rules.match("pkg/dist", is_dir=True))
+        self.assertTrue(rules.match("docs/_build", is_dir=True))
+        self.assertFalse(rules.match("other/docs/_build", is_dir=True))
+
+    def test_directory_only(self):
+        """A trailing slash should restrict the pattern to directories."""
+        rules = GitIgnore(["cache/"])
+        self.assertTrue(rules.match("cache", is_dir=True))
+        self.assertFalse(rules.match("cache", is_dir=False))
+
+    def test_negation(self):
+        """A later !pattern should re-include a path."""
+        rules = GitIgnore(["*.json", "!package.json"])
+        self.assertTrue(rules.match("data.json", is_dir=False))
+        self.assertFalse(rules.match("package.json", is_dir=False))
+
+    def test_double_star(self):
+        """** should match any number of directories."""
+        rules = GitIgnore(["**/generated/*.py", "logs/**"])
+        self.assertTrue(rules.match("generated/a.py", is_dir=False))
+        self.assertTrue(rules.match("x/y/generated/a.py", is_dir=False))
+        self.assertTrue(rules.match("logs/2024/app", is_dir=False))
+
+    def test_comments_and_blanks_ignored(self):
+        """Comments and blank lines should produce no rules."""
+        rules = GitIgnore(["# comment", "", "   "])
+        self.assertFalse(rules)
+        self.assertFalse(rules.match("anything", is_dir=False))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
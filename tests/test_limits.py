@@ -0,0 +1,59 @@
+"""
+Unit Tests for ExecutionLimits
+
+Tests:
+1. Deployment defaults from SANDBOX_* environment variables
+2. Per-call overrides
+3. Container and command translation
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.limits import ExecutionLimits
+
+
+class TestExecutionLimits(unittest.TestCase):
+    """Test limit configuration and translation."""
+
+    @patch.dict(os.environ, {"SANDBOX_TIMEOUT": "5", "SANDBOX_MEM_LIMIT": "1g",
+                             "SANDBOX_PIDS_LIMIT": "none"})
+    def test_from_env(self):
+        """Environment variables should override the defaults."""
+        limits = ExecutionLimits.from_env()
+
+        self.assertEqual(limits.timeout, 5.0)
+        self.assertEqual(limits.mem_limit, "1g")
+        self.assertIsNone(limits.pids_limit)
+        self.assertEqual(limits.nano_cpus, ExecutionLimits().nano_cpus)
+
+    def test_merged_ignores_none(self):
+        """merged() should only apply overrides that are set."""
+        limits = ExecutionLimits(timeout=10).merged(timeout=None, mem_limit="256m")
+
+        self.assertEqual(limits.timeout, 10)
+        self.assertEqual(limits.mem_limit, "256m")
+
+    def test_container_kwargs(self):
+        """Memory limits should disable swap so the OOM killer fires promptly."""
+        kwargs = ExecutionLimits(mem_limit="256m", nano_cpus=None).container_kwargs()
+
+        self.assertEqual(kwargs["mem_limit"], "256m")
+        self.assertEqual(kwargs["memswap_limit"], "256m")
+        self.assertNotIn("nano_cpus", kwargs)
+
+    def test_wrap_command(self):
+        """Commands should be prefixed with timeout and a kill-after grace."""
+        argv = ExecutionLimits(timeout=2.5).wrap_command(["python", "x.py"])
+
+        self.assertEqual(argv, ["timeout", "-k", "1", "2.5", "python", "x.py"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
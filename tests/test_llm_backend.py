@@ -0,0 +1,150 @@
+"""
+Unit Tests for ManagedLLM
+
+Tests:
+1. Delegation to the provider LLM
+2. Concurrency throttling through shared slots
+3. Stop words forwarded to the provider
+4. Async calls wait for slots without threads and release them on cancel
+5. Sampling variants
+6. System messages kept first for prompt-prefix reuse
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from crewai.llms.base_llm import BaseLLM, call_stop_override
+from llm_backend import ManagedLLM, make_slots, stable_order
+
+
+class FakeLLM(BaseLLM):
+    """Provider stand-in that records calls and concurrency."""
+
+    delay: float = 0.0
+    active: int = 0
+    peak: int = 0
+    seen_stop: list = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.seen_stop = list(self.stop_sequences)
+        time.sleep(self.delay)
+        self.active -= 1
+        return f"echo: {messages}"
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return f"echo: {messages}"
+
+
+class TestManagedLLM(unittest.TestCase):
+    """Test the LLM wrapper shared by all agents."""
+
+    def test_delegates_call(self):
+        """Calls should be answered by the provider LLM."""
+        llm = ManagedLLM(FakeLLM(model="fake"))
+
+        self.assertEqual(llm.call("hi"), "echo: hi")
+        self.assertEqual(llm.model, "fake")
+
+    def test_slots_bound_concurrency(self):
+        """No more than `slots` calls should run at the same time."""
+        inner = FakeLLM(model="fake", delay=0.05)
+        llm = ManagedLLM(inner, slots=make_slots(2))
+
+        threads = [threading.Thread(target=llm.call, args=("x",)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(inner.peak, 2)
+
+    def test_stop_words_forwarded(self):
+        """Stop words set on the wrapper should reach the provider call."""
+        inner = FakeLLM(model="fake")
+        llm = ManagedLLM(inner)
+
+        with call_stop_override(llm, ["\nObservation:"]):
+            llm.call("x")
+
+        self.assertEqual(inner.seen_stop, ["\nObservation:"])
+
+
+    def test_async_slots_bound_concurrency(self):
+        """Many coroutines on one loop should share the slots without extra threads."""
+        inner = FakeLLM(model="fake", delay=0.02)
+        llm = ManagedLLM(inner, slots=make_slots(2))
+
+        async def scenario():
+            threads = threading.active_count()
+            calls = [asyncio.create_task(llm.acall(f"m{i}")) for i in range(30)]
+            await asyncio.sleep(0.01)
+            waiting_threads = threading.active_count() - threads
+            return await asyncio.gather(*calls), waiting_threads
+
+        results, waiting_threads = asyncio.run(scenario())
+
+        self.assertEqual(results[7], "echo: m7")
+        self.assertEqual(inner.peak, 2)
+        self.assertEqual(waiting_threads, 0)
+
+    def test_cancelled_wait_does_not_leak_slot(self):
+        """Cancelling a call queued for a slot should leave the slot count intact."""
+        slots = make_slots(1)
+        llm = ManagedLLM(FakeLLM(model="fake"), slots=slots)
+
+        async def scenario():
+            slots.acquire()
+            waiter = asyncio.create_task(llm.acall("x"))
+            await asyncio.sleep(0.02)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            slots.release()
+            return await llm.acall("y")
+
+        self.assertEqual(asyncio.run(scenario()), "echo: y")
+        self.assertTrue(slots.acquire(blocking=False))
+
+
+    def test_variant_shares_slots(self):
+        """A variant should sample differently but count against the same slots."""
+        slots = make_slots(2)
+        llm = ManagedLLM(FakeLLM(model="fake", temperature=0.1), slots=slots)
+
+        variant = llm.variant(temperature=0.9, seed=3)
+
+        self.assertIs(variant.slots, slots)
+        self.assertEqual((variant.inner.temperature, variant.inner.seed), (0.9, 3))
+        self.assertEqual(llm.inner.temperature, 0.1)
+        self.assertEqual(variant.call("hi"), "echo: hi")
+
+
+    def test_system_prompt_kept_first(self):
+        """System messages should lead so the static prefix never moves."""
+        system = {"role": "system", "content": "You are an engineer."}
+        user = {"role": "user", "content": "task"}
+        ordered = [system, user]
+
+        self.assertIs(stable_order(ordered), ordered)
+        self.assertEqual(stable_order([user, system]), [system, user])
+        self.assertEqual(stable_order("hi"), "hi")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,176 @@
+"""
+Unit Tests for the LLM Response Cache
+
+Tests:
+1. Key normalization and sensitivity
+2. Persistence, TTL and LRU eviction
+3. Transparent caching in ManagedLLM
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from crewai.llms.base_llm import BaseLLM
+from llm_backend import ManagedLLM
+from llm_cache import ResponseCache, make_key
+
+
+class CountingLLM(BaseLLM):
+    """Provider stand-in that counts generations."""
+
+    calls: int = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.calls += 1
+        return f"answer #{self.calls}"
+
+
+class TestMakeKey(unittest.TestCase):
+    """Test content addressing of requests."""
+
+    def test_whitespace_noise_ignored(self):
+        """Trailing spaces and surrounding blank lines should not change the key."""
+        a = make_key("m", {}, [{"role": "user", "content": "\nhello   \nworld\n"}])
+        b = make_key("m", {}, "hello\nworld")
+
+        self.assertEqual(a, b)
+
+    def test_model_and_params_matter(self):
+        """Different models or sampling parameters should give different keys."""
+        base = make_key("m", {"temperature": 0}, "hi")
+
+        self.assertNotEqual(base, make_key("other", {"temperature": 0}, "hi"))
+        self.assertNotEqual(base, make_key("m", {"temperature": 0.5}, "hi"))
+        self.assertNotEqual(base, make_key("m", {"temperature": 0}, "hi", tools=[{"name": "t"}]))
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test storage, expiry and eviction."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "cache.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_persists_across_instances(self):
+        """Entries should survive reopening the database."""
+        cache = ResponseCache(self.path)
+        cache.put("k", "v")
+        cache.close()
+
+        self.assertEqual(ResponseCache(self.path).get("k"), "v")
+
+    def test_ttl_expires_entries(self):
+        """Entries older than the TTL should be misses."""
+        cache = ResponseCache(self.path, ttl=0.01)
+        cache.put("k", "v")
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_lru_eviction_by_count(self):
+        """The least recently used entry should be evicted first."""
+        cache = ResponseCache(self.path, max_entries=2)
+        cache.put("a", "1")
+        time.sleep(0.01)
+        cache.put("b", "2")
+        time.sleep(0.01)
+        cache.get("a")  # a is now more recent than b
+        time.sleep(0.01)
+        cache.put("c", "3")
+
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_eviction_by_size(self):
+        """Total stored bytes should stay within max_bytes."""
+        cache = ResponseCache(self.path, max_bytes=10)
+        cache.put("a", "x" * 6)
+        time.sleep(0.01)
+        cache.put("b", "y" * 6)
+
+        self.assertLessEqual(cache.stats()["bytes"], 10)
+        self.assertIsNone(cache.get("a"))
+
+    def test_hit_miss_metrics(self):
+        """Hits and misses should be counted."""
+        cache = ResponseCache(":memory:")
+        cache.get("missing")
+        cache.put("k", "v")
+        cache.get("k")
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+
+class TestCachedLLM(unittest.TestCase):
+    """Test caching through ManagedLLM."""
+
+    def test_repeat_prompt_served_from_cache(self):
+        """The second identical call should not reach the provider."""
+        inner = CountingLLM(model="fake", temperature=0)
+        llm = ManagedLLM(inner, cache=ResponseCache(":memory:"))
+
+        first = llm.call("plan this")
+        second = llm.call("plan this")
+
+        self.assertEqual(first, second)
+        self.assertEqual(inner.calls, 1)
+
+    def test_sampled_generation_bypasses_cache(self):
+        """Unseeded sampling with temperature > 0 should not be cached by default."""
+        inner = CountingLLM(model="fake", temperature=0.7)
+        llm = ManagedLLM(inner, cache=ResponseCache(":memory:"))
+
+        llm.call("x")
+        llm.call("x")
+
+        self.assertEqual(inner.calls, 2)
+
+    def test_unset_temperature_bypasses_cache(self):
+        """No temperature means the server's (sampling) default, so nothing is cached."""
+        inner = CountingLLM(model="fake")
+        llm = ManagedLLM(inner, cache=ResponseCache(":memory:"))
+
+        llm.call("x")
+        llm.call("x")
+
+        self.assertEqual(inner.calls, 2)
+
+    def test_seeded_sampling_cached(self):
+        """A fixed seed makes sampling reproducible, so it should be cached."""
+        inner = CountingLLM(model="fake", temperature=0.7, seed=1)
+        llm = ManagedLLM(inner, cache=ResponseCache(":memory:"))
+
+        llm.call("x")
+        llm.call("x")
+
+        self.assertEqual(inner.calls, 1)
+
+    def test_native_tool_calls_not_cached(self):
+        """Calls that may execute tools should always reach the provider."""
+        inner = CountingLLM(model="fake")
+        llm = ManagedLLM(inner, cache=ResponseCache(":memory:"))
+
+        llm.call("x", available_functions={"f": print})
+        llm.call("x", available_functions={"f": print})
+
+        self.assertEqual(inner.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
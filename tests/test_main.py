@@ -0,0 +1,328 @@
+"""
+Unit Tests for the run_agent_team Orchestration
+
+Tests:
+1. The plan is generated once and reused across retries
+2. Re-planning after N failed fixes
+3. Error feedback to the Engineer
+4. Success decided from recorded execution results, not agent text
+5. Async runs and batches on one event loop
+6. Best-of-N candidates: first pass wins, the rest are cancelled
+7. Each run traced as run -> plan / attempt spans
+8. LLM, tools and agents built lazily on first use
+"""
+
+import unittest
+import asyncio
+from unittest.mock import patch
+import os
+import subprocess
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+import main
+from tools.results import ERROR, SUCCESS, ExecutionResult, record
+from tools.file_tools import CodebaseMapper
+from tracing import Tracer
+
+
+def failed(stderr, stdout=""):
+    return ExecutionResult(ERROR, exit_code=1, stdout=stdout, stderr=stderr)
+
+
+def passed(stdout):
+    return ExecutionResult(SUCCESS, exit_code=0, stdout=stdout)
+
+
+class FakeCrew:
+    """Crew stand-in that returns scripted outputs and records its tasks."""
+
+    outputs = []
+    created = []
+
+    def __init__(self, agents, tasks, **kwargs):
+        self.tasks = tasks
+        FakeCrew.created.append(self)
+
+    def kickoff(self):
+        # Execution results are recorded like the sandbox tool does
+        output = FakeCrew.outputs.pop(0)
+        if isinstance(output, ExecutionResult):
+            record(output)
+        return str(output)
+
+    async def akickoff(self):
+        await asyncio.sleep(0)
+        return self.kickoff()
+
+
+class TestStageRetry(unittest.TestCase):
+    """Test that retries only re-run the Engineer -> Executor stage."""
+
+    def setUp(self):
+        FakeCrew.created = []
+        patcher = patch.object(main, "Crew", FakeCrew)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def roles(self, crew):
+        return [task.agent.role for task in crew.tasks]
+
+    def test_plan_reused_across_retries(self):
+        """The Architect should run once even when code fixes are needed."""
+        FakeCrew.outputs = ["THE PLAN", failed("boom"), passed("42")]
+
+        result = main.run_agent_team("task", max_retries=3)
+
+        self.assertIn("SUCCESS", result)
+        self.assertEqual(self.roles(FakeCrew.created[0]), ["Software Architect"])
+        for crew in FakeCrew.created[1:]:
+            self.assertEqual(self.roles(crew), ["Software Engineer", "Code Executor"])
+            self.assertIn("THE PLAN", crew.tasks[0].description)
+
+    def test_error_fed_back_to_engineer(self):
+        """The retry coding task should include the previous error."""
+        FakeCrew.outputs = ["PLAN", failed("NameError: x"), passed("ok")]
+
+        main.run_agent_team("task", max_retries=2)
+
+        self.assertIn("NameError: x", FakeCrew.created[2].tasks[0].description)
+
+    def test_replan_after_failures(self):
+        """A new plan should be requested after replan_after failed fixes."""
+        FakeCrew.outputs = [
+            "PLAN A", failed("ValueError: one"), failed("ValueError: two"),
+            "PLAN B", passed("ok"),
+        ]
+
+        main.run_agent_team("task", max_retries=3, replan_after=2)
+
+        replan = FakeCrew.created[3]
+        self.assertEqual(self.roles(replan), ["Software Architect"])
+        self.assertIn("ValueError: two", replan.tasks[0].description)
+        self.assertIn("PLAN B", FakeCrew.created[4].tasks[0].description)
+
+
+    def test_success_words_in_output_ignored(self):
+        """A failing program that prints success text should still be retried."""
+        FakeCrew.outputs = ["PLAN", failed("boom", stdout="SUCCESS OUTPUT: all good"),
+                            passed("ok")]
+
+        main.run_agent_team("task", max_retries=2)
+
+        self.assertEqual(len(FakeCrew.created), 3)
+
+    def test_error_words_in_successful_output_ignored(self):
+        """A passing program that prints error text should not be retried."""
+        FakeCrew.outputs = ["PLAN", passed("EXECUTION ERROR: expected in this test")]
+
+        main.run_agent_team("task", max_retries=3)
+
+        self.assertEqual(len(FakeCrew.created), 2)
+
+    def test_only_traceback_fed_back(self):
+        """The retry should get the last traceback, not the program's output."""
+        noisy = "\n".join(f"progress {i}" for i in range(500))
+        traceback = 'Traceback (most recent call last):\n  File "script.py", line 3\nKeyError: \'id\''
+        FakeCrew.outputs = ["PLAN", failed(f"warning: slow\n{traceback}\n", stdout=noisy),
+                            passed("ok")]
+
+        main.run_agent_team("task", max_retries=2)
+
+        description = FakeCrew.created[2].tasks[0].description
+        self.assertIn("KeyError: 'id'", description)
+        self.assertNotIn("progress 1", description)
+        self.assertNotIn("warning: slow", description)
+
+    def test_no_execution_is_failure(self):
+        """An attempt that never ran code should not count as a success."""
+        FakeCrew.outputs = ["PLAN", "Here is the code, it should work.", passed("ok")]
+
+        main.run_agent_team("task", max_retries=2)
+
+        self.assertIn("never run", FakeCrew.created[2].tasks[0].description)
+
+
+class TestTracing(unittest.TestCase):
+    """Test the spans of a run."""
+
+    def setUp(self):
+        FakeCrew.created = []
+        self.tracer = Tracer()
+        for name, value in (("Crew", FakeCrew), ("tracer", self.tracer)):
+            patcher = patch.object(main, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_run_spans(self):
+        """A retried run should have one plan and one span per attempt."""
+        FakeCrew.outputs = ["PLAN", failed("boom"), passed("42")]
+
+        main.run_agent_team("the task", max_retries=3)
+
+        spans = self.tracer.spans()
+        run = spans[-1]
+        self.assertEqual(run.name, "run")
+        self.assertEqual(run.attributes["outcome"], "success")
+        self.assertEqual(run.attributes["task"], "the task")
+        children = [(s.name, s.attributes.get("passed"))
+                    for s in spans if s.parent_id == run.span_id]
+        self.assertEqual(children, [("plan", None), ("attempt", False), ("attempt", True)])
+
+
+class TestAsyncRuns(unittest.TestCase):
+    """Test the asyncio entry points."""
+
+    def setUp(self):
+        FakeCrew.created = []
+        patcher = patch.object(main, "Crew", FakeCrew)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_async_run_retries(self):
+        """run_agent_team_async should retry and feed back errors like the sync path."""
+        FakeCrew.outputs = ["PLAN", failed("NameError: x"), passed("42")]
+
+        result = asyncio.run(main.run_agent_team_async("task", max_retries=3))
+
+        self.assertTrue(result.startswith("SUCCESS"))
+        self.assertEqual(len(FakeCrew.created), 3)
+        self.assertIn("NameError: x", FakeCrew.created[2].tasks[0].description)
+
+    def test_batch_bounded_and_ordered(self):
+        """Batches should keep results in order and respect max_concurrency."""
+        active = peak = 0
+
+        async def fake_run(task, max_retries=3, candidates=1):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if task == "bad":
+                raise RuntimeError("exploded")
+            return f"done {task}"
+
+        with patch.object(main, "run_agent_team_async", fake_run):
+            results = asyncio.run(main.run_batch_async(["a", "bad", "c", "d", "e"],
+                                                       max_concurrency=2))
+
+        self.assertEqual(results[0], "done a")
+        self.assertIn("exploded", results[1])
+        self.assertEqual(results[2:], ["done c", "done d", "done e"])
+        self.assertEqual(peak, 2)
+
+
+class SlowCrew:
+    """Crew stand-in whose attempt outcome depends on its Engineer's LLM."""
+
+    # Engineer LLM -> (delay, execution result); others never finish
+    script = {}
+    cancelled = []
+
+    def __init__(self, agents, tasks, **kwargs):
+        self.llm = agents[0].llm
+        self.tasks = tasks
+
+    async def akickoff(self):
+        delay, result = SlowCrew.script.get(id(self.llm), (10, None))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            SlowCrew.cancelled.append(self.llm)
+            raise
+        if result is not None:
+            record(result)
+        return str(result)
+
+
+class TestCandidates(unittest.TestCase):
+    """Test racing best-of-N candidates within one attempt."""
+
+    def setUp(self):
+        patcher = patch.object(main, "Crew", SlowCrew)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        SlowCrew.cancelled = []
+        self.teams = [main.build_agents(engineer_llm=main.candidate_llm(i))[1:]
+                      for i in range(3)]
+
+    def llm(self, index):
+        return self.teams[index][0].llm
+
+    def race(self):
+        return asyncio.run(main._run_candidates(self.teams, "PLAN", None, "run", 1))
+
+    def test_first_pass_wins_and_rest_cancelled(self):
+        """A passing candidate should end the attempt even if another failed first."""
+        SlowCrew.script = {
+            id(self.llm(0)): (0.01, failed("boom")),
+            id(self.llm(1)): (0.05, passed("42")),
+        }
+
+        result, error = self.race()
+
+        self.assertIsNone(error)
+        self.assertIn("42", result)
+        self.assertEqual(SlowCrew.cancelled, [self.llm(2)])
+
+    def test_most_useful_failure_fed_back(self):
+        """With no pass, a traceback beats a run that never executed code."""
+        SlowCrew.script = {
+            id(self.llm(0)): (0.01, None),
+            id(self.llm(1)): (0.02, failed("ValueError: bad")),
+            id(self.llm(2)): (0.03, None),
+        }
+
+        _, error = self.race()
+
+        self.assertIn("ValueError: bad", error)
+
+    def test_candidates_sample_differently(self):
+        """Extra candidates should use seeded variants of the shared LLM."""
+        self.assertIs(self.llm(0), main.ollama_llm)
+        self.assertEqual({self.llm(1).inner.seed, self.llm(2).inner.seed}, {1, 2})
+        self.assertIs(self.llm(1).slots, main.ollama_llm.slots)
+
+
+class TestLazyComponents(unittest.TestCase):
+    """Test that main builds its components on first use."""
+
+    def test_import_skips_crewai(self):
+        """Importing main and the tools package should not load crewai or docker."""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = (f"import sys; sys.path.insert(0, {root!r}); import main, tools; "
+                "print(sorted(m for m in ('crewai', 'docker') if m in sys.modules))")
+
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                                text=True, check=True).stdout
+
+        self.assertEqual(output.strip(), "[]")
+
+    def test_component_built_once(self):
+        self.assertIs(main.component("docker_tool"), main.docker_tool)
+        self.assertIs(main.docker_tool.pool, main.sandbox_pool)
+        self.assertIs(main.architect.llm, main.ollama_llm)
+
+    @unittest.skipIf("SANDBOX_ABORT_ON_TRACEBACK" in os.environ, "configured by the environment")
+    def test_traceback_abort_off_by_default(self):
+        """The sandbox should wait for scripts to exit unless told otherwise."""
+        self.assertFalse(main.docker_tool.abort_on_traceback)
+
+    def test_replaced_component_used(self):
+        replacement = CodebaseMapper(max_lines=10)
+        with patch.object(main, "codebase_mapper", replacement):
+            architect, _, _ = main.build_agents()
+
+        self.assertIs(architect.tools[0], replacement)
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            main.no_such_component
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,197 @@
+"""
+Unit Tests for Ollama Residency, Warm-Up and Call Timings
+
+Tests:
+1. Translation of OpenAI chat requests and responses to and from /api/chat
+2. Provider LLM calls routed through a fake Ollama server (sync, async, tools)
+3. Model warm-up and prompt prefill
+"""
+
+import unittest
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from crewai import LLM
+from ollama_runtime import (
+    CallStats, CallTiming, OllamaInterceptor, to_native_request, to_openai_response, warm_up
+)
+
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "add",
+        "description": "Add two numbers",
+        "parameters": {"type": "object", "properties": {"a": {"type": "integer"}}},
+    },
+}]
+
+NATIVE_REPLY = {
+    "model": "fake",
+    "message": {"role": "assistant", "content": "hello"},
+    "done": True,
+    "done_reason": "stop",
+    "load_duration": 2_000_000_000,
+    "prompt_eval_count": 10,
+    "prompt_eval_duration": 100_000_000,
+    "eval_count": 5,
+    "eval_duration": 50_000_000,
+    "total_duration": 2_200_000_000,
+}
+
+
+class FakeOllama:
+    """Native Ollama API on an ephemeral local port that records requests."""
+
+    def __init__(self):
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.requests.append((self.path, body))
+                reply = dict(NATIVE_REPLY)
+                if body.get("tools"):
+                    reply["message"] = {"role": "assistant", "content": "", "tool_calls": [
+                        {"function": {"name": "add", "arguments": {"a": 1}}}
+                    ]}
+                data = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestTranslation(unittest.TestCase):
+    """Test the OpenAI <-> native format translation."""
+
+    def test_request_options_and_tool_history(self):
+        """Sampling maps to options; tool calls and results keep their pairing."""
+        body = {
+            "model": "qwen",
+            "temperature": 0.2,
+            "max_tokens": 100,
+            "stop": "Observation:",
+            "tools": TOOLS,
+            "messages": [
+                {"role": "system", "content": "sys"},
+                {"role": "assistant", "content": None, "tool_calls": [
+                    {"id": "c1", "type": "function",
+                     "function": {"name": "add", "arguments": '{"a": 1}'}}
+                ]},
+                {"role": "tool", "tool_call_id": "c1", "content": "2"},
+            ],
+        }
+
+        native = to_native_request(body, keep_alive="1h", num_ctx=8192)
+
+        self.assertEqual(native["keep_alive"], "1h")
+        self.assertEqual(native["options"], {
+            "temperature": 0.2, "num_predict": 100, "stop": ["Observation:"], "num_ctx": 8192
+        })
+        self.assertEqual(native["messages"][1]["tool_calls"][0]["function"]["arguments"], {"a": 1})
+        self.assertEqual(native["messages"][2]["tool_name"], "add")
+        self.assertEqual(native["tools"], TOOLS)
+        self.assertFalse(native["stream"])
+
+    def test_response_becomes_chat_completion(self):
+        payload = dict(NATIVE_REPLY, message={"role": "assistant", "content": "", "tool_calls": [
+            {"function": {"name": "add", "arguments": {"a": 1}}}
+        ]})
+
+        completion = to_openai_response(payload)
+
+        choice = completion["choices"][0]
+        self.assertEqual(choice["finish_reason"], "tool_calls")
+        self.assertEqual(json.loads(choice["message"]["tool_calls"][0]["function"]["arguments"]),
+                         {"a": 1})
+        self.assertEqual(completion["usage"]["total_tokens"], 15)
+
+    def test_timing_read_from_durations(self):
+        timing = CallTiming.from_ollama(NATIVE_REPLY)
+
+        self.assertEqual((timing.load, timing.prompt_eval, timing.eval), (2.0, 0.1, 0.05))
+        self.assertEqual(timing.tokens_per_second, 100.0)
+
+
+class TestInterceptedCalls(unittest.TestCase):
+    """Test provider LLM calls routed to a fake native server."""
+
+    def setUp(self):
+        self.server = FakeOllama()
+        self.stats = CallStats()
+        self.llm = LLM(
+            model="ollama/fake",
+            base_url=self.server.url,
+            interceptor=OllamaInterceptor(keep_alive="45m", stats=self.stats),
+        )
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_call_sets_keep_alive_and_records_timing(self):
+        self.assertEqual(self.llm.call("hi"), "hello")
+
+        path, body = self.server.requests[-1]
+        self.assertEqual(path, "/api/chat")
+        self.assertEqual(body["keep_alive"], "45m")
+        self.assertEqual(self.stats.calls()[0].load, 2.0)
+
+    def test_async_call(self):
+        self.assertEqual(asyncio.run(self.llm.acall("hi")), "hello")
+        self.assertEqual(self.stats.summary()["calls"], 1)
+
+    def test_tool_calls_returned_to_crewai(self):
+        """Native tool calls should come back in the OpenAI shape CrewAI expects."""
+        calls = self.llm.call([{"role": "user", "content": "add"}], tools=TOOLS)
+
+        self.assertEqual(calls[0].function.name, "add")
+        self.assertEqual(json.loads(calls[0].function.arguments), {"a": 1})
+
+
+class TestWarmUp(unittest.TestCase):
+    """Test loading the model and prefilling prompts."""
+
+    def setUp(self):
+        self.server = FakeOllama()
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_loads_then_prefills_each_prompt_once(self):
+        timings = warm_up("fake", self.server.url + "/v1", keep_alive="1h",
+                          system_prompts=["architect", "engineer", "architect"])
+
+        paths = [path for path, _ in self.server.requests]
+        self.assertEqual(paths, ["/api/generate", "/api/chat", "/api/chat"])
+        self.assertEqual(self.server.requests[0][1], {"model": "fake", "keep_alive": "1h"})
+        self.assertEqual(self.server.requests[2][1]["messages"][0]["content"], "engineer")
+        self.assertEqual(len(timings), 3)
+
+    def test_unreachable_server_raises(self):
+        with self.assertRaises(RuntimeError):
+            warm_up("fake", "http://127.0.0.1:1", timeout=1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
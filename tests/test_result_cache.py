@@ -0,0 +1,116 @@
+"""
+Unit Tests for the Sandbox Execution Result Cache
+
+Tests:
+1. Detection of scripts that must not be memoized
+2. Cache keys over code, files, image and limits
+3. LRU eviction by entry count and size
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.limits import ExecutionLimits
+from tools.result_cache import CachedExecution, ExecutionCache, is_cacheable, make_key
+
+
+class TestIsCacheable(unittest.TestCase):
+    """Test the determinism check."""
+
+    def test_pure_code_cacheable(self):
+        """Plain computation should be cacheable."""
+        self.assertTrue(is_cacheable(["import math\nprint(math.sqrt(2))"]))
+
+    def test_clock_and_randomness_not_cacheable(self):
+        """Imports of time or random should opt out."""
+        self.assertFalse(is_cacheable(["import time\nprint(time.time())"]))
+        self.assertFalse(is_cacheable(["from random import randint"]))
+
+    def test_network_submodule_not_cacheable(self):
+        """Network modules should opt out, including submodules."""
+        self.assertFalse(is_cacheable(["import urllib.request"]))
+        self.assertFalse(is_cacheable(["from http.client import HTTPConnection"]))
+
+    def test_entropy_attributes_not_cacheable(self):
+        """os.urandom and numpy.random should opt out."""
+        self.assertFalse(is_cacheable(["import os\nos.urandom(8)"]))
+        self.assertFalse(is_cacheable(["import numpy as np\nnp.random.rand(3)"]))
+
+    def test_helper_modules_checked(self):
+        """A nondeterministic helper module should opt the run out."""
+        self.assertFalse(is_cacheable(["import helper", "import datetime"]))
+
+    def test_syntax_error_cacheable(self):
+        """Code that does not parse fails identically every time."""
+        self.assertTrue(is_cacheable(["def broken(:"]))
+
+
+class TestMakeKey(unittest.TestCase):
+    """Test the content address of an execution."""
+
+    def test_stable(self):
+        """Identical inputs should give identical keys regardless of file order."""
+        limits = ExecutionLimits()
+        a = make_key("print(1)", {"a.txt": "1", "b.txt": "2"}, "img", limits)
+        b = make_key("print(1)", {"b.txt": "2", "a.txt": "1"}, "img", limits)
+        self.assertEqual(a, b)
+
+    def test_inputs_change_key(self):
+        """Code, files, image, limits and the abort flag should all be part of the key."""
+        limits = ExecutionLimits()
+        base = make_key("print(1)", None, "img", limits)
+        self.assertNotEqual(base, make_key("print(2)", None, "img", limits))
+        self.assertNotEqual(base, make_key("print(1)", {"a": "1"}, "img", limits))
+        self.assertNotEqual(base, make_key("print(1)", None, "other", limits))
+        self.assertNotEqual(base, make_key("print(1)", None, "img", limits.merged(timeout=5)))
+        self.assertNotEqual(base, make_key("print(1)", None, "img", limits,
+                                           abort_on_traceback=True))
+
+
+class TestExecutionCache(unittest.TestCase):
+    """Test storage and eviction."""
+
+    def test_round_trip(self):
+        """A stored result should be returned with its artifacts."""
+        cache = ExecutionCache()
+        cache.put("k", CachedExecution("SUCCESS OUTPUT:\nok", 0, {"out.txt": b"42"}))
+
+        entry = cache.get("k")
+
+        self.assertEqual(entry.exit_code, 0)
+        self.assertEqual(entry.artifacts, {"out.txt": b"42"})
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_evicts_least_recently_used(self):
+        """Exceeding max_entries should drop the least recently used entry."""
+        cache = ExecutionCache(max_entries=2)
+        cache.put("a", CachedExecution("a", 0))
+        cache.put("b", CachedExecution("b", 0))
+        cache.get("a")
+        cache.put("c", CachedExecution("c", 0))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_budget(self):
+        """Entries should be evicted to stay under max_bytes; oversized ones are skipped."""
+        cache = ExecutionCache(max_bytes=10)
+        cache.put("big", CachedExecution("x" * 11, 0))
+        cache.put("a", CachedExecution("aaaaaa", 0))
+        cache.put("b", CachedExecution("bbbbbb", 0))
+
+        self.assertIsNone(cache.get("big"))
+        self.assertIsNone(cache.get("a"))
+        self.assertLessEqual(cache.stats()["bytes"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+"""
+Unit Tests for Structured Execution Results
+
+Tests:
+1. Legacy text rendering of each status
+2. Trimmed feedback for the Engineer
+3. Out-of-band collection of results
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.results import (
+    DENIED, ERROR, OOM, SUCCESS, TIMEOUT, ExecutionResult, collect_results, record
+)
+
+TRACEBACK = (
+    "Traceback (most recent call last):\n"
+    '  File "/workspace/script.py", line 2, in <module>\n'
+    "ZeroDivisionError: division by zero\n"
+)
+
+
+class TestRendering(unittest.TestCase):
+    """Test that str() matches the text the sandbox used to return."""
+
+    def test_success_lists_artifacts(self):
+        result = ExecutionResult(SUCCESS, 0, stdout="42\n", artifacts=["b.txt", "a.txt"])
+        self.assertEqual(str(result),
+                         "SUCCESS OUTPUT:\n42\n\n[Files saved to ./workspace: a.txt, b.txt]")
+
+    def test_error_combines_streams(self):
+        result = ExecutionResult(ERROR, 1, stdout="out\n", stderr="err\n", aborted=True)
+        self.assertEqual(str(result),
+                         "EXECUTION ERROR:\nout\nerr\n\n[Execution aborted after first traceback]")
+
+    def test_headline_statuses(self):
+        timeout = ExecutionResult(TIMEOUT, 124, stdout="partial",
+                                  message="Execution exceeded the 5s limit and was killed.")
+        denied = ExecutionResult(DENIED, message="User rejected potentially dangerous code.")
+
+        self.assertEqual(str(timeout),
+                         "TIMEOUT: Execution exceeded the 5s limit and was killed.\npartial")
+        self.assertEqual(str(denied),
+                         "EXECUTION DENIED: User rejected potentially dangerous code.")
+
+
+class TestFeedback(unittest.TestCase):
+    """Test what failed runs feed back to the Engineer."""
+
+    def test_error_reduced_to_last_traceback(self):
+        result = ExecutionResult(ERROR, 1, stdout="lots of output\n",
+                                 stderr="DeprecationWarning: old\n" + TRACEBACK)
+
+        feedback = result.feedback()
+
+        self.assertTrue(feedback.startswith("EXECUTION ERROR: (exit code 1)\nTraceback"))
+        self.assertIn("ZeroDivisionError", feedback)
+        self.assertNotIn("lots of output", feedback)
+        self.assertNotIn("DeprecationWarning", feedback)
+
+    def test_long_output_keeps_tail(self):
+        output = "\n".join(f"line {i}" for i in range(100))
+        result = ExecutionResult(OOM, 137, stdout=output, message="Out of memory.")
+
+        lines = result.feedback(max_lines=5).splitlines()
+
+        self.assertEqual(lines[0], "OOM: Out of memory.")
+        self.assertIn("95 lines omitted", lines[1])
+        self.assertEqual(lines[-1], "line 99")
+
+    def test_success_has_no_feedback(self):
+        self.assertEqual(ExecutionResult(SUCCESS, 0, stdout="ok").feedback(), "")
+
+
+class TestCollection(unittest.TestCase):
+    """Test out-of-band result collection."""
+
+    def test_results_collected_in_context_only(self):
+        first = ExecutionResult(SUCCESS)
+        record(ExecutionResult(ERROR))  # No collector: ignored
+
+        with collect_results() as outer:
+            record(first)
+            with collect_results() as inner:
+                record(ExecutionResult(ERROR))
+
+        self.assertEqual(outer, [first])
+        self.assertEqual([r.status for r in inner], [ERROR])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,285 @@
+"""
+Unit Tests for Semantic Retrieval
+
+Tests:
+1. Line-window chunking
+2. Memory-mapped vector store: top-k, row reuse, growth, persistence
+3. Incremental index updates driven by file hashes
+4. Ollama embedding client (local fake server) and the CrewAI tool
+"""
+
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.retrieval import (
+    HashingEmbedder, OllamaEmbedder, SemanticSearch, VectorStore, WorkspaceIndex, chunk_lines
+)
+
+
+class CountingEmbedder(HashingEmbedder):
+    """HashingEmbedder that records how many texts it embedded."""
+
+    def __init__(self, dim=64):
+        super().__init__(dim=dim)
+        self.embedded = []
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+class TestChunking(unittest.TestCase):
+    """Test line-window chunking."""
+
+    def test_windows_overlap(self):
+        """Windows should overlap and carry 1-based line ranges."""
+        text = "\n".join(f"line {i}" for i in range(1, 26))
+
+        chunks = chunk_lines(text, size=10, overlap=2)
+
+        self.assertEqual([(s, e) for s, e, _ in chunks], [(1, 10), (9, 18), (17, 25)])
+        self.assertTrue(chunks[0][2].startswith("line 1\n"))
+
+    def test_blank_text_has_no_chunks(self):
+        """Whitespace-only files should produce nothing to embed."""
+        self.assertEqual(chunk_lines("\n\n  \n"), [])
+
+
+class TestVectorStore(unittest.TestCase):
+    """Test the memory-mapped store."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = VectorStore(self.dir)
+        self.store.reset(3, "test")
+
+    def tearDown(self):
+        self.store = None
+        shutil.rmtree(self.dir)
+
+    def test_top_k_by_cosine(self):
+        """Search should rank rows by cosine similarity."""
+        vectors = np.array([[1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=np.float32)
+        self.store.add(vectors, [{"id": "x"}, {"id": "y"}, {"id": "xy"}])
+
+        results = self.store.search(np.array([1, 0.1, 0], dtype=np.float32), k=2)
+
+        self.assertEqual([p["id"] for _, p in results], ["x", "xy"])
+
+    def test_removed_rows_reused_and_hidden(self):
+        """Freed rows should not be returned and should be filled by later inserts."""
+        rows = self.store.add(np.eye(3, dtype=np.float32), [{"id": i} for i in range(3)])
+        self.store.remove([rows[0]])
+
+        self.assertNotIn(0, [p["id"] for _, p in self.store.search(np.array([1, 0, 0.0]), k=3)])
+        again = self.store.add(np.ones((1, 3), dtype=np.float32), [{"id": "new"}])
+        self.assertEqual(again, [rows[0]])
+
+    def test_grows_and_persists(self):
+        """The file should grow past its initial capacity and reload from disk."""
+        vectors = np.random.default_rng(0).random((3000, 3), dtype=np.float32)
+        self.store.add(vectors, [{"id": i} for i in range(3000)])
+        self.store.flush()
+
+        reopened = VectorStore(self.dir)
+
+        self.assertEqual(reopened.count, 3000)
+        best = reopened.search(vectors[1234], k=1)[0][1]
+        self.assertEqual(best["id"], 1234)
+
+
+class TestWorkspaceIndex(unittest.TestCase):
+    """Test incremental indexing."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.write("pool.py", "def reset_container():\n    pkill_processes()\n")
+        self.write("workspace/report.md", "Quarterly revenue report\n")
+        self.write("notes.bin", "not indexed")
+        self.embedder = CountingEmbedder()
+        self.index = WorkspaceIndex(self.root, self.embedder)
+
+    def tearDown(self):
+        self.index = None
+        shutil.rmtree(self.root)
+
+    def write(self, rel, content):
+        path = os.path.join(self.root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def test_first_build_embeds_once(self):
+        """Building a new index should embed each chunk in a single call."""
+        self.index.refresh()
+
+        self.assertEqual(self.embedder.calls, 1)
+        self.assertEqual(len(self.embedder.embedded), 2)
+
+    def test_new_embedder_reembeds_everything_once(self):
+        """Switching models should embed every file again, but only once."""
+        self.index.refresh()
+        embedder = CountingEmbedder(dim=32)
+
+        stats = WorkspaceIndex(self.root, embedder).refresh()
+
+        self.assertEqual(stats["added"], 2)
+        self.assertEqual(embedder.calls, 1)
+        self.assertEqual(len(embedder.embedded), 2)
+        self.assertEqual(WorkspaceIndex(self.root, embedder).store.embedder, "hashing/32")
+
+    def test_search_finds_relevant_file(self):
+        """The best match should come from the file sharing the query's terms."""
+        self.index.refresh()
+
+        results = self.index.search("reset container", k=1)
+
+        self.assertEqual(results[0]["file"], "pool.py")
+        self.assertIn("pkill_processes", results[0]["text"])
+
+    def test_workspace_files_indexed(self):
+        """Files under ./workspace should be part of the index."""
+        stats = self.index.refresh()
+
+        self.assertEqual(stats["added"], 2)
+        self.assertEqual(self.index.search("revenue report", k=1)[0]["file"], "workspace/report.md")
+
+    def test_only_changed_files_reembedded(self):
+        """A second refresh should embed only the modified file."""
+        self.index.refresh()
+        self.embedder.embedded.clear()
+        self.write("pool.py", "def reset_container():\n    docker_kill()\n")
+
+        stats = self.index.refresh()
+
+        self.assertEqual(stats["updated"], 1)
+        self.assertEqual(len(self.embedder.embedded), 1)
+        self.assertIn("docker_kill", self.index.search("docker kill", k=1)[0]["text"])
+
+    def test_touched_file_not_reembedded(self):
+        """Same content with a new mtime should not be embedded again."""
+        self.index.refresh()
+        self.embedder.embedded.clear()
+        path = os.path.join(self.root, "pool.py")
+        os.utime(path, (1, 1))
+
+        self.index.refresh()
+
+        self.assertEqual(self.embedder.embedded, [])
+
+    def test_deleted_file_dropped(self):
+        """Deleted files should no longer be returned."""
+        self.index.refresh()
+        os.remove(os.path.join(self.root, "workspace", "report.md"))
+
+        stats = self.index.refresh()
+        results = self.index.search("revenue report", k=5)
+
+        self.assertEqual(stats["removed"], 1)
+        self.assertNotIn("workspace/report.md", [r["file"] for r in results])
+
+    def test_index_reloaded_from_disk(self):
+        """A new index over the same root should reuse stored vectors."""
+        self.index.refresh()
+        embedder = CountingEmbedder()
+
+        stats = WorkspaceIndex(self.root, embedder).refresh()
+
+        self.assertEqual(stats["unchanged"], 2)
+        self.assertEqual(embedder.embedded, [])
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/embed with one 2-d vector per input."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        payload = {"embeddings": [[float(len(text)), 1.0] for text in body["input"]]}
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestOllamaEmbedder(unittest.TestCase):
+    """Test the embedding client against a local fake server."""
+
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_batches_requests(self):
+        """Texts should be sent in batches to /api/embed."""
+        url = f"http://127.0.0.1:{self.server.server_port}"
+        embedder = OllamaEmbedder(model="nomic-embed-text", base_url=url, batch_size=2)
+
+        vectors = embedder.embed(["a", "bb", "ccc"])
+
+        self.assertEqual(vectors.shape, (3, 2))
+        self.assertEqual(vectors[:, 0].tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual([len(r["input"]) for r in self.server.requests], [2, 1])
+        self.assertEqual(self.server.requests[0]["model"], "nomic-embed-text")
+
+    def test_unreachable_server(self):
+        """Connection failures should surface as RuntimeError."""
+        embedder = OllamaEmbedder(base_url="http://127.0.0.1:9", timeout=1)
+
+        with self.assertRaises(RuntimeError):
+            embedder.embed(["x"])
+
+
+class TestSemanticSearchTool(unittest.TestCase):
+    """Test the CrewAI tool wrapper."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, "limits.py"), "w") as f:
+            f.write("TIMEOUT_EXIT_CODE = 124\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_returns_located_snippets(self):
+        """Results should be headed by path and line range."""
+        tool = SemanticSearch(embedder=HashingEmbedder(), root=self.root)
+
+        result = tool._run("timeout exit code")
+
+        self.assertIn("### limits.py:1-1", result)
+        self.assertIn("TIMEOUT_EXIT_CODE = 124", result)
+
+    def test_embedding_failure_reported(self):
+        """An unavailable embedding service should give an error string."""
+        tool = SemanticSearch(embedder=OllamaEmbedder(base_url="http://127.0.0.1:9", timeout=1),
+                              root=self.root)
+
+        self.assertTrue(tool._run("anything").startswith("ERROR"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,185 @@
+"""
+Unit Tests for the Dangerous-Code Scanner
+
+Tests:
+1. Resolution of call targets through imports and aliases
+2. Words that merely contain a dangerous substring are not flagged
+3. Structured findings and the sandbox approval gate
+4. Dynamic code, computed attribute access and native calls (bypasses)
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.safety import Finding, scan_code
+from tools.docker_tool import DockerSandboxTool
+
+
+def targets(code):
+    return [f.target for f in scan_code(code)]
+
+
+class TestTargetResolution(unittest.TestCase):
+    """Test that scanner findings name the real call target."""
+
+    def test_module_alias(self):
+        """An aliased module should resolve to its real name."""
+        self.assertEqual(targets("import os as o\no.remove('x')"), ["os.remove"])
+
+    def test_from_import_alias(self):
+        """A renamed from-import should resolve to the imported function."""
+        code = "from shutil import rmtree as wipe\nwipe('/data')"
+        self.assertEqual(targets(code), ["shutil.rmtree"])
+
+    def test_star_import(self):
+        """Names pulled in by a star import should resolve to their module."""
+        code = "from subprocess import *\ncheck_output(['ls'])"
+        self.assertEqual(targets(code), ["subprocess.check_output"])
+
+    def test_network_modules(self):
+        """socket, urllib and requests use should be reported as network access."""
+        code = (
+            "import socket, requests\n"
+            "import urllib.request\n"
+            "socket.create_connection(('example.com', 80))\n"
+            "requests.post('http://example.com')\n"
+            "urllib.request.urlopen('http://example.com')\n"
+        )
+        findings = scan_code(code)
+
+        self.assertEqual({f.category for f in findings}, {"network"})
+        self.assertEqual([f.target for f in findings], [
+            "socket.create_connection", "requests.post", "urllib.request.urlopen",
+        ])
+
+    def test_reference_without_call(self):
+        """Passing a dangerous function around should still be caught."""
+        code = "import os\nlist(map(os.unlink, ['a', 'b']))"
+        self.assertEqual(targets(code), ["os.unlink"])
+
+    def test_path_unlink(self):
+        """Delete methods on arbitrary objects should be caught."""
+        code = "from pathlib import Path\nPath('x').unlink()"
+        self.assertEqual(targets(code), ["<expr>.unlink"])
+
+
+class TestNoFalsePositives(unittest.TestCase):
+    """Test code the old keyword loop could misread."""
+
+    def test_substring_words(self):
+        """'perform' and 'form' contain 'rm' but are harmless."""
+        code = "def perform(form):\n    return form.strip()\nprint(perform(' x '))"
+        self.assertEqual(scan_code(code), [])
+
+    def test_harmless_os_use(self):
+        """os.path and os.getcwd are not dangerous."""
+        code = "import os\nprint(os.path.join(os.getcwd(), 'out.txt'))"
+        self.assertEqual(scan_code(code), [])
+
+    def test_shell_words_in_strings(self):
+        """Printing a shell command does not run it."""
+        self.assertEqual(scan_code("print('run: rm -rf build && curl http://x')"), [])
+
+    def test_syntax_error(self):
+        """Unparseable code cannot run, so it has no findings."""
+        self.assertEqual(scan_code("import os\nos.system('ls'"), [])
+
+
+class TestFindings(unittest.TestCase):
+    """Test the structure of findings and how the sandbox uses them."""
+
+    def test_finding_fields(self):
+        """Findings should carry category, target, line and source."""
+        code = "x = 1\nimport subprocess\nsubprocess.run(['ls'])\n"
+
+        self.assertEqual(scan_code(code, "job.py"), [
+            Finding("shell", "subprocess.run", 3, "subprocess.run(['ls'])", "job.py"),
+        ])
+
+    def test_helper_files_scanned(self):
+        """Python helper files should be scanned along with the script."""
+        tool = DockerSandboxTool()
+        files = {"helpers.py": "import os\ndef clean():\n    os.remove('x')\n",
+                 "notes.txt": "os.remove"}
+
+        findings = tool.find_dangerous("import helpers\nhelpers.clean()", files)
+
+        self.assertEqual([(f.path, f.target) for f in findings], [("helpers.py", "os.remove")])
+
+    @patch.object(DockerSandboxTool, '_request_approval', return_value=False)
+    def test_findings_passed_to_approval(self, mock_approval):
+        """The approval prompt should receive the findings."""
+        tool = DockerSandboxTool()
+
+        result = tool.execute("import os\nos.system('ls')")
+
+        self.assertIn("EXECUTION DENIED", result)
+        findings = mock_approval.call_args[0][1]
+        self.assertEqual([f.target for f in findings], ["os.system"])
+
+
+class TestBypasses(unittest.TestCase):
+    """Test code that reaches dangerous functions without naming them."""
+
+    def categories(self, code):
+        return {(f.category, f.target) for f in scan_code(code)}
+
+    def test_exec_of_literal_source(self):
+        """exec should be flagged and the source it runs scanned too."""
+        found = self.categories("exec(\"import os; os.remove('x')\")")
+
+        self.assertEqual(found, {("dynamic-code", "exec"), ("file-delete", "os.remove")})
+
+    def test_eval_of_import(self):
+        found = self.categories("eval(\"__import__('os').system('rm -rf /')\")")
+
+        self.assertIn(("dynamic-code", "eval"), found)
+        self.assertIn(("dynamic-import", "__import__"), found)
+
+    def test_compile(self):
+        self.assertIn(("dynamic-code", "compile"), self.categories("compile(src, 'x', 'exec')"))
+
+    def test_getattr_with_constant_name(self):
+        """getattr(os, "system") should resolve to os.system."""
+        code = 'import os\ngetattr(os, "system")("rm -rf /")'
+        self.assertEqual(targets(code), ["os.system"])
+
+    def test_computed_access_on_risky_module(self):
+        code = (
+            "import os, subprocess as sp\n"
+            "getattr(sp, name)\n"
+            "vars(os)['system']('ls')\n"
+            "os.__dict__['remove']('x')\n"
+        )
+        self.assertEqual([(f.category, f.target) for f in scan_code(code)], [
+            ("dynamic-access", "getattr(subprocess)"),
+            ("dynamic-access", "vars(os)"),
+            ("dynamic-access", "os.__dict__"),
+        ])
+
+    def test_asyncio_subprocess(self):
+        code = "import asyncio\nasyncio.create_subprocess_shell('ls')"
+        self.assertEqual(targets(code), ["asyncio.create_subprocess_shell"])
+
+    def test_exec_and_spawn_families(self):
+        code = "import os\nos.execv('/bin/sh', [])\nos.spawnlp(os.P_WAIT, 'ls')"
+        self.assertEqual(targets(code), ["os.execv", "os.spawnlp"])
+
+    def test_ctypes(self):
+        code = 'import ctypes\nctypes.CDLL(None).system(b"rm -rf /")'
+        self.assertEqual(self.categories(code), {("native-code", "ctypes.CDLL")})
+
+    def test_harmless_lookalikes(self):
+        """re.compile and getattr of a harmless os attribute stay clean."""
+        code = "import os, re\nre.compile('x')\ngetattr(os, 'getcwd')()"
+        self.assertEqual(scan_code(code), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
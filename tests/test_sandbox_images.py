@@ -0,0 +1,178 @@
+"""
+Unit Tests for Dependency-Aware Sandbox Images
+
+Tests:
+1. Detection of third-party imports
+2. One build per dependency set, reused afterwards (mocked Docker)
+3. Failed builds remembered, LRU eviction
+4. Dockerfile and build context for wheelhouse / mirror / offline installs
+"""
+
+import unittest
+from unittest.mock import MagicMock
+import io
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+import docker
+from tools.sandbox_images import (
+    IMAGE_LABEL, ImageBuildError, SandboxImages, detect_requirements
+)
+
+BASE = "python:3.11-slim"
+
+
+class TestDetectRequirements(unittest.TestCase):
+    """Test finding the packages a script needs."""
+
+    def test_stdlib_and_local_helpers_skipped(self):
+        code = "import os, json\nfrom collections import deque\nimport helpers\nimport numpy as np"
+        files = {"helpers.py": "import pandas", "data/input.csv": "a,b"}
+
+        self.assertEqual(detect_requirements(code, files), ["numpy", "pandas"])
+
+    def test_import_names_mapped_to_distributions(self):
+        code = "from sklearn.linear_model import LinearRegression\nimport yaml\nfrom PIL import Image"
+        self.assertEqual(detect_requirements(code), ["pillow", "pyyaml", "scikit-learn"])
+
+    def test_optional_and_relative_imports_skipped(self):
+        """Imports guarded by except ImportError are not required."""
+        code = (
+            "try:\n    import ujson as json\nexcept ImportError:\n    import json\n"
+            "from . import sibling\n"
+        )
+        self.assertEqual(detect_requirements(code), [])
+
+    def test_unparseable_code_has_no_requirements(self):
+        self.assertEqual(detect_requirements("import numpy\ndef broken(:"), [])
+
+
+class TestSandboxImages(unittest.TestCase):
+    """Test building and reusing derived images."""
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.built = set()
+        self.client.images.get.side_effect = self.get_image
+        self.client.images.build.side_effect = self.build_image
+        self.images = SandboxImages(BASE, client=self.client)
+
+    def get_image(self, tag):
+        if tag not in self.built:
+            raise docker.errors.ImageNotFound(tag)
+        return MagicMock()
+
+    def build_image(self, tag, **kwargs):
+        time.sleep(0.05)
+        self.built.add(tag)
+        return MagicMock(), []
+
+    def test_built_once_then_reused(self):
+        """The same set in any order should map to one image built once."""
+        first = self.images.image_for(["numpy", "pandas"])
+        second = self.images.image_for(["pandas", "numpy"])
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.client.images.build.call_count, 1)
+        self.assertEqual(self.images.stats()["hits"], 1)
+        self.assertNotEqual(first, self.images.tag_for(["numpy"]))
+
+    def test_no_requirements_use_base_image(self):
+        self.assertEqual(self.images.image_for([]), BASE)
+        self.client.images.build.assert_not_called()
+
+    def test_concurrent_requests_share_one_build(self):
+        tags = []
+        threads = [threading.Thread(target=lambda: tags.append(self.images.image_for(["numpy"])))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(tags)), 1)
+        self.assertEqual(self.client.images.build.call_count, 1)
+
+    def test_failed_build_not_retried(self):
+        """An uninstallable set should fail fast after the first attempt."""
+        self.client.images.build.side_effect = docker.errors.BuildError("pip failed", [])
+
+        with self.assertRaises(ImageBuildError):
+            self.images.image_for(["notapackage"])
+        with self.assertRaises(ImageBuildError):
+            self.images.image_for(["notapackage"])
+
+        self.assertEqual(self.client.images.build.call_count, 1)
+
+    def test_least_recently_used_evicted(self):
+        """Images beyond max_images should be removed, oldest use first."""
+        self.images.max_images = 2
+        for name in ("a", "b", "c"):
+            self.images.image_for([name])
+        self.images.image_for(["a"])  # a is now more recent than b and c
+        listed = []
+        for name in ("a", "b", "c"):
+            image = MagicMock(id=f"id-{name}", tags=[self.images.tag_for([name])], labels={})
+            listed.append(image)
+        self.client.images.list.return_value = listed
+
+        self.assertEqual(self.images.evict(), 1)
+
+        self.client.images.remove.assert_called_once_with("id-b")
+        self.client.images.list.assert_called_with(filters={"label": IMAGE_LABEL})
+
+    def test_subscribers_told_before_removal(self):
+        """Users of an evicted image should hear of it before it is removed."""
+        self.images.max_images = 0
+        tag = self.images.image_for(["a"])
+        self.client.images.list.return_value = [MagicMock(id="id-a", tags=[tag])]
+        calls = []
+        self.images.subscribe(lambda t: calls.append(("told", t)))
+        self.client.images.remove.side_effect = lambda image_id: calls.append(("removed", image_id))
+
+        self.images.evict()
+
+        self.assertEqual(calls, [("told", tag), ("removed", "id-a")])
+
+
+class TestBuildContext(unittest.TestCase):
+    """Test the generated Dockerfile and build context."""
+
+    def setUp(self):
+        self.wheelhouse = tempfile.mkdtemp()
+        with open(os.path.join(self.wheelhouse, "numpy-2.0-py3-none-any.whl"), "wb") as f:
+            f.write(b"wheel")
+
+    def tearDown(self):
+        shutil.rmtree(self.wheelhouse)
+
+    def test_offline_install_from_wheelhouse(self):
+        images = SandboxImages(BASE, wheelhouse=self.wheelhouse, offline=True)
+
+        dockerfile = images.dockerfile(["numpy"])
+        with tarfile.open(fileobj=io.BytesIO(images._context(["numpy"]))) as tar:
+            names = tar.getnames()
+
+        self.assertTrue(dockerfile.startswith(f"FROM {BASE}\n"))
+        self.assertIn('"--find-links", "/opt/wheelhouse", "--no-index", "numpy"', dockerfile)
+        self.assertEqual(names, ["Dockerfile", "wheelhouse/numpy-2.0-py3-none-any.whl"])
+
+    def test_mirror_index_used(self):
+        images = SandboxImages(BASE, index_url="http://mirror.local/simple")
+
+        self.assertIn('"--index-url", "http://mirror.local/simple"', images.dockerfile(["numpy"]))
+        with self.assertRaises(ValueError):
+            SandboxImages(BASE, offline=True)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,110 @@
+"""
+Unit Tests for TaskScheduler
+
+Tests:
+1. Concurrent execution and per-task futures
+2. Priority ordering
+3. Backpressure and shutdown
+"""
+
+import unittest
+import os
+import queue
+import sys
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import TaskScheduler
+
+
+class TestTaskScheduler(unittest.TestCase):
+    """Test queueing, ordering and result delivery."""
+
+    def test_results_delivered_via_futures(self):
+        """Each future should resolve to the run function's result."""
+        with TaskScheduler(lambda task, suffix="": task.upper() + suffix, max_workers=2) as s:
+            futures = s.map(["a", "b", "c"], suffix="!")
+
+        self.assertEqual([f.result() for f in futures], ["A!", "B!", "C!"])
+
+    def test_tasks_run_concurrently(self):
+        """Tasks should overlap up to max_workers."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def run(task):
+            barrier.wait()  # Only passes if all three run at the same time
+            return task
+
+        with TaskScheduler(run, max_workers=3) as s:
+            futures = s.map(["x", "y", "z"])
+
+        self.assertEqual(sorted(f.result() for f in futures), ["x", "y", "z"])
+
+    def test_exceptions_propagate(self):
+        """A failing task should set the exception on its future."""
+        def run(task):
+            raise ValueError(task)
+
+        with TaskScheduler(run, max_workers=1) as s:
+            future = s.submit("bad")
+
+        with self.assertRaises(ValueError):
+            future.result()
+        self.assertEqual(s.stats()["failed"], 1)
+
+    def test_higher_priority_starts_first(self):
+        """Queued tasks should start in priority order."""
+        gate = threading.Event()
+        order = []
+
+        def run(task):
+            if task == "blocker":
+                gate.wait(5)
+            order.append(task)
+
+        s = TaskScheduler(run, max_workers=1)
+        s.submit("blocker")
+        time.sleep(0.05)  # Let the worker pick up the blocker
+        s.submit("low", priority=0)
+        s.submit("high", priority=10)
+        s.submit("low-2", priority=0)
+        gate.set()
+        s.shutdown(wait=True)
+
+        self.assertEqual(order, ["blocker", "high", "low", "low-2"])
+
+    def test_backpressure_rejects_when_full(self):
+        """A full queue should raise queue.Full for non-blocking submits."""
+        gate = threading.Event()
+        s = TaskScheduler(lambda task: gate.wait(5), max_workers=1, max_queue=1)
+        s.submit("running")
+        time.sleep(0.05)
+        s.submit("queued")
+
+        with self.assertRaises(queue.Full):
+            s.submit("rejected", block=False)
+
+        gate.set()
+        s.shutdown(wait=True)
+
+    def test_shutdown_cancels_pending(self):
+        """cancel_pending should cancel tasks that have not started."""
+        gate = threading.Event()
+        s = TaskScheduler(lambda task: gate.wait(5), max_workers=1)
+        s.submit("running")
+        time.sleep(0.05)
+        pending = s.submit("pending")
+
+        s.shutdown(wait=False, cancel_pending=True)
+        gate.set()
+
+        self.assertTrue(pending.cancelled())
+        with self.assertRaises(RuntimeError):
+            s.submit("late")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
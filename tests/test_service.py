@@ -0,0 +1,212 @@
+"""
+Unit Tests for the Agent Team Service
+
+Tests:
+1. Jobs run on the persistent worker pool and record their status changes
+2. Sandbox output and run spans recorded as events of their job
+3. Cancelling queued jobs, long-polling events and forgetting old jobs
+4. The HTTP job API (submit, poll, stream, cancel, health)
+5. Browser-originated and unauthenticated requests refused
+"""
+
+import unittest
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from service import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobServer, JobService
+from tracing import Tracer, annotate
+
+
+def statuses(events):
+    return [e["status"] for e in events if e["type"] == "status"]
+
+
+class TestJobService(unittest.TestCase):
+    """Test running jobs and recording their progress."""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.tracer = Tracer()
+        self.service = JobService(self.run_task, max_workers=1, tracer=self.tracer)
+        self.addCleanup(self.service.close, wait=False, cancel_pending=True)
+        self.addCleanup(self.release.set)
+
+    def run_task(self, task, max_retries=3):
+        self.release.wait(5)
+        if task == "crash":
+            raise ValueError("boom")
+        with self.tracer.span("run"):
+            self.service.on_output("stdout", f"{task} output")
+            annotate(outcome="success")
+        return f"{task} x{max_retries}"
+
+    def wait(self, job):
+        job.future.result(5)
+        self.service.events(job.id, job.last_seq, timeout=5)
+        return self.service.get(job.id)
+
+    def test_job_runs_to_done(self):
+        job = self.wait(self.service.submit("fib", max_retries=2))
+
+        self.assertEqual(job.status, DONE)
+        self.assertEqual(job.result, "fib x2")
+        self.assertEqual(job.outcome, "success")
+        self.assertEqual(statuses(job.events), [QUEUED, RUNNING, DONE])
+
+    def test_crash_marks_job_failed(self):
+        job = self.wait(self.service.submit("crash"))
+
+        self.assertEqual(job.status, FAILED)
+        self.assertEqual(job.error, "ValueError: boom")
+        self.assertEqual(self.service.stats()["jobs"][FAILED], 1)
+
+    def test_output_and_spans_recorded_on_job(self):
+        """Events from inside the run belong to the job; outside ones are dropped."""
+        self.service.on_output("stdout", "not from a job")
+        job = self.wait(self.service.submit("fib"))
+
+        kinds = [(e["type"], e.get("text") or e.get("name")) for e in job.events
+                 if e["type"] != "status"]
+        self.assertEqual(kinds, [("output", "fib output"), ("span", "run")])
+        self.assertEqual([e["seq"] for e in job.events], [1, 2, 3, 4, 5])
+
+    def test_queued_job_cancelled(self):
+        self.release.clear()
+        first = self.service.submit("first")
+        second = self.service.submit("second")
+
+        self.assertTrue(self.service.cancel(second.id))
+        self.assertFalse(self.service.cancel(second.id))
+        self.release.set()
+        self.wait(first)
+
+        self.assertEqual(second.status, CANCELLED)
+        self.assertTrue(second.future.cancelled())
+        self.assertEqual(first.status, DONE)
+
+    def test_events_long_poll(self):
+        self.release.clear()
+        job = self.service.submit("fib")
+        timer = threading.Timer(0.1, self.release.set)
+        timer.start()
+
+        events = self.service.events(job.id, after=job.last_seq, timeout=5)
+
+        self.assertTrue(events)
+        self.assertGreater(events[0]["seq"], 1)
+        self.assertIsNone(self.service.events("missing"))
+
+    def test_old_finished_jobs_forgotten(self):
+        self.service.keep = 2
+        jobs = [self.wait(self.service.submit(f"task {i}")) for i in range(3)]
+
+        self.assertEqual([j.id for j in self.service.jobs()], [jobs[1].id, jobs[2].id])
+
+    def test_close_restores_tracer(self):
+        self.service.close()
+
+        self.assertIsNone(self.tracer.on_end)
+
+
+class TestJobServer(unittest.TestCase):
+    """Test the HTTP job API."""
+
+    def setUp(self):
+        self.service = JobService(lambda task, **options: task.upper(), max_workers=2)
+        self.server = JobServer(self.service, port=0, health=lambda: {"sandbox": {"idle": 1}})
+        self.server.start()
+        self.addCleanup(self.service.close)
+        self.addCleanup(self.server.stop)
+
+    def call(self, method, path, body=None, **headers):
+        headers = {"Authorization": f"Bearer {self.server.token}",
+                   "Content-Type": "application/json", **headers}
+        request = urllib.request.Request(
+            self.server.url + path, method=method, headers=headers,
+            data=None if body is None else json.dumps(body).encode("utf-8"),
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_submit_and_poll(self):
+        status, job = self.call("POST", "/jobs", {"task": "hello", "max_retries": 1})
+        self.assertEqual(status, 202)
+        self.assertEqual(job["options"], {"max_retries": 1})
+
+        status, events = self.call("GET", f"/jobs/{job['id']}/events?after=1&wait=5")
+        self.assertEqual(status, 200)
+        self.assertGreater(events[0]["seq"], 1)
+        self.service.events(job["id"], after=2, timeout=5)
+        _, done = self.call("GET", f"/jobs/{job['id']}")
+
+        self.assertEqual(done["status"], DONE)
+        self.assertEqual(done["result"], "HELLO")
+        _, listed = self.call("GET", "/jobs")
+        self.assertNotIn("result", listed[0])
+
+    def test_follow_streams_until_finished(self):
+        _, job = self.call("POST", "/jobs", {"task": "stream"})
+
+        request = urllib.request.Request(
+            f"{self.server.url}/jobs/{job['id']}/events?follow=1",
+            headers={"Authorization": f"Bearer {self.server.token}"},
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            events = [json.loads(line) for line in response]
+
+        self.assertEqual(statuses(events), [QUEUED, RUNNING, DONE])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.call("POST", "/jobs", {"task": ""})[0], 400)
+        self.assertEqual(self.call("POST", "/jobs", {"prompt": "x"})[0], 400)
+        self.assertEqual(self.call("GET", "/jobs/missing")[0], 404)
+        self.assertEqual(self.call("GET", "/jobs/missing/events")[0], 404)
+        self.assertEqual(self.call("POST", "/jobs/missing/cancel")[0], 409)
+
+    def test_run_options_bounded(self):
+        """Out-of-range or non-integer run options should be rejected before queuing."""
+        for options in ({"candidates": 10000}, {"max_retries": 1000000}, {"max_retries": -1},
+                        {"replan_after": 0}, {"candidates": "3"}, {"candidates": 2.5}):
+            status, error = self.call("POST", "/jobs", {"task": "x", **options})
+            self.assertEqual(status, 400, options)
+            self.assertIn(next(iter(options)), error["error"])
+
+        status, job = self.call("POST", "/jobs", {"task": "x", "candidates": 8,
+                                                  "replan_after": None})
+        self.assertEqual(status, 202)
+        self.assertEqual(job["options"], {"candidates": 8})
+        self.assertEqual(len(self.service.jobs()), 1)
+
+    def test_browser_requests_refused(self):
+        """Cross-site posts, rebound hosts and requests without the token are refused."""
+        self.assertEqual(self.call("POST", "/jobs", {"task": "x"},
+                                   **{"Content-Type": "text/plain"})[0], 415)
+        self.assertEqual(self.call("POST", "/jobs", {"task": "x"},
+                                   Origin="http://evil.example")[0], 403)
+        self.assertEqual(self.call("GET", "/jobs", Host="evil.example:8780")[0], 403)
+        self.assertEqual(self.call("GET", "/jobs", Authorization="Bearer wrong")[0], 401)
+        self.assertEqual(self.service.jobs(), [])
+
+    def test_health(self):
+        status, health = self.call("GET", "/health")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(health["status"], "ok")
+        self.assertEqual(health["workers"], 2)
+        self.assertEqual(health["sandbox"], {"idle": 1})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,225 @@
+"""
+Unit Tests for Span Tracing
+
+Tests:
+1. Span nesting across threads and asyncio tasks; no-op outside a trace
+2. Error and cancellation statuses
+3. JSONL and OTLP/JSON export, latency summaries
+4. Sandbox stage spans (mocked Docker) and LLM call spans
+"""
+
+import unittest
+import asyncio
+import contextvars
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from unittest.mock import MagicMock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from crewai.llms.base_llm import BaseLLM
+from llm_backend import ManagedLLM
+from tools.container_pool import ContainerPool
+from tools.docker_tool import DockerSandboxTool, build_archive
+from tools.limits import ExecutionLimits
+from tools.workspace import WorkspaceManager
+from tracing import (
+    CANCELLED, ERROR, JsonlWriter, Span, Tracer, annotate, read_jsonl, span,
+    summarize, traced, write_otlp
+)
+
+
+class EchoLLM(BaseLLM):
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        annotate(prompt_tokens=3)
+        return f"echo: {messages}"
+
+
+class TestSpans(unittest.TestCase):
+    """Test building the span tree."""
+
+    def setUp(self):
+        self.tracer = Tracer()
+
+    def by_name(self):
+        return {s.name: s for s in self.tracer.spans()}
+
+    def test_children_share_trace_and_nest(self):
+        with self.tracer.span("run", task="t") as root:
+            with span("attempt", attempt=1):
+                annotate(passed=True)
+                with span("llm"):
+                    pass
+
+        spans = self.by_name()
+        self.assertEqual({s.trace_id for s in spans.values()}, {root.trace_id})
+        self.assertIsNone(spans["run"].parent_id)
+        self.assertEqual(spans["attempt"].parent_id, root.span_id)
+        self.assertEqual(spans["llm"].parent_id, spans["attempt"].span_id)
+        self.assertEqual(spans["attempt"].attributes, {"attempt": 1, "passed": True})
+        self.assertGreaterEqual(spans["run"].duration, spans["llm"].duration)
+
+    def test_no_trace_records_nothing(self):
+        """Instrumented code outside a trace should be a no-op."""
+        with span("orphan") as orphan:
+            annotate(ignored=True)
+
+        self.assertIsNone(orphan)
+        self.assertEqual(self.tracer.spans(), [])
+
+    def test_context_carried_into_threads_and_tasks(self):
+        """Worker threads (with a copied context) and tasks join the trace."""
+        async def child(index):
+            with span("task", index=index):
+                await asyncio.sleep(0)
+
+        with self.tracer.span("run") as root:
+            context = contextvars.copy_context()
+            worker = threading.Thread(target=context.run, args=(traced("thread")(lambda: None),))
+            worker.start()
+            worker.join()
+
+            async def scenario():
+                await asyncio.gather(child(1), child(2))
+            asyncio.run(scenario())
+
+        children = [s for s in self.tracer.spans() if s.name != "run"]
+        self.assertEqual(sorted(s.name for s in children), ["task", "task", "thread"])
+        self.assertTrue(all(s.parent_id == root.span_id for s in children))
+
+    def test_error_and_cancellation_statuses(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span("run"):
+                raise ValueError("bad")
+
+        async def scenario():
+            async def slow():
+                with span("slow"):
+                    await asyncio.sleep(10)
+            with self.tracer.span("outer"):
+                task = asyncio.create_task(slow())
+                await asyncio.sleep(0)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        asyncio.run(scenario())
+
+        spans = self.by_name()
+        self.assertEqual(spans["run"].status, ERROR)
+        self.assertEqual(spans["run"].attributes["error"], "ValueError: bad")
+        self.assertEqual(spans["slow"].status, CANCELLED)
+
+
+class TestExport(unittest.TestCase):
+    """Test the JSONL and OTLP exports and the summary."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_jsonl_streamed_and_read_back(self):
+        path = os.path.join(self.dir, "trace.jsonl")
+        tracer = Tracer(on_end=JsonlWriter(path))
+        with tracer.span("run"):
+            with span("sandbox.exec", bytes=10):
+                pass
+
+        spans = read_jsonl(path)
+
+        self.assertEqual([s.name for s in spans], ["sandbox.exec", "run"])
+        self.assertEqual(spans[0].attributes, {"bytes": 10})
+        self.assertEqual(spans[0].parent_id, spans[1].span_id)
+
+    def test_otlp_file(self):
+        path = os.path.join(self.dir, "trace.json")
+        tracer = Tracer()
+        with tracer.span("run", attempts=2, model="qwen", load=0.5, passed=True):
+            with span("llm"):
+                pass
+
+        write_otlp(tracer.spans(), path)
+        with open(path) as f:
+            export = json.load(f)
+
+        otlp_spans = export["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        llm, run = otlp_spans
+        self.assertEqual(len(run["traceId"]), 32)
+        self.assertEqual(llm["parentSpanId"], run["spanId"])
+        self.assertNotIn("parentSpanId", run)
+        self.assertEqual(run["attributes"], [
+            {"key": "attempts", "value": {"intValue": "2"}},
+            {"key": "model", "value": {"stringValue": "qwen"}},
+            {"key": "load", "value": {"doubleValue": 0.5}},
+            {"key": "passed", "value": {"boolValue": True}},
+        ])
+        self.assertGreaterEqual(int(run["endTimeUnixNano"]), int(run["startTimeUnixNano"]))
+
+    def test_summary_percentiles(self):
+        spans = [Span("exec", "t", str(i), duration=float(i)) for i in range(1, 21)]
+        spans.append(Span("llm", "t", "x", duration=300.0, status=ERROR))
+
+        summary = summarize(spans)
+
+        self.assertEqual(list(summary), ["llm", "exec"])
+        self.assertEqual(summary["exec"]["count"], 20)
+        self.assertEqual((summary["exec"]["p50"], summary["exec"]["p95"]), (10.0, 19.0))
+        self.assertEqual(summary["llm"]["errors"], 1)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test the spans emitted by the sandbox tool and the LLM wrapper."""
+
+    def setUp(self):
+        self.tracer = Tracer()
+
+    def test_sandbox_stages(self):
+        """A successful run should be broken down into its stages."""
+        pool = MagicMock(spec=ContainerPool)
+        pool.limits = ExecutionLimits()
+        pool.image = "python:3.11-slim"
+        container = pool.acquire.return_value
+        container.client.api.exec_create.return_value = {"Id": "exec-1"}
+        container.client.api.exec_start.return_value = iter([(b"ok\n", None)])
+        container.client.api.exec_inspect.return_value = {"Running": False, "ExitCode": 0}
+        container.get_archive.return_value = (
+            iter([build_archive({"workspace/script.py": "..."})]), {}
+        )
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        tool = DockerSandboxTool(pool=pool, workspaces=WorkspaceManager(root=root))
+
+        with self.tracer.span("run"):
+            tool._run("print('ok')")
+
+        spans = {s.name: s for s in self.tracer.spans()}
+        stages = ["sandbox.safety", "sandbox.acquire", "sandbox.inject", "sandbox.exec",
+                  "sandbox.artifacts", "sandbox.release"]
+        for name in stages:
+            self.assertEqual(spans[name].parent_id, spans["tool.sandbox"].span_id, name)
+        self.assertEqual(spans["tool.sandbox"].attributes["status"], "success")
+        self.assertEqual(spans["sandbox.release"].attributes, {"healthy": True})
+
+    def test_llm_call_span(self):
+        """Provider annotations (token counts) land on the LLM call's span."""
+        llm = ManagedLLM(EchoLLM(model="fake"))
+        agent = MagicMock(role="Software Engineer")
+
+        with self.tracer.span("run"):
+            llm.call("hi", from_agent=agent)
+
+        call = next(s for s in self.tracer.spans() if s.name == "llm")
+        self.assertEqual(call.attributes["agent"], "Software Engineer")
+        self.assertEqual(call.attributes["prompt_tokens"], 3)
+        self.assertIn("slot_wait", call.attributes)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
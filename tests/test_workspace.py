@@ -0,0 +1,189 @@
+"""
+Unit Tests for Per-Run Workspaces
+
+Tests:
+1. Staging directory layout per run, attempt and candidate
+2. Extraction of container archives and promotion to the host
+3. Garbage collection of old runs, skipping active ones, off the create path
+4. Host workspace files offered as inputs to executions
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+import time
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import win_patch  # Windows compatibility
+from tools.docker_tool import build_archive
+from tools.workspace import WorkspaceManager, activate, current_workspace
+
+
+class TestWorkspaceManager(unittest.TestCase):
+    """Test staging, promotion and cleanup of run workspaces."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # Collections run only when a test calls gc()
+        self.manager = WorkspaceManager(root=self.root, gc_interval=None)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_attempts_get_separate_directories(self):
+        """Each attempt of a run should get its own staging directory."""
+        first = self.manager.create("run-a", attempt=1)
+        second = self.manager.create("run-a", attempt=2)
+
+        self.assertNotEqual(first.path, second.path)
+        self.assertTrue(os.path.isdir(first.path))
+        self.assertTrue(os.path.isdir(second.path))
+
+    def test_candidates_get_separate_directories(self):
+        """Candidates of one attempt should not share a staging directory."""
+        first = self.manager.create("run-a", attempt=2, candidate=1)
+        second = self.manager.create("run-a", attempt=2, candidate=2)
+
+        self.assertNotEqual(first.path, second.path)
+        self.assertEqual(second.label, "run-a/attempt-2-candidate-2")
+        self.assertEqual(self.manager.create("run-a", attempt=2).label, "run-a/attempt-2")
+
+    def test_extract_strips_prefix_and_excludes(self):
+        """Archive members should lose the workspace/ prefix; excluded files are skipped."""
+        ws = self.manager.create("run-b")
+        archive = build_archive({"workspace/script.py": "x", "workspace/data/out.csv": "1,2"})
+
+        extracted = self.manager.extract(ws, [archive[:100], archive[100:]], exclude={"script.py"})
+
+        self.assertEqual(extracted, ["data/out.csv"])
+        self.assertTrue(os.path.exists(os.path.join(ws.path, "data", "out.csv")))
+
+    def test_promote_copies_to_root(self):
+        """Promotion should copy staged files into the workspace root."""
+        ws = self.manager.create("run-c")
+        with open(os.path.join(ws.path, "report.txt"), "w") as f:
+            f.write("done")
+
+        promoted = self.manager.promote(ws)
+
+        self.assertEqual(promoted, ["report.txt"])
+        self.assertTrue(os.path.exists(os.path.join(self.root, "report.txt")))
+
+    def test_gc_removes_old_runs(self):
+        """Runs older than max_age should be removed."""
+        old = self.manager.create("old-run")
+        self.manager.release(old)
+        past = time.time() - 3600
+        os.utime(os.path.dirname(old.path), (past, past))
+
+        self.manager.max_age = 60
+        removed = self.manager.gc()
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(os.path.exists(old.path))
+
+    def test_gc_keeps_newest(self):
+        """Only the newest `keep` runs should survive."""
+        self.manager.keep = 2
+        for i in range(4):
+            ws = self.manager.create(f"run-{i}")
+            self.manager.release(ws)
+            stamp = time.time() - 100 + i
+            os.utime(os.path.dirname(ws.path), (stamp, stamp))
+
+        self.manager.gc()
+
+        self.assertEqual(sorted(os.listdir(self.manager.runs_dir)), ["run-2", "run-3"])
+
+    def test_gc_skips_active_runs(self):
+        """A run still using its workspace should survive collection."""
+        self.manager.keep = 0
+        busy = self.manager.create("busy")
+        done = self.manager.create("done")
+        self.manager.release(done)
+
+        self.assertEqual(self.manager.gc(), 1)
+
+        self.assertTrue(os.path.isdir(busy.path))
+        self.assertFalse(os.path.exists(done.path))
+
+    def test_use_releases_run(self):
+        """use() should activate the workspace and release the run afterwards."""
+        self.manager.keep = 0
+        with self.manager.use("run-e") as ws:
+            self.assertIs(current_workspace(), ws)
+            self.assertEqual(self.manager.gc(), 0)
+
+        self.assertEqual(self.manager.gc(), 1)
+
+    def test_create_collects_in_background(self):
+        """create() should not wait for a collection, nor start overlapping ones."""
+        started, finish = threading.Event(), threading.Event()
+
+        def slow_gc():
+            started.set()
+            finish.wait(5)
+            return 0
+
+        with patch.object(self.manager, "gc", side_effect=slow_gc) as gc:
+            self.manager.gc_interval = 0
+            self.manager.create("run-f")
+            self.assertTrue(started.wait(5))
+            self.manager.create("run-g")
+            finish.set()
+
+        self.assertEqual(gc.call_count, 1)
+
+    def test_inputs_skip_hidden_and_oversized(self):
+        """Inputs should list visible workspace files within the size budget."""
+        self.manager.create("run-h")
+        for rel, content in (("data.csv", "a,b"), ("sub/notes.txt", "hi"),
+                             (".approvals/x.json", "{}"), ("big.bin", "x" * 100)):
+            path = os.path.join(self.root, *rel.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        self.manager.max_input_bytes = 50
+
+        self.assertEqual(self.manager.inputs(), {"data.csv": b"a,b", "sub/notes.txt": b"hi"})
+
+    def test_inputs_read_without_manager_lock(self):
+        """Reading inputs should not wait for (or block) other runs."""
+        with open(os.path.join(self.root, "data.csv"), "w") as f:
+            f.write("a,b")
+
+        results = []
+        with self.manager._lock:
+            reader = threading.Thread(target=lambda: results.append(self.manager.inputs()))
+            reader.start()
+            reader.join(5)
+
+        self.assertEqual(results, [{"data.csv": b"a,b"}])
+
+    def test_extract_skips_unchanged_inputs(self):
+        """Injected inputs should come back only if the run modified them."""
+        ws = self.manager.create("run-i")
+        archive = build_archive({"workspace/same.txt": "1", "workspace/edited.txt": "2"})
+
+        extracted = self.manager.extract(ws, [archive],
+                                         unchanged={"same.txt": b"1", "edited.txt": b"1"})
+
+        self.assertEqual(extracted, ["edited.txt"])
+
+    def test_activate_sets_current(self):
+        """activate() should expose the workspace only inside the block."""
+        ws = self.manager.create("run-d")
+
+        with activate(ws):
+            self.assertIs(current_workspace(), ws)
+        self.assertIsNone(current_workspace())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,11 +1,34 @@
 # Local Agent Team - Tools Package
-# 
+#
 # This package provides tools for the CrewAI agent team.
+# The tool classes are imported on first access (PEP 562), so importing a
+# light submodule such as tools.results or tools.limits does not pull in
+# crewai and docker.
 
 # Windows compatibility - must be imported first
 import win_patch
 
-from tools.docker_tool import DockerSandboxTool
-from tools.file_tools import CodebaseMapper
+import importlib
 
-__all__ = ["DockerSandboxTool", "CodebaseMapper"]
+# Public tool classes and the modules defining them
+_EXPORTS = {
+    "DockerSandboxTool": "tools.docker_tool",
+    "CodebaseMapper": "tools.file_tools",
+    "SymbolIndex": "tools.file_tools",
+    "SemanticSearch": "tools.retrieval",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,435 @@
+"""
+Approval Queue for Dangerous Sandbox Executions
+
+Replaces the blocking console prompt with a queue that other tasks never
+wait on:
+- Each flagged execution is parked as a pending request with its findings;
+  only the task that submitted it waits, and it holds no container meanwhile
+- Policy rules approve or deny by finding ("network:requests.get",
+  "file-delete:*") before a human is asked
+- Humans answer through a watched directory, a line-based local socket or
+  a local HTTP endpoint (token-protected, see tools/local_http.py)
+- Requests left unanswered past their timeout are expired (denied by default)
+"""
+
+import fnmatch
+import json
+import os
+import socketserver
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional
+
+from tools.local_http import new_token, rejection
+from tools.safety import Finding
+
+
+PENDING = "pending"
+APPROVED = "approved"
+DENIED = "denied"
+EXPIRED = "expired"
+
+
+@dataclass
+class ApprovalRequest:
+    """One parked execution waiting for a decision."""
+
+    id: str
+    code: str
+    findings: List[Finding]
+    label: str = ""
+    created: float = field(default_factory=time.time)
+    deadline: Optional[float] = None
+    status: str = PENDING
+    decided_by: str = ""
+    reason: str = ""
+    _event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def approved(self) -> bool:
+        return self.status == APPROVED
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable view for approval sources."""
+        return {
+            "id": self.id,
+            "label": self.label,
+            "status": self.status,
+            "created": self.created,
+            "deadline": self.deadline,
+            "decided_by": self.decided_by,
+            "reason": self.reason,
+            "findings": [str(f) for f in self.findings],
+            "code": self.code,
+        }
+
+
+@dataclass
+class ApprovalPolicy:
+    """
+    Rules applied before a human is asked.
+
+    Patterns are shell globs over "category:target" (see tools.safety), e.g.
+    "network:*", "file-delete:os.remove" or "*:subprocess.*". Any finding
+    matching ``deny`` rejects the request; otherwise it is approved when
+    every finding matches ``approve``.
+    """
+
+    approve: List[str] = field(default_factory=list)
+    deny: List[str] = field(default_factory=list)
+
+    def decide(self, findings: Iterable[Finding]) -> Optional[bool]:
+        """True/False for an automatic decision, None to ask a human."""
+        keys = [f"{f.category}:{f.target}" for f in findings]
+        if any(fnmatch.fnmatchcase(k, p) for k in keys for p in self.deny):
+            return False
+        if keys and all(any(fnmatch.fnmatchcase(k, p) for p in self.approve) for k in keys):
+            return True
+        return None
+
+
+class ApprovalQueue:
+    """
+    Thread-safe store of pending approval requests.
+
+    Example:
+        approvals = ApprovalQueue(ApprovalPolicy(deny=["file-delete:*"]), timeout=600)
+        HttpApprovalSource(approvals, port=8765).start()
+        DockerSandboxTool(approvals=approvals)
+    """
+
+    def __init__(
+        self,
+        policy: Optional[ApprovalPolicy] = None,
+        timeout: Optional[float] = 300.0,
+        approve_on_timeout: bool = False,
+        keep_decided: int = 100,
+    ):
+        """
+        Args:
+            policy: Automatic approve/deny rules. Defaults to asking for everything.
+            timeout: Seconds a request may stay pending (None waits forever).
+            approve_on_timeout: Decision applied to expired requests.
+            keep_decided: Decided requests retained for inspection.
+        """
+        self.policy = policy or ApprovalPolicy()
+        self.timeout = timeout
+        self.approve_on_timeout = approve_on_timeout
+        self.keep_decided = keep_decided
+        self._requests: Dict[str, ApprovalRequest] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[ApprovalRequest], None]] = []
+
+        # Metrics
+        self.auto_approved = 0
+        self.auto_denied = 0
+        self.approved = 0
+        self.denied = 0
+        self.expired = 0
+
+    def subscribe(self, listener: Callable[[ApprovalRequest], None]) -> None:
+        """Call ``listener`` whenever a request is parked or decided."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def submit(self, code: str, findings: List[Finding], label: str = "") -> ApprovalRequest:
+        """
+        Apply the policy and park the request if a human must decide.
+
+        Args:
+            code: The script awaiting approval
+            findings: Why it was flagged
+            label: Shown to reviewers, e.g. the run and attempt
+
+        Returns:
+            The request; already decided if a policy rule matched
+        """
+        request = ApprovalRequest(uuid.uuid4().hex[:8], code, list(findings), label)
+        if self.timeout is not None:
+            request.deadline = request.created + self.timeout
+
+        decision = self.policy.decide(request.findings)
+        with self._lock:
+            self._requests[request.id] = request
+            if decision is not None:
+                if decision:
+                    self.auto_approved += 1
+                else:
+                    self.auto_denied += 1
+                self._settle(request, APPROVED if decision else DENIED, "policy", "")
+        self._notify(request)
+        return request
+
+    def decide(self, request_id: str, approve: bool, by: str = "", reason: str = "") -> bool:
+        """
+        Record a human decision.
+
+        Args:
+            request_id: ID of a pending request
+            approve: True to let the execution run
+            by: Who decided (source name or user)
+            reason: Optional note kept with the request
+
+        Returns:
+            False if the request is unknown or no longer pending
+        """
+        with self._lock:
+            request = self._requests.get(request_id)
+            if request is None or request.status != PENDING:
+                return False
+            if approve:
+                self.approved += 1
+            else:
+                self.denied += 1
+            self._settle(request, APPROVED if approve else DENIED, by, reason)
+        self._notify(request)
+        return True
+
+    def wait(self, request: ApprovalRequest) -> bool:
+        """
+        Block the calling thread until ``request`` is decided or expires.
+
+        Returns:
+            True if the execution may run
+        """
+        remaining = None if request.deadline is None else request.deadline - time.time()
+        if not request._event.wait(remaining):
+            with self._lock:
+                if request.status == PENDING:
+                    self.expired += 1
+                    self._settle(request, EXPIRED, "timeout", "No decision before the deadline")
+            self._notify(request)
+        if request.status == EXPIRED:
+            return self.approve_on_timeout
+        return request.approved
+
+    def request_approval(self, code: str, findings: List[Finding], label: str = "") -> bool:
+        """Submit and wait; the synchronous entry point used by the sandbox."""
+        return self.wait(self.submit(code, findings, label))
+
+    def get(self, request_id: str) -> Optional[ApprovalRequest]:
+        with self._lock:
+            return self._requests.get(request_id)
+
+    def pending(self) -> List[ApprovalRequest]:
+        """Requests still waiting for a human, oldest first."""
+        with self._lock:
+            return [r for r in self._requests.values() if r.status == PENDING]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": sum(r.status == PENDING for r in self._requests.values()),
+                "auto_approved": self.auto_approved,
+                "auto_denied": self.auto_denied,
+                "approved": self.approved,
+                "denied": self.denied,
+                "expired": self.expired,
+            }
+
+    def _settle(self, request: ApprovalRequest, status: str, by: str, reason: str) -> None:
+        """Mark a request decided and drop the oldest decided ones (lock held)."""
+        request.status = status
+        request.decided_by = by
+        request.reason = reason
+        request._event.set()
+
+        decided = [k for k, r in self._requests.items() if r.status != PENDING]
+        for key in decided[:max(0, len(decided) - self.keep_decided)]:
+            del self._requests[key]
+
+    def _notify(self, request: ApprovalRequest) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(request)
+            except Exception as e:
+                print(f"⚠️ Approval listener failed: {e}")
+
+
+# =============================================================================
+# Approval Sources
+# =============================================================================
+
+class FileApprovalSource:
+    """
+    Approvals through a watched directory.
+
+    Each pending request is written to ``<directory>/<id>.json``. Create
+    ``<id>.approve`` or ``<id>.deny`` (its content is kept as the reason)
+    to decide; the files are removed once the request is settled.
+    """
+
+    def __init__(self, queue: ApprovalQueue, directory: str, poll_interval: float = 1.0):
+        self.queue = queue
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+        queue.subscribe(self._on_change)
+
+    def start(self) -> "FileApprovalSource":
+        self._thread = threading.Thread(target=self._loop, name="approvals-file", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def poll(self) -> None:
+        """Apply any decision files now."""
+        for request in self.queue.pending():
+            for suffix, approve in ((".approve", True), (".deny", False)):
+                path = os.path.join(self.directory, request.id + suffix)
+                if os.path.exists(path):
+                    with open(path, encoding="utf-8", errors="replace") as f:
+                        reason = f.read().strip()
+                    self.queue.decide(request.id, approve, by="file", reason=reason)
+                    break
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def _on_change(self, request: ApprovalRequest) -> None:
+        base = os.path.join(self.directory, request.id)
+        if request.status == PENDING:
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(request.to_dict(), f, indent=2)
+            return
+        for suffix in (".json", ".approve", ".deny"):
+            try:
+                os.remove(base + suffix)
+            except FileNotFoundError:
+                pass
+
+
+class _SocketHandler(socketserver.StreamRequestHandler):
+    """Line protocol: "list", "show <id>", "approve <id> [reason]", "deny <id> [reason]"."""
+
+    def handle(self):
+        queue: ApprovalQueue = self.server.approvals
+        for raw in self.rfile:
+            parts = raw.decode("utf-8", errors="replace").strip().split(None, 2)
+            if not parts:
+                continue
+            command = parts[0].lower()
+            if command == "list":
+                reply = "\n".join(
+                    f"{r.id} {r.label} {'; '.join(str(f) for f in r.findings)}"
+                    for r in queue.pending()
+                ) or "no pending requests"
+            elif command == "show" and len(parts) > 1:
+                request = queue.get(parts[1])
+                reply = json.dumps(request.to_dict()) if request else "ERROR: unknown request"
+            elif command in ("approve", "deny") and len(parts) > 1:
+                reason = parts[2] if len(parts) > 2 else ""
+                ok = queue.decide(parts[1], command == "approve", by="socket", reason=reason)
+                reply = "OK" if ok else "ERROR: unknown or already decided request"
+            elif command == "quit":
+                return
+            else:
+                reply = "ERROR: expected list | show <id> | approve <id> [reason] | deny <id> [reason]"
+            self.wfile.write((reply + "\n").encode("utf-8"))
+
+
+class SocketApprovalSource:
+    """Approvals over a local TCP socket (e.g. ``nc 127.0.0.1 8766``)."""
+
+    def __init__(self, queue: ApprovalQueue, host: str = "127.0.0.1", port: int = 8766):
+        self.server = socketserver.ThreadingTCPServer((host, port), _SocketHandler)
+        self.server.daemon_threads = True
+        self.server.approvals = queue
+        self.port = self.server.server_address[1]
+
+    def start(self) -> "SocketApprovalSource":
+        threading.Thread(target=self.server.serve_forever, name="approvals-socket",
+                         daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _HttpHandler(BaseHTTPRequestHandler):
+    """GET /approvals[/<id>], POST /approvals/<id>/approve|deny."""
+
+    def do_GET(self):
+        if self._refused():
+            return
+        queue: ApprovalQueue = self.server.approvals
+        parts = self.path.strip("/").split("/")
+        if parts == ["approvals"]:
+            self._reply(200, [r.to_dict() for r in queue.pending()])
+        elif len(parts) == 2 and parts[0] == "approvals" and queue.get(parts[1]):
+            self._reply(200, queue.get(parts[1]).to_dict())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self._refused():
+            return
+        queue: ApprovalQueue = self.server.approvals
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "approvals" or parts[2] not in ("approve", "deny"):
+            self._reply(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": "invalid JSON"})
+            return
+        ok = queue.decide(parts[1], parts[2] == "approve",
+                          by=str(body.get("by", "http")), reason=str(body.get("reason", "")))
+        if ok:
+            self._reply(200, queue.get(parts[1]).to_dict())
+        else:
+            self._reply(409, {"error": "unknown or already decided request"})
+
+    def _refused(self) -> bool:
+        """Reply with an error to requests that may come from a browser page."""
+        refused = rejection(self, self.server.token)
+        if refused is not None:
+            self._reply(refused[0], {"error": refused[1]})
+        return refused is not None
+
+    def _reply(self, status: int, payload) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpApprovalSource:
+    """Approvals over a local HTTP endpoint (``Authorization: Bearer <token>``)."""
+
+    def __init__(self, queue: ApprovalQueue, host: str = "127.0.0.1", port: int = 8765,
+                 token: Optional[str] = None):
+        self.server = ThreadingHTTPServer((host, port), _HttpHandler)
+        self.server.daemon_threads = True
+        self.server.approvals = queue
+        self.server.token = self.token = token or new_token()
+        self.port = self.server.server_address[1]
+
+    def start(self) -> "HttpApprovalSource":
+        threading.Thread(target=self.server.serve_forever, name="approvals-http",
+                         daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
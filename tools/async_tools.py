@@ -0,0 +1,97 @@
+"""
+Asyncio Support for the Agent Tools
+
+Lets one event loop drive many crews (``Crew.akickoff``) through the tools:
+- NativeAsyncTool: base class for tools with an ``_arun``. CrewAI's async
+  path otherwise runs ``_run`` via ``run_in_executor``, which drops context
+  variables (the active run workspace, result collectors) and cannot be
+  cancelled; these tools are awaited on the loop instead. That path uses
+  CrewStructuredTool internals; on a crewai release without them the tool
+  runs in a worker thread (context kept, but not cancellable)
+- CancelToken: thread-safe cancellation signal a blocking execution can
+  subscribe to, e.g. to kill its container when the awaiting task is cancelled
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Callable, List
+
+# Windows compatibility - must be imported before crewai
+import win_patch
+
+from crewai.tools import BaseTool
+from crewai.tools.structured_tool import CrewStructuredTool
+from pydantic import PrivateAttr
+
+# Private CrewStructuredTool members the native path needs (present in 1.x)
+_NATIVE_HOOKS = ("_parse_args", "_increment_usage_count", "has_reached_max_usage_count")
+_HAS_NATIVE_HOOKS = all(callable(getattr(CrewStructuredTool, name, None))
+                        for name in _NATIVE_HOOKS)
+
+
+class _LoopStructuredTool(CrewStructuredTool):
+    """Structured tool whose async invocation awaits the tool's ``_arun``."""
+
+    _native_tool: Any = PrivateAttr(default=None)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        if not _HAS_NATIVE_HOOKS:
+            # Public API only: run() validates and counts usage itself;
+            # to_thread carries the caller's context variables along
+            args = json.loads(input) if isinstance(input, str) else dict(input or {})
+            return await asyncio.to_thread(self._native_tool.run, **args, **kwargs)
+        if self.has_reached_max_usage_count():
+            # Let CrewAI raise its usual usage-limit error
+            return await super().ainvoke(input, config, **kwargs)
+        parsed_args = self._parse_args(input)
+        self._increment_usage_count()
+        return await self._native_tool._arun(**parsed_args, **kwargs)
+
+
+class NativeAsyncTool(BaseTool):
+    """
+    BaseTool whose ``_arun`` is used by async crews.
+
+    Subclasses implement both ``_run`` (sync crews) and ``_arun``.
+    """
+
+    def to_structured_tool(self) -> CrewStructuredTool:
+        structured = super().to_structured_tool()
+        native = _LoopStructuredTool.model_construct(
+            **{name: getattr(structured, name) for name in CrewStructuredTool.model_fields}
+        )
+        native._original_tool = self
+        native._native_tool = self
+        return native
+
+
+class CancelToken:
+    """Cancellation flag with callbacks, safe to use across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """Set the flag and run every registered callback once."""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` on cancellation (immediately if already cancelled)."""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
@@ -0,0 +1,374 @@
+"""
+Warm Container Pool for the Docker Sandbox
+
+Keeps a set of pre-started sandbox containers so that executions skip the
+container create/start/stop cycle:
+- Configurable minimum (pre-warmed) and maximum (hard cap) pool size
+- Health check before a container is handed out
+- Reset step between uses so runs do not leak state into each other
+  (each container has a private /workspace, nothing is shared with the host)
+- Idle containers above the minimum are reaped after a timeout
+- Memory, CPU and PID limits applied to every container
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from tools.docker_client import get_client
+from tools.limits import ExecutionLimits
+from tracing import annotate, traced
+
+
+# Image used for all sandbox containers
+DEFAULT_IMAGE = "mcr.microsoft.com/devcontainers/python:3.11"
+
+# Label attached to every pooled container (useful for manual cleanup)
+POOL_LABEL = "local-dev-team.pool"
+
+# Command run inside a container before it goes back to the pool.
+# Kills anything left over from the previous script and wipes the private
+# workspace and scratch space so the next run starts clean.
+RESET_COMMAND = (
+    "/bin/sh -c \"pkill -9 -f '^python /workspace/' ; "
+    "find /workspace /tmp -mindepth 1 -delete ; true\""
+)
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no container becomes available within the acquire timeout."""
+
+
+class ContainerPool:
+    """
+    Thread-safe pool of long-lived sandbox containers.
+
+    Containers run ``sleep infinity`` and are reused across executions.
+    A container is health-checked when acquired and reset when released;
+    any container failing either step is discarded and replaced on demand.
+    """
+
+    def __init__(
+        self,
+        image: str = DEFAULT_IMAGE,
+        min_size: int = 1,
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        acquire_timeout: float = 60.0,
+        reap_interval: Optional[float] = 30.0,
+        limits: Optional[ExecutionLimits] = None,
+        client=None,
+    ):
+        """
+        Args:
+            image: Docker image used for sandbox containers.
+            min_size: Number of containers kept warm at all times.
+            max_size: Maximum number of containers (idle + in use).
+            idle_timeout: Seconds a surplus idle container is kept before reaping.
+            acquire_timeout: Default seconds to wait for a free container.
+            reap_interval: Seconds between background reaper passes (None disables
+                the thread; reaping then only happens on acquire/release).
+            limits: Memory, CPU and PID limits applied to every container.
+                Defaults to ``ExecutionLimits.from_env()``.
+            client: Optional docker client. Defaults to the shared client
+                (``tools.docker_client.get_client``) on first use.
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self.image = image
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.reap_interval = reap_interval
+        self.limits = limits or ExecutionLimits.from_env()
+
+        self._client = client
+        self._idle = deque()  # (container, last_used) pairs, most recently used last
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.reaped = 0
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    @property
+    def client(self):
+        """Docker client, resolved lazily so constructing a pool is free."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    def start(self) -> None:
+        """Pre-warm the pool up to ``min_size`` and start the reaper thread."""
+        with self._cond:
+            missing = self.min_size - self._size()
+            self._in_use += max(missing, 0)  # reserve the slots while creating
+
+        for _ in range(max(missing, 0)):
+            try:
+                container = self._create_container()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._in_use -= 1
+                self._idle.append((container, time.monotonic()))
+                self._cond.notify()
+
+        if self.reap_interval and self._reaper is None:
+            self._reaper = threading.Thread(
+                target=self._reap_loop, name="container-pool-reaper", daemon=True
+            )
+            self._reaper.start()
+
+    def with_limits(self, limits: ExecutionLimits) -> "ContainerPool":
+        """
+        Create a sibling pool whose containers use different limits.
+
+        The sibling shares this pool's image, maximum size and
+        docker client but keeps no warm minimum; its reaper is running, so
+        it drains when unused.
+        """
+        return self._sibling(self.image, limits)
+
+    def with_image(self, image: str) -> "ContainerPool":
+        """
+        Create a sibling pool whose containers run a different image.
+
+        Like ``with_limits``, the sibling keeps this pool's limits, maximum
+        size and docker client, and no warm minimum.
+        """
+        return self._sibling(image, self.limits)
+
+    def _sibling(self, image: str, limits: ExecutionLimits) -> "ContainerPool":
+        sibling = ContainerPool(
+            image=image,
+            min_size=0,
+            max_size=self.max_size,
+            idle_timeout=self.idle_timeout,
+            acquire_timeout=self.acquire_timeout,
+            reap_interval=self.reap_interval,
+            limits=limits,
+            client=self._client,
+        )
+        # No containers to warm; this starts the reaper so idle ones drain
+        # even if the sibling is never used again
+        sibling.start()
+        return sibling
+
+    def close(self) -> None:
+        """Stop the reaper and remove every idle container."""
+        self._stop_reaper.set()
+        with self._cond:
+            self._closed = True
+            idle = [c for c, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for container in idle:
+            self._remove_container(container)
+
+    # -------------------------------------------------------------------------
+    # Acquire / Release
+    # -------------------------------------------------------------------------
+
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Take a healthy container from the pool, starting one if needed.
+
+        Args:
+            timeout: Seconds to wait when the pool is at ``max_size``.
+                Defaults to ``acquire_timeout``.
+
+        Returns:
+            A running docker container.
+
+        Raises:
+            PoolExhaustedError: If no container frees up within the timeout.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                while not self._idle and self._size() >= self.max_size:
+                    if self._closed:
+                        raise RuntimeError("Container pool is closed")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhaustedError(
+                            f"No sandbox container available after {timeout:.0f}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+                if self._closed:
+                    raise RuntimeError("Container pool is closed")
+
+                self._in_use += 1
+                container = self._idle.pop()[0] if self._idle else None
+
+            if container is None:
+                try:
+                    container = self._create_container()
+                except Exception:
+                    self._release_slot()
+                    raise
+                self.misses += 1
+                annotate(pool_hit=False)
+                return container
+
+            if self._is_healthy(container):
+                self.hits += 1
+                annotate(pool_hit=True)
+                return container
+
+            # Unhealthy: drop it and try again with the freed slot
+            self._release_slot()
+            self._remove_container(container)
+            self.discarded += 1
+
+    def release(self, container, healthy: bool = True) -> None:
+        """
+        Return a container to the pool after resetting it.
+
+        Args:
+            container: Container previously obtained from ``acquire``.
+            healthy: False if the caller saw the container misbehave; it is
+                then discarded instead of being reused.
+        """
+        if healthy and not self._closed:
+            healthy = self._reset(container)
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and not self._closed:
+                self._idle.append((container, time.monotonic()))
+                container = None
+            self._cond.notify()
+
+        if container is not None:
+            self._remove_container(container)
+            self.discarded += 1
+
+        self.reap_idle()
+
+    def discard(self, container) -> None:
+        """Remove a container obtained from ``acquire`` without reusing it."""
+        self.release(container, healthy=False)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """Context manager around ``acquire``/``release``."""
+        container = self.acquire(timeout)
+        healthy = True
+        try:
+            yield container
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self.release(container, healthy=healthy)
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    def reap_idle(self) -> int:
+        """
+        Remove idle containers above ``min_size`` unused for ``idle_timeout``.
+
+        Returns:
+            Number of containers removed.
+        """
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            # Oldest idle containers sit at the left end of the deque
+            while (
+                self._idle
+                and self._size() > self.min_size
+                and now - self._idle[0][1] >= self.idle_timeout
+            ):
+                expired.append(self._idle.popleft()[0])
+
+        for container in expired:
+            self._remove_container(container)
+        self.reaped += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        """Snapshot of pool occupancy and hit/miss counters."""
+        with self._cond:
+            return {
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+                "reaped": self.reaped,
+            }
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _size(self) -> int:
+        return len(self._idle) + self._in_use
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    @traced("container.create")
+    def _create_container(self):
+        # No host bind mount: /workspace lives in the container's own layer so
+        # concurrent runs are isolated. Files are copied in and out with
+        # put_archive/get_archive.
+        return self.client.containers.run(
+            self.image,
+            command="sleep infinity",  # Lives until the pool removes it
+            detach=True,
+            remove=True,
+            working_dir="/workspace",
+            labels={POOL_LABEL: "sandbox"},
+            **self.limits.container_kwargs()
+        )
+
+    def _is_healthy(self, container) -> bool:
+        try:
+            container.reload()
+            return container.status == "running"
+        except Exception:
+            return False
+
+    def _reset(self, container) -> bool:
+        try:
+            return container.exec_run(RESET_COMMAND).exit_code == 0
+        except Exception:
+            return False
+
+    def _remove_container(self, container) -> None:
+        try:
+            container.remove(force=True)
+        except Exception:
+            pass  # Already gone (auto-remove) or daemon unreachable
+
+    def _reap_loop(self) -> None:
+        while not self._stop_reaper.wait(self.reap_interval):
+            self.reap_idle()
@@ -0,0 +1,34 @@
+"""
+Shared Docker Client
+
+One ``docker.from_env()`` client per process, created on first use. The
+container pool and the dependency image cache both default to it, so
+startup opens no connection to the daemon and a run opens only one.
+docker-py is imported at the same time, keeping it off the import path
+of code that never touches the sandbox.
+"""
+
+import threading
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide Docker client (connects on the first call)."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import docker
+                _client = docker.from_env()
+    return _client
+
+
+def reset_client() -> None:
+    """Close and forget the shared client; the next ``get_client`` reconnects."""
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
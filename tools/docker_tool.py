@@ -2,24 +2,78 @@
 Docker Sandbox Tool for CrewAI
 
 Runs Python code in an isolated Docker container with:
-- Safety gate for dangerous commands (requires user approval)
-- Volume mounting for file persistence to host ./workspace directory
+- Safety gate for dangerous commands (requires approval, optionally via
+  a non-blocking ApprovalQueue)
+- Per-run isolated workspaces seeded with the files in ./workspace; new
+  files are promoted to ./workspace on success
+- Warm container pool so executions skip container startup
+- Code and helper files injected in a single in-memory tar stream
+- Streamed stdout/stderr with a size cap and optional abort on traceback
+- Wall-clock, memory, CPU and PID limits with a fast kill path
+- Memoized results for byte-identical deterministic code
+- Async execution (``execute_result_async`` / ``_arun``) whose cancellation
+  kills the container
+- Typed ExecutionResult per run (exit code, stdout/stderr, duration,
+  CPU/memory usage), recorded for the orchestrator out of band
+- Third-party imports detected before the run and served from a cached
+  image with those packages installed
+- Trace spans per stage (safety, image, acquire/create, inject, exec,
+  artifacts, release) when a trace is active
 """
 
+import asyncio
+import contextvars
 import os
-import docker
+import threading
 import tarfile
 import io
 import time
-import base64
+import posixpath
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 # Windows compatibility - must be imported before crewai
 import win_patch
 
-from crewai.tools import BaseTool
+from pydantic import PrivateAttr
+from tools.approvals import ApprovalQueue
+from tools.async_tools import CancelToken, NativeAsyncTool
+from tools.container_pool import ContainerPool
+from tools.exec_stream import (
+    USAGE_RUNNER, ChunkDecoder, ExecStream, OutputCapture, TracebackDetector, split_usage
+)
+from tools.limits import ExecutionLimits, SIGKILL_EXIT_CODE, TIMEOUT_EXIT_CODE
+from tools.result_cache import CachedExecution, ExecutionCache, is_cacheable
+from tools.result_cache import make_key as make_cache_key
+from tools.results import (
+    CANCELLED, DENIED, ERROR, OOM, SUCCESS, SYSTEM_ERROR, TIMEOUT, ExecutionResult, record
+)
+from tools.safety import Finding, scan_code
+from tools.sandbox_images import ImageBuildError, SandboxImages, detect_requirements
+from tools.workspace import RunWorkspace, WorkspaceManager, current_workspace
+from tracing import annotate, span
 
 
-# Keywords that trigger human approval before execution
+# Guards lazy creation of the default container pool and workspace manager
+_POOL_LOCK = threading.Lock()
+
+# Directory inside the container where code is written and executed
+WORKSPACE_DIR = "/workspace"
+
+# File name the submitted code is saved under inside WORKSPACE_DIR
+SCRIPT_NAME = "script.py"
+
+# Extra seconds after the in-container timeout before the host kills the container
+KILL_GRACE_SECONDS = 3.0
+
+# Results that depend only on the code and are safe to memoize; timeouts,
+# OOM kills and Docker failures are environmental and always re-run
+CACHEABLE_STATUSES = (SUCCESS, ERROR)
+
+# Operations that need human approval before execution. Detection is done by
+# tools.safety, which resolves call targets; this list is kept for callers
+# that display or extend the categories
 DANGEROUS_KEYWORDS = [
     "rm ", "rm(",           # File deletion
     "rmdir", "shutil.rmtree",
@@ -31,25 +85,211 @@ DANGEROUS_KEYWORDS = [
     "subprocess.call", "subprocess.run", "os.system",  # Shell commands
 ]
 
+# Serializes console prompts from concurrent executions
+_CONSOLE_LOCK = threading.Lock()
+
 
-class DockerSandboxTool(BaseTool):
+def build_archive(files: Dict[str, Union[str, bytes]]) -> bytes:
+    """
+    Pack files into an uncompressed tar archive held in memory.
+    
+    Args:
+        files: Mapping of relative POSIX paths to text or bytes content
+        
+    Returns:
+        The tar archive as bytes, ready for ``container.put_archive``
+        
+    Raises:
+        ValueError: If a path is absolute or escapes the target directory
+    """
+    buffer = io.BytesIO()
+    now = int(time.time())
+    added_dirs = set()
+    
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for path, content in files.items():
+            name = posixpath.normpath(path.replace("\\", "/"))
+            if name.startswith("/") or name == ".." or name.startswith("../") or name == ".":
+                raise ValueError(f"Invalid file path for sandbox: {path!r}")
+            
+            # Explicit entries for parent directories of nested files
+            parent = posixpath.dirname(name)
+            parents = []
+            while parent and parent not in added_dirs:
+                parents.append(parent)
+                parent = posixpath.dirname(parent)
+            for directory in reversed(parents):
+                info = tarfile.TarInfo(directory)
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                info.mtime = now
+                tar.addfile(info)
+                added_dirs.add(directory)
+            
+            data = content.encode("utf-8") if isinstance(content, str) else content
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = now
+            tar.addfile(info, io.BytesIO(data))
+    
+    return buffer.getvalue()
+
+
+class DockerSandboxTool(NativeAsyncTool):
     """
     Runs Python code in a secure, isolated Docker container.
     
     Features:
-    - Human approval gate for dangerous operations
-    - Volume mounting: Files written to /workspace in container 
-      appear in ./workspace on host machine
+    - Human approval gate for dangerous operations; with ``approvals`` set,
+      flagged runs are parked in the queue instead of prompting on stdin
+    - Isolated workspaces: each run writes to the container's private
+      /workspace, which starts with a copy of the files in ./workspace;
+      on success the files it created or changed are copied back to
+      ./workspace on the host machine
+    - Container reuse: executions lease a pre-started container from a
+      ContainerPool instead of creating one per call
+    - Streaming: stdout/stderr chunks are delivered to ``on_output`` as they
+      arrive and capped at ``limits.max_output_bytes`` per stream
+    - Limits: every run is bounded by ``limits`` (overridable per call via
+      ``execute``); runs that hit them return TIMEOUT/OOM results
+    - Result cache: with ``result_cache`` set, re-running identical
+      deterministic code returns the stored output and artifacts without
+      leasing a container
+    - Dependencies: with ``images`` set, scripts importing third-party
+      packages run in a cached image that has them installed
     """
     
     name: str = "Docker Sandbox Executor"
     description: str = (
         "Runs Python code in a secure, isolated Docker container. "
         "Input should be a raw string of valid Python code. "
-        "Files saved to the current directory will persist in ./workspace on host. "
+        "Optionally pass 'files', a mapping of relative paths to file contents, "
+        "to make helper modules or data files available next to the script. "
+        "Files in ./workspace on host can be read from the current directory, "
+        "and files saved there will persist in ./workspace. "
         "Returns the standard output (stdout) or error (stderr)."
     )
     
+    # Warm container pool; a default pool is created on first execution
+    pool: Optional[ContainerPool] = None
+    
+    # Called with (stream_name, text) for every chunk while the code runs
+    on_output: Optional[Callable[[str, str], None]] = None
+    
+    # Stop as soon as the first complete traceback appears on stderr; only
+    # for scripts that never print a traceback they recover from
+    abort_on_traceback: bool = False
+    
+    # Deployment-wide limits; None uses the pool's limits (SANDBOX_* env vars)
+    limits: Optional[ExecutionLimits] = None
+    
+    # Per-run staging directories; a default manager is created on first use
+    workspaces: Optional[WorkspaceManager] = None
+    
+    # Memoized results of deterministic runs (None disables caching)
+    result_cache: Optional[ExecutionCache] = None
+    
+    # Where flagged runs wait for a decision (None prompts on the console)
+    approvals: Optional[ApprovalQueue] = None
+    
+    # Images with a script's dependencies installed (None runs everything
+    # on the pool's image)
+    images: Optional[SandboxImages] = None
+    
+    # Pools for calls whose image or container limits differ from the main pool's
+    _override_pools: Dict[Tuple, ContainerPool] = PrivateAttr(default_factory=dict)
+    
+    # The image cache whose evictions close the matching pools
+    _watched_images: Optional[SandboxImages] = PrivateAttr(default=None)
+    
+    def _get_pool(self, limits: Optional[ExecutionLimits] = None,
+                  image: Optional[str] = None) -> ContainerPool:
+        """
+        Return the container pool for a set of limits and image, creating it if needed.
+        
+        Calls whose memory/CPU/PID limits and image match the main pool
+        share it; others get their own pool (no warm minimum) since cgroup
+        limits and the image are fixed when a container starts.
+        
+        Args:
+            limits: Limits of the execution, or None for the deployment defaults
+            image: Image of the execution, or None for the main pool's
+            
+        Returns:
+            The ContainerPool used for the execution
+        """
+        with _POOL_LOCK:
+            if self.pool is None:
+                self.pool = ContainerPool(limits=self.limits)
+            return self._pool_for(limits, image)
+    
+    def _pool_for(self, limits: Optional[ExecutionLimits], image: Optional[str]) -> ContainerPool:
+        # Caller holds _POOL_LOCK
+        same_image = image is None or image == self.pool.image
+        wanted = (limits or self.pool.limits).container_kwargs()
+        if same_image and wanted == self.pool.limits.container_kwargs():
+            return self.pool
+        
+        key = (None if same_image else image,) + tuple(sorted(wanted.items()))
+        pool = self._override_pools.get(key)
+        if pool is None:
+            if same_image:
+                pool = self.pool.with_limits(limits)
+            else:
+                pool = self._pool_for(limits, None).with_image(image)
+            self._override_pools[key] = pool
+        return pool
+    
+    def close(self) -> None:
+        """Close the pools this tool created for other images or limits."""
+        with _POOL_LOCK:
+            pools = list(self._override_pools.values())
+            self._override_pools.clear()
+        for pool in pools:
+            pool.close()
+    
+    def _drop_image_pools(self, image: str) -> None:
+        """Close the pools running ``image`` so it can be removed."""
+        with _POOL_LOCK:
+            keys = [key for key in self._override_pools if key[0] == image]
+            pools = [self._override_pools.pop(key) for key in keys]
+        for pool in pools:
+            # Idle containers go now; busy ones when they are released
+            pool.close()
+    
+    def _image_for(self, code: str, files: Optional[Dict[str, str]]) -> Optional[str]:
+        """
+        Image with the script's third-party imports installed, if any are needed.
+        
+        A set that cannot be installed runs on the pool's image, where the
+        script fails with an ImportError the Engineer can act on.
+        """
+        if self.images is None:
+            return None
+        requirements = detect_requirements(code, files)
+        if not requirements:
+            return None
+        with _POOL_LOCK:
+            if self._watched_images is not self.images:
+                self.images.subscribe(self._drop_image_pools)
+                self._watched_images = self.images
+        with span("sandbox.image", requirements=requirements):
+            try:
+                return self.images.image_for(requirements)
+            except ImageBuildError as e:
+                print(f"⚠️ {e}")
+                annotate(error=str(e))
+                return None
+    
+    def _effective_limits(self, overrides: Optional[ExecutionLimits]) -> ExecutionLimits:
+        """Per-call limits if given, else the deployment limits."""
+        if overrides is not None:
+            return overrides
+        if self.limits is not None:
+            return self.limits
+        return self._get_pool().limits
+    
     def _check_dangerous(self, code: str) -> bool:
         """
         Check if the code contains dangerous operations.
@@ -58,98 +298,477 @@ class DockerSandboxTool(BaseTool):
             code: The Python code to check
             
         Returns:
-            True if dangerous keywords found, False otherwise
+            True if dangerous operations found, False otherwise
+        """
+        return bool(scan_code(code, SCRIPT_NAME))
+    
+    def find_dangerous(self, code: str,
+                       files: Optional[Dict[str, str]] = None) -> List[Finding]:
+        """
+        Find dangerous operations in the script and its Python helper files.
+        
+        Args:
+            code: The Python code to check
+            files: Optional extra files (relative path -> content)
+            
+        Returns:
+            Findings with the resolved call target and source line
         """
-        code_lower = code.lower()
-        for keyword in DANGEROUS_KEYWORDS:
-            if keyword.lower() in code_lower:
-                return True
-        return False
+        findings = scan_code(code, SCRIPT_NAME)
+        for name, content in sorted((files or {}).items()):
+            if name.endswith(".py") and isinstance(content, str):
+                findings.extend(scan_code(content, name))
+        return findings
     
-    def _request_approval(self, code: str) -> bool:
+    def _request_approval(self, code: str,
+                          findings: Optional[List[Finding]] = None) -> bool:
         """
         Request human approval for dangerous code execution.
         
         Args:
             code: The dangerous code to review
+            findings: What made the code dangerous, shown to the reviewer
             
         Returns:
             True if user approves, False otherwise
         """
-        print("\n" + "="*60)
-        print("⚠️  HUMAN APPROVAL REQUIRED")
-        print("="*60)
-        print("The agent wants to execute code with potentially dangerous operations:")
-        print("-"*60)
-        print(code[:500] + ("..." if len(code) > 500 else ""))
-        print("-"*60)
+        if self.approvals is not None:
+            # Only this execution waits; other tasks keep running
+            workspace = current_workspace()
+            label = workspace.label if workspace else ""
+            return self.approvals.request_approval(code, findings or [], label)
         
-        try:
-            response = input("Allow execution? [y/N]: ").strip().lower()
-            return response == 'y'
-        except EOFError:
-            # Non-interactive mode, deny by default
-            print("Non-interactive mode detected. Denying by default.")
-            return False
+        with _CONSOLE_LOCK:
+            print("\n" + "="*60)
+            print("⚠️  HUMAN APPROVAL REQUIRED")
+            print("="*60)
+            print("The agent wants to execute code with potentially dangerous operations:")
+            for finding in findings or []:
+                print(f"  - {finding}")
+            print("-"*60)
+            print(code[:500] + ("..." if len(code) > 500 else ""))
+            print("-"*60)
+            
+            try:
+                response = input("Allow execution? [y/N]: ").strip().lower()
+                return response == 'y'
+            except EOFError:
+                # Non-interactive mode, deny by default
+                print("Non-interactive mode detected. Denying by default.")
+                return False
     
-    def _run(self, code: str) -> str:
+    def _run(self, code: str, files: Optional[Dict[str, str]] = None) -> str:
         """
         Execute Python code in a Docker container.
         
         Args:
             code: Python code to execute
+            files: Optional extra files (relative path -> content) written
+                to the workspace alongside the script
             
         Returns:
             Execution output or error message
         """
-        # Safety check
-        if self._check_dangerous(code):
-            if not self._request_approval(code):
-                return "EXECUTION DENIED: User rejected potentially dangerous code."
+        return self.execute(code, files=files)
+    
+    def execute(
+        self,
+        code: str,
+        files: Optional[Dict[str, str]] = None,
+        limits: Optional[ExecutionLimits] = None,
+        cache: bool = True,
+    ) -> str:
+        """
+        Execute Python code in a Docker container under resource limits.
+        
+        This is the programmatic entry point; unlike the agent-facing
+        ``_run`` it accepts per-call limits.
+        
+        Args:
+            code: Python code to execute
+            files: Optional extra files (relative path -> content) written
+                to the workspace alongside the script
+            limits: Per-call limits; defaults to the deployment limits
+            cache: Set to False to always run, even if ``result_cache``
+                holds a result for identical code
+            
+        Returns:
+            Execution output or error message. Runs that exceed the time or
+            memory limit start with "TIMEOUT:" or "OOM:".
+        """
+        return str(self.execute_result(code, files=files, limits=limits, cache=cache))
+    
+    async def _arun(self, code: str, files: Optional[Dict[str, str]] = None) -> str:
+        """Async ``_run``; used by crews started with ``akickoff``."""
+        return str(await self.execute_result_async(code, files=files))
+    
+    def execute_result(
+        self,
+        code: str,
+        files: Optional[Dict[str, str]] = None,
+        limits: Optional[ExecutionLimits] = None,
+        cache: bool = True,
+        cancel: Optional[CancelToken] = None,
+    ) -> ExecutionResult:
+        """
+        Like ``execute``, but return the structured result.
         
-        client = docker.from_env()
+        The result is also recorded for the active ``collect_results``
+        context, so orchestrators see it without parsing agent output.
+        
+        Args:
+            cancel: Token that aborts the run and kills its container
+            
+        Returns:
+            The ExecutionResult; ``str()`` of it is what ``execute`` returns
+        """
+        with span("tool.sandbox"):
+            result = self._execute(code, files, limits, cache, cancel)
+            annotate(status=result.status, exit_code=result.exit_code, cached=result.cached)
+        record(result)
+        return result
+    
+    async def execute_result_async(
+        self,
+        code: str,
+        files: Optional[Dict[str, str]] = None,
+        limits: Optional[ExecutionLimits] = None,
+        cache: bool = True,
+    ) -> ExecutionResult:
+        """
+        Async ``execute_result``; the blocking Docker calls run in a thread.
         
-        # Ensure workspace directory exists on host
-        workspace_path = os.path.join(os.getcwd(), "workspace")
-        os.makedirs(workspace_path, exist_ok=True)
+        Cancelling the awaiting task kills the container (which is then
+        discarded rather than returned to the pool) and records a
+        CANCELLED result.
         
+        Returns:
+            The ExecutionResult
+        """
+        cancel = CancelToken()
+        context = contextvars.copy_context()
+        work = asyncio.get_running_loop().run_in_executor(
+            None, context.run, self.execute_result, code, files, limits, cache, cancel
+        )
         try:
-            # Spin up container with volume mount
-            # The workspace folder is mounted so files persist
-            container = client.containers.run(
-                "mcr.microsoft.com/devcontainers/python:3.11",
-                command="sleep 120",  # Keep alive for execution
-                detach=True,
-                remove=True,
-                working_dir="/workspace",
-                volumes={
-                    workspace_path: {
-                        'bind': '/workspace',
-                        'mode': 'rw'
-                    }
-                }
+            return await asyncio.shield(work)
+        except asyncio.CancelledError:
+            cancel.cancel()
+            raise
+    
+    def _execute(
+        self,
+        code: str,
+        files: Optional[Dict[str, str]],
+        limits: Optional[ExecutionLimits],
+        cache: bool,
+        cancel: Optional[CancelToken] = None,
+    ) -> ExecutionResult:
+        # Safety check
+        with span("sandbox.safety"):
+            findings = self.find_dangerous(code, files)
+        if findings:
+            with span("sandbox.approval", findings=len(findings)):
+                approved = self._request_approval(code, findings)
+            if not approved:
+                return ExecutionResult(
+                    DENIED, message="User rejected potentially dangerous code."
+                )
+        if cancel is not None and cancel.cancelled:
+            return self._cancelled()
+        
+        # Build the script + helper files payload before touching Docker,
+        # with a copy of the files already in ./workspace for the script
+        # to read (the script and helper files win on a name clash)
+        payload = dict(files or {})
+        payload[SCRIPT_NAME] = code
+        inputs = {
+            name: data for name, data in self._get_workspaces().inputs().items()
+            if name not in payload
+        }
+        try:
+            archive = build_archive({**inputs, **payload})
+        except ValueError as e:
+            return ExecutionResult(ERROR, stderr=str(e))
+        
+        try:
+            limits = self._effective_limits(limits)
+            pool = self._get_pool(limits, self._image_for(code, files))
+        except Exception as e:
+            return self._system_error(e)
+        
+        # Identical deterministic code replays its previous result
+        key = self._cache_key(code, {**inputs, **(files or {})}, pool, limits) if cache else None
+        if key is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None and cached.result is not None:
+                self._replay_artifacts(cached.artifacts)
+                return replace(cached.result, cached=True)
+        
+        result, artifacts = self._run_in_container(
+            pool, archive, payload, limits, cancel, inputs, read_artifacts=key is not None
+        )
+        
+        if key is not None and result.status in CACHEABLE_STATUSES:
+            self.result_cache.put(
+                key, CachedExecution(str(result), result.exit_code, artifacts, result)
             )
+        return result
+    
+    def _run_in_container(
+        self,
+        pool: ContainerPool,
+        archive: bytes,
+        payload: Dict[str, str],
+        limits: ExecutionLimits,
+        cancel: Optional[CancelToken] = None,
+        inputs: Optional[Dict[str, bytes]] = None,
+        read_artifacts: bool = False,
+    ) -> Tuple[ExecutionResult, Dict[str, bytes]]:
+        """
+        Run the packed script in a pooled container.
+        
+        Args:
+            pool: Pool to lease the container from
+            archive: Tar stream holding the script, helper files and inputs
+            payload: The script and helper files, excluded from the artifacts
+            limits: Limits the run is bounded by
+            cancel: Kills the container when cancelled
+            inputs: Workspace files in ``archive``; artifacts only if changed
+            read_artifacts: Also return the artifacts' contents (for caching)
             
-            # Write code to file using base64 to avoid escaping issues
-            code_b64 = base64.b64encode(code.encode('utf-8')).decode('utf-8')
-            write_cmd = f"echo '{code_b64}' | base64 -d > /workspace/script.py"
-            container.exec_run(f"/bin/bash -c \"{write_cmd}\"")
+        Returns:
+            The result and, if requested, the artifacts as relative path ->
+            content
+        """
+        try:
+            # Lease a pre-started container; pool hits skip startup entirely
+            with span("sandbox.acquire", image=pool.image):
+                container = pool.acquire()
+        except Exception as e:
+            return self._system_error(e), {}
+        
+        healthy = True
+        killed = threading.Event()
+        
+        def kill_container():
+            # Host-side safety net if the in-container timeout did not fire;
+            # also how cancellation stops a run
+            killed.set()
+            try:
+                container.kill()
+            except Exception:
+                pass
+        
+        watchdog = threading.Timer(limits.timeout + KILL_GRACE_SECONDS, kill_container)
+        watchdog.daemon = True
+        
+        try:
+            if cancel is not None:
+                cancel.on_cancel(kill_container)
+                if cancel.cancelled:
+                    healthy = False
+                    return self._cancelled(), {}
             
-            # Execute the code
-            exec_result = container.exec_run(
-                "python /workspace/script.py",
-                workdir="/workspace"
+            # Send the script, helper files and inputs in one tar stream
+            with span("sandbox.inject", bytes=len(archive)):
+                if not container.put_archive(WORKSPACE_DIR, archive):
+                    raise RuntimeError("Failed to copy code into the container")
+            
+            # Execute the code, streaming output as it is produced; the
+            # usage runner reports CPU time and peak memory on exit
+            with span("sandbox.exec"):
+                started = time.monotonic()
+                watchdog.start()
+                stream = ExecStream(
+                    container,
+                    limits.wrap_command(
+                        ["python", "-S", "-c", USAGE_RUNNER, f"{WORKSPACE_DIR}/{SCRIPT_NAME}"]
+                    ),
+                    workdir=WORKSPACE_DIR
+                )
+                captures = {
+                    "stdout": OutputCapture(limits.max_output_bytes),
+                    "stderr": OutputCapture(limits.max_output_bytes),
+                }
+                decoder = ChunkDecoder()
+                detector = TracebackDetector()
+                aborted = False
+                usage = {}
+                
+                try:
+                    for stream_name, chunk in stream:
+                        if stream_name == "stderr":
+                            chunk, reported = split_usage(chunk)
+                            if reported is not None:
+                                usage = reported
+                            if not chunk:
+                                continue
+                        captures[stream_name].write(chunk)
+                        if self.on_output is not None:
+                            self.on_output(stream_name, decoder.decode(stream_name, chunk))
+                        if (self.abort_on_traceback and stream_name == "stderr"
+                                and detector.feed(chunk)):
+                            # Any still-running process is killed by the pool reset
+                            aborted = True
+                            break
+                except Exception:
+                    if not killed.is_set():
+                        raise
+                finally:
+                    stream.close()
+                    watchdog.cancel()
+                annotate(killed=killed.is_set(), aborted=aborted)
+            
+            elapsed = time.monotonic() - started
+            result = ExecutionResult(
+                ERROR,
+                stdout=captures["stdout"].getvalue(),
+                stderr=captures["stderr"].getvalue(),
+                duration=elapsed,
+                usage=usage,
+                stdout_truncated=captures["stdout"].truncated,
+                stderr_truncated=captures["stderr"].truncated,
             )
             
-            output = exec_result.output.decode('utf-8')
-            exit_code = exec_result.exit_code
+            if killed.is_set():
+                healthy = False
+                if cancel is not None and cancel.cancelled:
+                    return self._cancelled(), {}
+                return self._timed_out(result, limits), {}
             
-            # Cleanup
-            container.stop()
+            if aborted:
+                result.aborted = True
+                return result, {}
             
+            result.exit_code = exit_code = stream.wait()
+            if exit_code == TIMEOUT_EXIT_CODE or (
+                exit_code == SIGKILL_EXIT_CODE and elapsed >= limits.timeout
+            ):
+                return self._timed_out(result, limits), {}
+            if exit_code == SIGKILL_EXIT_CODE:
+                # SIGKILL before the deadline: the cgroup OOM killer
+                result.status = OOM
+                result.message = (
+                    f"Execution exceeded the {limits.mem_limit} memory limit and was killed."
+                )
+                return result, {}
             if exit_code != 0:
-                return f"EXECUTION ERROR:\n{output}"
-            return f"SUCCESS OUTPUT:\n{output}"
+                return result, {}
+            
+            # Success: copy produced files out of the container's private
+            # workspace and promote them into ./workspace on the host
+            with span("sandbox.artifacts"):
+                promoted, contents = self._save_artifacts(
+                    container, exclude=payload, unchanged=inputs, read=read_artifacts
+                )
+                annotate(files=len(promoted))
+            result.status = SUCCESS
+            result.artifacts = sorted(promoted)
+            return result, contents
             
         except Exception as e:
-            return f"SYSTEM ERROR: Docker failed to run. Reason: {str(e)}"
\ No newline at end of file
+            healthy = False
+            if cancel is not None and cancel.cancelled:
+                return self._cancelled(), {}
+            return self._system_error(e), {}
+        finally:
+            watchdog.cancel()
+            # Reset and return the container (or discard it if it broke)
+            with span("sandbox.release", healthy=healthy):
+                pool.release(container, healthy=healthy)
+    
+    def _cache_key(self, code: str, files: Optional[Dict[str, str]],
+                   pool: ContainerPool, limits: ExecutionLimits) -> Optional[str]:
+        """
+        Result cache key for an execution, or None when it must not be cached.
+        
+        Scripts (or helper modules) that use the clock, randomness, the
+        network or subprocesses always run.
+        """
+        if self.result_cache is None:
+            return None
+        sources = [code] + [
+            content if isinstance(content, str) else content.decode("utf-8", "replace")
+            for path, content in (files or {}).items()
+            if path.endswith(".py")
+        ]
+        if not is_cacheable(sources):
+            return None
+        # An aborted run ends as a truncated ERROR, so the flag is part of the key
+        return make_cache_key(code, files, pool.image, limits,
+                              abort_on_traceback=self.abort_on_traceback)
+    
+    def _replay_artifacts(self, artifacts: Dict[str, bytes]) -> None:
+        """Stage and promote the artifacts of a cached run, like a real one."""
+        if not artifacts:
+            return
+        manager = self._get_workspaces()
+        with self._staging() as workspace:
+            manager.write(workspace, artifacts)
+            manager.promote(workspace)
+    
+    def _get_workspaces(self) -> WorkspaceManager:
+        """Return the workspace manager, creating the default one if needed."""
+        with _POOL_LOCK:
+            if self.workspaces is None:
+                self.workspaces = WorkspaceManager()
+            return self.workspaces
+    
+    @contextmanager
+    def _staging(self) -> Iterator[RunWorkspace]:
+        """The active run's workspace, or a fresh one held for the block."""
+        workspace = current_workspace()
+        if workspace is not None:
+            yield workspace
+            return
+        with self._get_workspaces().use() as workspace:
+            yield workspace
+    
+    def _save_artifacts(self, container, exclude,
+                        unchanged: Optional[Dict[str, bytes]] = None,
+                        read: bool = False) -> Tuple[List[str], Dict[str, bytes]]:
+        """
+        Stage the files a successful run produced and promote them to the host.
+        
+        Files land in the active run's staging directory (or a fresh one when
+        no run is active) before being copied into the workspace root.
+        
+        Args:
+            container: Container the code ran in
+            exclude: Paths that were injected rather than produced
+            unchanged: Injected workspace inputs, staged only if modified
+            read: Also return the promoted files' contents
+            
+        Returns:
+            Relative paths of the promoted files, and their contents (empty
+            unless ``read``)
+        """
+        manager = self._get_workspaces()
+        with self._staging() as workspace:
+            chunks, _ = container.get_archive(WORKSPACE_DIR)
+            if not manager.extract(workspace, chunks, exclude=exclude, unchanged=unchanged):
+                return [], {}
+            promoted = manager.promote(workspace)
+            contents = {}
+            if read:
+                # Read while the workspace is held: a temporary one may be
+                # collected as soon as it is released
+                for name in promoted:
+                    with open(os.path.join(workspace.path, *name.split("/")), "rb") as f:
+                        contents[name] = f.read()
+            return promoted, contents
+    
+    def _timed_out(self, result: ExecutionResult, limits: ExecutionLimits) -> ExecutionResult:
+        """Mark the result of a run killed at the wall-clock limit."""
+        result.status = TIMEOUT
+        result.message = f"Execution exceeded the {limits.timeout:g}s limit and was killed."
+        return result
+    
+    def _cancelled(self) -> ExecutionResult:
+        """Result for an execution whose caller was cancelled."""
+        return ExecutionResult(CANCELLED, message="The run was cancelled and its container killed.")
+    
+    def _system_error(self, error: Exception) -> ExecutionResult:
+        """Result for a failure of Docker itself rather than of the code."""
+        return ExecutionResult(SYSTEM_ERROR, message=f"Docker failed to run. Reason: {error}")
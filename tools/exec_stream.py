@@ -0,0 +1,225 @@
+"""
+Streaming Exec Helpers for the Docker Sandbox
+
+Runs a command inside a container through the exec stream API so that
+stdout and stderr arrive as separate chunks while the process is running:
+- ExecStream: iterate ("stdout" | "stderr", bytes) chunks, then read the exit code
+- OutputCapture: bounded buffer keeping the head and tail of a stream
+- TracebackDetector: spots the first complete Python traceback across chunks
+- USAGE_RUNNER: runs a script and reports its CPU time and peak memory
+"""
+
+import codecs
+import json
+import time
+from collections import deque
+from typing import Iterator, Optional, Tuple
+
+
+# Marker printed by the interpreter at the start of every traceback
+TRACEBACK_MARKER = b"Traceback (most recent call last):"
+
+# Prefix of the resource-usage line USAGE_RUNNER writes to stderr
+USAGE_MARKER = "\x1e__sandbox_usage__ "
+
+# ``python -S -c USAGE_RUNNER script.py`` runs ``python script.py`` as a
+# child (same argv, so tracebacks and the pool's pkill pattern are
+# unchanged), then writes the child's rusage to stderr as one
+# USAGE_MARKER line and exits with the child's status
+USAGE_RUNNER = (
+    "import json,os,sys\n"
+    "pid=os.fork()\n"
+    "if not pid:os.execvp('python',['python']+sys.argv[1:])\n"
+    "_,status,ru=os.wait4(pid,0)\n"
+    "sys.stderr.write(%r+json.dumps({'cpu_user':ru.ru_utime,'cpu_system':ru.ru_stime,"
+    "'max_rss_kb':ru.ru_maxrss})+'\\n')\n"
+    "sys.stderr.flush()\n"
+    "code=os.waitstatus_to_exitcode(status)\n"
+    "if code<0:os.kill(os.getpid(),-code)\n"
+    "sys.exit(code)\n"
+) % USAGE_MARKER
+
+
+def split_usage(chunk: bytes) -> Tuple[bytes, Optional[dict]]:
+    """
+    Separate a USAGE_RUNNER report from a stderr chunk.
+
+    Returns:
+        The chunk without the report, and the parsed usage (None if absent)
+    """
+    marker = USAGE_MARKER.encode("utf-8")
+    index = chunk.rfind(marker)
+    if index < 0:
+        return chunk, None
+    line = chunk[index + len(marker):].split(b"\n", 1)[0]
+    try:
+        usage = json.loads(line)
+    except ValueError:
+        return chunk, None
+    return chunk[:index], usage
+
+
+class ExecStream:
+    """
+    A command started in a container with demultiplexed, streamed output.
+
+    Iterating yields ``(stream_name, chunk)`` pairs as data arrives. Once
+    iteration finishes, ``exit_code`` reports how the process ended.
+    """
+
+    def __init__(self, container, cmd, workdir: Optional[str] = None):
+        """
+        Args:
+            container: Running docker container (``docker.models.containers.Container``).
+            cmd: Command to execute, as a string or argv list.
+            workdir: Working directory for the command inside the container.
+        """
+        self._api = container.client.api
+        self.exec_id = self._api.exec_create(
+            container.id, cmd, stdout=True, stderr=True, workdir=workdir
+        )["Id"]
+        self._chunks = self._api.exec_start(self.exec_id, stream=True, demux=True)
+
+    def __iter__(self) -> Iterator[Tuple[str, bytes]]:
+        for stdout, stderr in self._chunks:
+            if stdout:
+                yield "stdout", stdout
+            if stderr:
+                yield "stderr", stderr
+
+    def close(self) -> None:
+        """Stop reading output (the process itself keeps running)."""
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+    @property
+    def exit_code(self) -> Optional[int]:
+        """Exit code of the process, or None while it is still running."""
+        return self._api.exec_inspect(self.exec_id).get("ExitCode")
+
+    def wait(self, timeout: float = 1.0, interval: float = 0.05) -> Optional[int]:
+        """
+        Exit code once the daemon reports the process finished.
+
+        The output stream can close slightly before the exec is marked as
+        exited, so poll briefly instead of reading ``exit_code`` once.
+
+        Args:
+            timeout: Maximum seconds to poll.
+            interval: Seconds between polls.
+
+        Returns:
+            The exit code, or None if the process is still running
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            info = self._api.exec_inspect(self.exec_id)
+            if not info.get("Running") or time.monotonic() >= deadline:
+                return info.get("ExitCode")
+            time.sleep(interval)
+
+
+class OutputCapture:
+    """
+    Accumulates one output stream up to a byte limit.
+
+    When the limit is exceeded the first and last halves of the budget are
+    kept and the middle is dropped, so both the start of the output and the
+    final error lines survive truncation.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Maximum number of bytes kept (head + tail).
+        """
+        self.limit = limit
+        self.total = 0
+        self._head = bytearray()
+        self._tail = deque()
+        self._tail_size = 0
+        self._head_limit = limit - limit // 2
+        self._tail_limit = limit // 2
+
+    @property
+    def truncated(self) -> bool:
+        """True if some output was dropped."""
+        return self.total > self.limit
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk of raw output."""
+        self.total += len(chunk)
+
+        room = self._head_limit - len(self._head)
+        if room > 0:
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+        if not chunk or self._tail_limit <= 0:
+            return
+
+        self._tail.append(chunk)
+        self._tail_size += len(chunk)
+        while self._tail_size - len(self._tail[0]) >= self._tail_limit:
+            self._tail_size -= len(self._tail.popleft())
+
+    def getvalue(self) -> str:
+        """Captured output decoded as text, with a marker where bytes were dropped."""
+        tail = b"".join(self._tail)
+        if len(tail) > self._tail_limit:
+            tail = tail[len(tail) - self._tail_limit:]
+
+        text = self._head.decode("utf-8", errors="replace")
+        if self.truncated:
+            dropped = self.total - len(self._head) - len(tail)
+            text += f"\n... [{dropped} bytes truncated] ...\n"
+        return text + tail.decode("utf-8", errors="replace")
+
+
+class TracebackDetector:
+    """
+    Detects the first complete Python traceback in a stderr stream.
+
+    A traceback counts as complete once the final, unindented exception line
+    (e.g. ``ValueError: bad input``) has arrived, so stopping at that point
+    still captures the whole traceback. Works across chunk boundaries.
+    """
+
+    def __init__(self):
+        self._window = b""
+        self._body = None  # Bytes after the marker, once it has been seen
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Scan the next chunk of stderr.
+
+        Returns:
+            True once a complete traceback has been seen
+        """
+        if self._body is None:
+            data = self._window + chunk
+            index = data.find(TRACEBACK_MARKER)
+            if index < 0:
+                self._window = data[-(len(TRACEBACK_MARKER) - 1):]
+                return False
+            self._body = data[index + len(TRACEBACK_MARKER):]
+        else:
+            self._body += chunk
+
+        # lines[0] is the rest of the marker line, lines[-1] may be partial
+        lines = self._body.split(b"\n")
+        return any(line and not line[:1].isspace() for line in lines[1:-1])
+
+
+class ChunkDecoder:
+    """Incrementally decodes UTF-8 chunks per stream without splitting characters."""
+
+    def __init__(self):
+        self._decoders = {}
+
+    def decode(self, stream: str, chunk: bytes) -> str:
+        decoder = self._decoders.get(stream)
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            self._decoders[stream] = decoder
+        return decoder.decode(chunk)
@@ -3,16 +3,63 @@ Codebase Mapper Tool for CrewAI
 
 Provides the Architect agent with visibility into the project structure.
 Creates a markdown summary of the directory tree and saves it to context/map.md.
+
+Scans are incremental: a snapshot of every directory's listing is kept in
+context/.map_cache.json and a directory is only re-listed when its mtime or
+inode changed, so repeated calls on a large tree cost one stat per directory.
+Directories are listed with os.scandir across a thread pool and the tree is
+rendered iteratively, so depth is not bounded by the recursion limit.
+Async crews await ``_arun``, which runs the same scan off the event loop.
+
+Maps are budgeted for the Architect's context window: .gitignore'd paths are
+skipped, crowded directories collapse into counts by extension, and only as
+many directory levels as fit ``max_lines`` are expanded. Summarized
+directories can be expanded on demand with the ``subtree`` argument.
+
+SymbolIndex complements the map with an AST index of definitions and imports
+(context/symbols.json) for targeted "where is X / who imports Y" lookups.
 """
 
+import ast
+import asyncio
+import json
 import os
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import win_patch  # Windows compatibility
 
 from crewai.tools import BaseTool
-from typing import Optional
+from pydantic import PrivateAttr
+from typing import Dict, List, Optional, Tuple
+from tools.async_tools import NativeAsyncTool
+from tools.gitignore import GitIgnore
+from tracing import traced
+
+
+# Snapshot of directory listings, stored next to map.md
+SNAPSHOT_NAME = ".map_cache.json"
+SNAPSHOT_VERSION = 2
+
+# Directories modified this close to a scan may change again within the same
+# mtime tick (2s on FAT), so their listings are never trusted
+RACY_WINDOW_NS = 2_000_000_000
+
+# Maps (full map and subtree expansions) remembered in the snapshot
+MAX_CACHED_MAPS = 16
+
+# Extensions listed individually when a crowded directory is collapsed
+MAX_SUMMARY_EXTENSIONS = 5
+
+# Subtrees per worker thread before the walk is split across the pool
+FANOUT_FACTOR = 4
+
+# Serializes scans so concurrent agents don't interleave snapshot writes
+_MAP_LOCK = threading.Lock()
 
 
-class CodebaseMapper(BaseTool):
+class CodebaseMapper(NativeAsyncTool):
     """
     Tool that scans the project directory and creates a markdown map
     of the codebase structure for the Architect agent to reference.
@@ -23,21 +70,49 @@ class CodebaseMapper(BaseTool):
         "Scans the current project directory and creates a structured markdown "
         "summary of all files and folders. Useful for understanding the project "
         "layout before making changes. Returns the map as a string and saves it "
-        "to 'context/map.md'."
+        "to 'context/map.md'. Large projects are summarized; pass 'subtree' "
+        "(a directory path relative to the project root) to expand one directory."
     )
     
     # Directories to ignore when scanning
-    IGNORE_DIRS: set = {".git", "__pycache__", ".venv", "venv", "node_modules", ".idea", ".vscode"}
+    IGNORE_DIRS: set = {".git", "__pycache__", ".venv", "venv", "node_modules", ".idea", ".vscode", ".runs"}
     
     # File extensions to ignore
     IGNORE_EXTENSIONS: set = {".pyc", ".pyo", ".log", ".tmp"}
     
-    def _run(self, root_path: Optional[str] = None) -> str:
+    # File names to ignore (the mapper's own bookkeeping)
+    IGNORE_FILES: set = {SNAPSHOT_NAME}
+    
+    # Threads listing directories concurrently (1 = walk serially)
+    max_workers: int = min(32, (os.cpu_count() or 1) + 4)
+    
+    # Line budget of a returned map (fits the Architect's context window)
+    max_lines: int = 400
+    
+    # Directory levels expanded at most (None = as many as fit the budget)
+    max_depth: Optional[int] = None
+    
+    # Directories with more files than this show counts by extension
+    collapse_threshold: Optional[int] = 40
+    
+    @traced("tool.codebase_map")
+    def _run(self, root_path: Optional[str] = None, subtree: Optional[str] = None) -> str:
         """
         Scan the directory and generate a markdown tree structure.
         
+        The map is fitted to ``max_lines``: directories with many files are
+        collapsed into counts by extension, and when the whole tree does not
+        fit, only as many directory levels as fit are expanded. Paths matched
+        by the root .gitignore are left out.
+        
+        Unchanged directories reuse their listing from the previous scan;
+        when nothing changed the cached map is returned as-is, and map.md is
+        only rewritten when its content differs.
+        
         Args:
             root_path: Optional path to scan. Defaults to current working directory.
+            subtree: Optional directory (relative to the root) to expand on
+                its own, e.g. one that was summarized in the full map.
             
         Returns:
             Markdown-formatted directory tree as a string.
@@ -45,72 +120,759 @@ class CodebaseMapper(BaseTool):
         if root_path is None:
             root_path = os.getcwd()
         
-        # Build the tree structure
-        tree_lines = ["# Codebase Map", "", f"**Root:** `{root_path}`", "", "```"]
-        self._build_tree(root_path, tree_lines, prefix="")
-        tree_lines.append("```")
-        
-        # Join into final markdown
-        map_content = "\n".join(tree_lines)
+        start = posixpath.normpath((subtree or ".").replace("\\", "/").strip("/") or ".")
+        if start == ".." or start.startswith("../"):
+            return f"ERROR: Subtree '{subtree}' is outside the project root."
+        start_path = root_path if start == "." else os.path.join(root_path, *start.split("/"))
+        if not os.path.isdir(start_path):
+            return f"ERROR: Subtree '{subtree}' is not a directory."
         
-        # Save to context/map.md
         context_dir = os.path.join(root_path, "context")
-        os.makedirs(context_dir, exist_ok=True)
-        
         map_file = os.path.join(context_dir, "map.md")
-        with open(map_file, "w", encoding="utf-8") as f:
-            f.write(map_content)
+        ignore = GitIgnore.from_file(os.path.join(root_path, ".gitignore"))
+        map_key = json.dumps(
+            [start, self.max_lines, self.max_depth, self.collapse_threshold, ignore.digest]
+        )
         
+        with _MAP_LOCK:
+            snapshot = self._load_snapshot(context_dir, root_path)
+            cached = snapshot["maps"].get(map_key) if snapshot is not None else None
+            
+            if cached is not None and self._snapshot_current(
+                root_path, {rel: snapshot["dirs"].get(rel) for rel in cached["dirs"]}
+            ):
+                map_content = cached["map"]
+            else:
+                old_dirs = snapshot["dirs"] if snapshot is not None else {}
+                new_dirs: Dict[str, list] = {}
+                listings = self._collect_listings(
+                    root_path, old_dirs, new_dirs, time.time_ns(),
+                    start=start, max_depth=self.max_depth, ignore=ignore
+                )
+                map_content = self._render_map(root_path, start, listings, ignore)
+                
+                # Keep listings outside the rescanned subtree for later calls
+                prefix = start + "/"
+                dirs = {
+                    rel: entry for rel, entry in old_dirs.items()
+                    if start != "." and rel != start and not rel.startswith(prefix)
+                }
+                dirs.update(new_dirs)
+                maps = dict(snapshot["maps"]) if snapshot is not None else {}
+                maps.pop(map_key, None)
+                maps[map_key] = {"map": map_content, "dirs": sorted(new_dirs)}
+                while len(maps) > MAX_CACHED_MAPS:
+                    maps.pop(next(iter(maps)))
+                
+                os.makedirs(context_dir, exist_ok=True)
+                self._save_snapshot(context_dir, root_path, {"dirs": dirs, "maps": maps})
+            
+            # Save to context/map.md (subtree expansions are not the project map)
+            if start == ".":
+                os.makedirs(context_dir, exist_ok=True)
+                self._write_if_changed(map_file, map_content)
+        
+        if start != ".":
+            return map_content
         return f"SUCCESS: Codebase map saved to {map_file}\n\n{map_content}"
     
-    def _build_tree(self, path: str, lines: list, prefix: str) -> None:
+    async def _arun(self, root_path: Optional[str] = None, subtree: Optional[str] = None) -> str:
+        """
+        Async ``_run``: the scan runs in a worker thread (where it fans out
+        across ``max_workers`` as usual) so the event loop stays free.
+        """
+        return await asyncio.to_thread(self._run, root_path, subtree)
+    
+    def _render_map(self, root_path: str, start: str, listings: dict,
+                    ignore: Optional[GitIgnore]) -> str:
         """
-        Recursively build the directory tree.
+        Render the budgeted markdown map of ``start``.
         
         Args:
-            path: Current directory path
+            root_path: Scan root, shown in the header
+            start: Directory being mapped, relative to the root
+            listings: Listings from ``_collect_listings``
+            ignore: .gitignore rules of the root
+            
+        Returns:
+            The markdown map
+        """
+        # Lines per depth decide how many levels fit before rendering anything
+        per_depth = self._lines_per_depth(listings, start, ignore)
+        depth = len(per_depth)
+        if self.max_depth is not None:
+            depth = min(depth, self.max_depth)
+        while depth > 1 and sum(per_depth[:depth]) > self.max_lines:
+            depth -= 1
+        limited = depth < len(per_depth)
+        
+        tree: List[str] = []
+        self._render(listings, tree, start, "", max_depth=depth,
+                     collapse=self.collapse_threshold, ignore=ignore)
+        hidden = len(tree) - self.max_lines
+        if hidden > 0:
+            tree = tree[:self.max_lines] + [f"... {hidden} more entries not shown"]
+        
+        lines = ["# Codebase Map", "", f"**Root:** `{root_path}`", ""]
+        if start != ".":
+            lines += [f"**Subtree:** `{start}`", ""]
+        if limited or hidden > 0:
+            lines += [
+                f"**Note:** Showing {depth} directory level(s) to fit the "
+                f"{self.max_lines}-line budget. Summarized directories can be "
+                f"expanded by calling this tool again with subtree='<path>'.",
+                "",
+            ]
+        return "\n".join(lines + ["```"] + tree + ["```"])
+    
+    def _build_tree(self, path: str, lines: list, prefix: str,
+                    old: Optional[dict] = None, new: Optional[dict] = None,
+                    started_ns: int = 0) -> None:
+        """
+        Build the complete, unbudgeted directory tree.
+        
+        Listings are gathered first (in parallel), then rendered depth-first
+        with an explicit stack, so arbitrarily deep trees never hit the
+        recursion limit.
+        
+        Args:
+            path: Root directory path
             lines: List to append tree lines to
-            prefix: Current indentation prefix
+            prefix: Indentation prefix of the root's entries
+            old: Snapshot entries from the previous scan
+            new: Snapshot entries collected by this scan
+            started_ns: Scan start time, for racy-mtime detection
+        """
+        listings = self._collect_listings(
+            path, old or {}, new if new is not None else {}, started_ns
+        )
+        self._render(listings, lines, ".", prefix)
+    
+    def _render(self, listings: dict, lines: list, start: str, prefix: str,
+                max_depth: Optional[int] = None, collapse: Optional[int] = None,
+                ignore: Optional[GitIgnore] = None) -> None:
+        """
+        Render collected listings as tree lines.
+        
+        Args:
+            listings: Listings keyed by root-relative directory path
+            lines: List to append tree lines to
+            start: Directory whose contents are rendered
+            prefix: Indentation prefix of ``start``'s entries
+            max_depth: Directory levels to expand; deeper directories are
+                shown with a count of their contents
+            collapse: Directories with more files than this list counts by
+                extension instead of every file
+            ignore: .gitignore rules; matching entries are omitted
+        """
+        # Work items: a finished line, or a directory still to expand
+        stack: list = [(start, prefix, 1)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                lines.append(item)
+                continue
+            
+            rel, prefix, depth = item
+            listing = listings.get(rel)
+            if listing is None:
+                lines.append(f"{prefix}[Permission Denied]")
+                continue
+            dirs, files = self._filter(rel, listing, ignore)
+            
+            # Directories first, each followed by its own subtree
+            items: list = []
+            for i, d in enumerate(dirs):
+                is_last_dir = (i == len(dirs) - 1) and (len(files) == 0)
+                connector = "└── " if is_last_dir else "├── "
+                child = d if rel == "." else f"{rel}/{d}"
+                if max_depth is not None and depth >= max_depth:
+                    summary = self._summary(listings.get(child), child, ignore)
+                    items.append(f"{prefix}{connector}📁 {d}/ {summary}")
+                    continue
+                items.append(f"{prefix}{connector}📁 {d}/")
+                new_prefix = prefix + ("    " if is_last_dir else "│   ")
+                items.append((child, new_prefix, depth + 1))
+            
+            # Then files, or their counts in a crowded directory
+            if collapse is not None and len(files) > collapse:
+                items.append(f"{prefix}└── 📄 {self._file_counts(files)}")
+            else:
+                for i, f in enumerate(files):
+                    is_last = (i == len(files) - 1)
+                    connector = "└── " if is_last else "├── "
+                    items.append(f"{prefix}{connector}📄 {f}")
+            
+            stack.extend(reversed(items))
+    
+    def _lines_per_depth(self, listings: dict, start: str,
+                         ignore: Optional[GitIgnore]) -> List[int]:
+        """Rendered line count at each depth below ``start`` (index 0 = its entries)."""
+        counts: List[int] = []
+        stack = [(start, 0)]
+        while stack:
+            rel, depth = stack.pop()
+            if len(counts) <= depth:
+                counts.extend([0] * (depth + 1 - len(counts)))
+            listing = listings.get(rel)
+            if listing is None:
+                counts[depth] += 1
+                continue
+            dirs, files = self._filter(rel, listing, ignore)
+            collapsed = self.collapse_threshold is not None and len(files) > self.collapse_threshold
+            counts[depth] += len(dirs) + (1 if collapsed else len(files))
+            for d in dirs:
+                child = d if rel == "." else f"{rel}/{d}"
+                if child in listings:
+                    stack.append((child, depth + 1))
+        return counts
+    
+    def _filter(self, rel: str, listing: List[List[str]],
+                ignore: Optional[GitIgnore]) -> Tuple[List[str], List[str]]:
+        """Drop .gitignore'd entries from a listing."""
+        dirs, files = listing
+        if not ignore:
+            return dirs, files
+        base = "" if rel == "." else rel + "/"
+        return (
+            [d for d in dirs if not ignore.match(base + d, is_dir=True)],
+            [f for f in files if not ignore.match(base + f, is_dir=False)],
+        )
+    
+    def _summary(self, listing: Optional[List[List[str]]], rel: str,
+                 ignore: Optional[GitIgnore]) -> str:
+        """Parenthesized content counts of a directory that is not expanded."""
+        if listing is None:
+            return "(…)"
+        dirs, files = self._filter(rel, listing, ignore)
+        parts = []
+        if dirs:
+            parts.append(f"{len(dirs)} dir{'s' if len(dirs) != 1 else ''}")
+        if files:
+            parts.append(f"{len(files)} file{'s' if len(files) != 1 else ''}")
+        return f"({', '.join(parts) or 'empty'})"
+    
+    def _file_counts(self, files: List[str]) -> str:
+        """Summarize many files as counts by extension, most common first."""
+        counts: Dict[str, int] = {}
+        for f in files:
+            ext = os.path.splitext(f)[1] or "(no ext)"
+            counts[ext] = counts.get(ext, 0) + 1
+        ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+        shown = [f"{ext}: {n}" for ext, n in ranked[:MAX_SUMMARY_EXTENSIONS]]
+        other = sum(n for _, n in ranked[MAX_SUMMARY_EXTENSIONS:])
+        if other:
+            shown.append(f"other: {other}")
+        return f"{len(files)} files ({', '.join(shown)})"
+    
+    def _collect_listings(self, root: str, old: dict, new: dict, started_ns: int,
+                          start: str = ".", max_depth: Optional[int] = None,
+                          ignore: Optional[GitIgnore] = None
+                          ) -> Dict[str, Optional[List[List[str]]]]:
+        """
+        List every directory under ``start``, fanning subtrees out across threads.
+        
+        The top of the tree is walked breadth-first until there are enough
+        subtrees to keep every worker busy; each worker then walks whole
+        subtrees, so thread hand-off costs stay per subtree, not per directory.
+        
+        Args:
+            root: Scan root
+            old: Snapshot entries from the previous scan
+            new: Snapshot entries collected by this scan
+            started_ns: Scan start time
+            start: Directory to list from, relative to ``root``
+            max_depth: Directory levels below ``start`` to list
+            ignore: .gitignore rules; ignored directories are not descended into
+        
+        Returns:
+            Listing (or None if unreadable) keyed by relative directory path
+        """
+        listings: Dict[str, Optional[List[List[str]]]] = {}
+        start_path = root if start == "." else os.path.join(root, *start.split("/"))
+        frontier = [(start_path, start, 0)]
+        visit = lambda item, into: self._visit(*item, into, old, new, started_ns, max_depth, ignore)
+        
+        if self.max_workers > 1:
+            wanted = self.max_workers * FANOUT_FACTOR
+            while frontier and len(frontier) < wanted:
+                level = frontier
+                frontier = []
+                for item in level:
+                    frontier.extend(visit(item, listings))
+        
+        def walk(pending, into):
+            while pending:
+                pending.extend(visit(pending.pop(), into))
+            return into
+        
+        if len(frontier) <= 1 or self.max_workers <= 1:
+            walk(frontier, listings)
+            return listings
+        
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="mapper") as executor:
+            for local in executor.map(lambda item: walk([item], {}), frontier):
+                listings.update(local)
+        return listings
+    
+    def _visit(self, path: str, rel: str, depth: int, listings: dict, old: dict,
+               new: dict, started_ns: int, max_depth: Optional[int],
+               ignore: Optional[GitIgnore]) -> List[tuple]:
+        """Record one directory's listing and return the subdirectories to list."""
+        listing = self._list_dir(path, rel, old, new, started_ns)
+        listings[rel] = listing
+        if not listing or (max_depth is not None and depth >= max_depth):
+            return []
+        dirs, _ = self._filter(rel, [listing[0], []], ignore)
+        return [
+            (os.path.join(path, d), d if rel == "." else f"{rel}/{d}", depth + 1)
+            for d in dirs
+        ]
+    
+    def _list_dir(self, path: str, rel: str, old: dict, new: dict,
+                  started_ns: int) -> Optional[List[List[str]]]:
+        """
+        Return ``[dirs, files]`` for a directory, reusing the snapshot if valid.
+        
+        Args:
+            path: Directory to list
+            rel: Snapshot key of the directory
+            old: Snapshot entries from the previous scan
+            new: Snapshot entries collected by this scan (updated in place)
+            started_ns: Scan start time
+            
+        Returns:
+            Sorted subdirectory and file names, or None if unreadable
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        
+        cached = old.get(rel)
+        if st is not None and cached is not None and cached[:2] == [st.st_mtime_ns, st.st_ino]:
+            new[rel] = cached
+            return cached[2]
+        
+        listing = self._scan_dir(path)
+        if st is None or listing is None or st.st_mtime_ns >= started_ns - RACY_WINDOW_NS:
+            # Never matches, so the directory is listed again next time
+            mtime, ino = -1, -1
+        else:
+            mtime, ino = st.st_mtime_ns, st.st_ino
+        new[rel] = [mtime, ino, listing]
+        return listing
+    
+    def _scan_dir(self, path: str) -> Optional[List[List[str]]]:
+        """
+        List a directory and split its entries into subdirectories and files.
+        
+        ``os.scandir`` reports each entry's type from the directory listing
+        itself (d_type), so only symlinks and filesystems without d_type
+        need an extra stat.
         """
         try:
-            entries = sorted(os.listdir(path))
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
         except PermissionError:
-            lines.append(f"{prefix}[Permission Denied]")
-            return
+            return None
         
         # Separate directories and files
         dirs = []
         files = []
         
         for entry in entries:
-            full_path = os.path.join(path, entry)
+            name = entry.name
             
             # Skip ignored directories
-            if entry in self.IGNORE_DIRS:
+            if name in self.IGNORE_DIRS:
                 continue
             
             # Skip ignored file extensions
-            _, ext = os.path.splitext(entry)
-            if ext in self.IGNORE_EXTENSIONS:
+            _, ext = os.path.splitext(name)
+            if ext in self.IGNORE_EXTENSIONS or name in self.IGNORE_FILES:
                 continue
             
-            if os.path.isdir(full_path):
-                dirs.append(entry)
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                dirs.append(name)
             else:
-                files.append(entry)
-        
-        # Process directories first
-        for i, d in enumerate(dirs):
-            is_last_dir = (i == len(dirs) - 1) and (len(files) == 0)
-            connector = "└── " if is_last_dir else "├── "
-            lines.append(f"{prefix}{connector}📁 {d}/")
-            
-            # Recurse into subdirectory
-            new_prefix = prefix + ("    " if is_last_dir else "│   ")
-            self._build_tree(os.path.join(path, d), lines, new_prefix)
-        
-        # Then process files
-        for i, f in enumerate(files):
-            is_last = (i == len(files) - 1)
-            connector = "└── " if is_last else "├── "
-            lines.append(f"{prefix}{connector}📄 {f}")
+                files.append(name)
+        
+        return [dirs, files]
+    
+    # -------------------------------------------------------------------------
+    # Snapshot persistence
+    # -------------------------------------------------------------------------
+    
+    def _ignore_signature(self) -> list:
+        return [sorted(self.IGNORE_DIRS), sorted(self.IGNORE_EXTENSIONS), sorted(self.IGNORE_FILES)]
+    
+    def _load_snapshot(self, context_dir: str, root_path: str) -> Optional[dict]:
+        """Previous scan of ``root_path``, or None if missing, stale or corrupt."""
+        try:
+            with open(os.path.join(context_dir, SNAPSHOT_NAME), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if (not isinstance(data, dict)
+                or data.get("version") != SNAPSHOT_VERSION
+                or data.get("root") != root_path
+                or data.get("ignore") != self._ignore_signature()):
+            return None
+        return data
+    
+    def _snapshot_current(self, root_path: str, dirs: dict) -> bool:
+        """True if no directory in the snapshot changed since it was taken."""
+        for rel, entry in dirs.items():
+            if entry is None:
+                return False
+            path = root_path if rel == "." else os.path.join(root_path, *rel.split("/"))
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if entry[:2] != [st.st_mtime_ns, st.st_ino]:
+                return False
+        return True
+    
+    def _save_snapshot(self, context_dir: str, root_path: str, snapshot: dict) -> None:
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "root": root_path,
+            "ignore": self._ignore_signature(),
+            "dirs": snapshot["dirs"],
+            "maps": snapshot["maps"],
+        }
+        # Rewritten in place (not replaced) so the context directory's own
+        # mtime, and with it the snapshot, stays valid
+        with open(os.path.join(context_dir, SNAPSHOT_NAME), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    
+    def _write_if_changed(self, path: str, content: str) -> bool:
+        """Write ``content`` unless the file already holds exactly that."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                if f.read() == content:
+                    return False
+        except (OSError, UnicodeDecodeError):
+            pass
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return True
+
+
+# =============================================================================
+# Symbol Index
+# =============================================================================
+
+# Persistent index of definitions and imports, stored next to map.md
+SYMBOLS_NAME = "symbols.json"
+SYMBOLS_VERSION = 1
+
+# Python files larger than this are not parsed (generated code, data dumps)
+MAX_SOURCE_BYTES = 1_000_000
+
+
+def _module_name(rel: str) -> str:
+    """Dotted module name of a root-relative .py path."""
+    parts = rel[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _signature(node) -> str:
+    """One-line signature of a class or function definition."""
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(b) for b in node.bases] + [ast.unparse(k) for k in node.keywords]
+        return f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+    keyword = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns is not None else ""
+    return f"{keyword} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _parse_source(source: str, module: str, is_package: bool) -> dict:
+    """
+    Extract definitions and imports from Python source.
+    
+    Args:
+        source: File contents
+        module: Dotted module name, used to resolve relative imports
+        is_package: Whether the file is a package's __init__.py
+        
+    Returns:
+        Index entry with "symbols" and "imports" lists
+    """
+    tree = ast.parse(source)
+    symbols = []
+    imports = []
+    
+    # Module- and class-level definitions (function bodies are not indexed)
+    pending = [(tree.body, "")]
+    while pending:
+        body, owner = pending.pop()
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = "class" if isinstance(node, ast.ClassDef) else ("method" if owner else "function")
+                qualname = f"{owner}.{node.name}" if owner else node.name
+                symbols.append({
+                    "name": node.name, "qualname": qualname, "kind": kind,
+                    "line": node.lineno, "signature": _signature(node),
+                })
+                if isinstance(node, ast.ClassDef):
+                    pending.append((node.body, qualname))
+            elif not owner and isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        symbols.append({
+                            "name": target.id, "qualname": target.id, "kind": "variable",
+                            "line": node.lineno, "signature": target.id,
+                        })
+    
+    # Imports anywhere in the file, with relative imports resolved
+    package = module if is_package else module.rpartition(".")[0]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append({"module": alias.name, "names": [], "line": node.lineno})
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                anchor = package.split(".") if package else []
+                anchor = anchor[:len(anchor) - (node.level - 1)] if node.level > 1 else anchor
+                base = ".".join([p for p in anchor + [base] if p])
+            imports.append({
+                "module": base,
+                "names": [alias.name for alias in node.names],
+                "line": node.lineno,
+            })
+    
+    symbols.sort(key=lambda s: s["line"])
+    imports.sort(key=lambda i: i["line"])
+    return {"symbols": symbols, "imports": imports}
+
+
+class SymbolIndex(BaseTool):
+    """
+    Tool that answers "where is X defined" and "who imports Y" for the
+    project's Python code from a persistent AST index (context/symbols.json).
+    
+    Files are re-parsed only when their mtime or size changed, so queries
+    after the first cost one stat per Python file at most.
+    """
+    
+    name: str = "Symbol Index"
+    description: str = (
+        "Looks up Python symbols in the project without reading whole files. "
+        "Set 'mode' to 'definition' to find where a class, function, method or "
+        "module-level variable is defined (query 'name' or 'Class.method'), "
+        "'importers' to list files importing a module or name (query "
+        "'package.module' or 'Name'), or 'outline' to list the definitions "
+        "in a file or module (query 'path/to/file.py' or 'package.module'). "
+        "Returns file:line locations with signatures."
+    )
+    
+    # Directories to ignore when scanning (same as CodebaseMapper)
+    IGNORE_DIRS: set = {".git", "__pycache__", ".venv", "venv", "node_modules", ".idea", ".vscode", ".runs"}
+    
+    # Maximum results listed per query
+    max_results: int = 25
+    
+    # Seconds during which repeated queries skip checking files for changes
+    refresh_interval: float = 2.0
+    
+    # Loaded index per root: (files, refreshed_at)
+    _indexes: Dict[str, Tuple[dict, float]] = PrivateAttr(default_factory=dict)
+    
+    @traced("tool.symbol_index")
+    def _run(self, query: str, mode: str = "definition", root_path: Optional[str] = None) -> str:
+        """
+        Query the symbol index, updating it for changed files first.
+        
+        Args:
+            query: Symbol, module or file to look up.
+            mode: "definition", "importers" or "outline".
+            root_path: Optional project root. Defaults to current working directory.
+            
+        Returns:
+            Matching locations, one per line.
+        """
+        if root_path is None:
+            root_path = os.getcwd()
+        query = query.strip()
+        
+        files = self.refresh(root_path)
+        if mode == "definition":
+            return self._find_definitions(files, query)
+        if mode == "importers":
+            return self._find_importers(files, query)
+        if mode == "outline":
+            return self._outline(files, query)
+        return f"ERROR: Unknown mode '{mode}'. Use 'definition', 'importers' or 'outline'."
+    
+    def refresh(self, root_path: str, force: bool = False) -> dict:
+        """
+        Bring the index of ``root_path`` up to date and return its file entries.
+        
+        Args:
+            root_path: Project root
+            force: Check every file even within ``refresh_interval``
+            
+        Returns:
+            Index entries keyed by root-relative file path (a snapshot that
+            later refreshes never modify)
+        """
+        with _MAP_LOCK:
+            cached = self._indexes.get(root_path)
+            if cached is not None and not force and time.monotonic() - cached[1] < self.refresh_interval:
+                return cached[0]
+            
+            context_dir = os.path.join(root_path, "context")
+            # Copy on write: queries iterate the returned dict without the lock
+            files = dict(cached[0]) if cached is not None else self._load(context_dir, root_path)
+            changed = False
+            seen = set()
+            
+            for rel, path, st in self._python_files(root_path):
+                seen.add(rel)
+                entry = files.get(rel)
+                if entry is not None and entry["stamp"] == [st.st_mtime_ns, st.st_size]:
+                    continue
+                files[rel] = self._index_file(rel, path, st)
+                changed = True
+            
+            for rel in [rel for rel in files if rel not in seen]:
+                del files[rel]
+                changed = True
+            
+            if changed or not os.path.exists(os.path.join(context_dir, SYMBOLS_NAME)):
+                os.makedirs(context_dir, exist_ok=True)
+                with open(os.path.join(context_dir, SYMBOLS_NAME), "w", encoding="utf-8") as f:
+                    json.dump({"version": SYMBOLS_VERSION, "root": root_path, "files": files}, f)
+            
+            self._indexes[root_path] = (files, time.monotonic())
+            return files
+    
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+    
+    def _find_definitions(self, files: dict, query: str) -> str:
+        matches = []
+        for rel, entry in sorted(files.items()):
+            for symbol in entry["symbols"]:
+                qualname = symbol["qualname"]
+                if query in (symbol["name"], qualname, f"{entry['module']}.{qualname}") \
+                        or qualname.endswith("." + query):
+                    detail = "" if symbol["kind"] == "variable" else f"  {symbol['signature']}"
+                    matches.append(f"{rel}:{symbol['line']}  {symbol['kind']} {qualname}{detail}")
+        return self._format(f"Definitions of '{query}'", matches)
+    
+    def _find_importers(self, files: dict, query: str) -> str:
+        matches = []
+        for rel, entry in sorted(files.items()):
+            for imp in entry["imports"]:
+                module, names = imp["module"], imp["names"]
+                hit = (
+                    module == query
+                    or module.startswith(query + ".")
+                    or query in names
+                    or any(f"{module}.{n}" == query for n in names)
+                )
+                if hit:
+                    stmt = f"from {module} import {', '.join(names)}" if names else f"import {module}"
+                    matches.append(f"{rel}:{imp['line']}  {stmt}")
+        return self._format(f"Importers of '{query}'", matches)
+    
+    def _outline(self, files: dict, query: str) -> str:
+        rel = query.replace("\\", "/").removeprefix("./")
+        entry = files.get(rel)
+        if entry is None:
+            rel, entry = next(
+                ((r, e) for r, e in sorted(files.items()) if e["module"] == query), (rel, None)
+            )
+        if entry is None:
+            return f"No indexed Python file or module matches '{query}'."
+        if entry.get("error"):
+            return f"{rel}: could not be parsed ({entry['error']})"
+        lines = [
+            f"{rel}:{s['line']}  {'    ' * s['qualname'].count('.')}{s['signature']}"
+            for s in entry["symbols"]
+        ]
+        return self._format(f"Outline of {rel}", lines)
+    
+    def _format(self, title: str, matches: List[str]) -> str:
+        if not matches:
+            return f"{title}: no matches."
+        shown = matches[:self.max_results]
+        more = len(matches) - len(shown)
+        footer = [f"... {more} more (refine the query)"] if more > 0 else []
+        return "\n".join([f"{title} ({len(matches)}):"] + shown + footer)
+    
+    # -------------------------------------------------------------------------
+    # Index maintenance
+    # -------------------------------------------------------------------------
+    
+    def _load(self, context_dir: str, root_path: str) -> dict:
+        """File entries of the persisted index, or empty if missing or stale."""
+        try:
+            with open(os.path.join(context_dir, SYMBOLS_NAME), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (not isinstance(data, dict) or data.get("version") != SYMBOLS_VERSION
+                or data.get("root") != root_path):
+            return {}
+        return data.get("files", {})
+    
+    def _python_files(self, root_path: str):
+        """Yield (rel, path, stat) for every Python file the mapper would show."""
+        ignore = GitIgnore.from_file(os.path.join(root_path, ".gitignore"))
+        pending = [(root_path, "")]
+        while pending:
+            path, base = pending.pop()
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                rel = base + entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    if entry.name not in self.IGNORE_DIRS and not ignore.match(rel, is_dir=True):
+                        pending.append((entry.path, rel + "/"))
+                elif entry.name.endswith(".py") and not ignore.match(rel, is_dir=False):
+                    try:
+                        yield rel, entry.path, entry.stat()
+                    except OSError:
+                        continue
+    
+    def _index_file(self, rel: str, path: str, st) -> dict:
+        """Parse one file into an index entry."""
+        module = _module_name(rel)
+        entry = {
+            "module": module,
+            "stamp": [st.st_mtime_ns, st.st_size],
+            "symbols": [],
+            "imports": [],
+        }
+        if st.st_size > MAX_SOURCE_BYTES:
+            entry["error"] = "file too large"
+            return entry
+        try:
+            with open(path, "rb") as f:
+                source = f.read().decode("utf-8", errors="replace")
+            entry.update(_parse_source(source, module, rel.endswith("__init__.py")))
+        except (OSError, SyntaxError, ValueError) as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+        return entry
@@ -0,0 +1,116 @@
+"""
+.gitignore Matching for the Codebase Mapper
+
+Implements the commonly used subset of gitignore semantics:
+- Blank lines and ``#`` comments are skipped; ``\\#`` / ``\\!`` escape them
+- ``!pattern`` re-includes a path excluded by an earlier pattern
+- ``dir/`` matches directories only
+- Patterns containing ``/`` are anchored to the .gitignore's directory,
+  others match a name at any depth
+- ``*``, ``?``, ``[...]`` and ``**`` wildcards
+"""
+
+import hashlib
+import re
+from typing import Iterable, List, Tuple
+
+
+def _translate(pattern: str) -> str:
+    """Translate one gitignore glob into a regular expression body."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape("["))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class GitIgnore:
+    """Compiled .gitignore rules, matched against root-relative POSIX paths."""
+
+    def __init__(self, lines: Iterable[str] = ()):
+        """
+        Args:
+            lines: Lines of a .gitignore file.
+        """
+        self._rules: List[Tuple[re.Pattern, bool, bool]] = []
+        text = []
+        for raw in lines:
+            line = raw.rstrip("\n").rstrip()
+            text.append(line)
+            if not line or line.startswith("#"):
+                continue
+
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+
+            if "/" in line:
+                regex = _translate(line.lstrip("/"))
+            else:
+                regex = "(?:.*/)?" + _translate(line)
+            self._rules.append((re.compile(regex + r"\Z"), negate, dir_only))
+
+        self.digest = hashlib.sha256("\n".join(text).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def from_file(cls, path: str) -> "GitIgnore":
+        """Load rules from ``path``; a missing or unreadable file gives no rules."""
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                return cls(f.readlines())
+        except OSError:
+            return cls()
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, path: str, is_dir: bool) -> bool:
+        """
+        Whether a path is ignored.
+
+        Args:
+            path: Path relative to the .gitignore's directory, "/"-separated.
+            is_dir: Whether the path is a directory.
+
+        Returns:
+            True if the last matching rule excludes the path
+        """
+        ignored = False
+        for regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(path):
+                ignored = not negate
+        return ignored
@@ -0,0 +1,80 @@
+"""
+Execution Limits for the Docker Sandbox
+
+Bounds every sandboxed run so one bad attempt cannot hold a worker or
+starve the host:
+- timeout: wall-clock seconds before the process is killed
+- mem_limit / nano_cpus / pids_limit: container cgroup limits
+- max_output_bytes: bytes kept per output stream
+
+Deployment defaults can be set with SANDBOX_* environment variables
+(see ``ExecutionLimits.from_env``); individual calls can override any field.
+"""
+
+import os
+from dataclasses import dataclass, fields, replace
+from typing import Optional
+
+
+# Exit code of `timeout` when the command ran too long
+TIMEOUT_EXIT_CODE = 124
+
+# Exit code of a process killed with SIGKILL (OOM killer or kill-after)
+SIGKILL_EXIT_CODE = 137
+
+
+@dataclass(frozen=True)
+class ExecutionLimits:
+    """Resource limits applied to a single sandbox execution."""
+
+    timeout: float = 60.0
+    mem_limit: Optional[str] = "512m"
+    nano_cpus: Optional[int] = 1_000_000_000  # 1 CPU
+    pids_limit: Optional[int] = 256
+    max_output_bytes: int = 64_000
+
+    @classmethod
+    def from_env(cls) -> "ExecutionLimits":
+        """
+        Build limits from SANDBOX_TIMEOUT, SANDBOX_MEM_LIMIT, SANDBOX_NANO_CPUS,
+        SANDBOX_PIDS_LIMIT and SANDBOX_MAX_OUTPUT_BYTES, falling back to defaults.
+        """
+        limits = cls()
+        overrides = {}
+        for field in fields(cls):
+            value = os.environ.get(f"SANDBOX_{field.name.upper()}")
+            if value is None:
+                continue
+            current = getattr(limits, field.name)
+            if value.strip().lower() == "none" and field.name not in ("timeout", "max_output_bytes"):
+                overrides[field.name] = None  # Explicitly unlimited
+            elif field.name == "mem_limit":
+                overrides[field.name] = value
+            elif isinstance(current, float):
+                overrides[field.name] = float(value)
+            else:
+                overrides[field.name] = int(value)
+        return replace(limits, **overrides)
+
+    def merged(self, **overrides) -> "ExecutionLimits":
+        """Copy of these limits with every non-None override applied."""
+        return replace(self, **{k: v for k, v in overrides.items() if v is not None})
+
+    def container_kwargs(self) -> dict:
+        """Keyword arguments for ``containers.run`` enforcing the cgroup limits."""
+        kwargs = {}
+        if self.mem_limit is not None:
+            kwargs["mem_limit"] = self.mem_limit
+            kwargs["memswap_limit"] = self.mem_limit  # No swap, so OOM kills fast
+        if self.nano_cpus is not None:
+            kwargs["nano_cpus"] = self.nano_cpus
+        if self.pids_limit is not None:
+            kwargs["pids_limit"] = self.pids_limit
+        return kwargs
+
+    def wrap_command(self, argv: list) -> list:
+        """
+        Prefix a command with coreutils ``timeout`` so the kill happens inside
+        the container: SIGTERM at the deadline, SIGKILL one second later.
+        """
+        return ["timeout", "-k", "1", f"{self.timeout:g}"] + list(argv)
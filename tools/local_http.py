@@ -0,0 +1,58 @@
+"""
+Request Checks for the Local HTTP Endpoints
+
+The job API and the approval endpoint only listen on 127.0.0.1, but a web
+page open in the user's browser can still reach them: a cross-site form
+POST needs no CORS preflight, and DNS rebinding lets a page read the
+replies. Every request is therefore checked before it is handled:
+- The Host header must name the loopback interface (defeats rebinding)
+- Requests carrying an Origin header are refused; browsers add one to
+  cross-site requests, curl and scripts do not
+- POST bodies must be declared as application/json, which a form cannot
+  send without a preflight
+- The per-process token printed at startup must be sent as
+  ``Authorization: Bearer <token>``
+"""
+
+import hmac
+import secrets
+from http.server import BaseHTTPRequestHandler
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+# Host names a local client may address the endpoint by
+LOCAL_HOSTS = frozenset({"127.0.0.1", "localhost", "::1"})
+
+
+def new_token() -> str:
+    """A random bearer token for one server process."""
+    return secrets.token_urlsafe(24)
+
+
+def rejection(handler: BaseHTTPRequestHandler,
+              token: Optional[str]) -> Optional[Tuple[int, str]]:
+    """
+    Why a request to a local endpoint must be refused, if it must.
+
+    Args:
+        handler: Handler of the request (headers and command are read).
+        token: Bearer token the request must carry (None skips the check).
+
+    Returns:
+        (HTTP status, error message), or None if the request may proceed.
+    """
+    try:
+        host = urlsplit("//" + handler.headers.get("Host", "")).hostname
+    except ValueError:
+        host = None
+    if host not in LOCAL_HOSTS:
+        return 403, "requests must address a loopback host"
+    if handler.headers.get("Origin") is not None:
+        return 403, "cross-origin requests are not allowed"
+    if handler.command == "POST" and handler.headers.get_content_type() != "application/json":
+        return 415, "Content-Type must be application/json"
+    if token is not None:
+        sent = handler.headers.get("Authorization", "")
+        if not hmac.compare_digest(sent.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            return 401, "missing or wrong bearer token"
+    return None
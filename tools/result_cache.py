@@ -0,0 +1,204 @@
+"""
+Execution Result Cache for the Docker Sandbox
+
+Memoizes deterministic sandbox runs so byte-identical code (LLM retries,
+duplicate tool calls) is answered without leasing a container:
+- Keyed by a hash of the code, helper files, image and limits
+- Stores the result text, exit code, structured result and produced artifacts
+- Scripts that read the clock, randomness or the network are never cached
+- In-memory LRU bounded by entry count and total bytes
+"""
+
+import ast
+import dataclasses
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Mapping, Optional, Union
+
+from tools.results import ExecutionResult
+
+from tools.limits import ExecutionLimits
+
+
+# Modules whose use makes a script's output depend on more than its inputs
+NONDETERMINISTIC_MODULES = frozenset({
+    "time", "datetime", "calendar", "random", "secrets", "uuid",
+    "socket", "ssl", "select", "selectors", "urllib", "http", "ftplib",
+    "smtplib", "requests", "httpx", "aiohttp", "urllib3",
+    "subprocess", "threading", "multiprocessing", "concurrent",
+    "importlib", "tempfile",
+})
+
+# Attribute or function names that read entropy, the clock or process state
+NONDETERMINISTIC_NAMES = frozenset({
+    "urandom", "getrandom", "getpid", "getppid", "times", "random",
+    "environ", "getenv", "__import__",
+})
+
+
+def is_cacheable(sources: Iterable[str]) -> bool:
+    """
+    Decide whether scripts always produce the same output for the same input.
+
+    Any import of a module in ``NONDETERMINISTIC_MODULES`` (including
+    submodules such as ``urllib.request``) or any use of a name in
+    ``NONDETERMINISTIC_NAMES`` (``os.urandom``, ``np.random``, ...) opts the
+    execution out. Code that does not parse is cacheable: it fails the same
+    way every time.
+
+    Args:
+        sources: Python sources of the script and its helper modules
+
+    Returns:
+        True if the execution can be memoized
+    """
+    for source in sources:
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            continue
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                modules = [node.module or ""]
+                if any(alias.name in NONDETERMINISTIC_NAMES for alias in node.names):
+                    return False
+            elif isinstance(node, ast.Attribute):
+                if node.attr in NONDETERMINISTIC_NAMES:
+                    return False
+                continue
+            elif isinstance(node, ast.Name):
+                if node.id in NONDETERMINISTIC_NAMES:
+                    return False
+                continue
+            else:
+                continue
+
+            if any(m.split(".")[0] in NONDETERMINISTIC_MODULES for m in modules):
+                return False
+    return True
+
+
+def make_key(
+    code: str,
+    files: Optional[Mapping[str, Union[str, bytes]]],
+    image: str,
+    limits: ExecutionLimits,
+    abort_on_traceback: bool = False,
+) -> str:
+    """
+    Content address of a sandbox execution.
+
+    Args:
+        code: The script source.
+        files: Helper files injected next to the script.
+        image: Docker image the script runs in.
+        limits: Limits the script runs under.
+        abort_on_traceback: Whether the run stops at its first traceback.
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    header = {"image": image, "limits": dataclasses.asdict(limits),
+              "abort_on_traceback": abort_on_traceback}
+    digest.update(json.dumps(header, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0script\0" + code.encode("utf-8"))
+    for path in sorted(files or {}):
+        content = files[path]
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        digest.update(b"\0file\0" + path.encode("utf-8") + b"\0")
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedExecution:
+    """Outcome of a memoized run."""
+
+    output: str
+    exit_code: Optional[int]
+    artifacts: Dict[str, bytes] = field(default_factory=dict)
+    result: Optional[ExecutionResult] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.output.encode("utf-8")) + sum(len(v) for v in self.artifacts.values())
+
+
+class ExecutionCache:
+    """
+    Thread-safe LRU of execution results.
+
+    When the cache exceeds ``max_entries`` or ``max_bytes`` the least
+    recently used results are evicted.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_entries: Maximum number of cached executions.
+            max_bytes: Maximum total size of cached output and artifacts.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedExecution]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CachedExecution]:
+        """Cached result for ``key``, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedExecution) -> None:
+        """Store a result and evict least recently used entries if over budget."""
+        size = entry.size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Entry count, stored bytes and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,150 @@
+"""
+Structured Results of Sandbox Executions
+
+Every execution produces an ExecutionResult (status, exit code, separate
+stdout/stderr, duration, resource usage, truncation flags, artifacts):
+- ``str(result)`` renders the legacy text ("SUCCESS OUTPUT:", "TIMEOUT:", ...)
+  that the Executor agent reads
+- Results are also recorded out of band for the orchestrator, which
+  activates a collector around each attempt and decides success from the
+  recorded status instead of searching the crew's final answer
+- ``feedback()`` trims a failure down to what the Engineer needs to fix it
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+SUCCESS = "success"
+ERROR = "error"
+TIMEOUT = "timeout"
+OOM = "oom"
+DENIED = "denied"
+SYSTEM_ERROR = "system_error"
+CANCELLED = "cancelled"
+
+# Legacy text prefix of each status
+PREFIXES = {
+    SUCCESS: "SUCCESS OUTPUT:",
+    ERROR: "EXECUTION ERROR:",
+    TIMEOUT: "TIMEOUT:",
+    OOM: "OOM:",
+    DENIED: "EXECUTION DENIED:",
+    SYSTEM_ERROR: "SYSTEM ERROR:",
+    CANCELLED: "EXECUTION CANCELLED:",
+}
+
+# Start of every Python traceback
+TRACEBACK_HEADER = "Traceback (most recent call last):"
+
+# Lines of output kept in feedback for failures
+FEEDBACK_LINES = 40
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of one sandbox execution."""
+
+    status: str
+    exit_code: Optional[int] = None
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    # cpu_user / cpu_system seconds and max_rss_kb, when the run reported them
+    usage: Dict[str, float] = field(default_factory=dict)
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+    # Workspace-relative paths of the files the run produced
+    artifacts: List[str] = field(default_factory=list)
+    # Headline for results without (meaningful) output, e.g. the denial reason
+    message: str = ""
+    aborted: bool = False
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status == SUCCESS
+
+    @property
+    def output(self) -> str:
+        """Combined output as the legacy text showed it (stdout, then stderr)."""
+        return self.stdout + self.stderr
+
+    def __str__(self) -> str:
+        prefix = PREFIXES[self.status]
+        if self.status == SUCCESS:
+            text = f"{prefix}\n{self.output}"
+            if self.artifacts:
+                text += f"\n[Files saved to ./workspace: {', '.join(sorted(self.artifacts))}]"
+            return text
+        if self.status == ERROR:
+            text = f"{prefix}\n{self.output}"
+            if self.aborted:
+                text += "\n[Execution aborted after first traceback]"
+            return text
+        if self.status in (TIMEOUT, OOM):
+            return f"{prefix} {self.message}\n{self.output}"
+        return f"{prefix} {self.message}"
+
+    def traceback(self) -> str:
+        """The last traceback on stderr, or "" if there is none."""
+        index = self.stderr.rfind(TRACEBACK_HEADER)
+        return self.stderr[index:].strip() if index >= 0 else ""
+
+    def feedback(self, max_lines: int = FEEDBACK_LINES) -> str:
+        """
+        What the Engineer needs to fix a failed run.
+
+        Errors are reduced to the last traceback (or the tail of the output
+        when there is none); successes give "".
+
+        Args:
+            max_lines: Lines of output kept, from the end
+
+        Returns:
+            Status line followed by the trimmed output
+        """
+        if self.ok:
+            return ""
+        if self.status in (DENIED, SYSTEM_ERROR, CANCELLED):
+            return str(self)
+
+        if self.status == ERROR:
+            head = PREFIXES[ERROR]
+            if self.exit_code is not None:
+                head += f" (exit code {self.exit_code})"
+            body = self.traceback() or self.output
+        else:
+            head = f"{PREFIXES[self.status]} {self.message}"
+            body = self.output
+
+        lines = body.strip().splitlines()
+        if len(lines) > max_lines:
+            lines = [f"... [{len(lines) - max_lines} lines omitted] ..."] + lines[-max_lines:]
+        return "\n".join([head] + lines)
+
+
+# Results recorded by executions in the current thread / task
+_collector: ContextVar[Optional[List[ExecutionResult]]] = ContextVar(
+    "execution_results", default=None
+)
+
+
+@contextmanager
+def collect_results():
+    """Collect the results of every execution made in this context."""
+    results: List[ExecutionResult] = []
+    token = _collector.set(results)
+    try:
+        yield results
+    finally:
+        _collector.reset(token)
+
+
+def record(result: ExecutionResult) -> None:
+    """Hand a result to the active collector, if any."""
+    results = _collector.get()
+    if results is not None:
+        results.append(result)
@@ -0,0 +1,528 @@
+"""
+Semantic Retrieval Tool for CrewAI
+
+Lets agents pull only the relevant snippets of the project into their
+prompts instead of whole files or the full tree map:
+- Text and source files are split into overlapping line windows
+- Windows are embedded with Ollama's /api/embed endpoint (or any embedder
+  with the same interface, e.g. HashingEmbedder for offline use and tests)
+- Vectors live in a memory-mapped float32 array; queries are a single
+  matrix-vector product followed by a top-k partition
+- Updates are incremental: only files whose content hash changed are
+  re-chunked and re-embedded
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import win_patch  # Windows compatibility
+
+from crewai.tools import BaseTool
+from pydantic import PrivateAttr
+from tools.gitignore import GitIgnore
+from tracing import traced
+
+
+# Default on-disk location of the index, relative to the indexed root
+DEFAULT_INDEX_DIR = os.path.join(".cache", "retrieval")
+
+# Files worth embedding, by extension
+INDEX_EXTENSIONS = {
+    ".py", ".md", ".rst", ".txt", ".json", ".yaml", ".yml", ".toml", ".cfg",
+    ".ini", ".js", ".ts", ".tsx", ".jsx", ".html", ".css", ".sh", ".sql", ".csv",
+}
+
+# Directories never indexed
+IGNORE_DIRS = {
+    ".git", "__pycache__", ".venv", "venv", "node_modules", ".idea", ".vscode",
+    ".runs", ".cache", "context",
+}
+
+# Larger files are skipped (data dumps, lockfiles, generated code)
+MAX_FILE_BYTES = 256 * 1024
+
+META_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[A-Za-z][a-z]+|[A-Z]+(?![a-z])|\d+")
+
+
+class OllamaEmbedder:
+    """Embeds text with a local Ollama embedding model."""
+
+    def __init__(
+        self,
+        model: str = "nomic-embed-text",
+        base_url: str = "http://localhost:11434",
+        timeout: float = 60.0,
+        batch_size: int = 32,
+    ):
+        """
+        Args:
+            model: Embedding model pulled into Ollama.
+            base_url: Ollama server URL.
+            timeout: Seconds to wait for one batch.
+            batch_size: Texts sent per request.
+        """
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.batch_size = batch_size
+
+    @property
+    def name(self) -> str:
+        return f"ollama/{self.model}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+
+        Raises:
+            RuntimeError: If Ollama cannot be reached or returns no vectors.
+        """
+        rows = []
+        for i in range(0, len(texts), self.batch_size):
+            body = json.dumps({"model": self.model, "input": list(texts[i:i + self.batch_size])})
+            request = urllib.request.Request(
+                f"{self.base_url}/api/embed",
+                data=body.encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    payload = json.loads(response.read())
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                raise RuntimeError(f"Ollama embedding request failed: {e}") from e
+            embeddings = payload.get("embeddings")
+            if not embeddings:
+                raise RuntimeError(f"Ollama returned no embeddings: {payload.get('error', payload)}")
+            rows.extend(embeddings)
+        return np.asarray(rows, dtype=np.float32)
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder using hashed identifier tokens.
+
+    Not semantic, but deterministic and good at matching identifiers, which
+    makes it a stand-in for tests and machines without an embedding model.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    @property
+    def name(self) -> str:
+        return f"hashing/{self.dim}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN_RE.findall(text):
+                digest = hashlib.blake2b(token.lower().encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                vectors[row, (value >> 1) % self.dim] += sign
+        return vectors
+
+
+def chunk_lines(text: str, size: int = 40, overlap: int = 10) -> List[Tuple[int, int, str]]:
+    """
+    Split text into overlapping windows of lines.
+
+    Args:
+        text: File contents.
+        size: Lines per window.
+        overlap: Lines shared by consecutive windows.
+
+    Returns:
+        (first_line, last_line, text) tuples with 1-based inclusive line numbers
+    """
+    lines = text.splitlines()
+    chunks = []
+    step = max(size - overlap, 1)
+    for start in range(0, max(len(lines), 1), step):
+        window = lines[start:start + size]
+        if any(line.strip() for line in window):
+            chunks.append((start + 1, start + len(window), "\n".join(window)))
+        if start + size >= len(lines):
+            break
+    return chunks
+
+
+class VectorStore:
+    """
+    Unit-normalized vectors in a growable memory-mapped float32 file, with a
+    JSON payload per row. Freed rows are reused by later inserts.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Where vectors.f32 and meta.json are kept.
+        """
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.dim: Optional[int] = None
+        self.embedder: Optional[str] = None
+        self.payloads: List[Optional[dict]] = []
+        self.files: Dict[str, dict] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._load()
+
+    @property
+    def count(self) -> int:
+        return len(self.payloads)
+
+    def reset(self, dim: int, embedder: str) -> None:
+        """Drop everything and start over with a new dimensionality."""
+        self._matrix = None
+        for path in (self.vectors_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.dim = dim
+        self.embedder = embedder
+        self.payloads = []
+        self.files = {}
+
+    def add(self, vectors: np.ndarray, payloads: List[dict]) -> List[int]:
+        """Store vectors (normalized here) and return their rows."""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        free = [i for i, p in enumerate(self.payloads) if p is None]
+        rows = free[:len(payloads)]
+        rows += list(range(self.count, self.count + len(payloads) - len(rows)))
+        self.payloads.extend([None] * (max(rows, default=-1) + 1 - self.count))
+        self._ensure_capacity(self.count)
+
+        self._matrix[rows] = vectors
+        for row, payload in zip(rows, payloads):
+            self.payloads[row] = payload
+        return rows
+
+    def remove(self, rows: Sequence[int]) -> None:
+        """Free rows for reuse."""
+        for row in rows:
+            self.payloads[row] = None
+        if self._matrix is not None and len(rows):
+            self._matrix[list(rows)] = 0.0
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[float, dict]]:
+        """Top-k rows by cosine similarity to ``query``."""
+        if self._matrix is None or not self.count:
+            return []
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return []
+        scores = self._matrix[:self.count] @ (query.astype(np.float32) / norm)
+        live = np.fromiter((p is not None for p in self.payloads), dtype=bool, count=self.count)
+        scores = np.where(live, scores, -np.inf)
+        k = min(k, int(live.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.payloads[i]) for i in top]
+
+    def flush(self) -> None:
+        """Persist vectors and metadata."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self._matrix is not None:
+            self._matrix.flush()
+        meta = {
+            "version": META_VERSION,
+            "dim": self.dim,
+            "embedder": self.embedder,
+            "payloads": self.payloads,
+            "files": self.files,
+        }
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def _load(self) -> None:
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("version") != META_VERSION or not meta.get("dim"):
+            return
+        self.dim = meta["dim"]
+        self.embedder = meta.get("embedder")
+        self.payloads = meta.get("payloads", [])
+        self.files = meta.get("files", {})
+        try:
+            self._ensure_capacity(self.count)
+        except (OSError, ValueError):
+            self.payloads, self.files = [], {}
+
+    def _ensure_capacity(self, rows: int) -> None:
+        """Grow the backing file (doubling) so it holds at least ``rows`` rows."""
+        row_bytes = self.dim * 4
+        current = self._matrix.shape[0] if self._matrix is not None else 0
+        if self._matrix is None and os.path.exists(self.vectors_path):
+            current = os.path.getsize(self.vectors_path) // row_bytes
+        if self._matrix is not None and rows <= current:
+            return
+
+        capacity = max(current, 1024)
+        while capacity < rows:
+            capacity *= 2
+        os.makedirs(self.directory, exist_ok=True)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(capacity * row_bytes)
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(capacity, self.dim))
+
+
+class WorkspaceIndex:
+    """Incrementally maintained chunk index of the text files under a root."""
+
+    def __init__(
+        self,
+        root: str,
+        embedder: Any,
+        index_dir: Optional[str] = None,
+        chunk_size: int = 40,
+        chunk_overlap: int = 10,
+    ):
+        """
+        Args:
+            root: Directory to index (includes ./workspace when it is the project root).
+            embedder: Object with ``name`` and ``embed(texts) -> ndarray``.
+            index_dir: Where the index is stored. Defaults to <root>/.cache/retrieval.
+            chunk_size: Lines per chunk.
+            chunk_overlap: Lines shared by consecutive chunks.
+        """
+        self.root = root
+        self.embedder = embedder
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.store = VectorStore(index_dir or os.path.join(root, DEFAULT_INDEX_DIR))
+        self._lock = threading.Lock()
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Re-embed changed files and drop deleted ones.
+
+        Files are hashed only when their mtime or size changed, and re-embedded
+        only when the hash differs.
+
+        Returns:
+            Counts of "added", "updated", "removed" and "unchanged" files
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> Dict[str, int]:
+        store = self.store
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        seen = set()
+        dirty = False
+        pending: List[Tuple[str, dict, List[Tuple[int, int, str]]]] = []
+        # A new (or first) embedder makes every stored vector unusable, so
+        # every file is embedded in this pass and the store reset afterwards
+        stale = store.embedder != self.embedder.name
+        known = {} if stale else store.files
+
+        for rel, path, st in self._files():
+            seen.add(rel)
+            stamp = [st.st_mtime_ns, st.st_size]
+            entry = known.get(rel)
+            if entry is not None and entry["stamp"] == stamp:
+                stats["unchanged"] += 1
+                continue
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            if entry is not None and entry["hash"] == digest:
+                # Touched but identical: remember the new stamp, keep the vectors
+                entry["stamp"] = stamp
+                stats["unchanged"] += 1
+                dirty = True
+                continue
+            stats["updated" if entry is not None else "added"] += 1
+            text = data.decode("utf-8", errors="replace")
+            chunks = chunk_lines(text, self.chunk_size, self.chunk_overlap)
+            pending.append((rel, {"hash": digest, "stamp": stamp, "rows": []}, chunks))
+
+        for rel in [rel for rel in store.files if rel not in seen]:
+            store.remove(store.files.pop(rel)["rows"])
+            stats["removed"] += 1
+            dirty = True
+
+        vectors = None
+        texts = [f"{rel}\n{chunk[2]}" for rel, _, chunks in pending for chunk in chunks]
+        if texts:
+            vectors = self.embedder.embed(texts)
+            if stale:
+                store.reset(vectors.shape[1], self.embedder.name)
+            elif store.dim != vectors.shape[1]:
+                # Same name, new dimensionality: the unchanged files need
+                # embedding again too
+                store.reset(vectors.shape[1], self.embedder.name)
+                return self._refresh()
+
+        # Free replaced rows first so one batched insert can reuse them
+        for rel, _, _ in pending:
+            if rel in store.files:
+                store.remove(store.files[rel]["rows"])
+        payloads = [
+            {"file": rel, "start": s, "end": e}
+            for rel, _, chunks in pending for s, e, _ in chunks
+        ]
+        rows = store.add(vectors, payloads) if payloads else []
+
+        offset = 0
+        for rel, entry, chunks in pending:
+            entry["rows"] = rows[offset:offset + len(chunks)]
+            offset += len(chunks)
+            store.files[rel] = entry
+            dirty = True
+
+        if dirty:
+            store.flush()
+        return stats
+
+    def search(self, query: str, k: int = 5) -> List[dict]:
+        """
+        Most similar chunks to ``query``.
+
+        Returns:
+            Dicts with file, start, end, score and text, best first
+        """
+        with self._lock:
+            vector = self.embedder.embed([query])[0]
+            if self.store.dim is not None and vector.shape[0] != self.store.dim:
+                return []
+            results = []
+            for score, payload in self.store.search(vector, k):
+                text = self._read_lines(payload["file"], payload["start"], payload["end"])
+                results.append(dict(payload, score=score, text=text))
+            return results
+
+    def _read_lines(self, rel: str, start: int, end: int) -> str:
+        path = os.path.join(self.root, *rel.split("/"))
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return ""
+        return "\n".join(lines[start - 1:end])
+
+    def _files(self):
+        """Yield (rel, path, stat) for every indexable file."""
+        ignore = GitIgnore.from_file(os.path.join(self.root, ".gitignore"))
+        pending = [(self.root, "")]
+        while pending:
+            path, base = pending.pop()
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                rel = base + entry.name
+                try:
+                    if entry.is_dir():
+                        if entry.name not in IGNORE_DIRS and not ignore.match(rel, is_dir=True):
+                            pending.append((entry.path, rel + "/"))
+                        continue
+                    if os.path.splitext(entry.name)[1] not in INDEX_EXTENSIONS:
+                        continue
+                    if ignore.match(rel, is_dir=False):
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if st.st_size <= MAX_FILE_BYTES:
+                    yield rel, entry.path, st
+
+
+class SemanticSearch(BaseTool):
+    """
+    Tool that returns the project snippets most relevant to a question,
+    so agents can ground plans and code without reading whole files.
+    """
+
+    name: str = "Semantic Code Search"
+    description: str = (
+        "Finds the code and documentation snippets in the project (including "
+        "./workspace) most relevant to a natural-language query, e.g. "
+        "'where are docker containers reset between runs'. Returns the top "
+        "matches as 'path:first-last' headers followed by the snippet text."
+    )
+
+    # Embedding backend; defaults to Ollama's nomic-embed-text
+    embedder: Optional[Any] = None
+
+    # Directory to index; defaults to the current working directory
+    root: Optional[str] = None
+
+    # Snippets returned per query
+    top_k: int = 5
+
+    # Seconds during which repeated queries skip checking files for changes
+    refresh_interval: float = 5.0
+
+    _index: Optional[WorkspaceIndex] = PrivateAttr(default=None)
+    _refreshed_at: float = PrivateAttr(default=0.0)
+
+    @traced("tool.semantic_search")
+    def _run(self, query: str, top_k: Optional[int] = None) -> str:
+        """
+        Search the project for snippets relevant to ``query``.
+
+        Args:
+            query: What to look for, in natural language or identifiers.
+            top_k: Number of snippets to return.
+
+        Returns:
+            Snippets with their locations, best match first.
+        """
+        try:
+            index = self.get_index()
+            if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                index.refresh()
+                self._refreshed_at = time.monotonic()
+            results = index.search(query, top_k or self.top_k)
+        except RuntimeError as e:
+            return f"ERROR: Semantic search unavailable. Reason: {str(e)}"
+
+        if not results:
+            return f"No indexed snippets match '{query}'."
+        blocks = [
+            f"### {r['file']}:{r['start']}-{r['end']} (score {r['score']:.2f})\n{r['text']}"
+            for r in results
+        ]
+        return "\n\n".join(blocks)
+
+    def get_index(self) -> WorkspaceIndex:
+        """Return the index, creating it on first use."""
+        if self._index is None:
+            self._index = WorkspaceIndex(
+                self.root or os.getcwd(),
+                self.embedder if self.embedder is not None else OllamaEmbedder(),
+            )
+        return self._index
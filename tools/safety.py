@@ -0,0 +1,240 @@
+"""
+Dangerous-Code Scanner for the Docker Sandbox
+
+Decides whether submitted code needs human approval before it runs:
+- A single compiled regex pre-filters scripts; code that never mentions a
+  risky module or method is cleared without parsing
+- Otherwise one AST pass resolves every referenced name through the
+  script's imports (aliases, from-imports, star imports), so ``o.remove``
+  after ``import os as o`` is caught while ``perform`` or ``form`` never are
+- Code run through exec/eval/compile is flagged, and string literals
+  passed to them are scanned as well; getattr/vars/__dict__ access on a
+  risky module is resolved (constant names) or flagged as dynamic access
+- Findings are structured (category, resolved target, line, source)
+"""
+
+import ast
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+
+@dataclass(frozen=True)
+class Finding:
+    """One dangerous operation found in a script."""
+
+    category: str
+    target: str
+    line: int
+    source: str
+    path: str = "script.py"
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line} [{self.category}] {self.target}: {self.source}"
+
+
+# Fully qualified targets and the category they belong to; entries ending
+# in ".*" cover every attribute of the module
+RULES: Dict[str, str] = {
+    "os.remove": "file-delete",
+    "os.unlink": "file-delete",
+    "os.rmdir": "file-delete",
+    "os.removedirs": "file-delete",
+    "shutil.rmtree": "file-delete",
+    "os.system": "shell",
+    "os.popen": "shell",
+    "os.exec*": "shell",
+    "os.spawn*": "shell",
+    "os.posix_spawn*": "shell",
+    "subprocess.*": "shell",
+    "pty.spawn": "shell",
+    "asyncio.create_subprocess_*": "shell",
+    "ctypes.*": "native-code",
+    "socket.*": "network",
+    "urllib.*": "network",
+    "urllib3.*": "network",
+    "http.client.*": "network",
+    "requests.*": "network",
+    "httpx.*": "network",
+    "aiohttp.*": "network",
+    "ftplib.*": "network",
+    "smtplib.*": "network",
+    "telnetlib.*": "network",
+    "__import__": "dynamic-import",
+    "importlib.import_module": "dynamic-import",
+    "exec": "dynamic-code",
+    "eval": "dynamic-code",
+    "compile": "dynamic-code",
+}
+
+# Modules whose attributes must not be reached by computed names
+# (getattr(os, name), vars(os)[name], os.__dict__[name])
+RISKY_MODULES = {"os", "subprocess", "shutil", "socket", "ctypes", "pty"}
+
+# Builtins that run source code given as a string
+DYNAMIC_CODE = {"exec", "eval", "compile"}
+
+# Methods that delete files whatever object they are called on (pathlib.Path etc.)
+DELETE_METHODS = {"unlink", "rmdir", "rmtree"}
+
+_EXACT = {k: v for k, v in RULES.items() if not k.endswith("*")}
+_PREFIXES = sorted(
+    ((k[:-1], v) for k, v in RULES.items() if k.endswith("*")),
+    key=lambda item: -len(item[0]),
+)
+
+# Every rule needs one of these words somewhere in the source (a module
+# name in an import or attribute chain, or a delete method), so scripts
+# without a match are safe without parsing
+_PREFILTER = re.compile(
+    r"\b(?:"
+    + "|".join(sorted({re.escape(k.split(".")[0].rstrip("*")) for k in RULES} | DELETE_METHODS))
+    + r")\b"
+)
+
+
+def _match_rule(target: str) -> Optional[str]:
+    """Category of a fully qualified target, or None if it is harmless."""
+    category = _EXACT.get(target)
+    if category is not None:
+        return category
+    for prefix, category in _PREFIXES:
+        if target.startswith(prefix) and len(target) > len(prefix):
+            return category
+    return None
+
+
+class _Resolver(ast.NodeVisitor):
+    """Collects import aliases, then resolves names and attribute chains."""
+
+    def __init__(self):
+        self.aliases: Dict[str, str] = {}
+        self.star_modules: Set[str] = set()
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                # "import os.path" binds "os"
+                top = alias.name.split(".")[0]
+                self.aliases[top] = top
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.level or not node.module:
+            return  # Relative imports are the script's own modules
+        for alias in node.names:
+            if alias.name == "*":
+                self.star_modules.add(node.module)
+            else:
+                self.aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+
+    def resolve(self, node: ast.AST) -> Optional[str]:
+        """Dotted name a Name/Attribute chain refers to, or None if not static."""
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        base = self.aliases.get(node.id)
+        if base is None:
+            base = node.id
+            for module in self.star_modules:
+                if _match_rule(f"{module}.{node.id}"):
+                    base = f"{module}.{node.id}"
+                    break
+        return ".".join([base] + parts[::-1])
+
+
+def scan_code(code: str, path: str = "script.py") -> List[Finding]:
+    """
+    Find dangerous operations in Python source.
+
+    Code that does not parse is reported clean: Python refuses to run any
+    of it.
+
+    Args:
+        code: Python source to scan
+        path: Name reported in findings
+
+    Returns:
+        Findings in source order, at most one per target and line
+    """
+    if not _PREFILTER.search(code):
+        return []
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return []
+
+    resolver = _Resolver()
+    resolver.visit(tree)
+    lines = code.splitlines()
+
+    def finding(category: str, target: str, node: ast.AST) -> Finding:
+        line = getattr(node, "lineno", 0)
+        source = lines[line - 1].strip() if 0 < line <= len(lines) else ""
+        return Finding(category, target, line, source, path)
+
+    found: Dict[tuple, Finding] = {}
+
+    def add(new: Finding) -> None:
+        key = (new.line, new.category)
+        current = found.get(key)
+        # Keep the most specific target of a chain (socket.socket.connect)
+        if current is None or len(new.target) > len(current.target):
+            found[key] = new
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        if isinstance(node, ast.Call):
+            for category, target in _dynamic_targets(node, resolver):
+                add(finding(category, target, node))
+            if resolver.resolve(node.func) in DYNAMIC_CODE and node.args:
+                # Scan literal source handed to exec/eval/compile as well
+                inner = node.args[0]
+                if isinstance(inner, ast.Constant) and isinstance(inner.value, str):
+                    for nested in scan_code(inner.value, path):
+                        add(finding(nested.category, nested.target, node))
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            target = resolver.resolve(node)
+            category = _match_rule(target) if target else None
+            if category is None and isinstance(node, ast.Attribute) and node.attr in DELETE_METHODS:
+                category, target = "file-delete", target or f"<expr>.{node.attr}"
+            if (category is None and isinstance(node, ast.Attribute)
+                    and node.attr == "__dict__" and _is_risky(resolver.resolve(node.value))):
+                category = "dynamic-access"
+            if category is not None:
+                add(finding(category, target, node))
+
+    return sorted(found.values(), key=lambda f: (f.line, f.target))
+
+
+def _is_risky(target: Optional[str]) -> bool:
+    return target is not None and target.split(".")[0] in RISKY_MODULES
+
+
+def _dynamic_targets(call: ast.Call, resolver: _Resolver) -> List[tuple]:
+    """
+    (category, target) of getattr(module, name) / vars(module) calls.
+
+    A constant name is resolved like a normal attribute; a computed one on
+    a risky module is flagged as dynamic access.
+    """
+    function = resolver.resolve(call.func)
+    if function not in ("getattr", "vars") or not call.args:
+        return []
+    owner = resolver.resolve(call.args[0])
+    if owner is None:
+        return []
+    if function == "getattr" and len(call.args) > 1:
+        name = call.args[1]
+        if isinstance(name, ast.Constant) and isinstance(name.value, str):
+            target = f"{owner}.{name.value}"
+            category = _match_rule(target)
+            return [(category, target)] if category else []
+    if _is_risky(owner):
+        return [("dynamic-access", f"{function}({owner})")]
+    return []
@@ -0,0 +1,364 @@
+"""
+Dependency-Aware Sandbox Images
+
+Scripts that import third-party packages run in an image that already
+has them installed, instead of failing with ModuleNotFoundError or
+pip-installing on every execution:
+- detect_requirements() finds the third-party imports of a script and its
+  helper modules (stdlib, local helpers and optional imports are skipped)
+- SandboxImages builds a derived image per dependency set, tagged with the
+  set's hash, and reuses it for every later run with the same imports
+- A local wheelhouse and/or package index allow offline builds
+- Derived images are evicted least-recently-used beyond ``max_images``
+"""
+
+import ast
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import docker
+
+from tools.docker_client import get_client
+from tracing import traced
+
+
+# Repository of the derived images; the tag is the dependency-set hash
+IMAGE_REPOSITORY = "local-dev-team-sandbox"
+
+# Label attached to every derived image (useful for manual cleanup)
+IMAGE_LABEL = "local-dev-team.sandbox-image"
+
+# Import names whose distribution on PyPI is named differently
+IMPORT_TO_PACKAGE = {
+    "PIL": "pillow",
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python-headless",
+    "dateutil": "python-dateutil",
+    "docx": "python-docx",
+    "dotenv": "python-dotenv",
+    "jwt": "pyjwt",
+    "magic": "python-magic",
+    "pptx": "python-pptx",
+    "serial": "pyserial",
+    "sklearn": "scikit-learn",
+    "skimage": "scikit-image",
+    "yaml": "pyyaml",
+    "Crypto": "pycryptodome",
+    "OpenSSL": "pyopenssl",
+    "attr": "attrs",
+    "google.protobuf": "protobuf",
+}
+
+# Modules every Python image provides without being in the stdlib list
+PREINSTALLED = frozenset({"pip", "setuptools", "pkg_resources", "wheel", "_distutils_hack"})
+
+# Exceptions that mark an import as optional when caught around it
+_IMPORT_ERRORS = frozenset({"ImportError", "ModuleNotFoundError", "Exception", "BaseException"})
+
+
+class ImageBuildError(RuntimeError):
+    """Raised when a derived image cannot be built (e.g. unknown package)."""
+
+
+def _catches_import_error(handler: ast.ExceptHandler) -> bool:
+    if handler.type is None:
+        return True
+    types = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+    return any(isinstance(t, ast.Name) and t.id in _IMPORT_ERRORS for t in types)
+
+
+def _imports(tree: ast.AST) -> Iterable[str]:
+    """Absolute module names imported outside ``try: ... except ImportError``."""
+    optional = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Try) and any(_catches_import_error(h) for h in node.handlers):
+            for statement in node.body:
+                optional.update(id(child) for child in ast.walk(statement))
+
+    for node in ast.walk(tree):
+        if id(node) in optional:
+            continue
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            yield node.module
+
+
+def _local_modules(files: Iterable[str]) -> set:
+    """Top-level module names provided by the helper files themselves."""
+    local = set()
+    for path in files:
+        first = path.replace("\\", "/").lstrip("./").split("/")[0]
+        local.add(first[:-3] if first.endswith(".py") else first)
+    return local
+
+
+def _package_for(module: str) -> str:
+    for name in (module, module.split(".")[0]):
+        if name in IMPORT_TO_PACKAGE:
+            return IMPORT_TO_PACKAGE[name]
+    return module.split(".")[0].replace("_", "-").lower()
+
+
+def detect_requirements(code: str, files: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Third-party distributions a script needs, in sorted order.
+
+    Args:
+        code: The script
+        files: Helper files (relative path -> content); their Python
+            sources are scanned too and their names count as local modules
+
+    Returns:
+        PyPI distribution names, e.g. ["numpy", "scikit-learn"]. Sources
+        that do not parse contribute nothing.
+    """
+    files = files or {}
+    sources = [code] + [
+        content for path, content in files.items()
+        if path.endswith(".py") and isinstance(content, str)
+    ]
+    skip = set(sys.stdlib_module_names) | PREINSTALLED | _local_modules(files)
+
+    packages = set()
+    for source in sources:
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            continue
+        for module in _imports(tree):
+            if module.split(".")[0] not in skip:
+                packages.add(_package_for(module))
+    return sorted(packages)
+
+
+class SandboxImages:
+    """
+    Builds and caches sandbox images with a script's dependencies installed.
+
+    Each dependency set maps to one image tagged with the set's hash, so
+    repeat runs with the same imports start with nothing left to install.
+    """
+
+    def __init__(
+        self,
+        base_image: str,
+        max_images: int = 10,
+        wheelhouse: Optional[str] = None,
+        index_url: Optional[str] = None,
+        offline: bool = False,
+        client=None,
+    ):
+        """
+        Args:
+            base_image: Image the derived images are built FROM.
+            max_images: Derived images kept locally; the least recently
+                used are removed beyond this.
+            wheelhouse: Local directory of wheels copied into the build and
+                searched before the index.
+            index_url: Package index or local mirror to install from.
+            offline: Install from the wheelhouse only (no index at all).
+            client: Optional docker client. Defaults to the shared client
+                (``tools.docker_client.get_client``) on first use.
+        """
+        if offline and not wheelhouse:
+            raise ValueError("Offline builds need a wheelhouse")
+        self.base_image = base_image
+        self.max_images = max_images
+        self.wheelhouse = wheelhouse
+        self.index_url = index_url
+        self.offline = offline
+
+        self._client = client
+        self._lock = threading.Lock()
+        self._building: Dict[str, threading.Lock] = {}
+        self._last_used: Dict[str, float] = {}
+        self._failed: Dict[str, str] = {}
+        self._listeners: List[Callable[[str], None]] = []
+
+        # Metrics
+        self.hits = 0
+        self.builds = 0
+        self.evicted = 0
+
+    @property
+    def client(self):
+        """Docker client, resolved lazily so constructing the cache is free."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    def tag_for(self, requirements: Iterable[str]) -> str:
+        """Image tag of a dependency set (independent of its order)."""
+        spec = json.dumps({
+            "base": self.base_image,
+            "requirements": sorted(set(requirements)),
+            "index_url": self.index_url,
+            "offline": self.offline,
+        }, sort_keys=True)
+        return f"{IMAGE_REPOSITORY}:{hashlib.sha256(spec.encode()).hexdigest()[:16]}"
+
+    def image_for(self, requirements: Iterable[str]) -> str:
+        """
+        Image to run a script with these requirements in, building it if needed.
+
+        Concurrent requests for the same set wait for a single build.
+
+        Args:
+            requirements: Distribution names from ``detect_requirements``
+
+        Returns:
+            The base image for an empty set, else the derived image's tag
+
+        Raises:
+            ImageBuildError: If the build fails. The failure is remembered,
+                so the same set is not rebuilt on every run.
+        """
+        requirements = sorted(set(requirements))
+        if not requirements:
+            return self.base_image
+        tag = self.tag_for(requirements)
+
+        with self._lock:
+            if tag in self._failed:
+                raise ImageBuildError(self._failed[tag])
+            build_lock = self._building.setdefault(tag, threading.Lock())
+
+        with build_lock:
+            built = not self._exists(tag)
+            if built:
+                self._build(tag, requirements)
+                self.builds += 1
+            else:
+                self.hits += 1
+            with self._lock:
+                self._last_used[tag] = time.time()
+        if built:
+            self.evict()
+        return tag
+
+    def subscribe(self, listener: Callable[[str], None]) -> None:
+        """
+        Call ``listener(tag)`` before a derived image is removed.
+
+        Users of the image (e.g. the sandbox tool's pool for it) drop their
+        idle containers there, since Docker refuses to remove an image a
+        container still uses.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used derived images beyond ``max_images``.
+
+        Subscribers are told first so idle containers release the image.
+        Images still used by a running container are skipped (Docker
+        refuses to remove them) and retried on a later pass.
+
+        Returns:
+            Number of images removed
+        """
+        try:
+            images = self.client.images.list(filters={"label": IMAGE_LABEL})
+        except Exception:
+            return 0
+
+        def last_used(image) -> float:
+            for tag in image.tags:
+                if tag in self._last_used:
+                    return self._last_used[tag]
+            return float(image.labels.get(IMAGE_LABEL + ".created", 0))
+
+        removed = 0
+        excess = len(images) - self.max_images
+        with self._lock:
+            listeners = list(self._listeners)
+        for image in sorted(images, key=last_used)[:max(excess, 0)]:
+            for tag in image.tags:
+                for listener in listeners:
+                    listener(tag)
+            try:
+                self.client.images.remove(image.id)
+            except Exception:
+                continue
+            with self._lock:
+                for tag in image.tags:
+                    self._last_used.pop(tag, None)
+            removed += 1
+        self.evicted += removed
+        return removed
+
+    def dockerfile(self, requirements: List[str]) -> str:
+        """Dockerfile installing ``requirements`` on top of the base image."""
+        install = ["pip", "install", "--no-cache-dir", "--disable-pip-version-check"]
+        lines = [f"FROM {self.base_image}"]
+        if self.wheelhouse:
+            lines.append("COPY wheelhouse /opt/wheelhouse")
+            install += ["--find-links", "/opt/wheelhouse"]
+        if self.offline:
+            install.append("--no-index")
+        elif self.index_url:
+            install += ["--index-url", self.index_url]
+        lines.append(f"RUN {json.dumps(install + list(requirements))}")
+        return "\n".join(lines) + "\n"
+
+    def stats(self) -> dict:
+        """Hit/build/eviction counters."""
+        with self._lock:
+            failed = len(self._failed)
+        return {"hits": self.hits, "builds": self.builds,
+                "evicted": self.evicted, "failed": failed}
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _exists(self, tag: str) -> bool:
+        try:
+            self.client.images.get(tag)
+            return True
+        except docker.errors.ImageNotFound:
+            return False
+
+    @traced("image.build")
+    def _build(self, tag: str, requirements: List[str]) -> None:
+        try:
+            self.client.images.build(
+                fileobj=io.BytesIO(self._context(requirements)),
+                custom_context=True,
+                tag=tag,
+                rm=True,
+                forcerm=True,
+                labels={
+                    IMAGE_LABEL: " ".join(requirements),
+                    IMAGE_LABEL + ".created": str(time.time()),
+                },
+            )
+        except (docker.errors.BuildError, docker.errors.APIError) as e:
+            message = f"Could not build a sandbox image with {', '.join(requirements)}: {e}"
+            with self._lock:
+                self._failed[tag] = message
+            raise ImageBuildError(message) from e
+
+    def _context(self, requirements: List[str]) -> bytes:
+        """Build context: the Dockerfile plus the wheelhouse, as a tar stream."""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            data = self.dockerfile(requirements).encode("utf-8")
+            info = tarfile.TarInfo("Dockerfile")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            if self.wheelhouse:
+                for name in sorted(os.listdir(self.wheelhouse)):
+                    if name.endswith((".whl", ".tar.gz", ".zip")):
+                        tar.add(os.path.join(self.wheelhouse, name), f"wheelhouse/{name}")
+        return buffer.getvalue()
@@ -0,0 +1,345 @@
+"""
+Per-Run Workspaces for the Docker Sandbox
+
+Gives every run/attempt its own staging directory so concurrent
+executions never share files:
+- Each execution works in the container's private /workspace layer,
+  seeded with a copy of the files already in ./workspace
+- Files it produces are copied back into workspace/.runs/<run_id>/attempt-<n>
+  (attempt-<n>-candidate-<c> when an attempt runs several candidates)
+- Artifacts are promoted into ./workspace only when the run succeeds
+- Old staging directories are garbage-collected by age and count, in the
+  background and never while a run still uses them
+"""
+
+import io
+import os
+import shutil
+import tarfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+
+# Name of the staging area inside the host workspace root
+RUNS_DIR_NAME = ".runs"
+
+# Largest total size of ./workspace files copied into each container
+MAX_INPUT_BYTES = 16 * 1024 * 1024
+
+
+@dataclass
+class RunWorkspace:
+    """Staging directory for one attempt of one run."""
+
+    run_id: str
+    attempt: int
+    path: str
+    # Candidate number when the attempt runs several at once
+    candidate: Optional[int] = None
+
+    @property
+    def label(self) -> str:
+        """Readable identifier, e.g. "<run_id>/attempt-2-candidate-1"."""
+        return f"{self.run_id}/{_attempt_dir(self.attempt, self.candidate)}"
+
+
+def _attempt_dir(attempt: int, candidate: Optional[int] = None) -> str:
+    name = f"attempt-{attempt}"
+    return name if candidate is None else f"{name}-candidate-{candidate}"
+
+
+# Workspace of the run executing in the current thread / task
+_current_workspace: ContextVar[Optional[RunWorkspace]] = ContextVar(
+    "current_workspace", default=None
+)
+
+
+def current_workspace() -> Optional[RunWorkspace]:
+    """Workspace activated for the current context, if any."""
+    return _current_workspace.get()
+
+
+@contextmanager
+def activate(workspace: RunWorkspace):
+    """Make ``workspace`` the target for sandbox executions in this context."""
+    token = _current_workspace.set(workspace)
+    try:
+        yield workspace
+    finally:
+        _current_workspace.reset(token)
+
+
+class WorkspaceManager:
+    """Creates, promotes and garbage-collects per-run staging directories."""
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_age: float = 24 * 3600,
+        keep: int = 50,
+        gc_interval: Optional[float] = 60.0,
+        max_input_bytes: int = MAX_INPUT_BYTES,
+    ):
+        """
+        Args:
+            root: Host workspace directory. Defaults to ./workspace.
+            max_age: Seconds after which a run's staging directory is removed.
+            keep: Maximum number of finished run directories retained
+                regardless of age.
+            gc_interval: Minimum seconds between background collections
+                started by ``create`` (None leaves collection to ``gc``).
+            max_input_bytes: Largest total size of the ./workspace files
+                ``inputs`` hands to an execution.
+        """
+        self.root = root or os.path.join(os.getcwd(), "workspace")
+        self.runs_dir = os.path.join(self.root, RUNS_DIR_NAME)
+        self.max_age = max_age
+        self.keep = keep
+        self.gc_interval = gc_interval
+        self.max_input_bytes = max_input_bytes
+        self._lock = threading.Lock()
+        # Open workspaces per run id; collection skips these runs
+        self._active: Counter = Counter()
+        self._last_gc = float("-inf")
+        self._collecting = False
+
+    def create(
+        self,
+        run_id: Optional[str] = None,
+        attempt: int = 1,
+        candidate: Optional[int] = None,
+    ) -> RunWorkspace:
+        """
+        Create the staging directory for a run attempt.
+
+        The run counts as active (safe from ``gc``) until the workspace is
+        passed to ``release``; ``use`` does both around a block.
+
+        Args:
+            run_id: Identifier shared by all attempts of a run. Generated if omitted.
+            attempt: Attempt number (1-based).
+            candidate: Candidate number (1-based) when the attempt runs
+                several candidates side by side.
+
+        Returns:
+            The new RunWorkspace
+        """
+        run_id = run_id or uuid.uuid4().hex[:12]
+        path = os.path.join(self.runs_dir, run_id, _attempt_dir(attempt, candidate))
+        with self._lock:
+            self._active[run_id] += 1
+            os.makedirs(path, exist_ok=True)
+            collect = (self.gc_interval is not None and not self._collecting
+                       and time.monotonic() - self._last_gc >= self.gc_interval)
+            if collect:
+                self._collecting = True
+                self._last_gc = time.monotonic()
+        if collect:
+            threading.Thread(target=self._collect, name="workspace-gc", daemon=True).start()
+        return RunWorkspace(run_id=run_id, attempt=attempt, path=path, candidate=candidate)
+
+    def release(self, workspace: RunWorkspace) -> None:
+        """Mark a workspace from ``create`` as no longer in use."""
+        with self._lock:
+            self._active[workspace.run_id] -= 1
+            if self._active[workspace.run_id] <= 0:
+                del self._active[workspace.run_id]
+
+    @contextmanager
+    def use(
+        self,
+        run_id: Optional[str] = None,
+        attempt: int = 1,
+        candidate: Optional[int] = None,
+    ) -> Iterator[RunWorkspace]:
+        """Create a workspace and make it current for the block (see ``create``)."""
+        workspace = self.create(run_id, attempt, candidate)
+        try:
+            with activate(workspace):
+                yield workspace
+        finally:
+            self.release(workspace)
+
+    def inputs(self) -> Dict[str, bytes]:
+        """
+        Files already in the host workspace, to be copied into a container.
+
+        Hidden entries (the staging area, approvals, caches) are skipped, as
+        are files once ``max_input_bytes`` would be exceeded.
+
+        Returns:
+            Relative POSIX paths mapped to their content
+        """
+        # No lock: only the filesystem is read, and holding the manager lock
+        # here would stall every create/release/promote behind the reads
+        files = {}
+        budget = self.max_input_bytes
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                if filename.startswith("."):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    size = os.path.getsize(path)
+                    if size > budget:
+                        continue
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except OSError:
+                    continue  # Removed meanwhile
+                budget -= len(data)
+                files[os.path.relpath(path, self.root).replace(os.sep, "/")] = data
+        return files
+
+    def extract(self, workspace: RunWorkspace, chunks: Iterable[bytes],
+                exclude: Iterable[str] = (),
+                unchanged: Optional[Mapping[str, bytes]] = None) -> List[str]:
+        """
+        Unpack a ``get_archive`` stream of the container workspace.
+
+        Args:
+            workspace: Staging directory receiving the files.
+            chunks: Raw tar stream as returned by ``container.get_archive``.
+            exclude: Relative paths to skip (e.g. the injected script).
+            unchanged: Injected inputs, skipped unless their content changed.
+
+        Returns:
+            Relative paths of the extracted files
+        """
+        excluded = set(exclude)
+        unchanged = unchanged or {}
+        extracted = []
+        with tarfile.open(fileobj=_ChunkReader(chunks), mode="r|") as tar:
+            for member in tar:
+                # get_archive prefixes every member with the directory's name
+                _, _, name = member.name.partition("/")
+                if not name or name in excluded or not member.isfile():
+                    continue
+                target = os.path.normpath(os.path.join(workspace.path, name))
+                if not target.startswith(os.path.normpath(workspace.path) + os.sep):
+                    continue  # Never write outside the staging directory
+                source = tar.extractfile(member)
+                if name in unchanged:
+                    data = source.read()
+                    if data == unchanged[name]:
+                        continue
+                    source = io.BytesIO(data)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    shutil.copyfileobj(source, f)
+                extracted.append(name)
+        return extracted
+
+    def write(self, workspace: RunWorkspace, files: Dict[str, bytes]) -> List[str]:
+        """
+        Stage files given in memory (e.g. artifacts replayed from a cache).
+
+        Args:
+            workspace: Staging directory receiving the files.
+            files: Relative POSIX paths mapped to their content.
+
+        Returns:
+            Relative paths of the written files
+        """
+        written = []
+        root = os.path.normpath(workspace.path)
+        for name, data in files.items():
+            target = os.path.normpath(os.path.join(root, name))
+            if not target.startswith(root + os.sep):
+                continue  # Never write outside the staging directory
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+            written.append(name)
+        return written
+
+    def promote(self, workspace: RunWorkspace) -> List[str]:
+        """
+        Copy a successful attempt's artifacts into the host workspace root.
+
+        Returns:
+            Relative paths of the promoted files
+        """
+        promoted = []
+        with self._lock:
+            for dirpath, _, filenames in os.walk(workspace.path):
+                for filename in filenames:
+                    source = os.path.join(dirpath, filename)
+                    rel = os.path.relpath(source, workspace.path)
+                    target = os.path.join(self.root, rel)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copy2(source, target)
+                    promoted.append(rel.replace(os.sep, "/"))
+        return promoted
+
+    def gc(self) -> int:
+        """
+        Remove run directories older than ``max_age`` or beyond ``keep``.
+
+        Runs with a workspace still in use are never removed and do not
+        count towards ``keep``.
+
+        Returns:
+            Number of run directories removed
+        """
+        try:
+            entries = list(os.scandir(self.runs_dir))
+        except FileNotFoundError:
+            return 0
+
+        runs = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    runs.append((entry.stat().st_mtime, entry))
+            except OSError:
+                continue  # Removed meanwhile
+        runs.sort(key=lambda run: run[0], reverse=True)
+        cutoff = time.time() - self.max_age
+        removed = 0
+        kept = 0
+        for mtime, entry in runs:
+            with self._lock:
+                # Checked under the lock so a run cannot start mid-removal
+                if entry.name in self._active:
+                    continue
+                if kept < self.keep and mtime >= cutoff:
+                    kept += 1
+                    continue
+                shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+        return removed
+
+    def _collect(self) -> None:
+        try:
+            self.gc()
+        finally:
+            with self._lock:
+                self._collecting = False
+
+
+class _ChunkReader:
+    """File-like adapter over an iterator of byte chunks for tarfile streaming."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
@@ -0,0 +1,342 @@
+"""
+Span Tracing for the Agent Pipeline
+
+Records where the time of a run goes as a tree of timed spans (run ->
+plan / attempt -> agent task -> LLM call / tool -> sandbox stage):
+- Tracer.span() opens the root span of a trace, e.g. one per run
+- span() opens a child of the span active in this thread / task; with no
+  active trace it does nothing, so instrumented code costs nothing when
+  tracing is off
+- annotate() adds attributes (token counts, statuses) to the active span
+- Finished spans stream to an ``on_end`` callback (e.g. a JsonlWriter) and
+  can be written as JSONL or as an OTLP/JSON file for OpenTelemetry tools
+- summarize() gives count, p50, p95 and total seconds per span name, and
+  read_jsonl() loads an exported trace back for offline analysis
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+# Span statuses
+OK = "ok"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+# service.name resource attribute of exported OTLP files
+SERVICE_NAME = "local-agent-team"
+
+# OTLP span kind INTERNAL and status codes
+_OTLP_KIND_INTERNAL = 1
+_OTLP_STATUS = {OK: 1, ERROR: 2, CANCELLED: 2}
+
+
+@dataclass
+class Span:
+    """One timed operation; times are epoch seconds."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = 0.0
+    duration: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = OK
+    tracer: Optional["Tracer"] = field(default=None, repr=False, compare=False)
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat record, one line of the JSONL export."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Span in the OTLP/JSON encoding."""
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _OTLP_KIND_INTERNAL,
+            "startTimeUnixNano": str(int(self.start * 1e9)),
+            "endTimeUnixNano": str(int(self.end * 1e9)),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": _OTLP_STATUS[self.status]},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        if self.status != OK and "error" in self.attributes:
+            otlp["status"]["message"] = str(self.attributes["error"])
+        return otlp
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+# Span active in the current thread / task
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Span active in the current context, if any."""
+    return _current_span.get()
+
+
+class Tracer:
+    """Collects finished spans; thread- and asyncio-safe."""
+
+    def __init__(self, keep: int = 10000, on_end: Optional[Callable[[Span], None]] = None):
+        """
+        Args:
+            keep: Most recent finished spans retained in memory.
+            on_end: Called with every finished span, e.g. a JsonlWriter.
+        """
+        self.on_end = on_end
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=keep)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Time the enclosed block as a span of this tracer.
+
+        The span continues the trace of the active span when that belongs to
+        this tracer, and starts a new trace otherwise.
+
+        Args:
+            name: Operation name, e.g. "run" or "sandbox.exec"
+            **attributes: Initial attributes
+
+        Yields:
+            The open Span
+        """
+        parent = _current_span.get()
+        if parent is not None and parent.tracer is not self:
+            parent = None
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start=time.time(),
+            attributes=dict(attributes),
+            tracer=self,
+        )
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = CANCELLED if isinstance(e, asyncio.CancelledError) else ERROR
+            span.attributes.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._finish(span)
+
+    def spans(self) -> List[Span]:
+        """Finished spans, oldest first."""
+        with self._lock:
+            return list(self._spans)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """``summarize()`` of the retained spans."""
+        return summarize(self.spans())
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+        if self.on_end is not None:
+            try:
+                self.on_end(span)
+            except Exception:
+                pass  # An exporter failure must not fail the traced code
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time the enclosed block as a child of the active span.
+
+    Args:
+        name: Operation name
+        **attributes: Initial attributes
+
+    Yields:
+        The open Span, or None (and nothing is recorded) outside a trace
+    """
+    parent = _current_span.get()
+    if parent is None or parent.tracer is None:
+        yield None
+        return
+    with parent.tracer.span(name, **attributes) as child:
+        yield child
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the active span; does nothing outside a trace."""
+    active = _current_span.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+def traced(name: str) -> Callable:
+    """Decorator running every call of a function (sync or async) in ``span(name)``."""
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# =============================================================================
+# Export
+# =============================================================================
+
+class JsonlWriter:
+    """``on_end`` callback appending each finished span to a JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def write_jsonl(spans: Iterable[Span], path: str) -> None:
+    """Write spans as JSON lines (one span per line)."""
+    with open(path, "w", encoding="utf-8") as f:
+        for item in spans:
+            f.write(json.dumps(item.to_dict(), default=str) + "\n")
+
+
+def write_otlp(spans: Iterable[Span], path: str, service_name: str = SERVICE_NAME) -> None:
+    """
+    Write spans as an OTLP/JSON trace export.
+
+    The file has the shape of an OTLP ``ExportTraceServiceRequest``, which
+    OpenTelemetry collectors (file receiver) and trace viewers can load.
+    """
+    export = {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": service_name}}
+        ]},
+        "scopeSpans": [{
+            "scope": {"name": __name__},
+            "spans": [item.to_otlp() for item in spans],
+        }],
+    }]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(export, f, default=str)
+
+
+def read_jsonl(path: str) -> List[Span]:
+    """Load spans written by ``write_jsonl`` or a JsonlWriter."""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                record.pop("end", None)
+                spans.append(Span(**record))
+    return spans
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    index = max(math.ceil(fraction * len(values)) - 1, 0)
+    return values[index]
+
+
+def summarize(spans: Iterable[Span]) -> Dict[str, Dict[str, float]]:
+    """
+    Latency statistics per span name.
+
+    Returns:
+        name -> {"count", "errors", "p50", "p95", "max", "total"}
+        (seconds), ordered by total time, largest first
+    """
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for item in spans:
+        durations.setdefault(item.name, []).append(item.duration)
+        if item.status != OK:
+            errors[item.name] = errors.get(item.name, 0) + 1
+
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "p50": round(_percentile(values, 0.50), 4),
+            "p95": round(_percentile(values, 0.95), 4),
+            "max": round(values[-1], 4),
+            "total": round(sum(values), 4),
+        }
+    return dict(sorted(summary.items(), key=lambda entry: -entry[1]["total"]))
+
+
+def format_summary(summary: Dict[str, Dict[str, float]]) -> str:
+    """One aligned line per span name of a ``summarize()`` result."""
+    return "\n".join(
+        f"  {name:<22} n={stats['count']:<5} p50={stats['p50']:.3f}s "
+        f"p95={stats['p95']:.3f}s total={stats['total']:.1f}s"
+        + (f" errors={stats['errors']}" if stats["errors"] else "")
+        for name, stats in summary.items()
+    )